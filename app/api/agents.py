@@ -57,6 +57,7 @@ class AgentLaunchRequest(BaseModel):
     auto_review: bool = Field(False, description="Automatically review the PR after creation (disabled)")
     max_duration_minutes: int = Field(0, ge=0, le=480, description="Maximum run duration in minutes (0 = unlimited, default)")
     base_branch: Optional[str] = Field(None, description="Base branch for worktree (defaults to main/master)")
+    priority: int = Field(0, ge=-10, le=10, description="Queued agents with a higher priority start first")
 
 
 class AgentResponse(BaseModel):
@@ -80,6 +81,7 @@ class AgentResponse(BaseModel):
     auto_pr: bool = True
     auto_review: bool = False
     max_duration_minutes: int = 0
+    priority: int = 0
 
 
 class AgentLogEntry(BaseModel):
@@ -155,7 +157,8 @@ def _create_agent_response(agent_data: Dict[str, Any]) -> AgentResponse:
         auto_branch=agent_data.get("auto_branch", True),
         auto_pr=agent_data.get("auto_pr", False),
         auto_review=agent_data.get("auto_review", False),
-        max_duration_minutes=agent_data.get("max_duration_minutes", 30)
+        max_duration_minutes=agent_data.get("max_duration_minutes", 30),
+        priority=agent_data.get("priority") or 0
     )
 
 
@@ -209,7 +212,8 @@ async def launch_agent(request: AgentLaunchRequest, token: str = Depends(require
         auto_merge=request.auto_merge,
         auto_review=request.auto_review,
         max_duration_minutes=request.max_duration_minutes,
-        base_branch=request.base_branch
+        base_branch=request.base_branch,
+        priority=request.priority
     )
 
     logger.info(f"Launched agent {agent_run['id']}: {request.name}")
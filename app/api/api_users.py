@@ -11,6 +11,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 
 from app.core.models import ApiUser, ApiUserCreate, ApiUserUpdate, ApiUserWithKey
 from app.api.auth import require_admin
+from app.core.principal_cache import principal_cache
 from app.db import database as db
 
 router = APIRouter(prefix="/api/v1/api-users", tags=["API Users"])
@@ -129,6 +130,8 @@ async def update_api_user(
         is_active=request.is_active,
         web_login_allowed=request.web_login_allowed
     )
+    # Cached tokens carry the old user (or a deactivated one)
+    principal_cache.invalidate_user(user_id)
 
     return user
 
@@ -148,6 +151,7 @@ async def regenerate_api_key(user_id: str, token: str = Depends(require_admin)):
     api_key_hash = hash_api_key(api_key)
 
     user = db.update_api_user_key(user_id, api_key_hash)
+    principal_cache.invalidate_user(user_id)
 
     return {**user, "api_key": api_key}
 
@@ -160,3 +164,4 @@ async def delete_api_user(user_id: str, token: str = Depends(require_admin)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="API user not found"
         )
+    principal_cache.invalidate_user(user_id)
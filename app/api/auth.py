@@ -20,6 +20,9 @@ from app.core.models import (
 )
 import bcrypt
 from app.core.auth import auth_service
+from app.core.principal_cache import (
+    principal_cache, Principal, ADMIN_SESSION, API_KEY_SESSION, API_KEY
+)
 from app.core.config import settings
 from app.core import encryption
 from app.core import totp_service
@@ -148,39 +151,33 @@ def hash_api_key(api_key: str) -> str:
     return hashlib.sha256(api_key.encode()).hexdigest()
 
 
+def _set_principal(request: Request, principal: Principal) -> None:
+    """Store who is authenticated in request state for later use"""
+    request.state.is_admin = principal.is_admin
+    # Copy so handlers can't modify the cached user
+    request.state.api_user = dict(principal.api_user) if principal.api_user else None
+    if principal.api_user and principal_cache.should_record_use(principal.api_user["id"]):
+        # Update last used timestamp (coalesced, see principal_cache)
+        db.update_api_user_last_used(principal.api_user["id"])
+
+
 def require_auth(request: Request) -> str:
     """Dependency that requires authentication (cookie, API key, or API key session)"""
-    # First try cookie-based admin auth
+    # First try cookie-based auth: admin session or API key web session
     token = get_session_token(request)
-    if token:
-        # Check admin session
-        if auth_service.validate_session(token):
-            request.state.is_admin = True
-            request.state.api_user = None
-            return token
-
-        # Check API key web session
-        api_key_session = db.get_api_key_session(token)
-        if api_key_session:
-            api_user = db.get_api_user(api_key_session["api_user_id"])
-            if api_user and api_user["is_active"]:
-                request.state.is_admin = False
-                request.state.api_user = api_user
-                db.update_api_user_last_used(api_user["id"])
-                return f"api_session:{api_user['id']}"
+    principal = principal_cache.resolve(token)
+    if principal and principal.kind == ADMIN_SESSION:
+        _set_principal(request, principal)
+        return token
+    if principal and principal.kind == API_KEY_SESSION:
+        _set_principal(request, principal)
+        return f"api_session:{principal.api_user_id}"
 
     # Then try API key auth (Bearer token)
-    api_key = get_api_key(request)
-    if api_key:
-        key_hash = hash_api_key(api_key)
-        api_user = db.get_api_user_by_key_hash(key_hash)
-        if api_user:
-            # Update last used timestamp
-            db.update_api_user_last_used(api_user["id"])
-            # Store API user info in request state for later use
-            request.state.is_admin = False
-            request.state.api_user = api_user
-            return f"api_key:{api_user['id']}"
+    principal = principal_cache.resolve(get_api_key(request))
+    if principal and principal.kind == API_KEY:
+        _set_principal(request, principal)
+        return f"api_key:{principal.api_user_id}"
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -191,9 +188,9 @@ def require_auth(request: Request) -> str:
 def require_admin(request: Request) -> str:
     """Dependency that requires admin authentication only"""
     token = get_session_token(request)
-    if token and auth_service.validate_session(token):
-        request.state.is_admin = True
-        request.state.api_user = None
+    principal = principal_cache.resolve(token)
+    if principal and principal.is_admin:
+        _set_principal(request, principal)
         return token
 
     raise HTTPException(
@@ -214,27 +211,15 @@ def require_api_key(request: Request) -> dict:
     not admin sessions. Returns the API user dict.
     """
     # First check for Bearer token (direct API key)
-    api_key = get_api_key(request)
-    if api_key:
-        key_hash = hash_api_key(api_key)
-        api_user = db.get_api_user_by_key_hash(key_hash)
-        if api_user and api_user.get("is_active", True):
-            db.update_api_user_last_used(api_user["id"])
-            request.state.is_admin = False
-            request.state.api_user = api_user
-            return api_user
-
-    # Then check for API key web session (cookie-based API key login)
-    token = get_session_token(request)
-    if token:
-        api_key_session = db.get_api_key_session(token)
-        if api_key_session:
-            api_user = db.get_api_user(api_key_session["api_user_id"])
-            if api_user and api_user.get("is_active", True):
-                db.update_api_user_last_used(api_user["id"])
-                request.state.is_admin = False
-                request.state.api_user = api_user
-                return api_user
+    principal = principal_cache.resolve(get_api_key(request))
+    if not (principal and principal.kind == API_KEY):
+        # Then check for API key web session (cookie-based API key login)
+        principal = principal_cache.resolve(get_session_token(request))
+        if not (principal and principal.kind == API_KEY_SESSION):
+            principal = None
+    if principal:
+        _set_principal(request, principal)
+        return request.state.api_user
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -256,27 +241,15 @@ def get_current_api_user(request: Request) -> dict:
     Returns the API user dict.
     """
     # First check for Bearer token (direct API key)
-    api_key = get_api_key(request)
-    if api_key:
-        key_hash = hash_api_key(api_key)
-        api_user = db.get_api_user_by_key_hash(key_hash)
-        if api_user and api_user.get("is_active", True):
-            db.update_api_user_last_used(api_user["id"])
-            request.state.is_admin = False
-            request.state.api_user = api_user
-            return api_user
-
-    # Then check for API key web session (cookie-based API user login)
-    token = get_session_token(request)
-    if token:
-        api_key_session = db.get_api_key_session(token)
-        if api_key_session:
-            api_user = db.get_api_user(api_key_session["api_user_id"])
-            if api_user and api_user.get("is_active", True):
-                db.update_api_user_last_used(api_user["id"])
-                request.state.is_admin = False
-                request.state.api_user = api_user
-                return api_user
+    principal = principal_cache.resolve(get_api_key(request))
+    if not (principal and principal.kind == API_KEY):
+        # Then check for API key web session (cookie-based API key login)
+        principal = principal_cache.resolve(get_session_token(request))
+        if not (principal and principal.kind == API_KEY_SESSION):
+            principal = None
+    if principal:
+        _set_principal(request, principal)
+        return request.state.api_user
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -568,6 +541,7 @@ async def register_api_user(req: Request, register_data: ApiUserRegisterRequest,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to register. Please try again."
         )
+    principal_cache.invalidate_user(updated_user["id"])
 
     # Create session for the newly registered user
     session_token = secrets.token_urlsafe(32)
@@ -711,6 +685,7 @@ async def logout(request: Request, response: Response):
         auth_service.logout(token)
         # Also try to delete API key session if exists
         db.delete_api_key_session(token)
+        principal_cache.invalidate_token(token)
 
     # Note: We don't clear the encryption key on logout to allow
     # the app to continue functioning for API users
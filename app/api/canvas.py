@@ -22,8 +22,7 @@ from pydantic import BaseModel, Field
 
 from app.core.config import settings
 from app.api.auth import require_auth
-from app.db import database
-from app.core import encryption
+from app.core.credential_service import secret_cache
 
 logger = logging.getLogger(__name__)
 
@@ -38,24 +37,8 @@ def _get_decrypted_api_key(setting_name: str) -> Optional[str]:
     Returns:
         The decrypted API key, or None if not found or decryption fails
     """
-    value = database.get_system_setting(setting_name)
-    if not value:
-        return None
-
-    # Check if the value is encrypted
-    if encryption.is_encrypted(value):
-        if not encryption.is_encryption_ready():
-            logger.warning(f"Cannot decrypt {setting_name}: encryption key not available")
-            return None
-        try:
-            decrypted = encryption.decrypt_value(value)
-            return decrypted
-        except Exception as e:
-            logger.error(f"Failed to decrypt {setting_name}: {e}")
-            return None
-
-    # Return plaintext value (for backwards compatibility during migration)
-    return value
+    # Cached in memory, see app/core/credential_service.py
+    return secret_cache.get_admin_key(setting_name)
 
 router = APIRouter(prefix="/api/v1/canvas", tags=["Canvas"])
 
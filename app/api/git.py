@@ -9,6 +9,7 @@ Provides endpoints for git repository operations including:
 - Fetch from remote
 """
 
+import asyncio
 import uuid
 import logging
 from typing import List, Optional
@@ -214,12 +215,20 @@ def check_project_access(request: Request, project_id: str) -> None:
             )
 
 
-def ensure_git_repository_record(project_id: str, working_dir: str) -> Optional[dict]:
+async def ensure_git_repository_record(
+    project_id: str,
+    working_dir: str,
+    is_git_repo: Optional[bool] = None
+) -> Optional[dict]:
     """
     Ensure a git_repositories record exists for this project if it's a git repo.
     Creates one if needed, returns the record or None if not a git repo.
+
+    Pass is_git_repo when already known (e.g. from a status) to skip the check.
     """
-    if not git_service.is_git_repo(working_dir):
+    if is_git_repo is None:
+        is_git_repo = await git_service.is_git_repo_async(working_dir)
+    if not is_git_repo:
         return None
 
     repo = database.get_git_repository_by_project(project_id)
@@ -228,8 +237,8 @@ def ensure_git_repository_record(project_id: str, working_dir: str) -> Optional[
 
     # Create a new record
     repo_id = f"repo-{uuid.uuid4().hex[:12]}"
-    remote_url = git_service.get_remote_url(working_dir)
-    default_branch = git_service.get_default_branch(working_dir)
+    remote_url = await git_service.get_remote_url_async(working_dir)
+    default_branch = await git_service.get_default_branch_async(working_dir)
 
     # Try to extract GitHub repo name from URL
     github_repo_name = None
@@ -279,7 +288,7 @@ async def get_git_status(
     working_dir = get_project_path(project_id)
 
     # Get git status
-    status_data = git_service.get_status(working_dir)
+    status_data = await git_service.get_status_async(working_dir)
 
     # Convert staged files to proper format
     staged_files = [
@@ -288,7 +297,7 @@ async def get_git_status(
     ]
 
     # Ensure repository record exists and get additional info
-    repo = ensure_git_repository_record(project_id, working_dir)
+    repo = await ensure_git_repository_record(project_id, working_dir, is_git_repo=status_data["is_git_repo"])
 
     return GitStatusResponse(
         is_git_repo=status_data["is_git_repo"],
@@ -327,14 +336,14 @@ async def list_branches(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
         )
 
-    branches = git_service.list_branches(working_dir, include_remote=include_remote)
-    current_branch = git_service.get_current_branch(working_dir)
+    branches = await git_service.list_branches_async(working_dir, include_remote=include_remote)
+    current_branch = await git_service.get_current_branch_async(working_dir)
 
     branch_infos = [
         BranchInfo(
@@ -373,7 +382,7 @@ async def create_branch(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
@@ -388,7 +397,8 @@ async def create_branch(
                 detail=f"Invalid branch name: contains '{char}'"
             )
 
-    success = git_service.create_branch(
+    success = await asyncio.to_thread(
+        git_service.create_branch,
         working_dir,
         body.name,
         start_point=body.start_point
@@ -425,21 +435,21 @@ async def delete_branch(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
         )
 
     # Don't allow deleting current branch
-    current = git_service.get_current_branch(working_dir)
+    current = await git_service.get_current_branch_async(working_dir)
     if current == branch_name:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete the currently checked out branch"
         )
 
-    success = git_service.delete_branch(working_dir, branch_name, force=force)
+    success = await asyncio.to_thread(git_service.delete_branch, working_dir, branch_name, force=force)
 
     if not success:
         raise HTTPException(
@@ -470,21 +480,21 @@ async def checkout_branch(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
         )
 
-    # Check for uncommitted changes
-    status_data = git_service.get_status(working_dir)
+    # Check for uncommitted changes (uncached, the last poll may predate an edit)
+    status_data = await git_service.get_status_async(working_dir, use_cache=False)
     if not status_data["is_clean"]:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Cannot checkout: you have uncommitted changes. Commit or stash them first."
         )
 
-    success = git_service.checkout(working_dir, body.ref)
+    success = await git_service.checkout_async(working_dir, body.ref)
 
     if not success:
         raise HTTPException(
@@ -517,7 +527,7 @@ async def get_commit_graph(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
@@ -526,7 +536,7 @@ async def get_commit_graph(
     # Cap limit to prevent excessive data
     limit = min(limit, 500)
 
-    commits = git_service.get_commit_graph(working_dir, limit=limit, branch=branch)
+    commits = await git_service.get_commit_graph_async(working_dir, limit=limit, branch=branch)
 
     commit_infos = [
         CommitInfo(
@@ -565,13 +575,13 @@ async def fetch_from_remote(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
         )
 
-    success = git_service.fetch(working_dir, remote=remote)
+    success = await git_service.fetch_async(working_dir, remote=remote)
 
     # Update last_synced_at if we have a repository record
     if success:
@@ -682,7 +692,7 @@ async def list_worktrees(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
@@ -729,7 +739,7 @@ async def create_worktree(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
@@ -746,9 +756,11 @@ async def create_worktree(
 
     session = None
 
+    # Creating a worktree runs several git commands; keep them off the event loop
     if body.profile_id:
         # Legacy mode: Create worktree and session together
-        worktree, session = worktree_manager.create_worktree_session(
+        worktree, session = await asyncio.to_thread(
+            worktree_manager.create_worktree_session,
             project_id=project_id,
             branch_name=body.branch_name,
             create_new_branch=body.create_new_branch,
@@ -763,7 +775,8 @@ async def create_worktree(
             )
     else:
         # New mode: Create standalone worktree (no session)
-        worktree = worktree_manager.create_worktree(
+        worktree = await asyncio.to_thread(
+            worktree_manager.create_worktree,
             project_id=project_id,
             branch_name=body.branch_name,
             create_new_branch=body.create_new_branch,
@@ -777,7 +790,7 @@ async def create_worktree(
             )
 
     # Get full worktree details for response
-    worktree_details = worktree_manager.get_worktree_details(worktree["id"])
+    worktree_details = await worktree_manager.get_worktree_details_async(worktree["id"])
 
     return WorktreeCreateResponse(
         success=True,
@@ -801,7 +814,7 @@ async def get_worktree(
     """
     check_project_access(request, project_id)
 
-    worktree = worktree_manager.get_worktree_details(worktree_id)
+    worktree = await worktree_manager.get_worktree_details_async(worktree_id)
     if not worktree:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -853,7 +866,7 @@ async def delete_worktree(
             detail=f"Worktree not found in this project: {worktree_id}"
         )
 
-    success = worktree_manager.cleanup_worktree(worktree_id, keep_branch=keep_branch)
+    success = await asyncio.to_thread(worktree_manager.cleanup_worktree, worktree_id, keep_branch=keep_branch)
 
     if not success:
         raise HTTPException(
@@ -882,13 +895,13 @@ async def sync_worktrees(
     check_project_access(request, project_id)
     working_dir = get_project_path(project_id)
 
-    if not git_service.is_git_repo(working_dir):
+    if not await git_service.is_git_repo_async(working_dir):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project is not a git repository"
         )
 
-    result = worktree_manager.sync_worktrees(project_id)
+    result = await worktree_manager.sync_worktrees_async(project_id)
 
     return WorktreeSyncResponse(
         synced=result.get("synced", 0),
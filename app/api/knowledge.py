@@ -4,18 +4,23 @@ Knowledge Base API routes
 Per-project knowledge base management for RAG context injection.
 """
 
-from typing import List
+import uuid
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query, Request
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request
 
+from app.core.config import settings
 from app.core.models import (
+    KnowledgeBatchItem,
+    KnowledgeBatchResult,
     KnowledgeDocument,
     KnowledgeDocumentSummary,
     KnowledgeSearchResult,
     KnowledgeStats
 )
 from app.core import knowledge_service
-from app.db import database
+from app.core.sync_engine import sync_engine
+from app.db import database, async_database
 from app.api.auth import require_auth, get_api_user_from_request
 
 router = APIRouter(prefix="/api/v1/projects/{project_id}/knowledge", tags=["Knowledge Base"])
@@ -111,22 +116,21 @@ async def upload_document(
             detail=f"Unsupported file type. Supported: {', '.join(knowledge_service.SUPPORTED_TYPES.keys())}"
         )
 
-    # Read file content
-    content = await file.read()
-
-    # Check file size (max 5MB)
-    max_size = 5 * 1024 * 1024
-    if len(content) > max_size:
+    # Reject oversized uploads early when the size is known; the stream is
+    # also checked while reading
+    max_size = settings.knowledge_max_upload_bytes
+    if file.size is not None and file.size > max_size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large. Maximum size is 5MB"
+            detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
         )
 
     try:
-        document_id, chunk_count = await knowledge_service.process_document(
+        document_id, chunk_count = await knowledge_service.process_document_stream(
             project_id=project_id,
             filename=file.filename,
-            content=content
+            fileobj=file.file,
+            max_size=max_size
         )
     except ValueError as e:
         raise HTTPException(
@@ -153,6 +157,60 @@ async def upload_document(
     )
 
 
+@router.post("/batch", response_model=KnowledgeBatchResult, status_code=status.HTTP_201_CREATED)
+async def upload_documents_batch(
+    request: Request,
+    project_id: str,
+    files: List[UploadFile] = File(...),
+    batch_id: Optional[str] = Form(None),
+    token: str = Depends(require_auth)
+):
+    """
+    Upload many documents to the knowledge base at once.
+
+    Files are ingested concurrently. Progress is sent over the global
+    WebSocket as knowledge_ingest_progress events carrying batch_id, the
+    file's index and filename, and a status (started, progress, completed,
+    failed). Pass batch_id to correlate events before the response arrives.
+    Each file succeeds or fails on its own.
+    """
+    check_project_access(request, project_id)
+    get_project_or_404(project_id)
+
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one file is required"
+        )
+
+    batch_id = batch_id or str(uuid.uuid4())
+    total = len(files)
+    sizes = [file.size for file in files]
+
+    async def report(event: Dict[str, Any]) -> None:
+        event = {"batch_id": batch_id, "project_id": project_id, "total": total, **event}
+        if event["status"] == "progress":
+            event["file_size"] = sizes[event["index"]]
+        await sync_engine.broadcast_global("knowledge_ingest_progress", event, project_id=project_id)
+
+    results = await knowledge_service.process_documents_batch(
+        project_id,
+        [(file.filename or "", file.file) for file in files],
+        max_size=settings.knowledge_max_upload_bytes,
+        concurrency=settings.knowledge_ingest_concurrency,
+        on_event=report
+    )
+
+    documents = [KnowledgeBatchItem(**result) for result in results]
+    succeeded = sum(1 for doc in documents if doc.status == "completed")
+    return KnowledgeBatchResult(
+        batch_id=batch_id,
+        documents=documents,
+        succeeded=succeeded,
+        failed=len(documents) - succeeded
+    )
+
+
 @router.get("/search", response_model=List[KnowledgeSearchResult])
 async def search_documents(
     request: Request,
@@ -164,12 +222,13 @@ async def search_documents(
     """
     Search the knowledge base for relevant content.
 
-    Uses keyword matching to find relevant chunks.
+    Ranks chunks with the project's knowledge search mode (BM25, vector or
+    hybrid).
     """
     check_project_access(request, project_id)
     get_project_or_404(project_id)
 
-    results = database.search_knowledge_chunks(project_id, q, limit=limit)
+    results = await async_database.run_read(knowledge_service.search_chunks, project_id, q, limit=limit)
 
     return [
         KnowledgeSearchResult(
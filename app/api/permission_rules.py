@@ -12,6 +12,7 @@ from pydantic import BaseModel, Field
 
 from app.db import database
 from app.api.auth import require_admin
+from app.core.permission_handler import permission_handler
 
 router = APIRouter(prefix="/api/v1/permission-rules", tags=["Permission Rules"])
 
@@ -97,6 +98,7 @@ async def create_permission_rule(
         tool_pattern=rule.tool_pattern,
         decision=rule.decision
     )
+    permission_handler.invalidate_rules(rule.profile_id)
 
     return new_rule
 
@@ -120,6 +122,7 @@ async def delete_permission_rule(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete rule"
         )
+    permission_handler.invalidate_rules(rule.get("profile_id"))
 
     return {"deleted": True, "id": rule_id}
 
@@ -139,4 +142,5 @@ async def delete_profile_permission_rules(
         )
 
     count = database.delete_profile_permission_rules(profile_id)
+    permission_handler.invalidate_rules(profile_id)
     return {"deleted": count, "profile_id": profile_id}
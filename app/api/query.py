@@ -12,6 +12,8 @@ from app.core.models import (
     QueryRequest, QueryResponse, ConversationRequest, QueryMetadata
 )
 from app.core.query_engine import execute_query, stream_query, interrupt_session, start_background_query
+from app.core.queue_manager import AdmissionError
+from app.core.sync_engine import sync_engine
 from app.core.auth import auth_service
 from app.api.auth import require_api_key, require_auth
 
@@ -74,6 +76,11 @@ async def one_shot_query(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Query error: {e}")
         raise HTTPException(
@@ -182,6 +189,11 @@ async def conversation(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Conversation error: {e}")
         raise HTTPException(
@@ -319,8 +331,9 @@ async def interrupt(
     """
     Interrupt an active streaming session.
     Returns success if the session was interrupted, error if not found or already completed.
+    A session running on another worker is interrupted there.
     """
-    success = await interrupt_session(session_id)
+    success = await interrupt_session(session_id) or await sync_engine.route_command(session_id, "interrupt")
 
     if success:
         return {"status": "interrupted", "session_id": session_id}
@@ -390,11 +390,14 @@ async def get_queue_admin_info(
     Admin only. Returns overall queue statistics.
     """
     queue_size = await request_queue.get_queue_size()
+    metrics = request_queue.get_metrics()
 
     return {
         "queue_size": queue_size,
         "max_size": request_queue._max_size,
-        "process_time_estimate": request_queue._process_time_estimate
+        "process_time_estimate": request_queue._process_time_estimate,
+        "running": metrics["running"],
+        "max_running": metrics["max_running"]
     }
 
 
@@ -4,7 +4,7 @@ Advanced search API routes with filters
 
 import re
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 
 from fastapi import APIRouter, HTTPException, Depends, Query, status, Request
@@ -256,6 +256,93 @@ def _search_session_jsonl(
     return matches
 
 
+def _search_with_index(
+    query: str,
+    project_id: Optional[str],
+    profile_id: Optional[str],
+    api_user_id: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    in_code_only: bool,
+    limit: int,
+    offset: int
+) -> List[AdvancedSearchResult]:
+    """
+    Search sessions through the FTS5 index instead of reading JSONL files.
+    Results are ranked by BM25 and snippets are highlighted by SQLite.
+    """
+    created_before = None
+    if end_date:
+        created_before = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # Code-only filtering happens after the index lookup, so fetch a wider
+    # window and paginate here instead of in SQL
+    if in_code_only:
+        fetch_limit, fetch_offset = 500, 0
+    else:
+        fetch_limit, fetch_offset = limit, offset
+
+    sessions = database.search_session_messages(
+        query,
+        project_id=project_id,
+        profile_id=profile_id,
+        api_user_id=api_user_id,
+        created_after=start_date,
+        created_before=created_before,
+        limit=fetch_limit,
+        offset=fetch_offset
+    )
+
+    profiles = {p["id"]: p["name"] for p in database.get_all_profiles()}
+    terms = [t.lower() for t in re.findall(r"\w+", query)]
+
+    results: List[AdvancedSearchResult] = []
+    for session in sessions:
+        matches: List[SearchMatch] = []
+        for hit in session.get("matches", []):
+            snippet = hit["snippet"]
+            if in_code_only:
+                block = next(
+                    (b for b in _extract_code_blocks(hit["content"]) if all(t in b.lower() for t in terms)),
+                    None
+                )
+                if block is None:
+                    continue
+                snippet = _highlight_snippet(block, terms[0] if terms else query)
+            matches.append(SearchMatch(
+                message_index=hit["message_index"],
+                snippet=snippet,
+                role=hit["role"],
+                timestamp=hit.get("created_at")
+            ))
+
+        if not matches and session.get("title_snippet"):
+            matches.append(SearchMatch(
+                message_index=-1,
+                snippet=session["title_snippet"],
+                role="title",
+                timestamp=session.get("created_at")
+            ))
+        if not matches:
+            continue
+
+        results.append(AdvancedSearchResult(
+            session_id=session["id"],
+            session_title=session.get("title"),
+            created_at=session["created_at"],
+            updated_at=session["updated_at"],
+            profile_id=session.get("profile_id"),
+            profile_name=profiles.get(session.get("profile_id")),
+            project_id=session.get("project_id"),
+            matches=matches,
+            match_count=len(matches)
+        ))
+
+    if in_code_only:
+        results = results[offset:offset + limit]
+    return results
+
+
 @router.get("", response_model=List[AdvancedSearchResult])
 async def advanced_search(
     request: Request,
@@ -273,7 +360,9 @@ async def advanced_search(
     """
     Advanced search across all sessions with filters.
 
-    Searches through JSONL files for message content.
+    Plain-text queries are served from the FTS5 search index (BM25-ranked,
+    prefix and "phrase" queries). Regex queries, and databases without the
+    index, search through the session JSONL files instead.
     Supports:
     - Date range filtering
     - Profile filtering
@@ -326,6 +415,14 @@ async def advanced_search(
             profile_id = api_user["profile_id"]
         filter_api_user_id = api_user["id"]
 
+    if not regex and database.search_index_available():
+        results = _search_with_index(
+            q, project_id, profile_id, filter_api_user_id,
+            start_date, end_date, in_code_only, limit, offset
+        )
+        logger.info(f"Advanced search '{q}': {len(results)} results from search index")
+        return results
+
     # Get all sessions (with basic filters)
     # We need to search through all sessions, so get a larger batch
     sessions = database.get_sessions(
@@ -7,7 +7,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query, status, Request, UploadFile, File
 from pydantic import BaseModel
 
-from app.core.models import Session, SessionWithMessages, SessionSearchResult
+from app.core.models import Session, SessionWithMessages, SessionSearchResult, SessionHistoryPage
 from app.db import database
 from app.api.auth import require_auth, get_api_user_from_request
 
@@ -114,6 +114,7 @@ async def search_sessions(
     project_id: Optional[str] = Query(None, description="Filter by project"),
     profile_id: Optional[str] = Query(None, description="Filter by profile"),
     admin_only: bool = Query(False, description="Show only admin sessions"),
+    tag_id: Optional[str] = Query(None, description="Filter by tag"),
     limit: int = Query(20, ge=1, le=50),
     token: str = Depends(require_auth)
 ):
@@ -143,17 +144,110 @@ async def search_sessions(
         profile_id=profile_id,
         api_user_id=filter_api_user_id,
         admin_only=admin_only,
-        limit=limit
+        limit=limit,
+        tag_id=tag_id
     )
 
     return results
 
 
+def _format_jsonl_message(m: dict, index: int) -> dict:
+    """Transform a JSONL history message to the SessionMessage format"""
+    # Use camelCase for frontend compatibility (toolName, toolInput, toolId)
+    # Get timestamp from metadata, ensuring it's properly formatted
+    # Note: timestamp extracted but not passed to Pydantic to avoid format issues
+    _timestamp = m.get("metadata", {}).get("timestamp")
+    # Don't pass raw timestamp strings to Pydantic datetime field
+    # The frontend handles timestamp display from metadata anyway
+    msg_data = {
+        "id": m.get("id", index),
+        "role": m.get("role", "user"),
+        "content": m.get("content", ""),
+        "type": m.get("type"),  # Critical for tool_use/tool_result rendering
+        "subtype": m.get("subtype"),  # For system messages (e.g., local_command)
+        "toolName": m.get("toolName"),  # camelCase for frontend
+        "toolInput": m.get("toolInput"),  # camelCase for frontend
+        "toolId": m.get("toolId"),
+        "toolResult": m.get("toolResult"),  # Tool output grouped with tool_use
+        "toolStatus": m.get("toolStatus"),  # Status: running, complete, error
+        "tool_name": m.get("toolName"),  # Also include snake_case for compatibility
+        "tool_input": m.get("toolInput"),  # Also include snake_case for compatibility
+        "metadata": m.get("metadata"),
+        "created_at": None  # Let Pydantic use default; timestamp is in metadata
+    }
+    # Include subagent-specific fields if present
+    if m.get("type") == "subagent":
+        msg_data["agentId"] = m.get("agentId")
+        msg_data["agentType"] = m.get("agentType")
+        msg_data["agentDescription"] = m.get("agentDescription")
+        msg_data["agentStatus"] = m.get("agentStatus")
+        msg_data["agentChildren"] = m.get("agentChildren")
+    return msg_data
+
+
+def _format_db_message(m: dict) -> dict:
+    """Transform a session_messages row to include type field for frontend compatibility"""
+    msg = dict(m)
+    # Infer type from role for legacy DB messages
+    if msg.get("tool_name"):
+        msg["type"] = "tool_use"
+        msg["toolName"] = msg.get("tool_name")
+        msg["toolInput"] = msg.get("tool_input")
+    elif msg.get("role") == "assistant":
+        msg["type"] = "text"
+    return msg
+
+
+def _get_working_dir(session: dict) -> str:
+    """Working directory of a session's project (used to locate JSONL files)"""
+    from app.core.config import settings
+
+    project_id = session.get("project_id")
+    if project_id:
+        project = database.get_project(project_id)
+        if project:
+            return str(settings.workspace_dir / project["path"])
+    return "/workspace"
+
+
+def _get_history_page(session: dict, limit: int, before: Optional[str], after: Optional[str], around: Optional[str]) -> dict:
+    """Load a page of history and format its messages (400 on an unknown cursor)"""
+    from app.core import session_history
+
+    try:
+        page = session_history.get_history_page(
+            session, _get_working_dir(session), limit, before=before, after=after, around=around
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if page.pop("source") == "jsonl":
+        page["messages"] = [_format_jsonl_message(m, i) for i, m in enumerate(page["messages"])]
+    else:
+        page["messages"] = [_format_db_message(m) for m in page["messages"]]
+    return page
+
+
 @router.get("/{session_id}", response_model=SessionWithMessages)
-async def get_session(request: Request, session_id: str, token: str = Depends(require_auth)):
-    """Get a session with its message history. API users can only access their assigned sessions."""
+async def get_session(
+    request: Request,
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, description="Return only this many messages (latest first page)"),
+    before: Optional[str] = Query(None, description="Return messages older than this message id"),
+    after: Optional[str] = Query(None, description="Return messages newer than this message id"),
+    around: Optional[str] = Query(None, description="Return messages centered on this message id"),
+    token: str = Depends(require_auth)
+):
+    """
+    Get a session with its message history. API users can only access their assigned sessions.
+
+    Pass limit (and optionally a before/after/around cursor) to get one page
+    of messages; history_page then describes the page. See
+    GET /{session_id}/messages for loading further pages.
+    """
     import logging
     import traceback
+    from app.core import session_history
     logger = logging.getLogger(__name__)
 
     logger.info(f"Loading session: {session_id}")
@@ -168,57 +262,23 @@ async def get_session(request: Request, session_id: str, token: str = Depends(re
 
     check_session_access(request, session)
 
+    page_size = session_history.resolve_page_size(limit)
+    if page_size is None and (before or after or around):
+        page_size = session_history.DEFAULT_PAGE_SIZE
+
     # Try to load messages from JSONL file first (source of truth for consistency)
     sdk_session_id = session.get("sdk_session_id")
     messages = []
-    working_dir = "/workspace"
+    working_dir = _get_working_dir(session)
 
     if sdk_session_id:
         try:
             from app.core.jsonl_parser import parse_session_history, get_session_cost_from_jsonl
-            from app.core.config import settings
-
-            # Get working dir from project if available
-            project_id = session.get("project_id")
-            if project_id:
-                project = database.get_project(project_id)
-                if project:
-                    working_dir = str(settings.workspace_dir / project["path"])
 
-            jsonl_messages = parse_session_history(sdk_session_id, working_dir)
-            if jsonl_messages:
+            if page_size is None:
+                jsonl_messages = parse_session_history(sdk_session_id, working_dir)
                 # Transform to expected format for SessionWithMessages
-                # Use camelCase for frontend compatibility (toolName, toolInput, toolId)
-                for i, m in enumerate(jsonl_messages):
-                    # Get timestamp from metadata, ensuring it's properly formatted
-                    # Note: timestamp extracted but not passed to Pydantic to avoid format issues
-                    _timestamp = m.get("metadata", {}).get("timestamp")
-                    # Don't pass raw timestamp strings to Pydantic datetime field
-                    # The frontend handles timestamp display from metadata anyway
-                    msg_data = {
-                        "id": m.get("id", i),
-                        "role": m.get("role", "user"),
-                        "content": m.get("content", ""),
-                        "type": m.get("type"),  # Critical for tool_use/tool_result rendering
-                        "subtype": m.get("subtype"),  # For system messages (e.g., local_command)
-                        "toolName": m.get("toolName"),  # camelCase for frontend
-                        "toolInput": m.get("toolInput"),  # camelCase for frontend
-                        "toolId": m.get("toolId"),
-                        "toolResult": m.get("toolResult"),  # Tool output grouped with tool_use
-                        "toolStatus": m.get("toolStatus"),  # Status: running, complete, error
-                        "tool_name": m.get("toolName"),  # Also include snake_case for compatibility
-                        "tool_input": m.get("toolInput"),  # Also include snake_case for compatibility
-                        "metadata": m.get("metadata"),
-                        "created_at": None  # Let Pydantic use default; timestamp is in metadata
-                    }
-                    # Include subagent-specific fields if present
-                    if m.get("type") == "subagent":
-                        msg_data["agentId"] = m.get("agentId")
-                        msg_data["agentType"] = m.get("agentType")
-                        msg_data["agentDescription"] = m.get("agentDescription")
-                        msg_data["agentStatus"] = m.get("agentStatus")
-                        msg_data["agentChildren"] = m.get("agentChildren")
-                    messages.append(msg_data)
+                messages = [_format_jsonl_message(m, i) for i, m in enumerate(jsonl_messages)]
 
             # Get token usage from JSONL - always load cache tokens since they're not in DB
             # Also load input/output tokens if database doesn't have them
@@ -245,20 +305,13 @@ async def get_session(request: Request, session_id: str, token: str = Depends(re
             logger.error(f"Failed to parse JSONL for session {session_id}: {e}")
             messages = []
 
+    if page_size is not None:
+        page = _get_history_page(session, page_size, before, after, around)
+        messages = page.pop("messages")
+        session["history_page"] = page
     # Fall back to database if JSONL not available or failed to parse
-    if not messages:
-        db_messages = database.get_session_messages(session_id)
-        # Transform DB messages to include type field for frontend compatibility
-        for m in db_messages:
-            msg = dict(m)
-            # Infer type from role for legacy DB messages
-            if msg.get("tool_name"):
-                msg["type"] = "tool_use"
-                msg["toolName"] = msg.get("tool_name")
-                msg["toolInput"] = msg.get("tool_input")
-            elif msg.get("role") == "assistant":
-                msg["type"] = "text"
-            messages.append(msg)
+    elif not messages:
+        messages = [_format_db_message(m) for m in database.get_session_messages(session_id)]
 
     session["messages"] = messages
     session["tags"] = database.get_session_tags(session_id)
@@ -275,6 +328,38 @@ async def get_session(request: Request, session_id: str, token: str = Depends(re
         )
 
 
+@router.get("/{session_id}/messages", response_model=SessionHistoryPage)
+async def get_session_messages_page(
+    request: Request,
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, description="Messages per page"),
+    before: Optional[str] = Query(None, description="Return messages older than this message id"),
+    after: Optional[str] = Query(None, description="Return messages newer than this message id"),
+    around: Optional[str] = Query(None, description="Return messages centered on this message id"),
+    token: str = Depends(require_auth)
+):
+    """
+    Get one page of a session's messages.
+
+    Without a cursor the latest messages are returned. To load older
+    messages pass before=<before_cursor> of the previous page; around
+    centers the page on a message, e.g. a search result.
+    """
+    from app.core import session_history
+
+    session = database.get_session(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session not found: {session_id}"
+        )
+
+    check_session_access(request, session)
+
+    page_size = session_history.resolve_page_size(limit) or session_history.DEFAULT_PAGE_SIZE
+    return _get_history_page(session, page_size, before, after, around)
+
+
 @router.patch("/{session_id}")
 async def update_session(
     request: Request,
@@ -404,16 +489,23 @@ async def toggle_session_favorite(request: Request, session_id: str, token: str
 async def get_sync_changes(
     request: Request,
     session_id: str,
-    since_id: int = Query(0, description="Get changes after this sync ID"),
+    since_id: int = Query(0, description="Get changes after this sync sequence number"),
+    epoch: Optional[str] = Query(None, description="Epoch returned with since_id by the previous poll"),
+    wait: float = Query(0, ge=0, description="Seconds to wait for a change before returning (long-poll)"),
     token: str = Depends(require_auth)
 ):
     """
-    Get sync changes for a session since a specific sync ID.
+    Get sync changes for a session since a specific sync sequence number.
     Used as a polling fallback when WebSocket is unavailable.
 
+    With wait > 0 the request is held until an event arrives or the wait
+    (capped by sync_poll_max_wait_seconds) runs out.
+
     Returns:
         - changes: List of sync events since since_id
-        - latest_id: The most recent sync ID (use for next poll)
+        - latest_id: The most recent sync sequence number (use for next poll)
+        - epoch: Pass back with the next poll
+        - resync_required: Events were missed; reload the session
         - is_streaming: Whether the session is currently streaming
     """
     existing = database.get_session(session_id)
@@ -425,17 +517,22 @@ async def get_sync_changes(
 
     check_session_access(request, existing)
 
-    changes = database.get_sync_logs(session_id, since_id=since_id)
-    latest_id = database.get_latest_sync_id(session_id)
-
-    # Check if streaming (import here to avoid circular import)
+    # Import here to avoid circular import
+    from app.core.config import settings
     from app.core.sync_engine import sync_engine
-    is_streaming = sync_engine.is_session_streaming(session_id)
+
+    wait = min(wait, settings.sync_poll_max_wait_seconds)
+    if wait > 0 and (epoch is None or epoch == sync_engine.epoch):
+        await sync_engine.wait_for_events(session_id, since_id, wait)
+
+    replay = await sync_engine.replay(session_id, since_id, epoch)
 
     return {
-        "changes": changes,
-        "latest_id": latest_id,
-        "is_streaming": is_streaming,
+        "changes": replay["events"],
+        "latest_id": replay["latest_seq"],
+        "epoch": replay["epoch"],
+        "resync_required": not replay["complete"],
+        "is_streaming": sync_engine.is_session_streaming(session_id),
         "connected_devices": sync_engine.get_device_count(session_id)
     }
 
@@ -12,7 +12,16 @@ from pydantic import BaseModel
 from app.core.models import HealthResponse, VersionResponse, StatsResponse
 from app.core.auth import auth_service
 from app.core.config import settings
-from app.db import database
+from app.core.sync_engine import sync_engine
+from app.core import stream_batcher, options_cache
+from app.core.principal_cache import principal_cache
+from app.core.credential_service import secret_cache
+from app.core.queue_manager import request_queue
+from app.core.agent_engine import agent_engine
+from app.core.client_pool import client_pool
+from app.core.git_service import git_service
+from app.db import database, async_database
+from app.db.write_behind import write_behind
 from app.api.auth import require_auth, require_admin
 
 
@@ -136,6 +145,37 @@ async def get_deployment_info(token: str = Depends(require_auth)):
     return settings.get_deployment_info()
 
 
+@router.get("/api/v1/metrics")
+async def get_runtime_metrics(token: str = Depends(require_admin)):
+    """
+    Get runtime performance metrics (admin only).
+
+    Includes database connection pool counters such as checkouts,
+    writer lock wait time and SQLITE_BUSY retries, write-behind queue
+    flush stats, how long the event loop has been blocked, sync send
+    queues, streamed frames per second before and after batching,
+    principal cache hit rate, running and queued queries, background
+    agent slot use and queue wait times, the SDK options cache with
+    per-stage timings up to the first response, decrypted API key cache
+    hit rate, warm SDK client pool hits and connect latency, and git
+    command latency, per-repo queueing and status/branch cache hit rate.
+    """
+    return {
+        "database": database.get_pool_metrics(),
+        "write_behind": write_behind.get_metrics(),
+        "event_loop": async_database.loop_lag_monitor.get_metrics(),
+        "sync": sync_engine.get_metrics(),
+        "streaming": stream_batcher.get_metrics(),
+        "auth": principal_cache.get_metrics(),
+        "queries": request_queue.get_metrics(),
+        "agents": agent_engine.get_metrics(),
+        "options": options_cache.get_metrics(),
+        "secrets": secret_cache.get_metrics(),
+        "client_pool": client_pool.get_metrics(),
+        "git": git_service.get_metrics(),
+    }
+
+
 # ============================================================================
 # Workspace Configuration (for local mode)
 # ============================================================================
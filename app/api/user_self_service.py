@@ -11,6 +11,7 @@ from pydantic import BaseModel
 
 from app.db import database
 from app.api.auth import get_current_api_user
+from app.core.principal_cache import principal_cache
 from app.core import encryption
 from app.core.credential_service import (
     validate_credential,
@@ -225,6 +226,7 @@ async def update_my_profile(
         updated = database.update_api_user(api_user["id"], **updates)
         if not updated:
             raise HTTPException(status_code=500, detail="Failed to update profile")
+        principal_cache.invalidate_user(api_user["id"])
         return updated
 
     return api_user
@@ -256,6 +258,7 @@ async def change_my_password(
     new_hash = bcrypt.hashpw(request.new_password.encode(), bcrypt.gensalt()).decode()
     if not database.update_api_user_password(api_user["id"], new_hash):
         raise HTTPException(status_code=500, detail="Failed to update password")
+    principal_cache.invalidate_user(api_user["id"])
 
     return {"success": True, "message": "Password changed successfully"}
 
@@ -19,7 +19,10 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from fastapi.websockets import WebSocketState
 
 from app.core.sync_engine import sync_engine
-from app.db import database
+from app.core.principal_cache import principal_cache, API_KEY
+from app.core import stream_batcher, ws_transport
+from app.db import database, async_database
+from app.db.write_behind import write_behind
 from app.core.webhook_service import dispatch_session_complete, dispatch_session_error
 from app.core.cli_bridge import CLIBridge, RewindParser
 from app.core.permission_handler import permission_handler
@@ -32,6 +35,32 @@ router = APIRouter(prefix="/api/v1", tags=["WebSocket"])
 # Track active chat sessions for interruption
 _active_chat_sessions: dict[str, asyncio.Task] = {}
 
+# How long interrupt_and_query waits for another worker to stop its query
+# (it waits up to 2s for the task to cancel, plus the routing round trip)
+ROUTED_INTERRUPT_TIMEOUT = 5.0
+
+
+async def _interrupt_local_session(session_id: str, args: Optional[Dict[str, Any]] = None) -> bool:
+    """Interrupt a query running in this worker (SDK interrupt, then cancel its task)"""
+    from app.core.query_engine import interrupt_session
+    # First, try to interrupt at the SDK level (this signals Claude to stop)
+    interrupted = await interrupt_session(session_id)
+    logger.info(f"Interrupt session {session_id}: {interrupted}")
+
+    # Then cancel the asyncio task as a backup
+    task = _active_chat_sessions.get(session_id)
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await asyncio.wait_for(task, timeout=2.0)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+    return interrupted
+
+
+# Stop requests arriving on another worker are routed to the one running the query
+sync_engine.register_command("interrupt", _interrupt_local_session)
+
 
 async def authenticate_websocket(websocket: WebSocket, token: Optional[str]) -> tuple[bool, Optional[dict]]:
     """
@@ -43,44 +72,83 @@ async def authenticate_websocket(websocket: WebSocket, token: Optional[str]) ->
         - For API user sessions: (True, api_user_dict)
         - For failed auth: (False, None)
     """
-    import hashlib
-
-    # First try the token from query parameter
-    if token:
-        # Check admin session token
-        session = database.get_auth_session(token)
-        if session:
-            return (True, None)  # Admin user
-
-        # Check API key web session token
-        api_key_session = database.get_api_key_session(token)
-        if api_key_session:
-            api_user = database.get_api_user(api_key_session["api_user_id"])
-            if api_user and api_user.get("is_active", True):
-                return (True, api_user)
-
-        # Check raw API key (hashed)
-        key_hash = hashlib.sha256(token.encode()).hexdigest()
-        api_user = database.get_api_user_by_key_hash(key_hash)
-        if api_user and api_user.get("is_active", True):
-            return (True, api_user)
-
-    # Also check the cookie directly (for httpOnly cookies that JS can't read)
-    cookie_token = websocket.cookies.get("session")
-    if cookie_token:
-        # Check admin session
-        session = database.get_auth_session(cookie_token)
-        if session:
-            return (True, None)  # Admin user
-
-        # Check API key web session
-        api_key_session = database.get_api_key_session(cookie_token)
-        if api_key_session:
-            api_user = database.get_api_user(api_key_session["api_user_id"])
-            if api_user and api_user.get("is_active", True):
-                return (True, api_user)
-
-    return (False, None)
+    # First try the token from query parameter (admin session, API key
+    # session or raw API key)
+    principal = await principal_cache.resolve_async(token)
+    if principal is None:
+        # Also check the cookie directly (for httpOnly cookies that JS can't read)
+        principal = await principal_cache.resolve_async(websocket.cookies.get("session"))
+        if principal and principal.kind == API_KEY:
+            principal = None
+
+    if principal is None:
+        return (False, None)
+    if principal.is_admin:
+        return (True, None)  # Admin user
+    return (True, dict(principal.api_user))
+
+
+def _format_db_history_message(m: Dict[str, Any]) -> Dict[str, Any]:
+    """Transform a session_messages row to streaming format"""
+    msg_type_value = None
+    if m.get("tool_name"):
+        msg_type_value = "tool_use"
+    elif m.get("role") == "assistant":
+        msg_type_value = "text"
+    elif m.get("role") in ("tool_use", "tool_result"):
+        msg_type_value = m.get("role")
+
+    return {
+        "id": f"msg-{m.get('id', 0)}",
+        "role": "assistant" if m.get("role") in ("tool_use", "tool_result") else m.get("role"),
+        "content": m.get("content", ""),
+        "type": msg_type_value,
+        "toolName": m.get("tool_name"),
+        "toolId": m.get("tool_id"),
+        "toolInput": m.get("tool_input"),
+        "metadata": m.get("metadata"),
+        "streaming": False
+    }
+
+
+async def _load_history_page(
+    session: Dict[str, Any],
+    working_dir: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None
+) -> tuple[list, Dict[str, Any]]:
+    """
+    Load one page of session history (see app/core/session_history.py).
+
+    Returns (messages in streaming format, page info). Raises ValueError
+    for an unknown cursor.
+    """
+    from app.core import session_history
+
+    page = await async_database.run_read(
+        session_history.get_history_page, session, working_dir, limit,
+        before=before, after=after, around=around
+    )
+    messages = page.pop("messages")
+    if page.pop("source") == "db":
+        messages = [_format_db_history_message(m) for m in messages]
+        # Cursors in the id format the client sees
+        page["before_cursor"] = messages[0]["id"] if messages else None
+        page["after_cursor"] = messages[-1]["id"] if messages else None
+    return messages, page
+
+
+async def _get_working_dir(session: Dict[str, Any]) -> str:
+    """Working directory of a session's project (used to locate JSONL files)"""
+    project_id = session.get("project_id")
+    if project_id:
+        project = await async_database.run(database.get_project, project_id)
+        if project:
+            from app.core.config import settings
+            return str(settings.workspace_dir / project["path"])
+    return "/workspace"
 
 
 # =============================================================================
@@ -91,7 +159,8 @@ async def authenticate_websocket(websocket: WebSocket, token: Optional[str]) ->
 async def chat_websocket(
     websocket: WebSocket,
     token: Optional[str] = Query(None, description="Authentication token (optional if cookie auth)"),
-    device_id: Optional[str] = Query(None, description="Unique device identifier for multi-device sync")
+    device_id: Optional[str] = Query(None, description="Unique device identifier for multi-device sync"),
+    encoding: Optional[str] = Query(None, description="Preferred wire encodings, e.g. 'msgpack,deflate' (default json)")
 ):
     """
     Primary WebSocket endpoint for chat with multi-device sync support.
@@ -103,9 +172,15 @@ async def chat_websocket(
     4. Server sends: {"type": "done", ...} when complete
     5. Server broadcasts streaming events to other connected devices via SyncEngine
 
+    Messages are JSON unless the client asked for another encoding with
+    ?encoding= (see app/core/ws_transport.py).
+
     Message types FROM server:
-    - history: Full message history for session (on connect or session switch)
+    - transport: Negotiated wire encoding (first message, only if ?encoding= was given)
+    - history: Message history for session (on connect or session switch)
       - Includes isStreaming and streamingBuffer for late-joining devices
+      - Only the latest page when load_session asked for a limit (see page)
+    - history_page: A page of older/newer messages (response to load_history)
     - start: Query started, streaming will begin
     - chunk: Text content chunk
     - stream_delta: Real-time streaming delta (when include_partial_messages=True)
@@ -123,7 +198,8 @@ async def chat_websocket(
     - query: Start a new query
     - queue_message: Queue a message to send while Claude is working (streaming input)
     - stop: Interrupt current query
-    - load_session: Load/switch to a session
+    - load_session: Load/switch to a session (optional limit/around for a page of history)
+    - load_history: Load a page of history (before/after/around a message id, limit)
     - pong: Response to ping
 
     Multi-device sync features:
@@ -146,6 +222,9 @@ async def chat_websocket(
     api_user_id: Optional[str] = api_user["id"] if api_user else None
     logger.info(f"Chat WebSocket connected and authenticated (api_user_id={api_user_id})")
 
+    # Switch to the client's preferred wire encoding, if any
+    await ws_transport.accept_encoding(websocket, encoding)
+
     # Generate device_id if not provided
     if not device_id:
         device_id = str(uuid.uuid4())
@@ -155,10 +234,10 @@ async def chat_websocket(
     query_task: Optional[asyncio.Task] = None
 
     async def send_json(data: dict):
-        """Safe JSON send with connection check"""
+        """Safe send (in the negotiated encoding) with connection check"""
         if websocket.client_state == WebSocketState.CONNECTED:
             try:
-                await websocket.send_json(data)
+                await ws_transport.send(websocket, data)
             except Exception as e:
                 logger.warning(f"Failed to send WebSocket message: {e}")
 
@@ -181,6 +260,39 @@ async def chat_websocket(
         await sync_engine.unregister_device(device_id, session_id)
         logger.info(f"Unregistered device {device_id} during streaming to prevent duplicates")
 
+        # Stop requests from devices on other workers are routed here
+        await sync_engine.claim_session(session_id)
+
+        async def emit_delta(event: Dict[str, Any]):
+            """Send a (merged) text delta here and to other devices"""
+            await send_json(event)
+
+            if event.get('type') == 'subagent_chunk':
+                # Text chunk from subagent
+                chunk_type = 'subagent_chunk'
+                chunk_data = {
+                    'agent_id': event.get('agent_id'),
+                    'content': event.get('content', '')
+                }
+            else:
+                # Real-time streaming delta - tool input streams as tool_input, the rest as text
+                delta_type = event.get('delta_type', 'text')
+                chunk_type = 'tool_input' if delta_type == 'tool_input' else 'text'
+                chunk_data = {
+                    'content': event.get('content', ''),
+                    'delta_type': delta_type,
+                    'index': event.get('index', 0)
+                }
+            await sync_engine.broadcast_stream_chunk(
+                session_id=session_id,
+                message_id=message_id,
+                chunk_type=chunk_type,
+                chunk_data=chunk_data,
+                source_device_id=None
+            )
+
+        batcher = stream_batcher.StreamChunkBatcher(emit_delta, session_id)
+
         try:
             logger.info(f"Starting query for session {session_id}, profile={profile_id}, project={project_id}, overrides={overrides}")
             await send_json({"type": "start", "session_id": session_id, "message_id": message_id})
@@ -198,9 +310,6 @@ async def chat_websocket(
                 event_type = event.get('type')
                 logger.debug(f"Streaming event for session {session_id}: {event_type}")
 
-                # Send to this websocket
-                await send_json(event)
-
                 # Broadcast to other devices via SyncEngine
                 # Start streaming on first content event
                 # Note: We pass source_device_id=None to NOT exclude any device.
@@ -223,40 +332,19 @@ async def chat_websocket(
                     )
                     stream_started = True
 
+                if event_type in stream_batcher.COALESCED_TYPES:
+                    # Text deltas are merged and sent by the batcher (see emit_delta)
+                    await batcher.add(event)
+                    continue
+
+                # Anything else ends a run of deltas; send the merged text first
+                await batcher.flush()
+
+                # Send to this websocket
+                await send_json(event)
+
                 # Broadcast stream chunks (source_device_id=None to not exclude any device)
-                if event_type == 'stream_delta':
-                    # Real-time streaming delta - handle different delta types
-                    delta_type = event.get('delta_type', 'text')
-
-                    if delta_type == 'tool_input':
-                        # Tool input streaming - broadcast as tool_input type
-                        chunk_data = {
-                            'content': event.get('content', ''),
-                            'delta_type': delta_type,
-                            'index': event.get('index', 0)
-                        }
-                        await sync_engine.broadcast_stream_chunk(
-                            session_id=session_id,
-                            message_id=message_id,
-                            chunk_type='tool_input',
-                            chunk_data=chunk_data,
-                            source_device_id=None
-                        )
-                    else:
-                        # Text or other delta - broadcast as text
-                        chunk_data = {
-                            'content': event.get('content', ''),
-                            'delta_type': delta_type,
-                            'index': event.get('index', 0)
-                        }
-                        await sync_engine.broadcast_stream_chunk(
-                            session_id=session_id,
-                            message_id=message_id,
-                            chunk_type='text',
-                            chunk_data=chunk_data,
-                            source_device_id=None
-                        )
-                elif event_type == 'chunk':
+                if event_type == 'chunk':
                     # Legacy chunk event (when include_partial_messages=False)
                     chunk_data = {
                         'content': event.get('content', '')
@@ -327,19 +415,6 @@ async def chat_websocket(
                         chunk_data=chunk_data,
                         source_device_id=None
                     )
-                elif event_type == 'subagent_chunk':
-                    # Text chunk from subagent
-                    chunk_data = {
-                        'agent_id': event.get('agent_id'),
-                        'content': event.get('content', '')
-                    }
-                    await sync_engine.broadcast_stream_chunk(
-                        session_id=session_id,
-                        message_id=message_id,
-                        chunk_type='subagent_chunk',
-                        chunk_data=chunk_data,
-                        source_device_id=None
-                    )
                 elif event_type == 'subagent_tool_use':
                     # Tool use within subagent
                     chunk_data = {
@@ -443,7 +518,7 @@ async def chat_websocket(
             # Dispatch webhook for session completion (non-blocking)
             import time as time_module
             duration = time_module.time() - query_start_time
-            session_data = database.get_session(session_id)
+            session_data = await async_database.run(database.get_session, session_id)
             try:
                 asyncio.create_task(dispatch_session_complete(
                     session_id=session_id,
@@ -458,6 +533,7 @@ async def chat_websocket(
                 logger.warning(f"Failed to dispatch session.complete webhook: {webhook_error}")
 
         except asyncio.CancelledError:
+            await batcher.close()
             await send_json({"type": "stopped", "session_id": session_id})
             logger.info(f"Query cancelled for session {session_id}")
             # Broadcast stream end with interrupted flag
@@ -472,6 +548,7 @@ async def chat_websocket(
 
         except Exception as e:
             logger.error(f"Query error for session {session_id}: {e}", exc_info=True)
+            await batcher.close()
             await send_json({"type": "error", "message": str(e)})
             # Broadcast stream end on error
             if stream_started:
@@ -484,7 +561,7 @@ async def chat_websocket(
                 )
 
             # Dispatch webhook for session error (non-blocking)
-            session_data = database.get_session(session_id)
+            session_data = await async_database.run(database.get_session, session_id)
             try:
                 asyncio.create_task(dispatch_session_error(
                     session_id=session_id,
@@ -496,6 +573,9 @@ async def chat_websocket(
                 logger.warning(f"Failed to dispatch session.error webhook: {webhook_error}")
 
         finally:
+            await batcher.close()
+            await sync_engine.release_session(session_id)
+
             # ALWAYS ensure streaming state is cleared, even if stream_started was never set
             # This prevents stuck streaming state after errors or early termination
             if sync_engine.is_session_streaming(session_id):
@@ -565,12 +645,12 @@ async def chat_websocket(
                         if not session_id:
                             # Validate worktree access if provided
                             if worktree_id:
-                                worktree = database.get_worktree(worktree_id)
+                                worktree = await async_database.run(database.get_worktree, worktree_id)
                                 if not worktree:
                                     await send_json({"type": "error", "message": f"Worktree not found: {worktree_id}"})
                                     continue
                                 # Get repository to verify project ownership
-                                repo = database.get_git_repository(worktree["repository_id"])
+                                repo = await async_database.run(database.get_git_repository, worktree["repository_id"])
                                 if not repo:
                                     await send_json({"type": "error", "message": "Worktree repository not found"})
                                     continue
@@ -585,7 +665,7 @@ async def chat_websocket(
                             
                             # Create new session, optionally linked to a worktree
                             session_id = str(uuid.uuid4())
-                            database.create_session(
+                            await async_database.run(database.create_session,
                                 session_id=session_id,
                                 profile_id=profile_id,
                                 project_id=project_id,
@@ -609,8 +689,9 @@ async def chat_websocket(
                             await sync_engine.register_device(device_id, session_id, websocket)
                             current_session_id = session_id
 
-                        # Store user message
-                        database.add_session_message(
+                        # Store user message (after rows buffered from the previous turn)
+                        await write_behind.barrier()
+                        await async_database.run(database.add_session_message,
                             session_id=session_id,
                             role="user",
                             content=prompt
@@ -646,20 +727,9 @@ async def chat_websocket(
                         # Stop current query - use interrupt_session for proper SDK-level cancellation
                         session_id = data.get("session_id") or current_session_id
                         if session_id:
-                            from app.core.query_engine import interrupt_session
-                            # First, try to interrupt at the SDK level (this signals Claude to stop)
-                            interrupted = await interrupt_session(session_id)
-                            logger.info(f"Interrupt session {session_id}: {interrupted}")
-
-                            # Then cancel the asyncio task as a backup
-                            if session_id in _active_chat_sessions:
-                                task = _active_chat_sessions[session_id]
-                                if not task.done():
-                                    task.cancel()
-                                    try:
-                                        await asyncio.wait_for(task, timeout=2.0)
-                                    except (asyncio.CancelledError, asyncio.TimeoutError):
-                                        pass
+                            # The query may be running on another worker
+                            if session_id in _active_chat_sessions or not await sync_engine.route_command(session_id, "interrupt"):
+                                await _interrupt_local_session(session_id)
 
                     elif msg_type == "interrupt_and_query":
                         # Interrupt current streaming and immediately send a new query
@@ -678,24 +748,25 @@ async def chat_websocket(
                             await send_json({"type": "error", "message": "No active session"})
                             continue
 
-                        from app.core.query_engine import interrupt_session
-
-                        # Step 1: Interrupt the SDK-level streaming
-                        interrupted = await interrupt_session(session_id)
-                        logger.info(f"Interrupt session {session_id} before new query: {interrupted}")
-
-                        # Step 2: Cancel the asyncio task
-                        if session_id in _active_chat_sessions:
-                            task = _active_chat_sessions[session_id]
-                            if not task.done():
-                                task.cancel()
-                                try:
-                                    await asyncio.wait_for(task, timeout=2.0)
-                                except (asyncio.CancelledError, asyncio.TimeoutError):
-                                    pass
-
-                        # Step 3: Store user message
-                        database.add_session_message(
+                        # Step 1-2: Interrupt the SDK-level streaming and cancel the asyncio task
+                        # (on the worker running it, which may be another one - wait until it
+                        # has stopped so two SDK clients never run the session)
+                        routed = False
+                        if session_id not in _active_chat_sessions:
+                            try:
+                                routed = await sync_engine.route_command(
+                                    session_id, "interrupt", ack_timeout=ROUTED_INTERRUPT_TIMEOUT
+                                )
+                            except asyncio.TimeoutError:
+                                logger.warning(f"Worker running session {session_id} did not stop its query")
+                                await send_json({"type": "error", "message": "Session is still busy, try again"})
+                                continue
+                        if not routed:
+                            await _interrupt_local_session(session_id)
+
+                        # Step 3: Store user message (after rows buffered from the previous turn)
+                        await write_behind.barrier()
+                        await async_database.run(database.add_session_message,
                             session_id=session_id,
                             role="user",
                             content=prompt
@@ -722,7 +793,7 @@ async def chat_websocket(
                         # Load a session's message history from JSONL file
                         session_id = data.get("session_id")
                         if session_id:
-                            session = database.get_session(session_id)
+                            session = await async_database.run(database.get_session, session_id)
                             if session:
                                 # Unregister from old session if switching
                                 if current_session_id and current_session_id != session_id:
@@ -735,22 +806,24 @@ async def chat_websocket(
                                 # Try to load from JSONL file first (source of truth)
                                 sdk_session_id = session.get("sdk_session_id")
                                 messages = []
+                                page_info = None
 
                                 # Get working dir from project if available
-                                working_dir = "/workspace"
-                                project_id = session.get("project_id")
-                                if project_id:
-                                    project = database.get_project(project_id)
-                                    if project:
-                                        from app.core.config import settings
-                                        working_dir = str(settings.workspace_dir / project["path"])
+                                working_dir = await _get_working_dir(session)
+
+                                # Optional pagination: latest page, or a page around a message
+                                from app.core import session_history
+                                page_size = session_history.resolve_page_size(data.get("limit"))
+                                if page_size is None and data.get("around"):
+                                    page_size = session_history.DEFAULT_PAGE_SIZE
 
                                 if sdk_session_id:
                                     try:
                                         from app.core.jsonl_parser import parse_session_history, get_session_cost_from_jsonl
 
-                                        messages = parse_session_history(sdk_session_id, working_dir)
-                                        logger.info(f"Loaded {len(messages)} messages from JSONL for session {session_id}")
+                                        if page_size is None:
+                                            messages = parse_session_history(sdk_session_id, working_dir)
+                                            logger.info(f"Loaded {len(messages)} messages from JSONL for session {session_id}")
 
                                         # Load context tokens from JSONL (same as sessions.py HTTP endpoint)
                                         usage_data = get_session_cost_from_jsonl(sdk_session_id, working_dir)
@@ -773,30 +846,20 @@ async def chat_websocket(
                                         logger.error(f"Failed to parse JSONL for session {session_id}: {e}")
                                         messages = []
 
+                                if page_size is not None:
+                                    try:
+                                        messages, page_info = await _load_history_page(
+                                            session, working_dir, page_size, around=data.get("around")
+                                        )
+                                    except ValueError:
+                                        # Unknown message to center on - send the latest page instead
+                                        messages, page_info = await _load_history_page(session, working_dir, page_size)
+                                    logger.info(f"Loaded page of {len(messages)}/{page_info['total']} messages for session {session_id}")
                                 # Fall back to database if JSONL not available or failed
-                                if not messages:
-                                    db_messages = database.get_session_messages(session_id)
+                                elif not messages:
+                                    db_messages = await async_database.run(database.get_session_messages, session_id)
                                     # Transform DB messages to streaming format
-                                    for m in db_messages:
-                                        msg_type_value = None
-                                        if m.get("tool_name"):
-                                            msg_type_value = "tool_use"
-                                        elif m.get("role") == "assistant":
-                                            msg_type_value = "text"
-                                        elif m.get("role") in ("tool_use", "tool_result"):
-                                            msg_type_value = m.get("role")
-
-                                        messages.append({
-                                            "id": f"msg-{m.get('id', 0)}",
-                                            "role": "assistant" if m.get("role") in ("tool_use", "tool_result") else m.get("role"),
-                                            "content": m.get("content", ""),
-                                            "type": msg_type_value,
-                                            "toolName": m.get("tool_name"),
-                                            "toolId": m.get("tool_id"),
-                                            "toolInput": m.get("tool_input"),
-                                            "metadata": m.get("metadata"),
-                                            "streaming": False
-                                        })
+                                    messages = [_format_db_history_message(m) for m in db_messages]
                                     logger.info(f"Loaded {len(messages)} messages from DB for session {session_id}")
 
                                 # Check if session is currently streaming (late-joining device)
@@ -807,7 +870,7 @@ async def chat_websocket(
                                 # Validate streaming state - if marked streaming but no active task, it's stale
                                 if is_streaming:
                                     active_task = _active_chat_sessions.get(session_id)
-                                    if active_task is None or active_task.done():
+                                    if (active_task is None or active_task.done()) and not await sync_engine.is_owned_elsewhere(session_id):
                                         # Stale streaming state - clean it up
                                         logger.warning(f"Session {session_id} marked as streaming but no active task - clearing stale state")
                                         await sync_engine.broadcast_stream_end(
@@ -827,6 +890,7 @@ async def chat_websocket(
                                     "session_id": session_id,
                                     "session": session,
                                     "messages": messages,
+                                    "page": page_info,
                                     "isStreaming": is_streaming,
                                     "streamingBuffer": streaming_buffer
                                 })
@@ -840,6 +904,34 @@ async def chat_websocket(
                             else:
                                 await send_json({"type": "error", "message": "Session not found"})
 
+                    elif msg_type == "load_history":
+                        # Load a page of older/newer messages, or a page around a message
+                        session_id = data.get("session_id") or current_session_id
+                        session = await async_database.run(database.get_session, session_id) if session_id else None
+                        if session:
+                            from app.core import session_history
+                            page_size = session_history.resolve_page_size(data.get("limit")) or session_history.DEFAULT_PAGE_SIZE
+                            try:
+                                messages, page_info = await _load_history_page(
+                                    session,
+                                    await _get_working_dir(session),
+                                    page_size,
+                                    before=data.get("before"),
+                                    after=data.get("after"),
+                                    around=data.get("around")
+                                )
+                            except ValueError as e:
+                                await send_json({"type": "error", "message": str(e)})
+                            else:
+                                await send_json({
+                                    "type": "history_page",
+                                    "session_id": session_id,
+                                    "messages": messages,
+                                    "page": page_info
+                                })
+                        else:
+                            await send_json({"type": "error", "message": "Session not found"})
+
                     elif msg_type == "close_session":
                         # Close/unload the current session
                         old_session_id = current_session_id
@@ -974,7 +1066,10 @@ async def session_sync_websocket(
     websocket: WebSocket,
     session_id: str,
     device_id: str = Query(..., description="Unique device identifier"),
-    token: str = Query(..., description="Authentication token")
+    token: str = Query(..., description="Authentication token"),
+    encoding: Optional[str] = Query(None, description="Preferred wire encodings, e.g. 'msgpack,deflate' (default json)"),
+    last_seq: Optional[int] = Query(None, description="Sequence number of the last event seen, to resume after a reconnect"),
+    epoch: Optional[str] = Query(None, description="sync_epoch from the state the client resumes from")
 ):
     """
     WebSocket endpoint for real-time session synchronization.
@@ -987,6 +1082,9 @@ async def session_sync_websocket(
     Query Parameters:
         - device_id: Unique identifier for this device (generated on frontend)
         - token: Authentication token (session cookie or API key)
+        - last_seq, epoch: Resume after a reconnect. The events after last_seq
+          are replayed (each event carries its seq), or resync_required is
+          sent if they are no longer available.
 
     Messages from server:
         - stream_start: Streaming has begun
@@ -994,7 +1092,9 @@ async def session_sync_websocket(
         - stream_end: Streaming has completed
         - message_added: A new message was added
         - session_updated: Session metadata changed
-        - state: Current session state (sent on connect)
+        - state: Current session state (sent on connect; without messages
+          when resuming)
+        - resync_required: Events were missed; reload the session
         - ping: Keep-alive message
 
     Messages to server:
@@ -1002,39 +1102,63 @@ async def session_sync_websocket(
         - subscribe: Start watching a session (automatic on connect)
     """
     # Authenticate
-    if not await authenticate_websocket(websocket, token):
+    is_authenticated, _ = await authenticate_websocket(websocket, token)
+    if not is_authenticated:
         await websocket.close(code=4001, reason="Authentication failed")
         return
 
     # Verify session exists
-    session = database.get_session(session_id)
+    session = await async_database.run(database.get_session, session_id)
     if not session:
         await websocket.close(code=4004, reason="Session not found")
         return
 
     # Accept connection
     await websocket.accept()
+    await ws_transport.accept_encoding(websocket, encoding)
     logger.info(f"WebSocket connected: device={device_id}, session={session_id}")
 
-    # Register device with sync engine
-    connection = await sync_engine.register_device(
-        device_id=device_id,
-        session_id=session_id,
-        websocket=websocket
-    )
-
-    try:
-        # Send initial state
+    if last_seq is not None:
+        # Resuming: the client has the messages, it only needs what it missed.
+        # State goes out before the device is registered so that replayed
+        # events follow it.
         state = await sync_engine.get_session_state(session_id)
         state["session"] = session
-        state["messages"] = database.get_session_messages(session_id)
-
-        await websocket.send_json({
+        state["resumed"] = True
+        await ws_transport.send(websocket, {
             "event_type": "state",
             "session_id": session_id,
             "data": state,
             "timestamp": None
         })
+        connection = await sync_engine.resume_device(
+            device_id=device_id,
+            session_id=session_id,
+            websocket=websocket,
+            since_seq=last_seq,
+            epoch=epoch
+        )
+    else:
+        # Register device with sync engine
+        connection = await sync_engine.register_device(
+            device_id=device_id,
+            session_id=session_id,
+            websocket=websocket
+        )
+
+    try:
+        if last_seq is None:
+            # Send initial state
+            state = await sync_engine.get_session_state(session_id)
+            state["session"] = session
+            state["messages"] = await async_database.run(database.get_session_messages, session_id)
+
+            await ws_transport.send(websocket, {
+                "event_type": "state",
+                "session_id": session_id,
+                "data": state,
+                "timestamp": None
+            })
 
         # Keep connection alive and handle client messages
         ping_task = asyncio.create_task(ping_loop(websocket, device_id))
@@ -1058,9 +1182,9 @@ async def session_sync_websocket(
                     elif msg_type == "request_state":
                         # Client requesting current state
                         state = await sync_engine.get_session_state(session_id)
-                        state["session"] = database.get_session(session_id)
-                        state["messages"] = database.get_session_messages(session_id)
-                        await websocket.send_json({
+                        state["session"] = await async_database.run(database.get_session, session_id)
+                        state["messages"] = await async_database.run(database.get_session_messages, session_id)
+                        await ws_transport.send(websocket, {
                             "event_type": "state",
                             "session_id": session_id,
                             "data": state,
@@ -1101,7 +1225,7 @@ async def ping_loop(websocket: WebSocket, device_id: str):
                 break
 
             try:
-                await websocket.send_json({
+                await ws_transport.send(websocket, {
                     "event_type": "ping",
                     "timestamp": None
                 })
@@ -1116,7 +1240,8 @@ async def ping_loop(websocket: WebSocket, device_id: str):
 async def global_sync_websocket(
     websocket: WebSocket,
     device_id: str = Query(..., description="Unique device identifier"),
-    token: str = Query(..., description="Authentication token")
+    token: str = Query(..., description="Authentication token"),
+    encoding: Optional[str] = Query(None, description="Preferred wire encodings, e.g. 'msgpack,deflate' (default json)")
 ):
     """
     Global WebSocket for receiving updates across all sessions.
@@ -1124,18 +1249,21 @@ async def global_sync_websocket(
     Useful for:
     - Updating session list when new sessions are created
     - Getting notified when any watched session changes
-    - Global notifications
+    - Global notifications (e.g. knowledge_ingest_progress for batch uploads)
 
     This is lighter weight than per-session WebSockets when you just need
     to know that something changed (then fetch details via REST).
     """
     # Authenticate
-    if not await authenticate_websocket(websocket, token):
+    is_authenticated, api_user = await authenticate_websocket(websocket, token)
+    if not is_authenticated:
         await websocket.close(code=4001, reason="Authentication failed")
         return
 
     await websocket.accept()
+    await ws_transport.accept_encoding(websocket, encoding)
     logger.info(f"Global WebSocket connected: device={device_id}")
+    await sync_engine.register_global_device(device_id, websocket, api_user)
 
     # Track sessions this device is interested in
     watched_sessions: set = set()
@@ -1158,7 +1286,7 @@ async def global_sync_websocket(
                         session_id = data.get("session_id")
                         if session_id:
                             watched_sessions.add(session_id)
-                            await websocket.send_json({
+                            await ws_transport.send(websocket, {
                                 "event_type": "watching",
                                 "session_id": session_id
                             })
@@ -1190,6 +1318,9 @@ async def global_sync_websocket(
     except Exception as e:
         logger.error(f"Global WebSocket error for device={device_id}: {e}")
 
+    finally:
+        await sync_engine.unregister_global_device(device_id, websocket)
+
 
 # =============================================================================
 # CLI BRIDGE WEBSOCKET - Interactive terminal for /rewind and similar commands
@@ -1234,7 +1365,7 @@ async def cli_websocket(
         return
 
     # Get session info
-    session = database.get_session(session_id)
+    session = await async_database.run(database.get_session, session_id)
     if not session:
         await websocket.close(code=4004, reason="Session not found")
         return
@@ -1252,7 +1383,7 @@ async def cli_websocket(
     working_dir = "/workspace"
     project_id = session.get("project_id")
     if project_id:
-        project = database.get_project(project_id)
+        project = await async_database.run(database.get_project, project_id)
         if project:
             from app.core.config import settings
             working_dir = str(settings.workspace_dir / project["path"])
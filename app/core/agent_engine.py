@@ -7,16 +7,26 @@ Manages the lifecycle of background autonomous agents:
 - Handles pause/resume/cancel operations
 - Manages auto-PR creation and review workflows
 
+Queued agents are scheduled by events rather than polling: launching,
+finishing, cancelling an agent or changing max_concurrent wakes the queue
+processor, which starts the highest priority queued runs that fit in the
+free slots (and under the per-project cap). On startup, runs left running
+or paused by a previous process are put back in the queue (single-process
+deployments only).
+
 Based on patterns from query_engine.py but adapted for long-running background execution.
 """
 
 import asyncio
 import logging
 import re
+import time
 import uuid
+from collections import deque
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Callable, Coroutine
+from typing import Optional, Dict, Any, List, Callable, Coroutine, Deque
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -26,7 +36,8 @@ from claude_agent_sdk import (
     ResultMessage, SystemMessage
 )
 
-from app.db import database
+from app.db import database, async_database
+from app.db.database import WorktreeStatus
 from app.core.config import settings
 from app.core.profiles import get_profile
 from app.core.worktree_manager import worktree_manager
@@ -63,6 +74,7 @@ class TaskStatus(str, Enum):
 class AgentRunState:
     """Track state for an active agent run"""
     agent_run_id: str
+    project_id: Optional[str] = None
     task: Optional[asyncio.Task] = None
     client: Optional[ClaudeSDKClient] = None
     sdk_session_id: Optional[str] = None
@@ -85,13 +97,21 @@ class AgentRunState:
 BroadcastCallback = Callable[[str, str, Dict[str, Any]], Coroutine[Any, Any, None]]
 
 
+def _warn_if_log_failed(written: Future) -> None:
+    """Done callback of an agent log write submitted to the writer thread"""
+    if not written.cancelled() and written.exception() is not None:
+        logger.warning(f"Failed to store agent log: {written.exception()}")
+
+
 class AgentExecutionEngine:
     """
     Manages background agent execution with concurrency control.
 
     Features:
     - Concurrent agent execution with configurable max slots
-    - Queue management for overflow
+    - Per-project concurrency caps
+    - Event-driven queue processing in priority order
+    - Recovery of queued and interrupted runs on startup
     - Isolated git worktrees per agent
     - Real-time progress updates via WebSocket
     - Pause/resume/cancel support
@@ -99,14 +119,52 @@ class AgentExecutionEngine:
     - Auto-review workflow
     """
 
-    def __init__(self, max_concurrent: int = 3):
-        self.max_concurrent = max_concurrent
+    WAIT_SAMPLES = 100  # Recent queue waits averaged in the metrics
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_per_project: Optional[int] = None):
+        self._max_concurrent = settings.agent_max_concurrent if max_concurrent is None else max_concurrent
+        self.max_per_project = settings.agent_max_per_project if max_per_project is None else max_per_project
         self._active_runs: Dict[str, AgentRunState] = {}
         self._broadcast_callback: Optional[BroadcastCallback] = None
         self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
         self._queue_processor_task: Optional[asyncio.Task] = None
         self._shutdown = False
 
+        # Metrics
+        self._queued_since: Dict[str, float] = {}  # agent_run_id -> monotonic time queued
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self.started = 0
+        self._slot_seconds = 0.0  # busy slots integrated over time
+        self._capacity_seconds = 0.0  # max_concurrent integrated over time
+        self._slots_checked_at = time.monotonic()
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._max_concurrent
+
+    @max_concurrent.setter
+    def max_concurrent(self, value: int):
+        self._account_slots()
+        self._max_concurrent = value
+        self._wake()
+
+    def _wake(self):
+        """Ask the queue processor to look for agents it can start"""
+        self._wakeup.set()
+
+    def _account_slots(self):
+        """Add the slots used since the last check to the utilization totals"""
+        now = time.monotonic()
+        elapsed = now - self._slots_checked_at
+        self._slots_checked_at = now
+        self._slot_seconds += self.get_active_count() * elapsed
+        self._capacity_seconds += self._max_concurrent * elapsed
+
+    def _on_run_done(self, task: asyncio.Task):
+        self._account_slots()
+        self._wake()
+
     def set_broadcast_callback(self, callback: BroadcastCallback):
         """Set the WebSocket broadcast callback for real-time updates"""
         self._broadcast_callback = callback
@@ -120,20 +178,44 @@ class AgentExecutionEngine:
                 logger.warning(f"Failed to broadcast update: {e}")
 
     def _log(self, agent_run_id: str, message: str, level: str = "info", metadata: Optional[Dict] = None):
-        """Add a log entry for an agent run and broadcast it"""
-        log_entry = database.add_agent_log(agent_run_id, message, level, metadata)
+        """
+        Add a log entry for an agent run and broadcast it.
+
+        The row is written on the database writer thread right away (in
+        call order, without blocking the event loop), so GET /agents/{id}/logs
+        sees it immediately. The broadcast follows once it is written.
+        """
+        written = async_database.submit_write(database.add_agent_log, agent_run_id, message, level, metadata)
+        written.add_done_callback(_warn_if_log_failed)
         # Fire and forget broadcast
         if self._broadcast_callback:
-            asyncio.create_task(self._broadcast(agent_run_id, "agent_log", {
-                "level": level,
-                "message": message,
-                "metadata": metadata,
-                "timestamp": log_entry["timestamp"] if log_entry else datetime.utcnow().isoformat()
-            }))
+            asyncio.create_task(self._broadcast_log(agent_run_id, written, message, level, metadata))
+
+    async def _broadcast_log(
+        self,
+        agent_run_id: str,
+        written: Future,
+        message: str,
+        level: str,
+        metadata: Optional[Dict]
+    ):
+        try:
+            log_entry = await asyncio.wrap_future(written)
+        except Exception:
+            log_entry = None  # Logged by _warn_if_log_failed
+        await self._broadcast(agent_run_id, "agent_log", {
+            "level": level,
+            "message": message,
+            "metadata": metadata,
+            "timestamp": log_entry["timestamp"] if log_entry else datetime.utcnow().isoformat()
+        })
 
     async def start(self):
         """Start the engine and queue processor"""
         self._shutdown = False
+        # The event binds to the loop that first waits on it; a restarted
+        # engine may be on a new loop (recovery wakes the processor anyway)
+        self._wakeup = asyncio.Event()
         self._queue_processor_task = asyncio.create_task(self._process_queue_loop())
         logger.info("Agent execution engine started")
 
@@ -156,38 +238,83 @@ class AgentExecutionEngine:
         logger.info("Agent execution engine stopped")
 
     async def _process_queue_loop(self):
-        """Background task that processes queued agents when slots are available"""
+        """Background task that starts queued agents whenever it is woken"""
+        try:
+            await self._recover_runs()
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"Failed to recover agent runs: {e}")
+        self._wake()
+
         while not self._shutdown:
             try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
                 await self._process_queue()
-                await asyncio.sleep(2)  # Check every 2 seconds
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Queue processor error: {e}")
                 await asyncio.sleep(5)
+                self._wake()
+
+    async def _recover_runs(self):
+        """Re-queue runs a previous process left running and note queued runs
+
+        With a shared sync backend other workers may still be running their
+        agents, so only a single-process deployment re-queues running rows.
+        """
+        now = time.monotonic()
+        orphaned = database.get_running_agent_runs() if settings.sync_backend == "local" else []
+        for agent_run in orphaned:
+            agent_run_id = agent_run["id"]
+            if agent_run_id in self._active_runs:
+                continue
+            database.update_agent_run(agent_run_id, status=AgentStatus.QUEUED.value)
+            self._log(agent_run_id, "Agent re-queued after restart", "warning")
+            self._queued_since.setdefault(agent_run_id, now)
+
+        for agent_run in database.get_queued_agent_runs():
+            self._queued_since.setdefault(agent_run["id"], now)
 
     async def _process_queue(self):
-        """Start queued agents if slots are available"""
+        """Start queued agents, highest priority first, if slots are available"""
         async with self._lock:
             # Count active (running or paused) agents
-            active_count = sum(
-                1 for state in self._active_runs.values()
+            active = [
+                state for state in self._active_runs.values()
                 if state.task and not state.task.done()
-            )
+            ]
 
-            if active_count >= self.max_concurrent:
+            if len(active) >= self.max_concurrent:
                 return
 
-            # Get queued agents
+            project_counts: Dict[Optional[str], int] = {}
+            for state in active:
+                project_counts[state.project_id] = project_counts.get(state.project_id, 0) + 1
+
+            # Get queued agents (ordered by priority, then age)
             queued = database.get_queued_agent_runs()
-            slots_available = self.max_concurrent - active_count
+            slots_available = self.max_concurrent - len(active)
 
-            for agent_run in queued[:slots_available]:
+            for agent_run in queued:
+                if slots_available <= 0:
+                    break
                 agent_run_id = agent_run["id"]
-                if agent_run_id not in self._active_runs:
-                    # Start the agent
-                    await self._start_agent_run(agent_run)
+                if agent_run_id in self._active_runs:
+                    continue
+                project_id = agent_run.get("project_id")
+                if (
+                    self.max_per_project > 0
+                    and project_id
+                    and project_counts.get(project_id, 0) >= self.max_per_project
+                ):
+                    continue
+
+                await self._start_agent_run(agent_run)
+                project_counts[project_id] = project_counts.get(project_id, 0) + 1
+                slots_available -= 1
 
     async def launch_agent(
         self,
@@ -200,12 +327,14 @@ class AgentExecutionEngine:
         auto_merge: bool = False,
         auto_review: bool = False,
         max_duration_minutes: int = 0,
-        base_branch: Optional[str] = None
+        base_branch: Optional[str] = None,
+        priority: int = 0
     ) -> Dict[str, Any]:
         """
         Launch a new background agent.
 
         The agent will be queued and started when a slot is available.
+        Queued agents with a higher priority start first.
 
         Simplified workflow:
         - Always creates a new feature branch (auto_branch=True)
@@ -228,16 +357,18 @@ class AgentExecutionEngine:
             auto_merge=auto_merge,
             auto_review=auto_review,
             max_duration_minutes=max_duration_minutes,
-            base_branch=base_branch
+            base_branch=base_branch,
+            priority=priority
         )
+        self._queued_since[agent_run_id] = time.monotonic()
 
         self._log(agent_run_id, f"Agent '{name}' created and queued")
 
         # Broadcast launch event
         await self._broadcast(agent_run_id, "agent_launched", agent_run)
 
-        # Trigger queue processing
-        asyncio.create_task(self._process_queue())
+        # Wake the queue processor
+        self._wake()
 
         logger.info(f"Launched agent {agent_run_id}: {name}")
         return agent_run
@@ -247,9 +378,15 @@ class AgentExecutionEngine:
         agent_run_id = agent_run["id"]
 
         # Create state tracker
-        state = AgentRunState(agent_run_id=agent_run_id)
+        self._account_slots()
+        state = AgentRunState(agent_run_id=agent_run_id, project_id=agent_run.get("project_id"))
         self._active_runs[agent_run_id] = state
 
+        queued_since = self._queued_since.pop(agent_run_id, None)
+        if queued_since is not None:
+            self._waits.append(time.monotonic() - queued_since)
+        self.started += 1
+
         # Update status to running
         database.update_agent_run(agent_run_id, status=AgentStatus.RUNNING.value)
         self._log(agent_run_id, "Agent execution starting")
@@ -262,6 +399,7 @@ class AgentExecutionEngine:
         state.task = asyncio.create_task(
             self._execute_agent(agent_run_id, agent_run, state)
         )
+        state.task.add_done_callback(self._on_run_done)
 
     async def _execute_agent(
         self,
@@ -458,13 +596,27 @@ class AgentExecutionEngine:
             self._log(agent_run_id, "Project is not a git repository, running without worktree", "warning")
             return
 
-        # Generate branch name
+        # Generate branch name (a recovered run keeps the branch it already has)
         safe_name = agent_run["name"].lower()
         safe_name = "".join(c if c.isalnum() or c == "-" else "-" for c in safe_name)[:30]
-        branch_name = f"agent/{safe_name}-{agent_run_id[-8:]}"
+        branch_name = agent_run.get("branch") or f"agent/{safe_name}-{agent_run_id[-8:]}"
         state.branch_name = branch_name
 
-        self._log(agent_run_id, f"Creating worktree for branch: {branch_name}")
+        # A run re-queued after a restart must go back into its own worktree,
+        # never into the main repository
+        resuming = bool(agent_run.get("worktree_id"))
+        existing = self._find_existing_worktree(agent_run, project_id, branch_name)
+        if existing:
+            state.worktree_path = str(settings.workspace_dir / existing["worktree_path"])
+            if existing["id"] != agent_run.get("worktree_id"):
+                database.update_agent_run(agent_run_id, worktree_id=existing["id"], branch=branch_name)
+            self._log(agent_run_id, f"Reusing worktree at: {state.worktree_path}")
+            return
+
+        if resuming:
+            self._log(agent_run_id, f"Worktree is gone, recreating it for existing branch: {branch_name}", "warning")
+        else:
+            self._log(agent_run_id, f"Creating worktree for branch: {branch_name}")
 
         try:
             # Get base branch - use provided one or get default from repo
@@ -474,11 +626,11 @@ class AgentExecutionEngine:
 
             self._log(agent_run_id, f"Using base branch: {base_branch}")
 
-            # Create worktree (this also creates the branch)
+            # Create worktree (this also creates the branch unless resuming)
             worktree, session = worktree_manager.create_worktree_session(
                 project_id=project_id,
                 branch_name=branch_name,
-                create_new_branch=True,
+                create_new_branch=not resuming,
                 base_branch=base_branch,
                 profile_id=agent_run.get("profile_id")
             )
@@ -501,13 +653,40 @@ class AgentExecutionEngine:
                     branch=branch_name
                 )
                 self._log(agent_run_id, f"Worktree created at: {state.worktree_path}")
+            elif resuming:
+                raise RuntimeError(f"Could not recreate worktree for branch {branch_name}")
             else:
                 self._log(agent_run_id, "Failed to create worktree, using main repository", "warning")
 
         except Exception as e:
             self._log(agent_run_id, f"Worktree creation failed: {e}", "error")
+            if resuming:
+                raise
             # Continue without worktree
 
+    def _find_existing_worktree(
+        self,
+        agent_run: Dict[str, Any],
+        project_id: str,
+        branch_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the usable worktree an earlier attempt of this run created, if any"""
+        worktree = None
+        if agent_run.get("worktree_id"):
+            worktree = database.get_worktree(agent_run["worktree_id"])
+        else:
+            # The process may have died between creating the worktree and
+            # recording it on the run
+            repo = database.get_git_repository_by_project(project_id)
+            if repo:
+                worktree = database.get_worktree_by_branch(repo["id"], branch_name)
+
+        if not worktree or worktree.get("status") != WorktreeStatus.ACTIVE:
+            return None
+        if not (settings.workspace_dir / worktree["worktree_path"]).exists():
+            return None
+        return worktree
+
     def _build_agent_prompt(self, agent_run: Dict[str, Any], state: AgentRunState) -> str:
         """Build the prompt for the agent with minimal context injection.
 
@@ -1402,6 +1581,8 @@ Important: Always approve before attempting to merge."""
 
             if state.task and not state.task.done():
                 state.task.cancel()
+        else:
+            self._queued_since.pop(agent_run_id, None)
 
         # Update database
         database.update_agent_run(
@@ -1418,6 +1599,7 @@ Important: Always approve before attempting to merge."""
             "error": reason
         })
 
+        self._wake()
         return True
 
     def get_agent_state(self, agent_run_id: str) -> Optional[Dict[str, Any]]:
@@ -1452,6 +1634,25 @@ Important: Always approve before attempting to merge."""
         """Get count of queued agents"""
         return database.get_agent_runs_count(status=AgentStatus.QUEUED.value)
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """Scheduler counters: slot use and recent queue wait times"""
+        self._account_slots()
+        active = self.get_active_count()
+        waits = list(self._waits)
+        return {
+            "running": active,
+            "max_running": self._max_concurrent,
+            "max_per_project": self.max_per_project,
+            "queued": len(self._queued_since),
+            "started": self.started,
+            "slot_utilization": round(active / self._max_concurrent, 3) if self._max_concurrent else 0.0,
+            "avg_slot_utilization": (
+                round(self._slot_seconds / self._capacity_seconds, 3) if self._capacity_seconds else 0.0
+            ),
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "max_wait_ms": round(max(waits) * 1000, 1) if waits else 0.0,
+        }
+
 
 # Singleton instance
 agent_engine = AgentExecutionEngine()
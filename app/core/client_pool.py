@@ -0,0 +1,265 @@
+"""
+Warm SDK client pool
+
+Connecting a ClaudeSDKClient spawns the Claude CLI and waits for it to
+initialize, which is most of the time before the first token of a new
+session. ClientPool keeps up to client_pool_size connected, idle clients for
+each set of options new sessions are started with (in practice one set per
+profile, working directory and user) and hands one to the next new session
+with the same options. The pool is then refilled in the background.
+
+Everything the CLI is started with must match for a client to be shared, so
+pools are keyed by the options. The exception is the per-session callbacks
+(can_use_tool and hooks). Pooled clients are connected with a CallbackRelay
+in their place, and the relay is bound to the callbacks of the session that
+takes the client. Sessions that resume or continue a conversation always get
+a new client.
+
+Idle clients are disconnected after client_pool_idle_ttl_seconds, and pools
+no session asked for in that time are dropped (checked when a session takes
+a client and by cleanup_stale_sessions). The pool is off when
+client_pool_size is 0.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackRelay:
+    """Forwards a pooled client's can_use_tool and hook calls to the session that took it"""
+
+    def __init__(self):
+        self.can_use_tool: Optional[Callable] = None
+        self.hooks: List[Callable] = []
+
+    async def _forward_can_use_tool(self, *args, **kwargs):
+        return await self.can_use_tool(*args, **kwargs)
+
+    def _forward_hook(self, index: int) -> Callable:
+        async def forward(*args, **kwargs):
+            return await self.hooks[index](*args, **kwargs)
+        return forward
+
+    def relay_options(self, options: ClaudeAgentOptions) -> ClaudeAgentOptions:
+        """Copy of options with callbacks that go through this relay"""
+        hooks = None
+        if options.hooks:
+            hooks = {}
+            index = 0
+            for event, matchers in options.hooks.items():
+                hooks[event] = []
+                for matcher in matchers:
+                    forwards = [self._forward_hook(index + i) for i in range(len(matcher.hooks))]
+                    index += len(matcher.hooks)
+                    hooks[event].append(dataclasses.replace(matcher, hooks=forwards))
+        return dataclasses.replace(
+            options,
+            can_use_tool=self._forward_can_use_tool if options.can_use_tool else None,
+            hooks=hooks
+        )
+
+    def bind(self, options: ClaudeAgentOptions) -> None:
+        """Send callbacks to those of options (same pool key as the relayed options)"""
+        self.can_use_tool = options.can_use_tool
+        self.hooks = [
+            hook
+            for matchers in (options.hooks or {}).values()
+            for matcher in matchers
+            for hook in matcher.hooks
+        ]
+
+
+def pool_key(options: ClaudeAgentOptions) -> Optional[str]:
+    """Key of the pool whose clients can serve options, or None if they must get a new client"""
+    if options.resume or options.continue_conversation or options.fork_session or options.session_id:
+        return None
+    hook_shape = [
+        (event, [(matcher.matcher, len(matcher.hooks), matcher.timeout) for matcher in matchers])
+        for event, matchers in (options.hooks or {}).items()
+    ]
+    # The stderr callback only logs, so sessions may share the first one
+    fixed = dataclasses.replace(options, can_use_tool=None, hooks=None, stderr=None)
+    return hashlib.sha256(repr((fixed, options.can_use_tool is not None, hook_shape)).encode()).hexdigest()
+
+
+@dataclass
+class _IdleClient:
+    client: Any
+    relay: CallbackRelay
+    connected_at: float
+
+
+@dataclass(eq=False)
+class _Pool:
+    options: ClaudeAgentOptions
+    idle: Deque[_IdleClient] = field(default_factory=deque)
+    last_used: float = field(default_factory=time.monotonic)
+    refill_task: Optional[asyncio.Task] = None
+
+
+class ClientPool:
+    """Pre-connected, idle SDK clients per set of session options"""
+
+    def __init__(self, client_factory: Callable[[ClaudeAgentOptions], Any] = ClaudeSDKClient):
+        self._client_factory = client_factory
+        self._pools: Dict[str, _Pool] = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.connect_ms_total = 0.0
+        self.connect_ms_max = 0.0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.client_pool_size > 0
+
+    async def acquire(self, options: ClaudeAgentOptions) -> Optional[Any]:
+        """
+        A connected client for options taken from the pool, or None.
+
+        On None the caller connects a client of its own; either way the pool
+        for options is (re)filled in the background.
+        """
+        key = pool_key(options) if self.enabled else None
+        if key is None:
+            return None
+
+        now = time.monotonic()
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _Pool(options=options)
+            self._drop_least_recently_used()
+        pool.last_used = now
+
+        client = None
+        while pool.idle and client is None:
+            idle = pool.idle.popleft()
+            if now - idle.connected_at > settings.client_pool_idle_ttl_seconds:
+                self._evict(idle)
+            else:
+                idle.relay.bind(options)
+                client = idle.client
+
+        if client is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._refill(pool)
+        return client
+
+    def _refill(self, pool: _Pool) -> None:
+        if pool.refill_task is None or pool.refill_task.done():
+            pool.refill_task = asyncio.create_task(self._fill(pool))
+
+    async def _fill(self, pool: _Pool) -> None:
+        while len(pool.idle) < settings.client_pool_size and pool in self._pools.values():
+            relay = CallbackRelay()
+            client = self._client_factory(relay.relay_options(pool.options))
+            started = time.perf_counter()
+            try:
+                await client.connect()
+            except asyncio.CancelledError:
+                asyncio.create_task(self._disconnect(client))
+                raise
+            except Exception as e:
+                # Sessions fall back to their own client; retry on the next acquire
+                self.connect_failures += 1
+                logger.warning(f"Failed to pre-connect pooled SDK client: {e}")
+                return
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.connects += 1
+            self.connect_ms_total += elapsed_ms
+            self.connect_ms_max = max(self.connect_ms_max, elapsed_ms)
+            if pool in self._pools.values():
+                pool.idle.append(_IdleClient(client, relay, time.monotonic()))
+            else:
+                self._evict(_IdleClient(client, relay, time.monotonic()))
+
+    def _drop_least_recently_used(self) -> None:
+        while len(self._pools) > max(1, settings.client_pool_max_pools):
+            key = min(self._pools, key=lambda k: self._pools[k].last_used)
+            self._drop_pool(self._pools.pop(key))
+
+    def _drop_pool(self, pool: _Pool) -> None:
+        if pool.refill_task and not pool.refill_task.done():
+            pool.refill_task.cancel()
+        while pool.idle:
+            self._evict(pool.idle.popleft())
+
+    def _evict(self, idle: _IdleClient) -> None:
+        self.evicted += 1
+        asyncio.create_task(self._disconnect(idle.client))
+
+    async def _disconnect(self, client: Any) -> None:
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting pooled SDK client: {e}")
+
+    def evict_idle(self) -> int:
+        """Disconnect clients idle past the TTL and drop pools nobody used in that time"""
+        now = time.monotonic()
+        ttl = settings.client_pool_idle_ttl_seconds
+        before = self.evicted
+        for key, pool in list(self._pools.items()):
+            if now - pool.last_used > ttl:
+                self._drop_pool(self._pools.pop(key))
+                continue
+            fresh = deque(idle for idle in pool.idle if now - idle.connected_at <= ttl)
+            for idle in pool.idle:
+                if now - idle.connected_at > ttl:
+                    self._evict(idle)
+            pool.idle = fresh
+            if self.enabled:
+                self._refill(pool)
+        return self.evicted - before
+
+    async def close(self) -> None:
+        """Disconnect every idle client (app shutdown)"""
+        pools = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            if pool.refill_task and not pool.refill_task.done():
+                pool.refill_task.cancel()
+                try:
+                    await pool.refill_task
+                except (asyncio.CancelledError, Exception):
+                    pass
+            while pool.idle:
+                await self._disconnect(pool.idle.popleft().client)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "pools": len(self._pools),
+            "idle": sum(len(pool.idle) for pool in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "avg_connect_ms": round(self.connect_ms_total / self.connects, 2) if self.connects else 0.0,
+            "max_connect_ms": round(self.connect_ms_max, 2),
+            "evicted": self.evicted,
+        }
+
+
+# Global instance
+client_pool = ClientPool()
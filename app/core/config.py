@@ -48,6 +48,92 @@ class Settings(BaseSettings):
     # Database
     database_url: Optional[str] = None
 
+    # Database - connection pool (see app/db/pool.py)
+    db_pool_enabled: bool = True  # Per-thread reusable connections with a serialized writer
+    db_journal_mode: str = "WAL"
+    db_synchronous: str = "NORMAL"  # NORMAL is durable in WAL mode except on power loss
+    db_mmap_size: int = 64 * 1024 * 1024  # Bytes of the DB file to memory-map
+    db_cache_size_kib: int = 16 * 1024  # Page cache per connection
+    db_busy_timeout_ms: int = 5000
+    db_statement_cache_size: int = 256  # Prepared statements cached per connection
+    db_busy_retries: int = 5  # Retries on SQLITE_BUSY before giving up
+
+    # Database - async facade (see app/db/async_database.py)
+    db_async_readers: int = 4  # Reader threads for DB calls made from async code
+
+    # Database - write-behind persistence for streamed turns (see app/db/write_behind.py)
+    db_write_mode: str = "per_turn"  # strict, per_turn or interval
+    db_write_interval_ms: int = 250  # Flush period in interval mode
+    db_write_max_batch: int = 500  # Flush early once this many rows are pending
+
+    # Knowledge base retrieval (see app/core/knowledge_service.py, app/core/knowledge_vectors.py)
+    knowledge_search_mode: str = "bm25"  # Default for projects without a setting: bm25, vector or hybrid
+    knowledge_hybrid_vector_weight: float = 0.5  # Share of the vector score in hybrid ranking
+    knowledge_embed_workers: int = 2  # Processes used to embed uploaded documents
+    knowledge_max_upload_bytes: int = 5 * 1024 * 1024  # Per-file upload limit
+    knowledge_ingest_concurrency: int = 4  # Files ingested at once by the batch endpoint
+    knowledge_index_persist: bool = True  # Keep chunk term frequencies on disk so BM25 indexes survive restarts
+
+    # Session history index (see app/core/jsonl_index.py)
+    history_index_persist: bool = True  # Keep transcript line offsets and totals on disk across restarts
+    history_index_cache_size: int = 64  # Parsed transcripts kept in memory
+    history_page_size: int = 0  # Messages per history page when the client doesn't ask (0 = full history)
+    history_max_page_size: int = 1000  # Upper bound for a requested page size
+    history_catalog_ttl_seconds: float = 2.0  # Reuse a chat history directory scan for this long
+
+    # Multi-device sync (see app/core/sync_engine.py)
+    sync_send_queue_size: int = 256  # Events queued per device before a slow device is resynced
+    sync_backend: str = "local"  # Fan-out between workers: local (single process) or sqlite (see app/core/sync_backend.py)
+    sync_backend_path: Optional[str] = None  # SQLite file shared by the workers (defaults to <data_dir>/sync_bus.sqlite)
+    sync_backend_poll_ms: int = 50  # How often workers poll for messages from other workers
+    sync_backend_retention_seconds: int = 300  # Published messages older than this are deleted
+    sync_owner_ttl_seconds: int = 60  # A session owner that stopped refreshing its claim for this long is ignored
+
+    # Sync event replay (see app/core/sync_engine.py)
+    sync_replay_buffer_size: int = 1000  # Recent events kept per session for reconnecting devices and polling
+    sync_replay_sessions: int = 500  # Sessions with a replay log; the least recently active are dropped
+    sync_replay_overflow: bool = False  # Write events dropped from a replay log to the sync_log table
+    sync_poll_max_wait_seconds: float = 25.0  # Longest a polling request is held waiting for events
+
+    # Stream chunk batching (see app/core/stream_batcher.py)
+    stream_batch_window_ms: int = 30  # Merge consecutive text deltas for this long (0 = off)
+    stream_batch_max_chars: int = 4096  # Emit a merged delta early once it is this long
+
+    # WebSocket transport (see app/core/ws_transport.py)
+    ws_per_message_deflate: bool = True  # Offer the permessage-deflate extension
+    ws_compress_min_bytes: int = 1024  # Smaller messages stay uncompressed with the deflate encoding
+    ws_compress_level: int = 6  # zlib level for the deflate encoding
+
+    # Query admission (see app/core/queue_manager.py)
+    query_max_concurrent: int = 8  # Queries (SDK clients) running at once; the rest wait in the queue (0 = unlimited)
+    query_duration_samples: int = 50  # Recent query durations averaged for queue wait estimates
+
+    # Background agents (see app/core/agent_engine.py)
+    agent_max_concurrent: int = 3  # Agents running (or paused) at once; the rest stay queued
+    agent_max_per_project: int = 0  # Agents running at once in one project (0 = no per-project cap)
+
+    # Permission rules (see app/core/permission_handler.py)
+    permission_rule_cache_seconds: float = 30.0  # Re-read a profile's rules at least this often (picks up other workers' edits)
+
+    # SDK options cache (see app/core/options_cache.py)
+    options_cache_ttl_seconds: float = 30.0  # Max age of cached profiles, subagents, provider settings and git status
+
+    # Decrypted API key cache (see app/core/credential_service.py)
+    secret_cache_ttl_seconds: float = 60.0  # Max age of cached admin keys and per-user credentials
+
+    # Warm SDK client pool (see app/core/client_pool.py)
+    client_pool_size: int = 0  # Connected idle clients kept per profile/working directory for new sessions (0 = off)
+    client_pool_idle_ttl_seconds: float = 300.0  # Disconnect pooled clients (and drop pools) unused this long
+    client_pool_max_pools: int = 8  # Option sets kept warm; the least recently used pool is dropped
+
+    # Async git commands (see app/core/git_service.py)
+    git_max_concurrent_per_repo: int = 4  # Git processes run at once per repository (shared with its worktrees)
+    git_status_cache_ttl_seconds: float = 5.0  # Max age of a cached status (file edits don't change .git mtimes)
+
+    # Event loop lag monitor
+    loop_lag_interval_ms: int = 500
+    loop_lag_warn_ms: int = 100  # Log a warning when the loop was blocked this long
+
     # Session
     session_secret: Optional[str] = None
     session_expire_days: int = 30
@@ -59,10 +145,16 @@ class Settings(BaseSettings):
     max_login_attempts: int = 5  # Max failed attempts before lockout
     login_attempt_window_minutes: int = 15  # Time window for counting attempts
     lockout_duration_minutes: int = 30  # Duration of lockout after max attempts
+    rate_limit_persist_seconds: float = 30.0  # How often request counters are saved to survive restarts (0 = never)
 
     # Security - API Key Session
     api_key_session_expire_hours: int = 24  # API key web session duration
 
+    # Security - Principal cache (see app/core/principal_cache.py)
+    auth_cache_ttl_seconds: float = 30.0  # How long a resolved token is trusted without a lookup (0 = off)
+    auth_cache_max_entries: int = 1024  # Resolved tokens kept; the least recently used are dropped
+    auth_last_used_interval_seconds: float = 60.0  # Write an API user's last_used_at at most this often
+
     # Security - Trusted Proxies (for getting real IP behind reverse proxy)
     trusted_proxy_headers: str = "X-Forwarded-For,X-Real-IP"  # Comma-separated
 
@@ -113,6 +205,21 @@ class Settings(BaseSettings):
         """Get the sessions directory"""
         return self.effective_data_dir / "sessions"
 
+    @property
+    def knowledge_vectors_dir(self) -> Path:
+        """Get the directory for per-project knowledge vector indexes"""
+        return self.effective_data_dir / "knowledge_vectors"
+
+    @property
+    def knowledge_index_dir(self) -> Path:
+        """Get the directory for persisted per-project BM25 indexes"""
+        return self.effective_data_dir / "knowledge_index"
+
+    @property
+    def history_index_dir(self) -> Path:
+        """Get the directory for persisted session history indexes"""
+        return self.effective_data_dir / "history_index"
+
     @property
     def get_claude_projects_dir(self) -> Path:
         """Get the Claude SDK projects directory"""
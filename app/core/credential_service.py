@@ -3,15 +3,27 @@ Credential validation and management service.
 
 This module handles business logic for validating API credentials with external
 providers (OpenAI, Google Gemini, GitHub).
+
+It also keeps decrypted API keys in memory (SecretCache) so queries and media
+generation do not read and decrypt the same keys from the database on every
+call. Cached values are dropped when the encryption key is set, cleared or
+rotated, when the admin keys or a user's credentials or policies are written,
+and after secret_cache_ttl_seconds.
 """
 
 import logging
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 import httpx
 
+from app.core import encryption
+from app.core.config import settings
+from app.db import database
+
 logger = logging.getLogger(__name__)
 
 
@@ -324,3 +336,176 @@ async def validate_credential(credential_type: str, value: str) -> CredentialVal
         return await validate_github_pat(value)
     else:
         raise ValueError(f"Unknown credential type: {credential_type}")
+
+
+# ============================================================================
+# Decrypted secret cache
+# ============================================================================
+
+def _decrypt_secret(name: str, value: Optional[str]) -> Optional[str]:
+    """
+    Decrypt a stored secret.
+
+    Returns None if the value is empty, the encryption key is not loaded or
+    decryption fails. Plaintext values are returned as-is (backwards
+    compatibility during migration).
+    """
+    if not value:
+        return None
+
+    if encryption.is_encrypted(value):
+        if not encryption.is_encryption_ready():
+            logger.warning(f"Cannot decrypt {name}: encryption key not available")
+            return None
+        try:
+            return encryption.decrypt_value(value)
+        except Exception as e:
+            logger.error(f"Failed to decrypt {name}: {e}")
+            return None
+
+    return value
+
+
+@dataclass
+class UserSecrets:
+    """A user's credential policies and decrypted credentials, by credential type"""
+    policies: Dict[str, str] = field(default_factory=dict)
+    credentials: Dict[str, Optional[str]] = field(default_factory=dict)
+
+
+class SecretCache:
+    """In-memory cache of decrypted admin API keys and per-user credentials"""
+
+    def __init__(self):
+        self._admin_keys: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._users: Dict[str, Tuple[float, UserSecrets]] = {}
+        self._key_version = encryption.get_key_version()
+        # Bumped on invalidation so a load that raced with a write is not stored
+        self._admin_generation = 0
+        self._user_generation = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def _check_key_version(self) -> None:
+        """Forget everything decrypted with a key that is no longer loaded (lock held)"""
+        key_version = encryption.get_key_version()
+        if key_version != self._key_version:
+            self._admin_keys.clear()
+            self._users.clear()
+            self._key_version = key_version
+
+    def get_admin_keys(self, setting_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Decrypted admin API keys from system_settings.
+
+        Keys that are not cached are read in one query.
+        """
+        setting_names = list(setting_names)
+        now = time.monotonic()
+        result: Dict[str, Optional[str]] = {}
+        with self._lock:
+            self._check_key_version()
+            key_version = self._key_version
+            for name in setting_names:
+                entry = self._admin_keys.get(name)
+                if entry and now - entry[0] < settings.secret_cache_ttl_seconds:
+                    result[name] = entry[1]
+            self.hits += len(result)
+            missing = [name for name in setting_names if name not in result]
+            self.misses += len(missing)
+            generation = self._admin_generation
+
+        if missing:
+            values = database.get_system_settings(missing)
+            loaded = {name: _decrypt_secret(name, values.get(name)) for name in missing}
+            with self._lock:
+                if (self._admin_generation == generation
+                        and self._key_version == key_version == encryption.get_key_version()):
+                    for name, value in loaded.items():
+                        self._admin_keys[name] = (now, value)
+            result.update(loaded)
+        return result
+
+    def get_admin_key(self, setting_name: str) -> Optional[str]:
+        """Decrypted admin API key, or None if not set or not decryptable"""
+        return self.get_admin_keys([setting_name])[setting_name]
+
+    def get_user_secrets(self, api_user_id: str) -> UserSecrets:
+        """All credential policies and decrypted credentials of an API user"""
+        now = time.monotonic()
+        with self._lock:
+            self._check_key_version()
+            key_version = self._key_version
+            entry = self._users.get(api_user_id)
+            if entry and now - entry[0] < settings.secret_cache_ttl_seconds:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._user_generation
+
+        user_secrets = UserSecrets(
+            policies={
+                row["credential_type"]: row["policy"]
+                for row in database.get_all_user_credential_policies(api_user_id)
+            },
+            credentials={
+                row["credential_type"]: _decrypt_secret(
+                    f"user credential {row['credential_type']}", row.get("encrypted_value")
+                )
+                for row in database.get_all_user_credentials(api_user_id)
+            },
+        )
+        with self._lock:
+            if (self._user_generation == generation
+                    and self._key_version == key_version == encryption.get_key_version()):
+                self._users[api_user_id] = (now, user_secrets)
+        return user_secrets
+
+    def invalidate_admin(self, setting_name: Optional[str] = None) -> None:
+        with self._lock:
+            self._admin_generation += 1
+            if setting_name is None:
+                self._admin_keys.clear()
+            else:
+                self._admin_keys.pop(setting_name, None)
+
+    def invalidate_user(self, api_user_id: Optional[str] = None) -> None:
+        with self._lock:
+            self._user_generation += 1
+            if api_user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(api_user_id, None)
+
+    def on_database_change(self, table: str, key: Optional[str]) -> None:
+        if table == "system_settings":
+            self.invalidate_admin(key)
+        elif table in ("api_user_credentials", "user_credential_policies"):
+            self.invalidate_user(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._admin_generation += 1
+            self._user_generation += 1
+            self._admin_keys.clear()
+            self._users.clear()
+            self._key_version = encryption.get_key_version()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            return {
+                "admin_keys": len(self._admin_keys),
+                "users": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Global instance
+secret_cache = SecretCache()
+database.add_change_listener(secret_cache.on_database_change)
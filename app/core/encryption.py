@@ -22,6 +22,14 @@ logger = logging.getLogger(__name__)
 _encryption_key: Optional[bytes] = None
 _key_salt: Optional[bytes] = None
 
+# Fernet instance for _encryption_key, reused across encrypt/decrypt calls
+_fernet: Optional[Fernet] = None
+_fernet_key: Optional[bytes] = None
+
+# Bumped whenever the key is set, cleared or rotated, so caches of decrypted
+# values (see app/core/credential_service.py) can tell their entries are stale
+_key_version = 0
+
 
 def init_encryption_from_env(db_module) -> bool:
     """
@@ -91,16 +99,18 @@ def set_encryption_key(password: str, db_module) -> None:
     Set the encryption key in memory by deriving it from the admin password.
     Called when admin logs in successfully.
     """
-    global _encryption_key
+    global _encryption_key, _key_version
     salt = get_or_create_salt(db_module)
     _encryption_key = derive_key_from_password(password, salt)
+    _key_version += 1
     logger.info("Encryption key loaded into memory")
 
 
 def clear_encryption_key() -> None:
     """Clear the encryption key from memory (e.g., on logout or shutdown)."""
-    global _encryption_key
+    global _encryption_key, _key_version
     _encryption_key = None
+    _key_version += 1
     logger.info("Encryption key cleared from memory")
 
 
@@ -109,6 +119,20 @@ def is_encryption_ready() -> bool:
     return _encryption_key is not None
 
 
+def get_key_version() -> int:
+    """Counter that changes whenever the encryption key is set, cleared or rotated."""
+    return _key_version
+
+
+def _get_fernet() -> Fernet:
+    """Fernet for the current key, built once per key instead of per call."""
+    global _fernet, _fernet_key
+    if _fernet is None or _fernet_key != _encryption_key:
+        _fernet = Fernet(_encryption_key)
+        _fernet_key = _encryption_key
+    return _fernet
+
+
 def encrypt_value(plaintext: str) -> str:
     """
     Encrypt a string value.
@@ -125,8 +149,7 @@ def encrypt_value(plaintext: str) -> str:
     if not _encryption_key:
         raise RuntimeError("Encryption key not loaded. Admin must be logged in.")
 
-    f = Fernet(_encryption_key)
-    encrypted = f.encrypt(plaintext.encode())
+    encrypted = _get_fernet().encrypt(plaintext.encode())
     # Prefix with 'enc:' to identify encrypted values
     return f"enc:{base64.b64encode(encrypted).decode()}"
 
@@ -154,8 +177,7 @@ def decrypt_value(encrypted: str) -> str:
 
     try:
         encrypted_bytes = base64.b64decode(encrypted[4:])  # Remove 'enc:' prefix
-        f = Fernet(_encryption_key)
-        decrypted = f.decrypt(encrypted_bytes)
+        decrypted = _get_fernet().decrypt(encrypted_bytes)
         return decrypted.decode()
     except InvalidToken:
         raise ValueError("Decryption failed - invalid key or corrupted data")
@@ -179,7 +201,7 @@ def re_encrypt_all_secrets(old_password: str, new_password: str, db_module) -> b
     Returns:
         True if successful, False otherwise
     """
-    global _encryption_key, _key_salt
+    global _encryption_key, _key_salt, _key_version
 
     salt = get_or_create_salt(db_module)
     old_key = derive_key_from_password(old_password, salt)
@@ -225,6 +247,7 @@ def re_encrypt_all_secrets(old_password: str, new_password: str, db_module) -> b
 
     # Update in-memory key
     _encryption_key = new_key
+    _key_version += 1
 
     logger.info("Successfully re-encrypted all secrets with new password")
     return True
@@ -6,15 +6,105 @@ worktree management, and commit graph visualization.
 
 This service wraps git CLI commands and provides a clean interface
 for the API layer to interact with git repositories.
+
+Every read has an *_async variant for async endpoints. These run git with
+asyncio subprocesses, so a slow fetch or `log --all` no longer blocks the
+event loop, and at most git_max_concurrent_per_repo commands run at once
+per repository (a repository and its worktrees share the limit). Status,
+branch and worktree lists are cached, keyed by the mtimes of HEAD, the
+index, config, packed-refs and the refs and worktrees directories, so
+repeated UI polls don't run git until the repository changes. Edits to
+working tree files don't touch .git, so status entries also expire after
+git_status_cache_ttl_seconds.
 """
 
+import asyncio
+import copy
 import logging
 import subprocess
 import os
-from typing import List, Dict, Any, Optional, Tuple
+import time
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Format of `git for-each-ref` lines parsed by _parse_branches
+BRANCH_FORMAT = "%(refname:short)|%(objectname:short)|%(subject)|%(HEAD)|%(upstream:short)|%(upstream:track)"
+
+# Format of `git log` lines parsed by _parse_commit_graph: SHA|short SHA|message|author|email|timestamp|parents|refs
+COMMIT_FORMAT = "%H|%h|%s|%an|%ae|%aI|%P|%D"
+
+
+def _git_dirs(working_dir: str) -> Optional[Tuple[str, str]]:
+    """
+    (git dir, common dir) of the repository or worktree rooted at working_dir.
+
+    For a linked worktree .git is a file pointing at its git dir under the
+    main repository's .git/worktrees, and the common dir is the main .git.
+    Returns None when working_dir has no .git (not a repository root).
+    """
+    dot_git = os.path.join(working_dir, ".git")
+    try:
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+        elif os.path.isfile(dot_git):
+            with open(dot_git, encoding="utf-8") as f:
+                content = f.read().strip()
+            if not content.startswith("gitdir:"):
+                return None
+            git_dir = os.path.join(working_dir, content[len("gitdir:"):].strip())
+        else:
+            return None
+
+        common_dir = git_dir
+        commondir_file = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_file):
+            with open(commondir_file, encoding="utf-8") as f:
+                common_dir = os.path.join(git_dir, f.read().strip())
+        return os.path.normpath(git_dir), os.path.normpath(common_dir)
+    except OSError:
+        return None
+
+
+def repo_fingerprint(working_dir: str) -> Optional[Tuple]:
+    """
+    mtimes of the repository files git status, branches and worktrees read.
+
+    Ref updates are written to a lock file that is renamed into place, so
+    every ref change touches the mtime of the directory holding the ref.
+    Returns None when working_dir is not a repository root (not cached).
+    """
+    dirs = _git_dirs(working_dir)
+    if dirs is None:
+        return None
+    git_dir, common_dir = dirs
+
+    paths = [
+        os.path.join(git_dir, "HEAD"),
+        os.path.join(git_dir, "index"),
+        os.path.join(common_dir, "config"),
+        os.path.join(common_dir, "packed-refs"),
+    ]
+    for root, _, _ in os.walk(os.path.join(common_dir, "refs")):
+        paths.append(root)
+    worktrees_dir = os.path.join(common_dir, "worktrees")
+    paths.append(worktrees_dir)
+    try:
+        paths.extend(entry.path for entry in os.scandir(worktrees_dir) if entry.is_dir())
+    except OSError:
+        pass
+
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
 
 class GitService:
     """
@@ -27,6 +117,23 @@ class GitService:
     - Commit graph and status
     """
 
+    def __init__(self):
+        # Per-repository limits on concurrent async git commands, keyed by common dir
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (kind, repo path, params) -> (fingerprint, cached_at, value)
+        self._cache: Dict[Tuple, Tuple[Tuple, float, Any]] = {}
+
+        # Metrics
+        self.commands = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.command_ms_total = 0.0
+        self.command_ms_max = 0.0
+        self.wait_ms_max = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def _run_git(
         self,
         working_dir: str,
@@ -62,6 +169,143 @@ class GitService:
             logger.warning(f"Git command failed: git {' '.join(args)}: {e.stderr}")
             raise
 
+    def _repo_semaphore(self, working_dir: str) -> asyncio.Semaphore:
+        """Semaphore limiting concurrent git commands in working_dir's repository"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Semaphores are bound to the loop they first wait on
+            self._loop = loop
+            self._semaphores = {}
+        dirs = _git_dirs(working_dir)
+        key = os.path.realpath(dirs[1] if dirs else working_dir)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(
+                max(1, settings.git_max_concurrent_per_repo)
+            )
+        return semaphore
+
+    async def _run_git_async(
+        self,
+        working_dir: str,
+        args: List[str],
+        timeout: int = 30
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a git command without blocking the event loop.
+
+        Waits for a slot of the repository's concurrency limit first; the
+        timeout applies to the command itself. The git process is killed on
+        timeout or cancellation.
+
+        Raises:
+            subprocess.TimeoutExpired: If the command times out
+        """
+        queued = time.perf_counter()
+        self.waiting += 1
+        acquired = False
+        try:
+            async with self._repo_semaphore(working_dir):
+                acquired = True
+                self.waiting -= 1
+                started = time.perf_counter()
+                self.wait_ms_max = max(self.wait_ms_max, (started - queued) * 1000)
+
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        "git", *args,
+                        cwd=working_dir,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE
+                    )
+                except NotImplementedError:
+                    # Event loop without subprocess support (selector loop on Windows)
+                    return await asyncio.to_thread(self._run_git, working_dir, args, timeout)
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    await self._kill(process)
+                    logger.warning(f"Git command timed out: git {' '.join(args)}")
+                    raise subprocess.TimeoutExpired(["git"] + args, timeout)
+                except asyncio.CancelledError:
+                    await self._kill(process)
+                    raise
+                finally:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    self.commands += 1
+                    self.command_ms_total += elapsed_ms
+                    self.command_ms_max = max(self.command_ms_max, elapsed_ms)
+        finally:
+            if not acquired:
+                # Cancelled while waiting for a slot
+                self.waiting -= 1
+
+        return subprocess.CompletedProcess(
+            args=["git"] + args,
+            returncode=process.returncode,
+            stdout=stdout.decode("utf-8", errors="replace"),
+            stderr=stderr.decode("utf-8", errors="replace")
+        )
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            return
+        await process.wait()
+
+    async def _cached(
+        self,
+        kind: str,
+        working_dir: str,
+        params: Tuple,
+        load: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Result of load(), reused until the repository fingerprint changes.
+
+        The fingerprint is taken before load() runs, so a change made while
+        git runs invalidates the stored result on the next call. Entries
+        older than ttl seconds (when given) are reloaded as well.
+        """
+        key = (kind, os.path.realpath(working_dir), params)
+        fingerprint = repo_fingerprint(working_dir)
+        now = time.monotonic()
+        if fingerprint is not None:
+            entry = self._cache.get(key)
+            if entry and entry[0] == fingerprint and (ttl is None or now - entry[1] < ttl):
+                self.cache_hits += 1
+                return copy.deepcopy(entry[2])
+
+        self.cache_misses += 1
+        value = await load()
+        if fingerprint is not None:
+            self._cache[key] = (fingerprint, now, value)
+        else:
+            self._cache.pop(key, None)
+        return copy.deepcopy(value)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "commands": self.commands,
+            "timeouts": self.timeouts,
+            "waiting": self.waiting,
+            "avg_command_ms": round(self.command_ms_total / self.commands, 2) if self.commands else 0.0,
+            "max_command_ms": round(self.command_ms_max, 2),
+            "max_wait_ms": round(self.wait_ms_max, 2),
+            "cache_entries": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else 0.0,
+        }
+
     # =========================================================================
     # Repository Introspection
     # =========================================================================
@@ -84,6 +328,24 @@ class GitService:
         except Exception:
             return None
 
+    async def is_git_repo_async(self, working_dir: str) -> bool:
+        """Check if the working directory is a git repository (non-blocking)."""
+        try:
+            result = await self._run_git_async(working_dir, ["rev-parse", "--git-dir"], timeout=5)
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    async def get_remote_url_async(self, working_dir: str) -> Optional[str]:
+        """Get the remote URL for origin (non-blocking)."""
+        try:
+            result = await self._run_git_async(working_dir, ["remote", "get-url", "origin"], timeout=5)
+            if result.returncode == 0:
+                return result.stdout.strip()
+            return None
+        except Exception:
+            return None
+
     def get_current_branch(self, working_dir: str) -> Optional[str]:
         """Get the current branch name."""
         try:
@@ -95,6 +357,17 @@ class GitService:
         except Exception:
             return None
 
+    async def get_current_branch_async(self, working_dir: str) -> Optional[str]:
+        """Get the current branch name (non-blocking)."""
+        try:
+            result = await self._run_git_async(working_dir, ["rev-parse", "--abbrev-ref", "HEAD"], timeout=5)
+            if result.returncode == 0:
+                branch = result.stdout.strip()
+                return branch if branch != "HEAD" else None
+            return None
+        except Exception:
+            return None
+
     def get_default_branch(self, working_dir: str) -> str:
         """
         Get the default branch name (usually main or master).
@@ -125,6 +398,30 @@ class GitService:
         except Exception:
             return "main"
 
+    async def get_default_branch_async(self, working_dir: str) -> str:
+        """Get the default branch name (non-blocking)."""
+        try:
+            result = await self._run_git_async(
+                working_dir,
+                ["symbolic-ref", "refs/remotes/origin/HEAD", "--short"],
+                timeout=5
+            )
+            if result.returncode == 0:
+                return result.stdout.strip().replace("origin/", "")
+
+            for branch in ["main", "master"]:
+                result = await self._run_git_async(
+                    working_dir,
+                    ["rev-parse", "--verify", f"refs/heads/{branch}"],
+                    timeout=5
+                )
+                if result.returncode == 0:
+                    return branch
+
+            return "main"
+        except Exception:
+            return "main"
+
     def fetch(self, working_dir: str, remote: str = "origin") -> bool:
         """
         Fetch from remote.
@@ -151,6 +448,23 @@ class GitService:
             logger.error(f"Fetch error: {e}")
             return False
 
+    async def fetch_async(self, working_dir: str, remote: str = "origin") -> bool:
+        """Fetch from remote without blocking the event loop (see fetch)."""
+        try:
+            result = await self._run_git_async(
+                working_dir,
+                ["fetch", remote, "--prune"],
+                timeout=60
+            )
+            if result.returncode == 0:
+                logger.info(f"Fetched from {remote}")
+                return True
+            logger.warning(f"Fetch failed: {result.stderr}")
+            return False
+        except Exception as e:
+            logger.error(f"Fetch error: {e}")
+            return False
+
     # =========================================================================
     # Branch Operations
     # =========================================================================
@@ -178,82 +492,110 @@ class GitService:
             - behind: Commits behind tracking branch (local only)
         """
         try:
-            # Use for-each-ref for structured output
-            format_str = "%(refname:short)|%(objectname:short)|%(subject)|%(HEAD)|%(upstream:short)|%(upstream:track)"
-            args = [
-                "for-each-ref",
-                f"--format={format_str}",
-                "refs/heads/"
-            ]
-            if include_remote:
-                args.append("refs/remotes/")
-
-            result = self._run_git(working_dir, args, timeout=10)
+            result = self._run_git(working_dir, self._branch_args(include_remote), timeout=10)
             if result.returncode != 0:
                 logger.warning(f"Failed to list branches: {result.stderr}")
                 return []
-
-            branches = []
-            for line in result.stdout.strip().split("\n"):
-                if not line:
-                    continue
-
-                parts = line.split("|", 5)
-                if len(parts) < 4:
-                    continue
-
-                name = parts[0]
-                commit = parts[1]
-                message = parts[2] if len(parts) > 2 else ""
-                is_current = parts[3] == "*" if len(parts) > 3 else False
-                upstream = parts[4] if len(parts) > 4 else ""
-                track_info = parts[5] if len(parts) > 5 else ""
-
-                # Skip HEAD reference
-                if name == "origin/HEAD":
-                    continue
-
-                is_remote = name.startswith("origin/") or "/" in name
-
-                # Parse ahead/behind from track info like "[ahead 1, behind 2]"
-                ahead = 0
-                behind = 0
-                if track_info:
-                    if "ahead" in track_info:
-                        try:
-                            ahead = int(track_info.split("ahead ")[1].split(",")[0].split("]")[0])
-                        except (IndexError, ValueError):
-                            pass
-                    if "behind" in track_info:
-                        try:
-                            behind = int(track_info.split("behind ")[1].split("]")[0])
-                        except (IndexError, ValueError):
-                            pass
-
-                branches.append({
-                    "name": name,
-                    "is_current": is_current,
-                    "is_remote": is_remote,
-                    "commit": commit,
-                    "commit_message": message[:100],
-                    "upstream": upstream if upstream else None,
-                    "ahead": ahead,
-                    "behind": behind
-                })
-
-            # Sort: current first, then local branches, then remote
-            branches.sort(key=lambda b: (
-                not b["is_current"],
-                b["is_remote"],
-                b["name"].lower()
-            ))
-
-            return branches
-
+            return self._parse_branches(result.stdout)
         except Exception as e:
             logger.error(f"Error listing branches: {e}")
             return []
 
+    async def list_branches_async(
+        self,
+        working_dir: str,
+        include_remote: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        List all branches without blocking the event loop (see list_branches).
+
+        Cached until a ref, HEAD or the index of the repository changes.
+        """
+        async def load() -> List[Dict[str, Any]]:
+            try:
+                result = await self._run_git_async(working_dir, self._branch_args(include_remote), timeout=10)
+                if result.returncode != 0:
+                    logger.warning(f"Failed to list branches: {result.stderr}")
+                    return []
+                return self._parse_branches(result.stdout)
+            except Exception as e:
+                logger.error(f"Error listing branches: {e}")
+                return []
+
+        return await self._cached("branches", working_dir, (include_remote,), load)
+
+    @staticmethod
+    def _branch_args(include_remote: bool) -> List[str]:
+        # Use for-each-ref for structured output
+        args = [
+            "for-each-ref",
+            f"--format={BRANCH_FORMAT}",
+            "refs/heads/"
+        ]
+        if include_remote:
+            args.append("refs/remotes/")
+        return args
+
+    @staticmethod
+    def _parse_branches(output: str) -> List[Dict[str, Any]]:
+        """Parse `git for-each-ref --format=BRANCH_FORMAT` output into sorted branch dicts"""
+        branches = []
+        for line in output.strip().split("\n"):
+            if not line:
+                continue
+
+            parts = line.split("|", 5)
+            if len(parts) < 4:
+                continue
+
+            name = parts[0]
+            commit = parts[1]
+            message = parts[2] if len(parts) > 2 else ""
+            is_current = parts[3] == "*" if len(parts) > 3 else False
+            upstream = parts[4] if len(parts) > 4 else ""
+            track_info = parts[5] if len(parts) > 5 else ""
+
+            # Skip HEAD reference
+            if name == "origin/HEAD":
+                continue
+
+            is_remote = name.startswith("origin/") or "/" in name
+
+            # Parse ahead/behind from track info like "[ahead 1, behind 2]"
+            ahead = 0
+            behind = 0
+            if track_info:
+                if "ahead" in track_info:
+                    try:
+                        ahead = int(track_info.split("ahead ")[1].split(",")[0].split("]")[0])
+                    except (IndexError, ValueError):
+                        pass
+                if "behind" in track_info:
+                    try:
+                        behind = int(track_info.split("behind ")[1].split("]")[0])
+                    except (IndexError, ValueError):
+                        pass
+
+            branches.append({
+                "name": name,
+                "is_current": is_current,
+                "is_remote": is_remote,
+                "commit": commit,
+                "commit_message": message[:100],
+                "upstream": upstream if upstream else None,
+                "ahead": ahead,
+                "behind": behind
+            })
+
+        # Sort: current first, then local branches, then remote
+        branches.sort(key=lambda b: (
+            not b["is_current"],
+            b["is_remote"],
+            b["name"].lower()
+        ))
+
+        return branches
+
     def create_branch(
         self,
         working_dir: str,
@@ -340,6 +682,20 @@ class GitService:
             logger.error(f"Error checking out {ref}: {e}")
             return False
 
+    async def checkout_async(self, working_dir: str, ref: str) -> bool:
+        """Checkout a branch or commit without blocking the event loop (see checkout)."""
+        try:
+            result = await self._run_git_async(working_dir, ["checkout", ref], timeout=30)
+            if result.returncode == 0:
+                logger.info(f"Checked out: {ref}")
+                return True
+
+            logger.warning(f"Failed to checkout {ref}: {result.stderr}")
+            return False
+        except Exception as e:
+            logger.error(f"Error checking out {ref}: {e}")
+            return False
+
     # =========================================================================
     # Worktree Operations
     # =========================================================================
@@ -369,52 +725,78 @@ class GitService:
             if result.returncode != 0:
                 logger.warning(f"Failed to list worktrees: {result.stderr}")
                 return []
-
-            worktrees = []
-            current_worktree: Dict[str, Any] = {}
-
-            for line in result.stdout.split("\n"):
-                line = line.strip()
-                if not line:
-                    if current_worktree:
-                        worktrees.append(current_worktree)
-                        current_worktree = {}
-                    continue
-
-                if line.startswith("worktree "):
-                    current_worktree["path"] = line[9:]
-                elif line.startswith("HEAD "):
-                    current_worktree["head"] = line[5:]
-                elif line.startswith("branch "):
-                    # Format: branch refs/heads/branch-name
-                    branch_ref = line[7:]
-                    if branch_ref.startswith("refs/heads/"):
-                        current_worktree["branch"] = branch_ref[11:]
-                    else:
-                        current_worktree["branch"] = branch_ref
-                elif line == "bare":
-                    current_worktree["is_bare"] = True
-                elif line == "detached":
-                    current_worktree["is_detached"] = True
-
-            # Don't forget the last worktree
-            if current_worktree:
-                worktrees.append(current_worktree)
-
-            # Mark the main worktree (first one, at main_dir)
-            main_path = os.path.abspath(working_dir)
-            for wt in worktrees:
-                wt["is_main"] = os.path.abspath(wt.get("path", "")) == main_path
-                wt.setdefault("is_bare", False)
-                wt.setdefault("is_detached", False)
-                wt.setdefault("branch", None)
-
-            return worktrees
-
+            return self._parse_worktrees(result.stdout, working_dir)
         except Exception as e:
             logger.error(f"Error listing worktrees: {e}")
             return []
 
+    async def list_worktrees_async(self, working_dir: str) -> List[Dict[str, Any]]:
+        """
+        List all worktrees without blocking the event loop (see list_worktrees).
+
+        Cached until HEAD, a ref or the repository's worktrees change.
+        """
+        async def load() -> List[Dict[str, Any]]:
+            try:
+                result = await self._run_git_async(
+                    working_dir,
+                    ["worktree", "list", "--porcelain"],
+                    timeout=10
+                )
+                if result.returncode != 0:
+                    logger.warning(f"Failed to list worktrees: {result.stderr}")
+                    return []
+                return self._parse_worktrees(result.stdout, working_dir)
+            except Exception as e:
+                logger.error(f"Error listing worktrees: {e}")
+                return []
+
+        return await self._cached("worktrees", working_dir, (), load)
+
+    @staticmethod
+    def _parse_worktrees(output: str, working_dir: str) -> List[Dict[str, Any]]:
+        """Parse `git worktree list --porcelain` output into worktree dicts"""
+        worktrees = []
+        current_worktree: Dict[str, Any] = {}
+
+        for line in output.split("\n"):
+            line = line.strip()
+            if not line:
+                if current_worktree:
+                    worktrees.append(current_worktree)
+                    current_worktree = {}
+                continue
+
+            if line.startswith("worktree "):
+                current_worktree["path"] = line[9:]
+            elif line.startswith("HEAD "):
+                current_worktree["head"] = line[5:]
+            elif line.startswith("branch "):
+                # Format: branch refs/heads/branch-name
+                branch_ref = line[7:]
+                if branch_ref.startswith("refs/heads/"):
+                    current_worktree["branch"] = branch_ref[11:]
+                else:
+                    current_worktree["branch"] = branch_ref
+            elif line == "bare":
+                current_worktree["is_bare"] = True
+            elif line == "detached":
+                current_worktree["is_detached"] = True
+
+        # Don't forget the last worktree
+        if current_worktree:
+            worktrees.append(current_worktree)
+
+        # Mark the main worktree (first one, at main_dir)
+        main_path = os.path.abspath(working_dir)
+        for wt in worktrees:
+            wt["is_main"] = os.path.abspath(wt.get("path", "")) == main_path
+            wt.setdefault("is_bare", False)
+            wt.setdefault("is_detached", False)
+            wt.setdefault("branch", None)
+
+        return worktrees
+
     def add_worktree(
         self,
         main_dir: str,
@@ -522,63 +904,83 @@ class GitService:
             - refs: List of refs pointing to this commit
         """
         try:
-            # Format: SHA|short SHA|message|author|email|timestamp|parents|refs
-            format_str = "%H|%h|%s|%an|%ae|%aI|%P|%D"
-            args = [
-                "log",
-                f"--format={format_str}",
-                f"-{limit}",
-                "--all" if not branch else branch
-            ]
-
-            result = self._run_git(working_dir, args, timeout=30)
+            result = self._run_git(working_dir, self._commit_graph_args(limit, branch), timeout=30)
             if result.returncode != 0:
                 logger.warning(f"Failed to get commit graph: {result.stderr}")
                 return []
+            return self._parse_commit_graph(result.stdout)
+        except Exception as e:
+            logger.error(f"Error getting commit graph: {e}")
+            return []
 
-            commits = []
-            for line in result.stdout.strip().split("\n"):
-                if not line:
-                    continue
-
-                parts = line.split("|", 7)
-                if len(parts) < 6:
-                    continue
-
-                sha = parts[0]
-                short_sha = parts[1]
-                message = parts[2]
-                author = parts[3]
-                author_email = parts[4]
-                timestamp = parts[5]
-                parents = parts[6].split() if len(parts) > 6 and parts[6] else []
-                refs_str = parts[7] if len(parts) > 7 else ""
-
-                # Parse refs
-                refs = []
-                if refs_str:
-                    for ref in refs_str.split(", "):
-                        ref = ref.strip()
-                        if ref:
-                            refs.append(ref)
-
-                commits.append({
-                    "sha": sha,
-                    "short_sha": short_sha,
-                    "message": message,
-                    "author": author,
-                    "author_email": author_email,
-                    "timestamp": timestamp,
-                    "parents": parents,
-                    "refs": refs
-                })
-
-            return commits
-
+    async def get_commit_graph_async(
+        self,
+        working_dir: str,
+        limit: int = 100,
+        branch: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get commit graph data without blocking the event loop (see get_commit_graph)."""
+        try:
+            result = await self._run_git_async(working_dir, self._commit_graph_args(limit, branch), timeout=30)
+            if result.returncode != 0:
+                logger.warning(f"Failed to get commit graph: {result.stderr}")
+                return []
+            return self._parse_commit_graph(result.stdout)
         except Exception as e:
             logger.error(f"Error getting commit graph: {e}")
             return []
 
+    @staticmethod
+    def _commit_graph_args(limit: int, branch: Optional[str]) -> List[str]:
+        return [
+            "log",
+            f"--format={COMMIT_FORMAT}",
+            f"-{limit}",
+            "--all" if not branch else branch
+        ]
+
+    @staticmethod
+    def _parse_commit_graph(output: str) -> List[Dict[str, Any]]:
+        """Parse `git log --format=COMMIT_FORMAT` output into commit dicts"""
+        commits = []
+        for line in output.strip().split("\n"):
+            if not line:
+                continue
+
+            parts = line.split("|", 7)
+            if len(parts) < 6:
+                continue
+
+            sha = parts[0]
+            short_sha = parts[1]
+            message = parts[2]
+            author = parts[3]
+            author_email = parts[4]
+            timestamp = parts[5]
+            parents = parts[6].split() if len(parts) > 6 and parts[6] else []
+            refs_str = parts[7] if len(parts) > 7 else ""
+
+            # Parse refs
+            refs = []
+            if refs_str:
+                for ref in refs_str.split(", "):
+                    ref = ref.strip()
+                    if ref:
+                        refs.append(ref)
+
+            commits.append({
+                "sha": sha,
+                "short_sha": short_sha,
+                "message": message,
+                "author": author,
+                "author_email": author_email,
+                "timestamp": timestamp,
+                "parents": parents,
+                "refs": refs
+            })
+
+        return commits
+
     def get_status(self, working_dir: str) -> Dict[str, Any]:
         """
         Get repository status.
@@ -601,20 +1003,7 @@ class GitService:
             - behind: Commits behind upstream
             - conflicts: List of files with merge conflicts
         """
-        status = {
-            "is_git_repo": False,
-            "current_branch": None,
-            "is_detached": False,
-            "head_commit": None,
-            "remote_url": None,
-            "is_clean": True,
-            "staged": [],
-            "modified": [],
-            "untracked": [],
-            "ahead": 0,
-            "behind": 0,
-            "conflicts": []
-        }
+        status = self._empty_status()
 
         if not self.is_git_repo(working_dir):
             return status
@@ -626,11 +1015,7 @@ class GitService:
             # Get current branch and HEAD
             result = self._run_git(working_dir, ["rev-parse", "--abbrev-ref", "HEAD"], timeout=5)
             if result.returncode == 0:
-                branch = result.stdout.strip()
-                if branch == "HEAD":
-                    status["is_detached"] = True
-                else:
-                    status["current_branch"] = branch
+                self._apply_branch(status, result.stdout)
 
             result = self._run_git(working_dir, ["rev-parse", "HEAD"], timeout=5)
             if result.returncode == 0:
@@ -644,53 +1029,146 @@ class GitService:
                     timeout=5
                 )
                 if result.returncode == 0:
-                    parts = result.stdout.strip().split()
-                    if len(parts) >= 2:
-                        status["ahead"] = int(parts[0])
-                        status["behind"] = int(parts[1])
+                    self._apply_ahead_behind(status, result.stdout)
 
             # Get file status using porcelain format
             result = self._run_git(working_dir, ["status", "--porcelain=v1"], timeout=10)
             if result.returncode == 0:
-                for line in result.stdout.split("\n"):
-                    if not line or len(line) < 3:
-                        continue
-
-                    index_status = line[0]
-                    worktree_status = line[1]
-                    filename = line[3:]
-
-                    # Check for conflicts (both sides modified)
-                    if index_status == "U" or worktree_status == "U":
-                        status["conflicts"].append(filename)
-                    elif index_status == "A" and worktree_status == "A":
-                        status["conflicts"].append(filename)
-                    elif index_status == "D" and worktree_status == "D":
-                        status["conflicts"].append(filename)
-                    # Staged changes
-                    elif index_status in ["A", "M", "D", "R", "C"]:
-                        status["staged"].append({
-                            "file": filename,
-                            "status": index_status
-                        })
-                    # Worktree changes (not staged)
-                    if worktree_status == "M":
-                        status["modified"].append(filename)
-                    elif worktree_status == "?":
-                        status["untracked"].append(filename)
-
-                status["is_clean"] = (
-                    not status["staged"] and
-                    not status["modified"] and
-                    not status["untracked"] and
-                    not status["conflicts"]
+                self._apply_porcelain(status, result.stdout)
+
+        except Exception as e:
+            logger.error(f"Error getting git status: {e}")
+
+        return status
+
+    async def get_status_async(self, working_dir: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get repository status without blocking the event loop (see get_status).
+
+        Cached until HEAD, the index or a ref changes, and for at most
+        git_status_cache_ttl_seconds since working tree edits don't touch
+        .git. Pass use_cache=False where a stale status is not acceptable.
+        """
+        if not use_cache:
+            return await self._load_status_async(working_dir)
+        return await self._cached(
+            "status", working_dir, (), lambda: self._load_status_async(working_dir),
+            ttl=settings.git_status_cache_ttl_seconds
+        )
+
+    async def _load_status_async(self, working_dir: str) -> Dict[str, Any]:
+        status = self._empty_status()
+
+        if not await self.is_git_repo_async(working_dir):
+            return status
+
+        status["is_git_repo"] = True
+
+        try:
+            # Independent reads run concurrently (within the per-repo limit).
+            # --no-optional-locks: polling must not take index.lock and make
+            # a git command run by an agent at the same time fail
+            remote_url, branch_result, head_result, porcelain_result = await asyncio.gather(
+                self.get_remote_url_async(working_dir),
+                self._run_git_async(working_dir, ["rev-parse", "--abbrev-ref", "HEAD"], timeout=5),
+                self._run_git_async(working_dir, ["rev-parse", "HEAD"], timeout=5),
+                self._run_git_async(working_dir, ["--no-optional-locks", "status", "--porcelain=v1"], timeout=10)
+            )
+            status["remote_url"] = remote_url
+
+            if branch_result.returncode == 0:
+                self._apply_branch(status, branch_result.stdout)
+            if head_result.returncode == 0:
+                status["head_commit"] = head_result.stdout.strip()[:12]
+
+            if status["current_branch"]:
+                result = await self._run_git_async(
+                    working_dir,
+                    ["rev-list", "--left-right", "--count", f"{status['current_branch']}...@{{upstream}}"],
+                    timeout=5
                 )
+                if result.returncode == 0:
+                    self._apply_ahead_behind(status, result.stdout)
+
+            if porcelain_result.returncode == 0:
+                self._apply_porcelain(status, porcelain_result.stdout)
 
         except Exception as e:
             logger.error(f"Error getting git status: {e}")
 
         return status
 
+    @staticmethod
+    def _empty_status() -> Dict[str, Any]:
+        return {
+            "is_git_repo": False,
+            "current_branch": None,
+            "is_detached": False,
+            "head_commit": None,
+            "remote_url": None,
+            "is_clean": True,
+            "staged": [],
+            "modified": [],
+            "untracked": [],
+            "ahead": 0,
+            "behind": 0,
+            "conflicts": []
+        }
+
+    @staticmethod
+    def _apply_branch(status: Dict[str, Any], output: str) -> None:
+        """Set current_branch / is_detached from `git rev-parse --abbrev-ref HEAD`"""
+        branch = output.strip()
+        if branch == "HEAD":
+            status["is_detached"] = True
+        else:
+            status["current_branch"] = branch
+
+    @staticmethod
+    def _apply_ahead_behind(status: Dict[str, Any], output: str) -> None:
+        """Set ahead/behind from `git rev-list --left-right --count`"""
+        parts = output.strip().split()
+        if len(parts) >= 2:
+            status["ahead"] = int(parts[0])
+            status["behind"] = int(parts[1])
+
+    @staticmethod
+    def _apply_porcelain(status: Dict[str, Any], output: str) -> None:
+        """Fill file lists and is_clean from `git status --porcelain=v1`"""
+        for line in output.split("\n"):
+            if not line or len(line) < 3:
+                continue
+
+            index_status = line[0]
+            worktree_status = line[1]
+            filename = line[3:]
+
+            # Check for conflicts (both sides modified)
+            if index_status == "U" or worktree_status == "U":
+                status["conflicts"].append(filename)
+            elif index_status == "A" and worktree_status == "A":
+                status["conflicts"].append(filename)
+            elif index_status == "D" and worktree_status == "D":
+                status["conflicts"].append(filename)
+            # Staged changes
+            elif index_status in ["A", "M", "D", "R", "C"]:
+                status["staged"].append({
+                    "file": filename,
+                    "status": index_status
+                })
+            # Worktree changes (not staged)
+            if worktree_status == "M":
+                status["modified"].append(filename)
+            elif worktree_status == "?":
+                status["untracked"].append(filename)
+
+        status["is_clean"] = (
+            not status["staged"] and
+            not status["modified"] and
+            not status["untracked"] and
+            not status["conflicts"]
+        )
+
 
 # Global instance
 git_service = GitService()
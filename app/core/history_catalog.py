@@ -0,0 +1,230 @@
+"""
+Chat history catalog
+
+The @-reference picker lists a project's chat transcripts with a title,
+preview and message count. Computing those used to read every *.jsonl file
+in the project directory on every request, including every keystroke of
+the search box.
+
+A catalog keeps that metadata per transcript, keyed by (size, mtime):
+- unchanged files are not opened
+- grown files whose already-read bytes are unchanged (fingerprints, see
+  jsonl_index) only have their appended lines summarized
+- new and rewritten files are summarized from the start; deleted files are
+  dropped
+
+The directory listing itself is reused for history_catalog_ttl_seconds, so
+a burst of searches only stats the directory once. Catalogs are cached in
+memory and persisted next to the session history indexes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core import jsonl_index, jsonl_parser
+
+logger = logging.getLogger(__name__)
+
+# Bump when summarize_entry output changes so stale catalogs are rebuilt
+CATALOG_VERSION = 1
+
+
+@dataclass
+class CatalogEntry:
+    """Cached metadata of one transcript"""
+    path: str
+    size: int = 0
+    mtime_ns: int = 0
+    offset: int = 0  # Summarized up to here (end of the last complete line)
+    head_hash: str = ""
+    tail_hash: str = ""
+    title: Optional[str] = None
+    preview: Optional[str] = None
+    message_count: int = 0
+
+    def to_item(self) -> Dict[str, Any]:
+        """Chat history item (see list_chat_history_sessions)"""
+        stem = Path(self.path).stem
+        return {
+            "name": self.title or f"Session {stem[:8]}...",
+            "type": "chat_history",
+            "path": self.path,
+            "sdk_session_id": stem,
+            "title": self.title,
+            "preview": self.preview,
+            "message_count": self.message_count,
+            "modified_at": datetime.fromtimestamp(self.mtime_ns / 1e9).isoformat(),
+            "size_bytes": self.size,
+        }
+
+
+class ChatHistoryCatalog:
+    """Metadata of the main session transcripts in one project directory"""
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = Path(project_dir)
+        self.entries: Dict[str, CatalogEntry] = {}
+        self.lock = threading.Lock()
+        self._listed_at = 0.0
+        self._loaded = False
+
+        # Metrics
+        self.files_summarized = 0
+        self.bytes_read = 0
+
+    @property
+    def _catalog_file(self) -> Path:
+        key = hashlib.sha1(str(self.project_dir).encode("utf-8")).hexdigest()
+        return jsonl_index.get_index_dir() / "catalogs" / f"{key}.json"
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not settings.history_index_persist:
+            return
+        try:
+            data = json.loads(self._catalog_file.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CATALOG_VERSION or data.get("project_dir") != str(self.project_dir):
+            return
+        try:
+            self.entries = {item["path"]: CatalogEntry(**item) for item in data["entries"]}
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Ignoring corrupt chat history catalog for {self.project_dir}: {e}")
+
+    def _persist(self) -> None:
+        if not settings.history_index_persist:
+            return
+        target = self._catalog_file
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "version": CATALOG_VERSION,
+                "project_dir": str(self.project_dir),
+                "entries": [asdict(entry) for entry in self.entries.values()],
+            }))
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.warning(f"Failed to persist chat history catalog for {self.project_dir}: {e}")
+
+    def _summarize(self, entry: CatalogEntry, st: os.stat_result) -> None:
+        """Bring one entry up to date with its file"""
+        with open(entry.path, "rb") as f:
+            reusable = bool(entry.offset) and st.st_size >= entry.offset and (
+                jsonl_index.fingerprints(f, entry.offset) == (entry.head_hash, entry.tail_hash)
+            )
+            summary = {"title": None, "preview": None, "message_count": 0}
+            start = 0
+            if reusable:
+                summary = {"title": entry.title, "preview": entry.preview, "message_count": entry.message_count}
+                start = entry.offset
+
+            offset = jsonl_index.read_entries(
+                f, start, lambda item, _offset: jsonl_parser.summarize_entry(summary, item), entry.path
+            )
+            entry.head_hash, entry.tail_hash = jsonl_index.fingerprints(f, offset)
+
+        self.files_summarized += 1
+        self.bytes_read += offset - start
+        entry.offset = offset
+        entry.size = st.st_size
+        entry.mtime_ns = st.st_mtime_ns
+        entry.title = summary["title"]
+        entry.preview = summary["preview"]
+        entry.message_count = summary["message_count"]
+
+    def refresh(self, force: bool = False) -> None:
+        """Rescan the directory (at most once per TTL unless forced)"""
+        with self.lock:
+            if not self._loaded:
+                self._load()
+            if not force and time.monotonic() - self._listed_at < settings.history_catalog_ttl_seconds:
+                return
+
+            changed = False
+            seen = set()
+            try:
+                listing = list(os.scandir(self.project_dir))
+            except OSError:
+                listing = []
+
+            for dir_entry in listing:
+                # Skip agent files (subagent logs)
+                if not dir_entry.name.endswith(".jsonl") or dir_entry.name.startswith("agent-"):
+                    continue
+                path = dir_entry.path
+                seen.add(path)
+                try:
+                    st = dir_entry.stat()
+                    entry = self.entries.get(path)
+                    if entry and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+                        continue
+                    entry = entry or CatalogEntry(path=path)
+                    self._summarize(entry, st)
+                    self.entries[path] = entry
+                    changed = True
+                except Exception as e:
+                    logger.warning(f"Failed to process {path}: {e}")
+
+            for path in list(self.entries):
+                if path not in seen:
+                    del self.entries[path]
+                    changed = True
+
+            self._listed_at = time.monotonic()
+            if changed:
+                self._persist()
+
+    def list_sessions(self, search: str = "", limit: int = 50) -> List[Dict[str, Any]]:
+        """Chat history items, newest first, filtered by title/preview"""
+        self.refresh()
+        search_lower = search.lower() if search else ""
+        with self.lock:
+            entries = list(self.entries.values())
+
+        if search_lower:
+            entries = [
+                entry for entry in entries
+                if (entry.title and search_lower in entry.title.lower())
+                or (entry.preview and search_lower in entry.preview.lower())
+            ]
+        # Sort by modified time, newest first
+        entries.sort(key=lambda entry: entry.mtime_ns, reverse=True)
+        return [entry.to_item() for entry in entries[:limit]]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "files_summarized": self.files_summarized,
+            "bytes_read": self.bytes_read,
+        }
+
+
+_catalogs: Dict[str, ChatHistoryCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(project_dir: Path) -> ChatHistoryCatalog:
+    """The catalog of a project directory (created on first use)"""
+    key = str(project_dir)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = ChatHistoryCatalog(project_dir)
+        return catalog
+
+
+def clear_cache() -> None:
+    """Drop all in-memory catalogs (persisted catalogs are kept)"""
+    with _catalogs_lock:
+        _catalogs.clear()
@@ -0,0 +1,450 @@
+"""
+Incremental session history index
+
+Opening a session used to re-read and re-parse its whole JSONL transcript
+(plus every agent-*.jsonl file) on every load. This module keeps the parsed
+state of each transcript - messages, the byte offset of each message's line
+and running token totals (see jsonl_parser.HistoryParser) - together with
+the byte offset parsing stopped at.
+
+On load the file is stat()ed:
+- same size and mtime: the cached state is used as is
+- grown, and the bytes before the old offset are unchanged (head and tail
+  fingerprints): only the appended lines are parsed
+- anything else (rewind, rewrite, truncation): the file is parsed again
+
+Parsed state is cached in memory (LRU). What survives restarts is an
+append-only sidecar under settings.history_index_dir: one record per
+parse, holding the offsets of the new message lines, the fingerprints and
+the running token totals. Message bodies are not stored; after a restart
+they are rebuilt by re-reading only the recorded lines, and token totals
+are served from the sidecar without touching the transcript. Agent
+histories are cached in memory by (size, mtime).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core import jsonl_parser
+
+logger = logging.getLogger(__name__)
+
+# Bump when HistoryParser output or state changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+# Entry types whose lines make up messages or token totals (see HistoryParser.feed)
+MESSAGE_ENTRY_TYPES = ("user", "assistant", "system")
+
+# HistoryParser fields holding the running token totals
+TOTALS_FIELDS = ("total_input_tokens", "total_output_tokens", "model", "last_usage")
+
+# Bytes hashed at the start and just before the indexed offset
+FINGERPRINT_BYTES = 4096
+
+
+@dataclass
+class SessionIndex:
+    """Parsed state of one JSONL transcript"""
+    path: str
+    size: int = 0
+    mtime_ns: int = 0
+    offset: int = 0  # Parsed up to here (end of the last complete line)
+    head_hash: str = ""
+    tail_hash: str = ""
+    # Byte offsets of the lines the messages and totals come from
+    entry_offsets: List[int] = field(default_factory=list)
+    totals: Dict[str, Any] = field(default_factory=dict)
+    # Built from entry_offsets when messages are first needed
+    parser: Optional[jsonl_parser.HistoryParser] = None
+    # entry_offsets[:persisted] are in the sidecar (-1: rewrite it)
+    persisted: int = -1
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self) -> Dict[str, Any]:
+        """Sidecar record for the entries parsed since the last one"""
+        return {
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "offset": self.offset,
+            "head_hash": self.head_hash,
+            "tail_hash": self.tail_hash,
+            "entries": self.entry_offsets[max(0, self.persisted):],
+            "totals": self.totals,
+        }
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        """Replay one sidecar record"""
+        self.size = record["size"]
+        self.mtime_ns = record["mtime_ns"]
+        self.offset = record["offset"]
+        self.head_hash = record["head_hash"]
+        self.tail_hash = record["tail_hash"]
+        self.entry_offsets.extend(record["entries"])
+        self.totals = record["totals"]
+
+
+_cache: "OrderedDict[str, SessionIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+_agent_cache: "OrderedDict[str, Tuple[int, int, List[Dict[str, Any]]]]" = OrderedDict()
+
+# Metrics
+stats = {"hits": 0, "appends": 0, "rebuilds": 0, "bytes_parsed": 0}
+
+
+def get_index_dir() -> Path:
+    """Directory holding persisted session indexes"""
+    return settings.history_index_dir
+
+
+def _index_file(path: str) -> Path:
+    key = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return get_index_dir() / f"{key}.idx"
+
+
+def fingerprints(f, offset: int) -> Tuple[str, str]:
+    """Hashes of the first and last FINGERPRINT_BYTES before offset"""
+    head_len = min(offset, FINGERPRINT_BYTES)
+    f.seek(0)
+    head = hashlib.sha1(f.read(head_len)).hexdigest()
+    tail_start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(tail_start)
+    tail = hashlib.sha1(f.read(offset - tail_start)).hexdigest()
+    return head, tail
+
+
+def read_entries(f, offset: int, on_entry: Callable[[Dict[str, Any], int], None], path: str = "") -> int:
+    """
+    Feed the JSONL entries of complete lines from offset on to on_entry(entry, line_offset).
+
+    f is a binary file. An unterminated last line is only taken if it is
+    already complete JSON. Returns the offset parsing stopped at.
+    """
+    f.seek(offset)
+    for line in f:
+        if not line.endswith(b"\n"):
+            # Unterminated last line: only take it if it is already complete JSON
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if isinstance(entry, dict):
+                on_entry(entry, offset)
+            offset += len(line)
+            break
+
+        stripped = line.strip()
+        if stripped:
+            try:
+                entry = json.loads(stripped)
+            except ValueError as e:
+                logger.warning(f"Failed to parse line at byte {offset} in {path}: {e}")
+                entry = None
+            if isinstance(entry, dict):
+                on_entry(entry, offset)
+        offset += len(line)
+    return offset
+
+
+def _parse_from(index: SessionIndex, f, parser: jsonl_parser.HistoryParser) -> int:
+    """Feed complete lines after index.offset to parser. Returns bytes consumed."""
+    def on_entry(entry: Dict[str, Any], line_offset: int) -> None:
+        if entry.get("type") in MESSAGE_ENTRY_TYPES:
+            index.entry_offsets.append(line_offset)
+        parser.feed(entry, line_offset)
+
+    offset = read_entries(f, index.offset, on_entry, index.path)
+    consumed = offset - index.offset
+    index.offset = offset
+    index.totals = {name: getattr(parser, name) for name in TOTALS_FIELDS}
+    return consumed
+
+
+def _build_parser(index: SessionIndex, f) -> jsonl_parser.HistoryParser:
+    """Rebuild the parsed messages by re-reading only the recorded lines"""
+    parser = jsonl_parser.HistoryParser()
+    for offset in index.entry_offsets:
+        f.seek(offset)
+        try:
+            entry = json.loads(f.readline())
+        except ValueError:
+            continue
+        if isinstance(entry, dict):
+            parser.feed(entry, offset)
+    return parser
+
+
+def _load_persisted(path: str) -> Optional[SessionIndex]:
+    try:
+        with open(_index_file(path), "rb") as f:
+            lines = f.read().split(b"\n")
+    except OSError:
+        return None
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        return None
+    if header.get("version") != INDEX_VERSION or header.get("path") != path:
+        return None
+
+    index = SessionIndex(path=path)
+    records = 0
+    corrupt = False
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            index.apply(json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            # A torn last record from a crash mid-append: keep what came before
+            logger.warning(f"Ignoring corrupt session index record for {path}: {e}")
+            corrupt = True
+            break
+        records += 1
+    if not records:
+        return None
+    # Rewrite a corrupt sidecar on the next parse rather than appending after it
+    index.persisted = -1 if corrupt else len(index.entry_offsets)
+    return index
+
+
+def _persist(index: SessionIndex) -> None:
+    """Append the newly parsed entries to the sidecar, or rewrite it after a rebuild"""
+    if not settings.history_index_persist:
+        return
+    target = _index_file(index.path)
+    record = (json.dumps(index.record()) + "\n").encode("utf-8")
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if index.persisted < 0:
+            tmp = target.with_suffix(".tmp")
+            header = (json.dumps({"version": INDEX_VERSION, "path": index.path}) + "\n").encode("utf-8")
+            tmp.write_bytes(header + record)
+            os.replace(tmp, target)
+        else:
+            with open(target, "ab") as f:
+                f.write(record)
+        index.persisted = len(index.entry_offsets)
+    except OSError as e:
+        index.persisted = -1
+        logger.warning(f"Failed to persist session index for {index.path}: {e}")
+
+
+def _get_cached(path: str) -> SessionIndex:
+    with _cache_lock:
+        index = _cache.get(path)
+        if index is not None:
+            _cache.move_to_end(path)
+            return index
+
+    index = (_load_persisted(path) if settings.history_index_persist else None) or SessionIndex(path=path)
+
+    with _cache_lock:
+        # Another thread may have loaded it meanwhile
+        existing = _cache.get(path)
+        if existing is not None:
+            return existing
+        _cache[path] = index
+        while len(_cache) > max(1, settings.history_index_cache_size):
+            _cache.popitem(last=False)
+        return index
+
+
+def _refresh(index: SessionIndex, messages: bool = True) -> None:
+    """
+    Bring an index up to date with its file (caller holds index.lock).
+
+    With messages=False only the token totals need to be current, so an
+    index loaded from the sidecar does not rebuild its messages.
+    """
+    try:
+        st = os.stat(index.path)
+    except OSError:
+        index.offset = index.size = index.mtime_ns = 0
+        index.entry_offsets = []
+        index.totals = {}
+        index.parser = jsonl_parser.HistoryParser()
+        return
+
+    unchanged = st.st_size == index.size and st.st_mtime_ns == index.mtime_ns and index.offset
+    if unchanged:
+        stats["hits"] += 1
+        if not messages or index.parser is not None:
+            return
+
+    with open(index.path, "rb") as f:
+        if unchanged:
+            index.parser = _build_parser(index, f)
+            return
+
+        reusable = bool(index.offset) and st.st_size >= index.offset and (
+            fingerprints(f, index.offset) == (index.head_hash, index.tail_hash)
+        )
+        if reusable:
+            stats["appends"] += 1
+            if index.parser is None and messages:
+                index.parser = _build_parser(index, f)
+        else:
+            stats["rebuilds"] += 1
+            index.offset = 0
+            index.entry_offsets = []
+            index.parser = jsonl_parser.HistoryParser()
+            index.persisted = -1
+
+        # Without built messages, a parser seeded with the totals is enough
+        # to keep them running; its messages are thrown away
+        parser = index.parser or jsonl_parser.HistoryParser.from_state(index.totals)
+        consumed = _parse_from(index, f, parser)
+        stats["bytes_parsed"] += consumed
+        index.size = st.st_size
+        index.mtime_ns = st.st_mtime_ns
+        index.head_hash, index.tail_hash = fingerprints(f, index.offset)
+
+    if consumed or not reusable:
+        _persist(index)
+    logger.debug(f"Session index {index.path}: parsed {consumed} bytes, {len(index.entry_offsets)} message lines")
+
+
+def get_session_messages(
+    jsonl_path: Path,
+    agent_children: Optional[Callable[[str], Optional[List[Dict[str, Any]]]]] = None
+) -> List[Dict[str, Any]]:
+    """Messages of a session transcript (see HistoryParser.build_messages)"""
+    index = _get_cached(str(jsonl_path))
+    with index.lock:
+        _refresh(index)
+        return index.parser.build_messages(agent_children)
+
+
+def page_window(
+    total: int,
+    limit: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    around: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    [start, end) of a page of at most `limit` items out of `total`.
+
+    before/after/around are item positions: the page ends just before
+    `before`, starts just after `after`, or is centered on `around`.
+    Without a position the page holds the last `limit` items.
+    """
+    limit = max(1, limit)
+    if around is not None:
+        start = max(0, around - limit // 2)
+        end = min(total, start + limit)
+        start = max(0, end - limit)
+    elif before is not None:
+        end = max(0, min(before, total))
+        start = max(0, end - limit)
+    elif after is not None:
+        start = min(after + 1, total)
+        end = min(total, start + limit)
+    else:
+        end = total
+        start = max(0, end - limit)
+    return start, end
+
+
+def get_session_page(
+    jsonl_path: Path,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None,
+    agent_children: Optional[Callable[[str], Optional[List[Dict[str, Any]]]]] = None
+) -> Dict[str, Any]:
+    """
+    One page of a session transcript's messages.
+
+    before/after/around are message ids (see page_window). Raises
+    ValueError if a cursor does not match any message.
+    """
+    index = _get_cached(str(jsonl_path))
+    with index.lock:
+        _refresh(index)
+        parser = index.parser
+        positions = {}
+        for name, message_id in (("before", before), ("after", after), ("around", around)):
+            if message_id is None:
+                continue
+            position = parser.index_of(message_id)
+            if position is None:
+                raise ValueError(f"Unknown message cursor: {message_id}")
+            positions[name] = position
+
+        total = len(parser.messages)
+        start, end = page_window(total, limit, **positions)
+        messages = parser.build_messages(agent_children, start, end)
+
+    return {
+        "messages": messages,
+        "total": total,
+        "has_more_before": start > 0,
+        "has_more_after": end < total,
+        "before_cursor": messages[0].get("id") if messages else None,
+        "after_cursor": messages[-1].get("id") if messages else None,
+    }
+
+
+def get_session_usage(jsonl_path: Path) -> Dict[str, Any]:
+    """Token totals of a session transcript (see HistoryParser.get_usage)"""
+    index = _get_cached(str(jsonl_path))
+    with index.lock:
+        _refresh(index, messages=False)
+        return jsonl_parser.HistoryParser.from_state(index.totals).get_usage()
+
+
+def get_agent_history(agent_path: Path) -> List[Dict[str, Any]]:
+    """Parsed agent history (see jsonl_parser.parse_agent_history), cached by size and mtime"""
+    path = str(agent_path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+
+    with _cache_lock:
+        cached = _agent_cache.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            _agent_cache.move_to_end(path)
+            return cached[2]
+
+    children = jsonl_parser.parse_agent_history(agent_path)
+    with _cache_lock:
+        _agent_cache[path] = (st.st_size, st.st_mtime_ns, children)
+        while len(_agent_cache) > max(1, settings.history_index_cache_size) * 4:
+            _agent_cache.popitem(last=False)
+    return children
+
+
+def invalidate(jsonl_path: Path) -> None:
+    """Drop the in-memory and persisted index for one transcript"""
+    path = str(jsonl_path)
+    with _cache_lock:
+        _cache.pop(path, None)
+    try:
+        _index_file(path).unlink()
+    except OSError:
+        pass
+
+
+def clear_cache() -> None:
+    """Drop all in-memory indexes (persisted indexes are kept)"""
+    with _cache_lock:
+        _cache.clear()
+        _agent_cache.clear()
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _cache_lock:
+        cached = len(_cache)
+    return {**stats, "cached_sessions": cached}
@@ -21,7 +21,7 @@ Key fields that affect parsing:
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Generator
+from typing import List, Dict, Any, Optional, Generator, Callable
 from datetime import datetime
 
 from app.core.config import settings
@@ -346,353 +346,546 @@ def parse_agent_history(agent_path: Path) -> List[Dict[str, Any]]:
     return children
 
 
-def parse_session_history(
-    sdk_session_id: str,
-    working_dir: str = "/workspace"
-) -> List[Dict[str, Any]]:
+class HistoryParser:
     """
-    Parse a session's JSONL history file and return messages in streaming format.
+    Incremental session history parser.
 
-    This transforms the JSONL format to match the format used by live streaming,
-    ensuring visual consistency between resumed and live sessions.
+    Turns JSONL entries into messages in streaming format, one entry at a
+    time, so parsing can resume where it stopped when the file grows. All
+    state is JSON-serializable (see to_state/from_state); the session
+    history index (app/core/jsonl_index.py) persists the token totals and
+    rebuilds messages by feeding the recorded lines again.
 
-    Also parses associated agent JSONL files for Task tool calls and creates
-    subagent message groups.
-
-    Args:
-        sdk_session_id: The Claude SDK session ID
-        working_dir: The working directory for finding the project
-
-    Returns:
-        List of messages in the same format as WebSocket streaming events
-        Each message has: id, role, content, type, toolName, toolId, toolInput, metadata, streaming
+    Subagent children are not attached here; the Task result only records
+    the agentId, and build_messages() fills them in from the agent files
+    when the history is loaded.
     """
-    jsonl_path = get_session_jsonl_path(sdk_session_id, working_dir)
-    if not jsonl_path:
-        logger.warning(f"JSONL file not found for session {sdk_session_id}")
-        return []
 
-    logger.info(f"Parsing JSONL history from {jsonl_path}")
-
-    # Find all agent files for this session
-    agent_files = get_agent_jsonl_paths(sdk_session_id, working_dir)
-    agent_children_cache: Dict[str, List[Dict[str, Any]]] = {}
-
-    # Pre-parse all agent files
-    for agent_id, agent_path in agent_files.items():
-        agent_children_cache[agent_id] = parse_agent_history(agent_path)
-        logger.debug(f"Parsed {len(agent_children_cache[agent_id])} messages from agent {agent_id}")
-
-    messages: List[Dict[str, Any]] = []
-    msg_counter = 0
-
-    # Track tool names by ID for matching tool_result to tool_use
-    tool_names_by_id: Dict[str, str] = {}
-
-    # Track Task tool uses that have been converted to subagent messages
-    # Maps tool_use_id to agent info for matching with tool_result
-    task_tool_uses: Dict[str, Dict[str, Any]] = {}
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        # Byte offset of the JSONL line each message came from
+        self.offsets: List[int] = []
+        self.msg_counter = 0
+        # Track tool names by ID for matching tool_result to tool_use
+        self.tool_names_by_id: Dict[str, str] = {}
+        # Track Task tool uses that have been converted to subagent messages
+        # Maps tool_use_id to agent info for matching with tool_result
+        self.task_tool_uses: Dict[str, Dict[str, Any]] = {}
+        # First tool_use/subagent message index per tool id
+        self.tool_message_index: Dict[str, int] = {}
+        # Task tool_use_id -> agentId reported by its result
+        self.subagent_agent_ids: Dict[str, str] = {}
+        # Running token totals (see get_session_cost_from_jsonl)
+        self.total_input_tokens = 0
+        self.total_output_tokens = 0
+        self.model: Optional[str] = None
+        self.last_usage: Dict[str, Any] = {}
+        # Message id -> position, built on demand by index_of (not persisted)
+        self._positions_by_id: Dict[str, int] = {}
+        self._positions_indexed = 0
+
+    _STATE_FIELDS = (
+        "messages", "offsets", "msg_counter", "tool_names_by_id", "task_tool_uses",
+        "tool_message_index", "subagent_agent_ids", "total_input_tokens",
+        "total_output_tokens", "model", "last_usage",
+    )
 
-    for entry in parse_jsonl_file(jsonl_path):
+    def to_state(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._STATE_FIELDS}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "HistoryParser":
+        parser = cls()
+        for name in cls._STATE_FIELDS:
+            if name in state:
+                setattr(parser, name, state[name])
+        return parser
+
+    def _add(self, message: Dict[str, Any], offset: int) -> None:
+        if message.get("type") in ("tool_use", "subagent") and message.get("toolId"):
+            self.tool_message_index.setdefault(message["toolId"], len(self.messages))
+        self.messages.append(message)
+        self.offsets.append(offset)
+
+    def _find_tool_message(self, tool_id: Optional[str], msg_type: str) -> Optional[Dict[str, Any]]:
+        index = self.tool_message_index.get(tool_id) if tool_id else None
+        if index is None:
+            return None
+        message = self.messages[index]
+        return message if message.get("type") == msg_type else None
+
+    def get_usage(self) -> Dict[str, Any]:
+        """Token totals in the get_session_cost_from_jsonl format"""
+        # Cache tokens from final message represent current cache state
+        # For context window calculation, we need last turn's input tokens (not cumulative)
+        return {
+            "total_tokens_in": self.total_input_tokens,
+            "total_tokens_out": self.total_output_tokens,
+            "cache_creation_tokens": self.last_usage.get("cache_creation_input_tokens", 0),
+            "cache_read_tokens": self.last_usage.get("cache_read_input_tokens", 0),
+            # Last turn's input tokens for context calculation
+            "last_input_tokens": self.last_usage.get("input_tokens", 0),
+            "model": self.model
+        }
+
+    def feed(self, entry: Dict[str, Any], offset: int = 0) -> None:
+        """Process one JSONL entry (offset is the byte offset of its line)"""
         entry_type = entry.get("type")
 
+        # Usage counts every assistant entry, including meta/sidechain ones
+        if entry_type == "assistant":
+            self._record_usage(entry.get("message", {}))
+
         # Skip non-message entries
         if entry_type in ("queue-operation", "file-history-snapshot"):
-            continue
+            return
 
         # Skip meta messages (slash commands, system prompts, etc.)
         if entry.get("isMeta"):
-            continue
+            return
 
         # Skip sidechain messages (alternate conversation branches)
         if entry.get("isSidechain"):
-            continue
+            return
 
         message_data = entry.get("message", {})
         role = message_data.get("role")
         content = message_data.get("content")
         timestamp = entry.get("timestamp")
-        uuid = entry.get("uuid", f"msg-{msg_counter}")
+        uuid = entry.get("uuid", f"msg-{self.msg_counter}")
 
         # Handle system messages (e.g., compact_boundary)
         if entry_type == "system":
-            subtype = entry.get("subtype")
-            system_content = entry.get("content", "")
-            msg_counter += 1
-
-            messages.append({
+            self.msg_counter += 1
+            self._add({
                 "id": uuid,
                 "role": "system",
-                "content": system_content,
+                "content": entry.get("content", ""),
                 "type": "system",
-                "subtype": subtype,
+                "subtype": entry.get("subtype"),
                 "metadata": {
                     "timestamp": timestamp,
                     "compactMetadata": entry.get("compactMetadata")
                 },
                 "streaming": False
-            })
-            continue
-
-        if entry_type == "user" and role == "user":
-            # User message - can be plain text, tool results, or array with text blocks
-            if isinstance(content, str):
-                # Check for local command output (e.g., /context, /compact)
-                local_output = _extract_local_command_output(content)
-                if local_output is not None:
-                    msg_counter += 1
-                    messages.append({
-                        "id": uuid,
-                        "role": "system",
-                        "content": local_output,
-                        "type": "system",
-                        "subtype": "local_command",
-                        "metadata": {"timestamp": timestamp},
+            }, offset)
+        elif entry_type == "user" and role == "user":
+            self._feed_user(entry, content, uuid, timestamp, offset)
+        elif entry_type == "assistant" and role == "assistant":
+            self._feed_assistant(message_data, content, uuid, timestamp, offset)
+
+    def _record_usage(self, message_data: Dict[str, Any]) -> None:
+        usage = message_data.get("usage", {})
+        if not self.model:
+            self.model = message_data.get("model")
+        # Sum up input/output tokens (these are incremental per turn)
+        self.total_input_tokens += usage.get("input_tokens", 0)
+        self.total_output_tokens += usage.get("output_tokens", 0)
+        # Keep track of latest usage for cache tokens
+        if usage:
+            self.last_usage = usage
+
+    def _feed_user(self, entry: Dict[str, Any], content: Any, uuid: str, timestamp: Any, offset: int) -> None:
+        # User message - can be plain text, tool results, or array with text blocks
+        if isinstance(content, str):
+            # Check for local command output (e.g., /context, /compact)
+            local_output = _extract_local_command_output(content)
+            if local_output is not None:
+                self.msg_counter += 1
+                self._add({
+                    "id": uuid,
+                    "role": "system",
+                    "content": local_output,
+                    "type": "system",
+                    "subtype": "local_command",
+                    "metadata": {"timestamp": timestamp},
+                    "streaming": False
+                }, offset)
+            # Plain user message - skip empty content and system/command-related messages
+            elif content and not _is_system_content(content):
+                self.msg_counter += 1
+                self._add({
+                    "id": uuid,
+                    "role": "user",
+                    "content": content,
+                    "type": None,
+                    "metadata": {"timestamp": timestamp},
+                    "streaming": False
+                }, offset)
+            return
+
+        if not isinstance(content, list):
+            return
+
+        # Array content - could be tool results or text blocks
+        text_parts = []
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "tool_result":
+                self.msg_counter += 1
+                self._feed_tool_result(entry, block, uuid, timestamp, offset)
+            elif block.get("type") == "text":
+                # Text block in user content array
+                text = block.get("text", "")
+                if text and not _is_system_content(text):
+                    text_parts.append(text)
+
+        # If we collected text blocks, create a single user message
+        if text_parts:
+            self.msg_counter += 1
+            self._add({
+                "id": uuid,
+                "role": "user",
+                "content": "\n".join(text_parts),
+                "type": None,
+                "metadata": {"timestamp": timestamp},
+                "streaming": False
+            }, offset)
+
+    def _feed_tool_result(
+        self,
+        entry: Dict[str, Any],
+        block: Dict[str, Any],
+        uuid: str,
+        timestamp: Any,
+        offset: int
+    ) -> None:
+        tool_result = entry.get("toolUseResult")
+        raw_content = block.get("content", "")
+        is_error = block.get("is_error", False)
+        tool_use_id = block.get("tool_use_id")
+
+        # Handle content that can be string or list of content blocks
+        # Some tool results have content as [{'type': 'text', 'text': '...'}]
+        if isinstance(raw_content, list):
+            output = extract_text_from_content(raw_content)
+        else:
+            output = raw_content if isinstance(raw_content, str) else ""
+
+        # Get output from toolUseResult if available
+        # toolUseResult can have different formats depending on the tool:
+        # - Bash: {"stdout": "...", "stderr": "...", "is_error": bool}
+        # - Read: {"type": "text", "file": {"filePath": "...", "content": "..."}}
+        # - Other tools: may be a string directly
+        if tool_result and isinstance(tool_result, dict):
+            # Handle Bash-style results with stdout/stderr
+            if "stdout" in tool_result or "stderr" in tool_result:
+                stdout = tool_result.get("stdout", "")
+                stderr = tool_result.get("stderr", "")
+                output = stdout
+                if stderr:
+                    output = f"{stdout}\n{stderr}" if stdout else stderr
+                is_error = is_error or tool_result.get("is_error", False)
+            # Handle Read-style results with file content
+            elif tool_result.get("type") == "text" and "file" in tool_result:
+                file_info = tool_result.get("file", {})
+                file_content = file_info.get("content", "")
+                file_path = file_info.get("filePath", "")
+                # Truncate file content early - images/large files can be huge
+                file_content = _truncate_for_display(file_content)
+                # Format like the streaming version does
+                if file_path and file_content:
+                    output = f"File: {file_path}\n{file_content}"
+                elif file_content:
+                    output = file_content
+            # Handle other dict-based results
+            elif tool_result.get("content"):
+                tr_content = tool_result.get("content", "")
+                # Content can be string or list of content blocks
+                if isinstance(tr_content, list):
+                    output = _truncate_for_display(extract_text_from_content(tr_content))
+                elif isinstance(tr_content, str):
+                    output = _truncate_for_display(tr_content)
+                else:
+                    output = _truncate_for_display(str(tr_content))
+            elif tool_result.get("result"):
+                output = _truncate_for_display(str(tool_result.get("result", "")))
+        elif tool_result and isinstance(tool_result, str):
+            # Sometimes toolUseResult is just a string (error messages)
+            output = _truncate_for_display(tool_result)
+
+        # Check if this is a result for a Task tool (subagent)
+        if tool_use_id in self.task_tool_uses:
+            # Extract agentId from toolUseResult if available
+            agent_id = tool_result.get("agentId") if isinstance(tool_result, dict) else None
+
+            # Update the existing subagent message
+            msg = self._find_tool_message(tool_use_id, "subagent")
+            if msg is not None:
+                msg["content"] = output[:2000] if output else ""
+                msg["agentStatus"] = "error" if is_error else "completed"
+                if agent_id:
+                    self.subagent_agent_ids[tool_use_id] = agent_id
+
+            # Don't add a separate tool_result message for Task tools
+            return
+
+        # Group tool result with its corresponding tool_use message
+        msg = self._find_tool_message(tool_use_id, "tool_use")
+        if msg is not None:
+            msg["toolResult"] = output[:2000] if output else ""
+            msg["toolStatus"] = "error" if is_error else "complete"
+            return
+
+        # Only create separate tool_result if no matching tool_use found
+        self._add({
+            "id": f"result-{uuid}-{tool_use_id}",
+            "role": "assistant",  # Display as assistant for UI consistency
+            "content": output[:2000] if output else "",  # Truncate like streaming
+            "type": "tool_result",
+            "toolId": tool_use_id,
+            "toolName": self.tool_names_by_id.get(tool_use_id),  # Match to tool_use
+            "metadata": {
+                "timestamp": timestamp,
+                "is_error": is_error
+            },
+            "streaming": False
+        }, offset)
+
+    def _feed_assistant(
+        self,
+        message_data: Dict[str, Any],
+        content: Any,
+        uuid: str,
+        timestamp: Any,
+        offset: int
+    ) -> None:
+        # Assistant message - contains text blocks and tool use blocks
+        if isinstance(content, str) and content:
+            # Plain string content (less common)
+            self.msg_counter += 1
+            self._add({
+                "id": f"text-{uuid}",
+                "role": "assistant",
+                "content": content,
+                "type": "text",
+                "metadata": {
+                    "timestamp": timestamp,
+                    "model": message_data.get("model")
+                },
+                "streaming": False
+            }, offset)
+            return
+
+        if not isinstance(content, list):
+            return
+
+        for block in content:
+            if not isinstance(block, dict):
+                continue
+            block_type = block.get("type")
+
+            if block_type == "text":
+                text = block.get("text", "")
+                if text:  # Only add non-empty text blocks
+                    self.msg_counter += 1
+                    self._add({
+                        "id": f"text-{uuid}-{self.msg_counter}",
+                        "role": "assistant",
+                        "content": text,
+                        "type": "text",
+                        "metadata": {
+                            "timestamp": timestamp,
+                            "model": message_data.get("model")
+                        },
                         "streaming": False
-                    })
-                # Plain user message - skip empty content and system/command-related messages
-                elif content and not _is_system_content(content):
-                    msg_counter += 1
-                    messages.append({
-                        "id": uuid,
-                        "role": "user",
-                        "content": content,
-                        "type": None,
+                    }, offset)
+
+            elif block_type == "tool_use":
+                self.msg_counter += 1
+                tool_id = block.get("id")
+                tool_name = block.get("name")
+                tool_input = block.get("input", {})
+
+                # Track tool name by ID for matching tool results
+                if tool_id and tool_name:
+                    self.tool_names_by_id[tool_id] = tool_name
+
+                # Check if this is a Task tool - create subagent message instead
+                if tool_name == "Task":
+                    agent_type = tool_input.get("subagent_type", "unknown")
+                    description = tool_input.get("description", "")
+                    prompt = tool_input.get("prompt", "")
+
+                    # Track this Task tool use for later matching with result
+                    self.task_tool_uses[tool_id] = {
+                        "agent_type": agent_type,
+                        "description": description,
+                        "prompt": prompt
+                    }
+
+                    # Placeholder subagent message; the agent id comes from the result
+                    self._add({
+                        "id": f"subagent-{tool_id}",
+                        "role": "assistant",
+                        "content": "",
+                        "type": "subagent",
+                        "toolId": tool_id,
+                        "toolInput": tool_input,
+                        "agentType": agent_type,
+                        "agentDescription": description,
+                        "agentPrompt": prompt,
+                        "agentStatus": "pending",  # Will be updated when we find the result
+                        "agentChildren": [],
                         "metadata": {"timestamp": timestamp},
                         "streaming": False
-                    })
-            elif isinstance(content, list):
-                # Array content - could be tool results or text blocks
-                has_text_content = False
-                text_parts = []
-
-                for block in content:
-                    if isinstance(block, dict):
-                        if block.get("type") == "tool_result":
-                            msg_counter += 1
-                            tool_result = entry.get("toolUseResult")
-                            raw_content = block.get("content", "")
-                            is_error = block.get("is_error", False)
-                            tool_use_id = block.get("tool_use_id")
-
-                            # Handle content that can be string or list of content blocks
-                            # Some tool results have content as [{'type': 'text', 'text': '...'}]
-                            if isinstance(raw_content, list):
-                                output = extract_text_from_content(raw_content)
-                            else:
-                                output = raw_content if isinstance(raw_content, str) else ""
-
-                            # Get output from toolUseResult if available
-                            # toolUseResult can have different formats depending on the tool:
-                            # - Bash: {"stdout": "...", "stderr": "...", "is_error": bool}
-                            # - Read: {"type": "text", "file": {"filePath": "...", "content": "..."}}
-                            # - Other tools: may be a string directly
-                            if tool_result and isinstance(tool_result, dict):
-                                # Handle Bash-style results with stdout/stderr
-                                if "stdout" in tool_result or "stderr" in tool_result:
-                                    stdout = tool_result.get("stdout", "")
-                                    stderr = tool_result.get("stderr", "")
-                                    output = stdout
-                                    if stderr:
-                                        output = f"{stdout}\n{stderr}" if stdout else stderr
-                                    is_error = is_error or tool_result.get("is_error", False)
-                                # Handle Read-style results with file content
-                                elif tool_result.get("type") == "text" and "file" in tool_result:
-                                    file_info = tool_result.get("file", {})
-                                    file_content = file_info.get("content", "")
-                                    file_path = file_info.get("filePath", "")
-                                    # Truncate file content early - images/large files can be huge
-                                    file_content = _truncate_for_display(file_content)
-                                    # Format like the streaming version does
-                                    if file_path and file_content:
-                                        output = f"File: {file_path}\n{file_content}"
-                                    elif file_content:
-                                        output = file_content
-                                # Handle other dict-based results
-                                elif tool_result.get("content"):
-                                    tr_content = tool_result.get("content", "")
-                                    # Content can be string or list of content blocks
-                                    if isinstance(tr_content, list):
-                                        output = _truncate_for_display(extract_text_from_content(tr_content))
-                                    elif isinstance(tr_content, str):
-                                        output = _truncate_for_display(tr_content)
-                                    else:
-                                        output = _truncate_for_display(str(tr_content))
-                                elif tool_result.get("result"):
-                                    output = _truncate_for_display(str(tool_result.get("result", "")))
-                            elif tool_result and isinstance(tool_result, str):
-                                # Sometimes toolUseResult is just a string (error messages)
-                                output = _truncate_for_display(tool_result)
-
-                            # Check if this is a result for a Task tool (subagent)
-                            if tool_use_id in task_tool_uses:
-                                # This is a subagent result - update the existing subagent message
-                                # task_info available for future extended metadata handling
-                                _task_info = task_tool_uses[tool_use_id]
-
-                                # Extract agentId from toolUseResult if available
-                                tool_use_result = entry.get("toolUseResult", {})
-                                agent_id = tool_use_result.get("agentId") if isinstance(tool_use_result, dict) else None
-
-                                # Find and update the subagent message
-                                for msg in messages:
-                                    if msg.get("type") == "subagent" and msg.get("toolId") == tool_use_id:
-                                        msg["content"] = output[:2000] if output else ""
-                                        msg["agentStatus"] = "error" if is_error else "completed"
-
-                                        # Use agentId from toolUseResult to find the right agent children
-                                        if agent_id and agent_id in agent_children_cache:
-                                            msg["agentId"] = agent_id
-                                            msg["agentChildren"] = agent_children_cache[agent_id]
-                                            # Clear from cache to avoid double-assignment
-                                            agent_children_cache[agent_id] = []
-                                        break
-
-                                # Don't add a separate tool_result message for Task tools
-                                continue
-
-                            # Group tool result with its corresponding tool_use message
-                            # Find the matching tool_use and embed the result
-                            found_tool_use = False
-                            for msg in messages:
-                                if msg.get("type") == "tool_use" and msg.get("toolId") == tool_use_id:
-                                    msg["toolResult"] = output[:2000] if output else ""
-                                    msg["toolStatus"] = "error" if is_error else "complete"
-                                    found_tool_use = True
-                                    break
-
-                            # Only create separate tool_result if no matching tool_use found
-                            if not found_tool_use:
-                                messages.append({
-                                    "id": f"result-{uuid}-{tool_use_id}",
-                                    "role": "assistant",  # Display as assistant for UI consistency
-                                    "content": output[:2000] if output else "",  # Truncate like streaming
-                                    "type": "tool_result",
-                                    "toolId": tool_use_id,
-                                    "toolName": tool_names_by_id.get(tool_use_id),  # Match to tool_use
-                                    "metadata": {
-                                        "timestamp": timestamp,
-                                        "is_error": is_error
-                                    },
-                                    "streaming": False
-                                })
-                        elif block.get("type") == "text":
-                            # Text block in user content array
-                            text = block.get("text", "")
-                            if text and not _is_system_content(text):
-                                has_text_content = True
-                                text_parts.append(text)
-
-                # If we collected text blocks, create a single user message
-                if has_text_content and text_parts:
-                    combined_text = "\n".join(text_parts)
-                    msg_counter += 1
-                    messages.append({
-                        "id": uuid,
-                        "role": "user",
-                        "content": combined_text,
-                        "type": None,
+                    }, offset)
+                else:
+                    self._add({
+                        "id": f"tool-{uuid}-{tool_id or self.msg_counter}",
+                        "role": "assistant",
+                        "content": "",
+                        "type": "tool_use",
+                        "toolName": tool_name,
+                        "toolId": tool_id,
+                        "toolInput": tool_input,
+                        "toolStatus": "running",  # Will be updated when result arrives
                         "metadata": {"timestamp": timestamp},
                         "streaming": False
-                    })
+                    }, offset)
+
+    def build_messages(
+        self,
+        agent_children: Optional[Callable[[str], Optional[List[Dict[str, Any]]]]] = None,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Copy of the parsed messages[start:end] with subagent children attached.
+
+        agent_children(agent_id) returns the parsed agent history, or None if
+        the session has no such agent file. Each agent's children are
+        attached to the first subagent message that reported it, so agent
+        files are only read for agents reported within the slice.
+        """
+        messages = [dict(message) for message in self.messages[start:end]]
+        if not agent_children or not self.subagent_agent_ids:
+            return messages
+
+        # First subagent message index per agent id
+        first_index: Dict[str, int] = {}
+        for tool_id, agent_id in self.subagent_agent_ids.items():
+            index = self.tool_message_index.get(tool_id)
+            if index is not None and index < first_index.get(agent_id, len(self.messages)):
+                first_index[agent_id] = index
+
+        for position, message in enumerate(messages, start=start):
+            if message.get("type") != "subagent":
+                continue
+            agent_id = self.subagent_agent_ids.get(message.get("toolId"))
+            if not agent_id:
+                continue
+            children = agent_children(agent_id)
+            if children is None:
+                continue
+            message["agentId"] = agent_id
+            message["agentChildren"] = children if first_index.get(agent_id) == position else []
+        return messages
 
-        elif entry_type == "assistant" and role == "assistant":
-            # Assistant message - contains text blocks and tool use blocks
-            if isinstance(content, list):
-                for block in content:
-                    if isinstance(block, dict):
-                        block_type = block.get("type")
+    def index_of(self, message_id: str) -> Optional[int]:
+        """Position of the message with the given id, or None"""
+        # Messages are only ever appended, so the lookup is extended lazily
+        for index in range(self._positions_indexed, len(self.messages)):
+            self._positions_by_id.setdefault(self.messages[index].get("id"), index)
+        self._positions_indexed = len(self.messages)
+        return self._positions_by_id.get(message_id)
 
-                        if block_type == "text":
-                            text = block.get("text", "")
-                            if text:  # Only add non-empty text blocks
-                                msg_counter += 1
-                                messages.append({
-                                    "id": f"text-{uuid}-{msg_counter}",
-                                    "role": "assistant",
-                                    "content": text,
-                                    "type": "text",
-                                    "metadata": {
-                                        "timestamp": timestamp,
-                                        "model": message_data.get("model")
-                                    },
-                                    "streaming": False
-                                })
 
-                        elif block_type == "tool_use":
-                            msg_counter += 1
-                            tool_id = block.get("id")
-                            tool_name = block.get("name")
-                            tool_input = block.get("input", {})
+def parse_session_history(
+    sdk_session_id: str,
+    working_dir: str = "/workspace"
+) -> List[Dict[str, Any]]:
+    """
+    Parse a session's JSONL history file and return messages in streaming format.
 
-                            # Track tool name by ID for matching tool results
-                            if tool_id and tool_name:
-                                tool_names_by_id[tool_id] = tool_name
+    This transforms the JSONL format to match the format used by live streaming,
+    ensuring visual consistency between resumed and live sessions.
 
-                            # Check if this is a Task tool - create subagent message instead
-                            if tool_name == "Task":
-                                agent_type = tool_input.get("subagent_type", "unknown")
-                                description = tool_input.get("description", "")
-                                prompt = tool_input.get("prompt", "")
-
-                                # Track this Task tool use for later matching with result
-                                task_tool_uses[tool_id] = {
-                                    "agent_type": agent_type,
-                                    "description": description,
-                                    "prompt": prompt
-                                }
-
-                                # For now, we don't have the agent_id from tool_use alone
-                                # We'll need to match it from tool_result or find a pattern
-                                # Create a placeholder subagent message
-                                messages.append({
-                                    "id": f"subagent-{tool_id}",
-                                    "role": "assistant",
-                                    "content": "",
-                                    "type": "subagent",
-                                    "toolId": tool_id,
-                                    "toolInput": tool_input,
-                                    "agentType": agent_type,
-                                    "agentDescription": description,
-                                    "agentPrompt": prompt,
-                                    "agentStatus": "pending",  # Will be updated when we find the result
-                                    "agentChildren": [],
-                                    "metadata": {"timestamp": timestamp},
-                                    "streaming": False
-                                })
-                            else:
-                                messages.append({
-                                    "id": f"tool-{uuid}-{tool_id or msg_counter}",
-                                    "role": "assistant",
-                                    "content": "",
-                                    "type": "tool_use",
-                                    "toolName": tool_name,
-                                    "toolId": tool_id,
-                                    "toolInput": tool_input,
-                                    "toolStatus": "running",  # Will be updated when result arrives
-                                    "metadata": {"timestamp": timestamp},
-                                    "streaming": False
-                                })
+    Also parses associated agent JSONL files for Task tool calls and creates
+    subagent message groups.
 
-            elif isinstance(content, str) and content:
-                # Plain string content (less common)
-                msg_counter += 1
-                messages.append({
-                    "id": f"text-{uuid}",
-                    "role": "assistant",
-                    "content": content,
-                    "type": "text",
-                    "metadata": {
-                        "timestamp": timestamp,
-                        "model": message_data.get("model")
-                    },
-                    "streaming": False
-                })
+    Parsed state is kept in the session history index, so repeated loads
+    only parse lines appended since the last load.
+
+    Args:
+        sdk_session_id: The Claude SDK session ID
+        working_dir: The working directory for finding the project
+
+    Returns:
+        List of messages in the same format as WebSocket streaming events
+        Each message has: id, role, content, type, toolName, toolId, toolInput, metadata, streaming
+    """
+    from app.core import jsonl_index
+
+    jsonl_path = get_session_jsonl_path(sdk_session_id, working_dir)
+    if not jsonl_path:
+        logger.warning(f"JSONL file not found for session {sdk_session_id}")
+        return []
 
-    logger.info(f"Parsed {len(messages)} messages from JSONL history")
+    messages = jsonl_index.get_session_messages(
+        jsonl_path, _agent_children_loader(sdk_session_id, working_dir)
+    )
+    logger.debug(f"Loaded {len(messages)} messages from JSONL history {jsonl_path}")
     return messages
 
 
+def parse_session_history_page(
+    sdk_session_id: str,
+    working_dir: str = "/workspace",
+    limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse one page of a session's JSONL history.
+
+    Without a cursor the latest `limit` messages are returned. before/after
+    are message ids to page older/newer from, around centers the page on a
+    message (e.g. a search result). Only agent files of subagents within the
+    page are read.
+
+    Returns None if the JSONL file does not exist, otherwise a dict with
+    messages (streaming format, see parse_session_history), total,
+    has_more_before, has_more_after, before_cursor and after_cursor.
+    Raises ValueError if a cursor does not match any message.
+    """
+    from app.core import jsonl_index
+
+    jsonl_path = get_session_jsonl_path(sdk_session_id, working_dir)
+    if not jsonl_path:
+        logger.warning(f"JSONL file not found for session {sdk_session_id}")
+        return None
+
+    return jsonl_index.get_session_page(
+        jsonl_path, limit, before=before, after=after, around=around,
+        agent_children=_agent_children_loader(sdk_session_id, working_dir)
+    )
+
+
+def _agent_children_loader(
+    sdk_session_id: str,
+    working_dir: str
+) -> Callable[[str], Optional[List[Dict[str, Any]]]]:
+    """agent_children callback for HistoryParser.build_messages"""
+    from app.core import jsonl_index
+
+    agent_files: Optional[Dict[str, Path]] = None
+
+    def agent_children(agent_id: str) -> Optional[List[Dict[str, Any]]]:
+        nonlocal agent_files
+        if agent_files is None:
+            # Only look for agent files if the session used subagents
+            agent_files = get_agent_jsonl_paths(sdk_session_id, working_dir)
+        agent_path = agent_files.get(agent_id)
+        if agent_path is None:
+            return None
+        return jsonl_index.get_agent_history(agent_path)
+
+    return agent_children
+
+
 def get_session_cost_from_jsonl(
     sdk_session_id: str,
     working_dir: str = "/workspace"
@@ -701,7 +894,7 @@ def get_session_cost_from_jsonl(
     Extract cost/usage information from JSONL file.
 
     Note: JSONL files don't contain total cost, only per-message usage.
-    This extracts what we can find.
+    This extracts what we can find (from the session history index).
 
     Returns dict with:
     - total_tokens_in: Input tokens (not including cache tokens)
@@ -710,47 +903,13 @@ def get_session_cost_from_jsonl(
     - cache_read_tokens: Tokens read from cache (doesn't count toward context)
     - model: The model used
     """
+    from app.core import jsonl_index
+
     jsonl_path = get_session_jsonl_path(sdk_session_id, working_dir)
     if not jsonl_path:
         return {}
 
-    total_input_tokens = 0
-    total_output_tokens = 0
-    model = None
-
-    # Track the last usage data - for cache tokens we want the final state
-    last_usage = {}
-
-    for entry in parse_jsonl_file(jsonl_path):
-        if entry.get("type") == "assistant":
-            message_data = entry.get("message", {})
-            usage = message_data.get("usage", {})
-
-            # Get model
-            if not model:
-                model = message_data.get("model")
-
-            # Sum up input/output tokens (these are incremental per turn)
-            total_input_tokens += usage.get("input_tokens", 0)
-            total_output_tokens += usage.get("output_tokens", 0)
-
-            # Keep track of latest usage for cache tokens
-            if usage:
-                last_usage = usage
-
-    # Cache tokens from final message represent current cache state
-    # - cache_creation_input_tokens: take from last message (represents final cache size)
-    # - cache_read_input_tokens: take from last message (represents what was read last)
-    # For context window calculation, we need last turn's input tokens (not cumulative)
-    return {
-        "total_tokens_in": total_input_tokens,
-        "total_tokens_out": total_output_tokens,
-        "cache_creation_tokens": last_usage.get("cache_creation_input_tokens", 0),
-        "cache_read_tokens": last_usage.get("cache_read_input_tokens", 0),
-        # Last turn's input tokens for context calculation
-        "last_input_tokens": last_usage.get("input_tokens", 0),
-        "model": model
-    }
+    return jsonl_index.get_session_usage(jsonl_path)
 
 
 def list_available_sessions(working_dir: str = "/workspace") -> List[Dict[str, Any]]:
@@ -783,6 +942,64 @@ def list_available_sessions(working_dir: str = "/workspace") -> List[Dict[str, A
     return sessions
 
 
+def _truncate_words(text: str, length: int) -> str:
+    truncated = text[:length].strip()
+    if len(text) > length:
+        truncated = truncated.rsplit(' ', 1)[0] + "..."
+    return truncated
+
+
+def summarize_entry(summary: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """
+    Update a session summary (title, preview, message_count) with one JSONL entry.
+
+    The title is the first user message, the preview the first assistant
+    text. Summaries can be resumed when a transcript grows (see
+    app/core/history_catalog.py).
+    """
+    entry_type = entry.get("type")
+
+    # Skip non-message entries
+    if entry_type in ("queue-operation", "file-history-snapshot", "system"):
+        return
+
+    # Skip meta and sidechain messages
+    if entry.get("isMeta") or entry.get("isSidechain"):
+        return
+
+    message_data = entry.get("message", {})
+    role = message_data.get("role")
+    content = message_data.get("content")
+
+    if entry_type == "user" and role == "user":
+        if isinstance(content, str) and not _is_system_content(content):
+            summary["message_count"] += 1
+            if summary["title"] is None:
+                # First user message is the title
+                summary["title"] = _truncate_words(content, 100)
+        elif isinstance(content, list):
+            # Check for text blocks
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "text":
+                    text = block.get("text", "")
+                    if text and not _is_system_content(text):
+                        summary["message_count"] += 1
+                        if summary["title"] is None:
+                            summary["title"] = _truncate_words(text, 100)
+                        break
+
+    elif entry_type == "assistant" and role == "assistant":
+        summary["message_count"] += 1
+        # Get preview from first assistant response
+        if summary["preview"] is None and isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "text":
+                    text = block.get("text", "")
+                    if text:
+                        summary["preview"] = _truncate_words(text, 150)
+                        break
+
+
 def _get_session_title_and_preview(jsonl_path: Path) -> tuple[Optional[str], Optional[str], int]:
     """
     Extract session title (first user message) and preview from JSONL file.
@@ -790,64 +1007,15 @@ def _get_session_title_and_preview(jsonl_path: Path) -> tuple[Optional[str], Opt
     Returns:
         tuple of (title, preview, message_count)
     """
-    title = None
-    preview = None
-    message_count = 0
+    summary = {"title": None, "preview": None, "message_count": 0}
 
     try:
         for entry in parse_jsonl_file(jsonl_path):
-            entry_type = entry.get("type")
-
-            # Skip non-message entries
-            if entry_type in ("queue-operation", "file-history-snapshot", "system"):
-                continue
-
-            # Skip meta and sidechain messages
-            if entry.get("isMeta") or entry.get("isSidechain"):
-                continue
-
-            message_data = entry.get("message", {})
-            role = message_data.get("role")
-            content = message_data.get("content")
-
-            if entry_type == "user" and role == "user":
-                if isinstance(content, str) and not _is_system_content(content):
-                    message_count += 1
-                    if title is None:
-                        # First user message is the title
-                        title = content[:100].strip()
-                        if len(content) > 100:
-                            title = title.rsplit(' ', 1)[0] + "..."
-                elif isinstance(content, list):
-                    # Check for text blocks
-                    for block in content:
-                        if isinstance(block, dict) and block.get("type") == "text":
-                            text = block.get("text", "")
-                            if text and not _is_system_content(text):
-                                message_count += 1
-                                if title is None:
-                                    title = text[:100].strip()
-                                    if len(text) > 100:
-                                        title = title.rsplit(' ', 1)[0] + "..."
-                                break
-
-            elif entry_type == "assistant" and role == "assistant":
-                message_count += 1
-                # Get preview from first assistant response
-                if preview is None and isinstance(content, list):
-                    for block in content:
-                        if isinstance(block, dict) and block.get("type") == "text":
-                            text = block.get("text", "")
-                            if text:
-                                preview = text[:150].strip()
-                                if len(text) > 150:
-                                    preview = preview.rsplit(' ', 1)[0] + "..."
-                                break
-
+            summarize_entry(summary, entry)
     except Exception as e:
         logger.warning(f"Failed to extract title/preview from {jsonl_path}: {e}")
 
-    return title, preview, message_count
+    return summary["title"], summary["preview"], summary["message_count"]
 
 
 def list_chat_history_sessions(
@@ -859,6 +1027,8 @@ def list_chat_history_sessions(
     List chat history sessions with rich metadata for the @ reference UI.
 
     Filters out agent-*.jsonl files as they are subagent logs, not main sessions.
+    Titles and counts come from the project's cached history catalog, so
+    only new or changed transcripts are read.
 
     Args:
         working_dir: The project working directory
@@ -869,52 +1039,12 @@ def list_chat_history_sessions(
         List of session dicts with: name, path, title, preview, message_count,
         modified_at, size_bytes, type='chat_history'
     """
-    claude_projects_dir = settings.get_claude_projects_dir
-    project_dir_name = get_project_dir_name(working_dir)
-    project_dir = claude_projects_dir / project_dir_name
+    from app.core import history_catalog
 
-    sessions = []
-    search_lower = search.lower() if search else ""
+    claude_projects_dir = settings.get_claude_projects_dir
+    project_dir = claude_projects_dir / get_project_dir_name(working_dir)
 
     if not project_dir.exists():
-        return sessions
-
-    for jsonl_file in project_dir.glob("*.jsonl"):
-        try:
-            # Skip agent files (subagent logs)
-            if jsonl_file.name.startswith("agent-"):
-                continue
-
-            stat = jsonl_file.stat()
-            title, preview, message_count = _get_session_title_and_preview(jsonl_file)
-
-            # Apply search filter
-            if search_lower:
-                title_match = title and search_lower in title.lower()
-                preview_match = preview and search_lower in preview.lower()
-                if not title_match and not preview_match:
-                    continue
-
-            # Build display name
-            display_name = title or f"Session {jsonl_file.stem[:8]}..."
-
-            sessions.append({
-                "name": display_name,
-                "type": "chat_history",
-                "path": str(jsonl_file),
-                "sdk_session_id": jsonl_file.stem,
-                "title": title,
-                "preview": preview,
-                "message_count": message_count,
-                "modified_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "size_bytes": stat.st_size
-            })
-
-        except Exception as e:
-            logger.warning(f"Failed to process {jsonl_file}: {e}")
-
-    # Sort by modified time, newest first
-    sessions.sort(key=lambda x: x["modified_at"], reverse=True)
+        return []
 
-    # Apply limit
-    return sessions[:limit]
+    return history_catalog.get_catalog(project_dir).list_sessions(search=search, limit=limit)
@@ -2,15 +2,47 @@
 Knowledge Base Service
 
 Handles document processing, chunking, and context retrieval for RAG.
+
+Uploads are ingested as a stream: the file is read and decoded in blocks,
+split into paragraphs and chunks by generators, and stored with its chunks
+in one transaction (see ingest_document).
+
+Retrieval uses a per-project BM25 inverted index held in memory. An index is
+built from the project's chunks on first search, updated in place when
+documents are added or deleted through this module, and rebuilt if the
+project's knowledge revision changes underneath it (e.g. cascade deletes).
+Each chunk's term frequencies are also kept in an append-only file under
+settings.knowledge_index_dir, so after a restart the index is restored
+without tokenizing every chunk again.
+
+Projects can opt into "vector" or "hybrid" retrieval (ProjectSettings
+.knowledge_search_mode), which ranks with the local embedding index in
+app/core/knowledge_vectors.py. Hybrid blends normalized BM25 scores with
+cosine similarity. When the vector index is behind the BM25 index it is
+re-embedded in the process pool; searches meanwhile rank with the stale
+vectors, or with BM25 while there are none.
 """
 
+import asyncio
+import codecs
+import functools
+import heapq
+import io
+import json
 import logging
+import math
+import os
 import re
+import threading
 import uuid
+from collections import Counter
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO, Callable, Iterable, Iterator, Awaitable
 
-from app.db import database
+from app.core import knowledge_vectors
+from app.core.config import settings
+from app.db import database, async_database
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +68,27 @@ SUPPORTED_TYPES = {
 DEFAULT_CHUNK_SIZE = 800  # characters per chunk
 DEFAULT_CHUNK_OVERLAP = 100  # overlap between chunks
 
+# Bytes per read when streaming an upload
+READ_BLOCK_SIZE = 1024 * 1024
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+
+# BM25 parameters (standard Okapi defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Bump when tokenize() changes so persisted indexes are rebuilt
+INDEX_VERSION = 1
+
+# Words too common to be useful retrieval terms
+STOPWORDS = frozenset("""
+    a an and are as at be but by can could do does for from had has have how i if in
+    into is it its me my no not of on or our so than that the their them then there
+    these they this to was we were what when where which who why will with would you your
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+")
+
 
 def get_content_type(filename: str) -> str:
     """Get MIME type based on file extension"""
@@ -69,82 +122,299 @@ def extract_text_from_file(content: bytes, filename: str) -> str:
     return text
 
 
-def chunk_document(
-    content: str,
-    chunk_size: int = DEFAULT_CHUNK_SIZE,
-    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
-) -> List[Dict[str, Any]]:
+def iter_text(
+    fileobj: BinaryIO,
+    filename: str,
+    block_size: int = READ_BLOCK_SIZE,
+    max_size: Optional[int] = None,
+    on_read: Optional[Callable[[int], None]] = None
+) -> Iterator[str]:
     """
-    Split document content into chunks for retrieval.
+    Read and decode a binary file incrementally.
 
-    Uses paragraph-aware splitting to maintain context.
+    Decodes as UTF-8; from the first invalid byte on, the rest of the file
+    is decoded as latin-1 (see extract_text_from_file).
 
     Args:
-        content: The full document text
-        chunk_size: Target size for each chunk in characters
-        chunk_overlap: Number of characters to overlap between chunks
-
-    Returns:
-        List of chunk dicts with 'content' and 'metadata' keys
+        fileobj: Binary file-like object to read
+        filename: Name used in log messages
+        block_size: Bytes per read
+        max_size: Raise ValueError once more than this many bytes are read
+        on_read: Called with the total bytes read after each block
+
+    Yields:
+        Decoded text pieces
     """
-    if not content or not content.strip():
-        return []
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    fallback = False
+    total = 0
+
+    while True:
+        block = fileobj.read(block_size)
+        if not block:
+            break
+        total += len(block)
+        if max_size is not None and total > max_size:
+            raise ValueError(f"File too large. Maximum size is {max_size // (1024 * 1024)}MB")
+        if on_read:
+            on_read(total)
+
+        if fallback:
+            yield block.decode("latin-1")
+            continue
+        pending = decoder.getstate()[0]
+        try:
+            yield decoder.decode(block)
+        except UnicodeDecodeError as e:
+            logger.warning(f"File {filename} is not valid UTF-8, decoding the rest as latin-1")
+            data = pending + block
+            fallback = True
+            yield data[:e.start].decode("utf-8") + data[e.start:].decode("latin-1")
+
+    if not fallback:
+        try:
+            yield decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            yield decoder.getstate()[0].decode("latin-1")
 
-    # Split by paragraphs first (double newlines)
-    paragraphs = re.split(r'\n\s*\n', content)
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
 
-    chunks = []
-    current_chunk = ""
+def iter_paragraphs(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Split streamed text into stripped, non-empty paragraphs (blank-line
+    separated), without holding more than one paragraph in memory.
+    """
+    buffer = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        # Rescan from the whitespace run at the old end, in case a separator
+        # straddles the boundary
+        scan_from = len(buffer)
+        while scan_from > 0 and buffer[scan_from - 1].isspace():
+            scan_from -= 1
+        buffer += piece
+
+        last_end = 0
+        for match in _PARAGRAPH_BREAK_RE.finditer(buffer, scan_from):
+            para = buffer[last_end:match.start()].strip()
+            if para:
+                yield para
+            last_end = match.end()
+        if last_end:
+            buffer = buffer[last_end:]
+
+    para = buffer.strip()
+    if para:
+        yield para
+
+
+def iter_chunks(
+    paragraphs: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
+) -> Iterator[Dict[str, Any]]:
+    """
+    Group paragraphs into chunks (see chunk_document).
+
+    Yields chunk dicts with 'content' and 'metadata' keys as each chunk is
+    completed.
+    """
+    parts: List[str] = []
+    length = 0  # len("\n\n".join(parts))
     current_start = 0
     char_position = 0
 
     for para in paragraphs:
         # If adding this paragraph would exceed chunk size
-        if current_chunk and len(current_chunk) + len(para) + 2 > chunk_size:
-            # Save current chunk
-            chunks.append({
+        if parts and length + len(para) + 2 > chunk_size:
+            current_chunk = "\n\n".join(parts)
+            yield {
                 "content": current_chunk.strip(),
                 "metadata": {
                     "start_char": current_start,
                     "end_char": char_position
                 }
-            })
+            }
 
             # Start new chunk with overlap
-            if chunk_overlap > 0 and len(current_chunk) > chunk_overlap:
-                # Find a good break point for overlap
+            if chunk_overlap > 0 and length > chunk_overlap:
                 overlap_text = current_chunk[-chunk_overlap:]
                 # Try to break at word boundary
                 space_pos = overlap_text.find(" ")
                 if space_pos > 0:
                     overlap_text = overlap_text[space_pos + 1:]
-                current_chunk = overlap_text + "\n\n" + para
+                parts = [overlap_text, para]
+                length = len(overlap_text) + 2 + len(para)
                 current_start = char_position - len(overlap_text)
             else:
-                current_chunk = para
+                parts = [para]
+                length = len(para)
                 current_start = char_position
+        elif parts:
+            parts.append(para)
+            length += 2 + len(para)
         else:
-            # Add to current chunk
-            if current_chunk:
-                current_chunk += "\n\n" + para
-            else:
-                current_chunk = para
-                current_start = char_position
+            parts = [para]
+            length = len(para)
+            current_start = char_position
 
         char_position += len(para) + 2  # +2 for paragraph separator
 
     # Don't forget the last chunk
-    if current_chunk.strip():
-        chunks.append({
-            "content": current_chunk.strip(),
-            "metadata": {
-                "start_char": current_start,
-                "end_char": char_position
+    if parts:
+        content = "\n\n".join(parts).strip()
+        if content:
+            yield {
+                "content": content,
+                "metadata": {
+                    "start_char": current_start,
+                    "end_char": char_position
+                }
             }
-        })
 
-    return chunks
+
+def chunk_document(
+    content: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP
+) -> List[Dict[str, Any]]:
+    """
+    Split document content into chunks for retrieval.
+
+    Uses paragraph-aware splitting to maintain context.
+
+    Args:
+        content: The full document text
+        chunk_size: Target size for each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+
+    Returns:
+        List of chunk dicts with 'content' and 'metadata' keys
+    """
+    if not content or not content.strip():
+        return []
+    return list(iter_chunks(iter_paragraphs([content]), chunk_size, chunk_overlap))
+
+
+def ingest_document(
+    project_id: str,
+    filename: str,
+    fileobj: BinaryIO,
+    max_size: Optional[int] = None,
+    on_read: Optional[Callable[[int], None]] = None
+) -> Tuple[str, List[Dict[str, Any]], Optional[str], Optional[str]]:
+    """
+    Stream a file into the knowledge base (blocking).
+
+    Reads, decodes and chunks the file incrementally, then stores the
+    document and all its chunks in one transaction and updates the loaded
+    BM25 index.
+
+    Returns:
+        Tuple of (document_id, stored_chunks, previous_revision, revision)
+    """
+    document_id = str(uuid.uuid4())
+    text_parts: List[str] = []
+    bytes_read = [0]
+
+    def read_progress(total: int) -> None:
+        bytes_read[0] = total
+        if on_read:
+            on_read(total)
+
+    def collect(pieces: Iterable[str]) -> Iterator[str]:
+        for piece in pieces:
+            text_parts.append(piece)
+            yield piece
+
+    pieces = collect(iter_text(fileobj, filename, max_size=max_size, on_read=read_progress))
+    stored_chunks = [
+        {
+            "id": str(uuid.uuid4()),
+            "document_id": document_id,
+            "chunk_index": idx,
+            "content": chunk["content"],
+            "metadata": chunk["metadata"],
+            "filename": filename,
+        }
+        for idx, chunk in enumerate(iter_chunks(iter_paragraphs(pieces)))
+    ]
+
+    if not stored_chunks:
+        raise ValueError("Document is empty or could not be parsed")
+
+    previous_revision, revision = database.create_knowledge_document_with_chunks(
+        document_id=document_id,
+        project_id=project_id,
+        filename=filename,
+        content="".join(text_parts),
+        chunks=stored_chunks,
+        content_type=get_content_type(filename),
+        file_size=bytes_read[0]
+    )
+    _index_chunks(project_id, stored_chunks, previous_revision, revision)
+
+    logger.info(f"Processed document {filename}: {len(stored_chunks)} chunks, {bytes_read[0]} bytes")
+    return document_id, stored_chunks, previous_revision, revision
+
+
+async def process_document_stream(
+    project_id: str,
+    filename: str,
+    fileobj: BinaryIO,
+    max_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> Tuple[str, int]:
+    """
+    Process an uploaded document for the knowledge base from a file object.
+
+    Ingestion runs in a worker thread; on_progress is called on the event
+    loop with the number of bytes read so far.
+
+    Args:
+        project_id: The project to add the document to
+        filename: Original filename
+        fileobj: Binary file-like object with the document content
+        max_size: Maximum accepted size in bytes (ValueError if exceeded)
+        on_progress: Optional progress callback
+
+    Returns:
+        Tuple of (document_id, chunk_count)
+    """
+    loop = asyncio.get_running_loop()
+    on_read = None
+    if on_progress:
+        def on_read(total: int) -> None:
+            loop.call_soon_threadsafe(on_progress, total)
+
+    embed = await async_database.run_read(get_search_mode, project_id) != "bm25"
+    if embed:
+        # Searches in between must not start a full rebuild for these chunks
+        with _indexes_lock:
+            _pending_vector_adds[project_id] += 1
+    try:
+        document_id, stored_chunks, previous_revision, revision = await loop.run_in_executor(
+            None,
+            functools.partial(ingest_document, project_id, filename, fileobj, max_size, on_read)
+        )
+
+        if embed:
+            # Embed in the process pool, then append and save off the event loop
+            vectors = await knowledge_vectors.embed_texts_async(
+                [chunk["content"] for chunk in stored_chunks]
+            )
+            await loop.run_in_executor(
+                None,
+                functools.partial(_add_vectors, project_id, stored_chunks, vectors, previous_revision, revision)
+            )
+    finally:
+        if embed:
+            with _indexes_lock:
+                _pending_vector_adds[project_id] -= 1
+                if not _pending_vector_adds[project_id]:
+                    del _pending_vector_adds[project_id]
+
+    return document_id, len(stored_chunks)
 
 
 async def process_document(
@@ -163,44 +433,577 @@ async def process_document(
     Returns:
         Tuple of (document_id, chunk_count)
     """
-    # Extract text
-    text_content = extract_text_from_file(content, filename)
+    return await process_document_stream(project_id, filename, io.BytesIO(content))
 
-    if not text_content.strip():
-        raise ValueError("Document is empty or could not be parsed")
 
-    # Generate document ID
-    document_id = str(uuid.uuid4())
-    content_type = get_content_type(filename)
+async def process_documents_batch(
+    project_id: str,
+    files: List[Tuple[str, BinaryIO]],
+    max_size: Optional[int] = None,
+    concurrency: int = 4,
+    on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ingest many files concurrently.
 
-    # Chunk the document
-    chunks = chunk_document(text_content)
+    Args:
+        project_id: The project to add the documents to
+        files: (filename, binary file object) pairs
+        max_size: Maximum accepted size per file in bytes
+        concurrency: Files processed at the same time
+        on_event: Awaited, in order, with progress events: "started",
+            "progress" (bytes_read), "completed" (document_id, chunk_count)
+            and "failed" (error) for each file
 
-    # Save document to database
-    database.create_knowledge_document(
-        document_id=document_id,
-        project_id=project_id,
-        filename=filename,
-        content=text_content,
-        content_type=content_type,
-        file_size=len(content),
-        chunk_count=len(chunks)
-    )
+    Returns:
+        One result per file, in input order, with filename, status
+        ("completed" or "failed"), document_id, chunk_count and error
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(index: int, filename: str, status: str, **data: Any) -> None:
+        if on_event:
+            events.put_nowait({"index": index, "filename": filename, "status": status, **data})
+
+    async def drain() -> None:
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            try:
+                await on_event(event)
+            except Exception as e:
+                logger.warning(f"Knowledge batch progress callback failed: {e}")
+
+    async def ingest(index: int, filename: str, fileobj: BinaryIO) -> Dict[str, Any]:
+        result = {"filename": filename, "status": "failed", "document_id": None, "chunk_count": 0, "error": None}
+        async with semaphore:
+            emit(index, filename, "started")
+            try:
+                if not is_supported_file(filename):
+                    raise ValueError("Unsupported file type")
+                document_id, chunk_count = await process_document_stream(
+                    project_id,
+                    filename,
+                    fileobj,
+                    max_size=max_size,
+                    on_progress=lambda total: emit(index, filename, "progress", bytes_read=total)
+                )
+            except ValueError as e:
+                result["error"] = str(e)
+            except Exception as e:
+                logger.error(f"Failed to ingest {filename}: {e}")
+                result["error"] = f"Failed to process document: {e}"
+            else:
+                result.update(status="completed", document_id=document_id, chunk_count=chunk_count)
+
+        if result["status"] == "completed":
+            emit(index, filename, "completed", document_id=result["document_id"], chunk_count=result["chunk_count"])
+        else:
+            emit(index, filename, "failed", error=result["error"])
+        return result
+
+    drainer = asyncio.create_task(drain()) if on_event else None
+    try:
+        results = await asyncio.gather(
+            *(ingest(i, filename, fileobj) for i, (filename, fileobj) in enumerate(files))
+        )
+    finally:
+        if drainer:
+            events.put_nowait(None)
+            await drainer
+    return list(results)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
 
-    # Save chunks
-    for idx, chunk in enumerate(chunks):
-        chunk_id = str(uuid.uuid4())
-        database.create_knowledge_chunk(
-            chunk_id=chunk_id,
-            document_id=document_id,
-            chunk_index=idx,
-            content=chunk["content"],
-            metadata=chunk["metadata"]
+    Drops stopwords and single-character tokens. Also indexes the parts of
+    snake_case identifiers so "chunk_size" matches a query for "chunk".
+    """
+    if not text:
+        return []
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if "_" in token:
+            terms.extend(part for part in token.split("_") if len(part) > 1 and part not in STOPWORDS)
+            token = token.strip("_")
+        if len(token) > 1 and token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+class KnowledgeIndex:
+    """
+    BM25 inverted index over one project's knowledge chunks.
+
+    Postings map each term to {chunk_id: term frequency}; IDF and average
+    chunk length are computed from this project's chunks only. Not thread
+    safe on its own - callers hold `lock`.
+    """
+
+    def __init__(self, project_id: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.project_id = project_id
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        self.revision: Optional[str] = None
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.chunks: Dict[str, Dict[str, Any]] = {}
+        self.chunk_terms: Dict[str, Counter] = {}
+        self.chunk_lengths: Dict[str, int] = {}
+        self.document_chunks: Dict[str, List[str]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_chunk(self, chunk: Dict[str, Any], terms: Optional[Counter] = None) -> None:
+        """Index a chunk row (needs id, document_id and content; terms if already tokenized)"""
+        chunk_id = chunk["id"]
+        if chunk_id in self.chunks:
+            self.remove_chunk(chunk_id)
+
+        if terms is None:
+            terms = Counter(tokenize(chunk.get("content", "")))
+        self.chunks[chunk_id] = chunk
+        self.chunk_terms[chunk_id] = terms
+        self.chunk_lengths[chunk_id] = sum(terms.values())
+        self.document_chunks.setdefault(chunk["document_id"], []).append(chunk_id)
+        self.total_length += self.chunk_lengths[chunk_id]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+
+    def remove_chunk(self, chunk_id: str) -> None:
+        chunk = self.chunks.pop(chunk_id, None)
+        if chunk is None:
+            return
+        terms = self.chunk_terms.pop(chunk_id)
+        self.total_length -= self.chunk_lengths.pop(chunk_id)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+        siblings = self.document_chunks.get(chunk["document_id"])
+        if siblings is not None:
+            siblings.remove(chunk_id)
+            if not siblings:
+                del self.document_chunks[chunk["document_id"]]
+
+    def remove_document(self, document_id: str) -> int:
+        """Remove all chunks of a document. Returns the number removed."""
+        chunk_ids = list(self.document_chunks.get(document_id, []))
+        for chunk_id in chunk_ids:
+            self.remove_chunk(chunk_id)
+        return len(chunk_ids)
+
+    def idf(self, term: str) -> float:
+        """BM25 IDF (the +1 variant, never negative)"""
+        n = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - n + 0.5) / (n + 0.5))
+
+    def score(self, query: str) -> Dict[str, float]:
+        """BM25 score of every chunk containing at least one query term"""
+        if not self.chunks:
+            return {}
+        avg_length = self.total_length / len(self.chunks) or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term)
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.chunk_lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top-k chunks by BM25 score, as chunk dicts with relevance_score"""
+        scores = self.score(query)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {**self.chunks[chunk_id], "relevance_score": round(score, 4)}
+            for chunk_id, score in top
+        ]
+
+
+# Per-project indexes, built lazily on first search
+_indexes: Dict[str, KnowledgeIndex] = {}
+_vector_indexes: Dict[str, "knowledge_vectors.VectorIndex"] = {}
+_indexes_lock = threading.Lock()
+
+# Vector index rebuilds in flight, per project
+_vector_rebuilds: Dict[str, Future] = {}
+# Uploads per project whose chunks are indexed for BM25 but not yet embedded
+_pending_vector_adds: Counter = Counter()
+
+SEARCH_MODES = ("bm25", "vector", "hybrid")
+
+
+def get_project_index(project_id: str) -> KnowledgeIndex:
+    """
+    Get the BM25 index for a project, (re)building it if the project's
+    knowledge revision no longer matches the cached index.
+    """
+    revision = database.get_knowledge_revision(project_id)
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+        if index is not None and index.revision == revision:
+            return index
+
+        chunks = database.get_all_knowledge_chunks_for_project(project_id)
+        index = _load_index(project_id, revision, chunks)
+        if index is None:
+            index = KnowledgeIndex(project_id)
+            for chunk in chunks:
+                index.add_chunk(chunk)
+            index.revision = revision
+            _save_index(index)
+            logger.debug(f"Built knowledge index for project {project_id}: {len(index)} chunks")
+        _indexes[project_id] = index
+        return index
+
+
+def get_index_dir() -> Path:
+    """Directory holding persisted BM25 indexes"""
+    return settings.knowledge_index_dir
+
+
+def _index_file(project_id: str) -> Path:
+    return get_index_dir() / f"{project_id}.jsonl"
+
+
+def _add_record(index: KnowledgeIndex, chunk_ids: List[str]) -> Dict[str, Any]:
+    """Persisted record adding chunks: [chunk_id, document_id, term frequencies] each"""
+    return {
+        "revision": index.revision,
+        "add": [
+            [chunk_id, index.chunks[chunk_id]["document_id"], index.chunk_terms[chunk_id]]
+            for chunk_id in chunk_ids
+        ],
+    }
+
+
+def _load_index(
+    project_id: str,
+    revision: Optional[str],
+    chunks: List[Dict[str, Any]]
+) -> Optional[KnowledgeIndex]:
+    """
+    Restore a project's index from its persisted term frequencies. Returns
+    None if there is none, or it is not at revision or doesn't cover chunks.
+    """
+    if not settings.knowledge_index_persist:
+        return None
+    try:
+        lines = _index_file(project_id).read_bytes().splitlines()
+    except OSError:
+        return None
+
+    # chunk_id -> (document_id, term frequencies)
+    entries: Dict[str, Tuple[str, Dict[str, int]]] = {}
+    persisted_revision = None
+    removals = 0
+    try:
+        if json.loads(lines[0]).get("version") != INDEX_VERSION:
+            return None
+        for line in lines[1:]:
+            record = json.loads(line)
+            persisted_revision = record["revision"]
+            for chunk_id, document_id, terms in record.get("add", []):
+                entries[chunk_id] = (document_id, terms)
+            if "remove" in record:
+                removals += 1
+                for chunk_id in [cid for cid, (doc_id, _) in entries.items() if doc_id == record["remove"]]:
+                    del entries[chunk_id]
+    except (IndexError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable knowledge index for project {project_id}: {e}")
+        return None
+
+    if persisted_revision != revision or entries.keys() != {chunk["id"] for chunk in chunks}:
+        return None
+
+    index = KnowledgeIndex(project_id)
+    for chunk in chunks:
+        index.add_chunk(chunk, Counter(entries[chunk["id"]][1]))
+    index.revision = revision
+    if removals:
+        # Compact away the removed documents
+        _save_index(index)
+    logger.debug(f"Loaded knowledge index for project {project_id}: {len(index)} chunks")
+    return index
+
+
+def _save_index(index: KnowledgeIndex) -> None:
+    """Rewrite a project's persisted index from scratch"""
+    if not settings.knowledge_index_persist:
+        return
+    target = _index_file(index.project_id)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"version": INDEX_VERSION}) + "\n"
+            + json.dumps(_add_record(index, list(index.chunks))) + "\n"
         )
+        os.replace(tmp, target)
+    except OSError as e:
+        logger.warning(f"Failed to persist knowledge index for project {index.project_id}: {e}")
+
+
+def _append_index(project_id: str, record: Dict[str, Any]) -> None:
+    """Append one update to a project's persisted index"""
+    if not settings.knowledge_index_persist:
+        return
+    target = _index_file(project_id)
+    if not target.exists():
+        return
+    try:
+        with open(target, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to persist knowledge index for project {project_id}: {e}")
+
+
+def _get_vector_index(project_id: str) -> "knowledge_vectors.VectorIndex":
+    """Get a project's vector index, loading it from disk on first use"""
+    with _indexes_lock:
+        vindex = _vector_indexes.get(project_id)
+        if vindex is None:
+            vindex = knowledge_vectors.VectorIndex(
+                project_id, knowledge_vectors.get_index_directory(project_id)
+            )
+            vindex.load()
+            _vector_indexes[project_id] = vindex
+        return vindex
+
+
+def invalidate_project_index(project_id: Optional[str] = None) -> None:
+    """Drop the cached indexes for a project (or all projects)"""
+    with _indexes_lock:
+        if project_id is None:
+            _indexes.clear()
+            _vector_indexes.clear()
+            _vector_rebuilds.clear()
+        else:
+            _indexes.pop(project_id, None)
+            _vector_indexes.pop(project_id, None)
+            _vector_rebuilds.pop(project_id, None)
+
+
+def get_search_mode(project_id: str) -> str:
+    """
+    Retrieval mode for a project: the project's knowledge_search_mode
+    setting, else settings.knowledge_search_mode. Falls back to "bm25" when
+    NumPy is not installed.
+    """
+    mode = None
+    project = database.get_project(project_id)
+    if project:
+        mode = (project.get("settings") or {}).get("knowledge_search_mode")
+    if mode not in SEARCH_MODES:
+        mode = settings.knowledge_search_mode
+    if mode not in SEARCH_MODES or (mode != "bm25" and not knowledge_vectors.VECTORS_AVAILABLE):
+        return "bm25"
+    return mode
+
+
+def search_chunks(
+    project_id: str,
+    query: str,
+    limit: int = 10,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Search a project's knowledge chunks.
+
+    Uses the project's search mode unless mode is given. Returns chunk dicts
+    (as stored, plus filename) with a relevance_score, best match first.
+    """
+    if not query or not project_id:
+        return []
+    if mode not in SEARCH_MODES:
+        mode = get_search_mode(project_id)
+    elif mode != "bm25" and not knowledge_vectors.VECTORS_AVAILABLE:
+        mode = "bm25"
+
+    index = get_project_index(project_id)
+    if mode == "bm25":
+        with index.lock:
+            return index.search(query, limit)
+    return _search_vectors(index, query, limit, mode)
 
-    logger.info(f"Processed document {filename}: {len(chunks)} chunks, {len(content)} bytes")
 
-    return document_id, len(chunks)
+def _search_vectors(
+    index: KnowledgeIndex,
+    query: str,
+    limit: int,
+    mode: str
+) -> List[Dict[str, Any]]:
+    """Rank with the vector index ("vector") or blended with BM25 ("hybrid")"""
+    vindex = _get_vector_index(index.project_id)
+    query_vector = knowledge_vectors.embed_text(query)
+    candidates = max(limit * 4, 20)
+
+    # Lock order: BM25 index, then vector index
+    with index.lock:
+        if vindex.revision != index.revision:
+            # Re-embedded in the process pool; stale rows still rank meanwhile
+            _start_vector_rebuild(index)
+        with vindex.lock:
+            hits = vindex.search(query_vector, candidates) if len(vindex) else None
+
+        if hits is None:
+            return index.search(query, limit)
+        if mode == "vector":
+            scores = {chunk_id: cosine for chunk_id, cosine in hits if cosine > 0}
+        else:
+            weight = min(1.0, max(0.0, settings.knowledge_hybrid_vector_weight))
+            bm25_scores = index.score(query)
+            top_bm25 = max(bm25_scores.values(), default=0.0)
+            scores = {
+                chunk_id: (1 - weight) * score / top_bm25
+                for chunk_id, score in bm25_scores.items()
+            }
+            for chunk_id, cosine in hits:
+                if cosine > 0:
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + weight * cosine
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {**index.chunks[chunk_id], "relevance_score": round(score, 4)}
+            for chunk_id, score in top
+            if chunk_id in index.chunks
+        ]
+
+
+def _index_chunks(
+    project_id: str,
+    chunks: List[Dict[str, Any]],
+    previous_revision: Optional[str],
+    revision: Optional[str]
+) -> None:
+    """
+    Add newly stored chunks to the project's BM25 index if it is loaded and
+    was current before they were written; otherwise drop it for a rebuild.
+    """
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+    if index is None:
+        return
+    with index.lock:
+        if index.revision != previous_revision:
+            # Stale; get_project_index rebuilds it on the next search
+            return
+        for chunk in chunks:
+            index.add_chunk(chunk)
+        index.revision = revision
+        _append_index(project_id, _add_record(index, [chunk["id"] for chunk in chunks]))
+
+
+def ensure_vector_index(project_id: str) -> Future:
+    """
+    Bring a project's vector index up to date with its BM25 index.
+
+    Re-embedding runs in the knowledge_vectors process pool. Returns a
+    future that completes once the rebuilt index is installed (at once if
+    nothing needs rebuilding).
+    """
+    index = get_project_index(project_id)
+    vindex = _get_vector_index(project_id)
+    with index.lock:
+        if vindex.revision != index.revision:
+            return _start_vector_rebuild(index)
+    done: Future = Future()
+    done.set_result(None)
+    return done
+
+
+def _start_vector_rebuild(index: KnowledgeIndex) -> Future:
+    """Start re-embedding a BM25 index's chunks unless already under way (caller holds index.lock)"""
+    project_id = index.project_id
+    with _indexes_lock:
+        running = _vector_rebuilds.get(project_id)
+        if running is not None:
+            return running
+        done: Future = Future()
+        if _pending_vector_adds[project_id]:
+            # An upload is about to append its vectors; rebuild on a later search
+            done.set_result(None)
+            return done
+        _vector_rebuilds[project_id] = done
+
+    chunks = list(index.chunks.values())
+    try:
+        embedded = knowledge_vectors.submit_embed_texts([chunk.get("content", "") for chunk in chunks])
+    except Exception as e:
+        _finish_vector_rebuild(project_id, done, e)
+        return done
+    embedded.add_done_callback(
+        functools.partial(_install_vectors, project_id, chunks, index.revision, done)
+    )
+    logger.info(f"Rebuilding vector index for project {project_id}: {len(chunks)} chunks")
+    return done
+
+
+def _install_vectors(
+    project_id: str,
+    chunks: List[Dict[str, Any]],
+    revision: Optional[str],
+    done: Future,
+    embedded: Future
+) -> None:
+    """Swap in re-embedded chunks if the BM25 index is still at their revision"""
+    error = None
+    try:
+        vectors = embedded.result()
+        with _indexes_lock:
+            index = _indexes.get(project_id)
+        vindex = _get_vector_index(project_id)
+        with vindex.lock:
+            if index is not None and index.revision == revision and vindex.revision != revision:
+                vindex.rebuild(chunks, revision, vectors)
+    except Exception as e:
+        error = e
+    _finish_vector_rebuild(project_id, done, error)
+
+
+def _finish_vector_rebuild(project_id: str, done: Future, error: Optional[BaseException]) -> None:
+    with _indexes_lock:
+        if _vector_rebuilds.get(project_id) is done:
+            del _vector_rebuilds[project_id]
+    if error is None:
+        done.set_result(None)
+    else:
+        logger.warning(f"Vector index rebuild failed for project {project_id}: {error}")
+        done.set_exception(error)
+
+
+def _add_vectors(
+    project_id: str,
+    chunks: List[Dict[str, Any]],
+    vectors: Any,
+    previous_revision: Optional[str],
+    revision: Optional[str]
+) -> None:
+    """Append embedded chunks to the project's vector index and save it"""
+    vindex = _get_vector_index(project_id)
+    with vindex.lock:
+        if vindex.revision != previous_revision:
+            # Stale or missing; rebuilt in full after the next search
+            return
+        vindex.add(
+            [chunk["id"] for chunk in chunks],
+            [chunk["document_id"] for chunk in chunks],
+            vectors,
+        )
+        vindex.revision = revision
+        vindex.save()
 
 
 def get_relevant_context(
@@ -212,8 +1015,7 @@ def get_relevant_context(
     """
     Retrieve relevant knowledge chunks for a query.
 
-    Uses simple keyword matching. For future enhancement,
-    this can be replaced with vector similarity search.
+    Ranks the project's chunks with its search mode (see search_chunks).
 
     Args:
         project_id: The project to search
@@ -228,7 +1030,7 @@ def get_relevant_context(
         return ""
 
     # Search for relevant chunks
-    results = database.search_knowledge_chunks(project_id, query, limit=max_chunks * 2)
+    results = search_chunks(project_id, query, limit=max_chunks * 2)
 
     if not results:
         return ""
@@ -342,4 +1144,27 @@ def delete_document_and_chunks(document_id: str) -> bool:
     Returns:
         True if deleted, False if not found
     """
-    return database.delete_knowledge_document(document_id)
+    deleted = database.delete_knowledge_document_with_revisions(document_id)
+    if deleted is None:
+        return False
+    project_id, previous_revision, revision = deleted
+
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+        vindex = _vector_indexes.get(project_id)
+    if index is not None:
+        with index.lock:
+            if index.revision == previous_revision:
+                index.remove_document(document_id)
+                index.revision = revision
+                _append_index(project_id, {"revision": revision, "remove": document_id})
+    if vindex is not None:
+        with vindex.lock:
+            if vindex.revision == previous_revision:
+                if vindex.remove_document(document_id):
+                    vindex.revision = revision
+                    vindex.save()
+                else:
+                    vindex.revision = revision
+
+    return True
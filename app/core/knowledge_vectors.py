@@ -0,0 +1,277 @@
+"""
+Local vector index for semantic knowledge retrieval
+
+Embeddings are computed on the CPU with no model download: each chunk is
+mapped to a fixed-size vector by feature hashing of its words, word bigrams
+and character trigrams (so "deploy" and "deployment" share features).
+Vectors are L2-normalized, quantized to int8 and stored per project as a
+.npy matrix that is memory-mapped on load; each save writes a new file, so
+a mapped matrix is never replaced in place (which Windows refuses). Search
+is a single matrix-vector product followed by an argpartition top-k.
+
+Embedding uploaded documents and full index rebuilds runs in a process
+pool so they don't hold the GIL on the server process.
+
+NumPy is optional; without it VECTORS_AVAILABLE is False and knowledge
+search stays on BM25.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+import zlib
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+VECTORS_AVAILABLE = False
+try:
+    import numpy as np
+    VECTORS_AVAILABLE = True
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space size (stored in each index's metadata; indexes
+# built with a different size are rebuilt)
+EMBEDDING_DIM = 1024
+
+# Relative weight of each feature family
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.35
+
+# int8 quantization scale for unit vectors
+QUANT_SCALE = 127.0
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# =============================================================================
+# Embedding
+# =============================================================================
+
+def _features(text: str) -> Counter:
+    """Weighted feature counts for one text"""
+    words = _WORD_RE.findall(text.lower())
+    features: Counter = Counter()
+    for word in words:
+        features["w:" + word] += WORD_WEIGHT
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            features["c:" + padded[i:i + 3]] += TRIGRAM_WEIGHT
+    for first, second in zip(words, words[1:]):
+        features[f"b:{first} {second}"] += BIGRAM_WEIGHT
+    return features
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> "np.ndarray":
+    """Embed one text as an L2-normalized float32 vector"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text or "").items():
+        # Sublinear term frequency so repeated words don't dominate
+        if weight > 1:
+            weight = 1.0 + math.log(weight)
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = -1.0 if h & 0x80000000 else 1.0
+        vector[(h & 0x7FFFFFFF) % dim] += sign * weight
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def embed_texts(texts: List[str], dim: int = EMBEDDING_DIM) -> "np.ndarray":
+    """Embed texts as rows of an (n, dim) float32 matrix"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        matrix[i] = embed_text(text, dim)
+    return matrix
+
+
+def quantize(vectors: "np.ndarray") -> "np.ndarray":
+    """Quantize unit vectors to int8"""
+    return np.clip(np.rint(vectors * QUANT_SCALE), -127, 127).astype(np.int8)
+
+
+# =============================================================================
+# Process pool
+# =============================================================================
+
+_pool_lock = threading.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        with _pool_lock:
+            if _process_pool is None:
+                # spawn: forking a process with live threads is unsafe
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=max(1, settings.knowledge_embed_workers),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _process_pool
+
+
+def submit_embed_texts(texts: List[str]) -> Future:
+    """Embed texts in the worker process pool without waiting for the result"""
+    return _get_process_pool().submit(embed_texts, texts)
+
+
+async def embed_texts_async(texts: List[str]) -> "np.ndarray":
+    """Embed texts in the worker process pool"""
+    return await asyncio.wrap_future(submit_embed_texts(texts))
+
+
+def shutdown() -> None:
+    """Stop the embedding process pool"""
+    global _process_pool
+    with _pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# =============================================================================
+# Vector index
+# =============================================================================
+
+class VectorIndex:
+    """
+    int8 embedding matrix for one project's knowledge chunks.
+
+    Stored as <directory>/vectors-<generation>.npy (memory-mapped on load)
+    plus <directory>/meta.json holding the matrix file name, the row ->
+    chunk mapping, the embedding dimension and the knowledge revision the
+    vectors were built from. Not thread safe on its own - callers hold `lock`.
+    """
+
+    def __init__(self, project_id: str, directory: Path, dim: int = EMBEDDING_DIM):
+        self.project_id = project_id
+        self.directory = Path(directory)
+        self.dim = dim
+        self.lock = threading.RLock()
+        self.revision: Optional[str] = None
+        self.chunk_ids: List[str] = []
+        self.document_ids: List[str] = []
+        self.matrix = np.zeros((0, dim), dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    def load(self) -> bool:
+        """Load the stored index. Returns False if missing or incompatible."""
+        try:
+            meta = json.loads(self._meta_path.read_text())
+            matrix = np.load(self.directory / meta.get("vectors", "vectors.npy"), mmap_mode="r")
+        except (OSError, ValueError) as e:
+            if self._meta_path.exists():
+                logger.warning(f"Could not load vector index for project {self.project_id}: {e}")
+            return False
+        if meta.get("dim") != self.dim or matrix.shape != (len(meta.get("chunk_ids", [])), self.dim):
+            return False
+        self.revision = meta.get("revision")
+        self.chunk_ids = list(meta["chunk_ids"])
+        self.document_ids = list(meta["document_ids"])
+        self.matrix = matrix
+        return True
+
+    def save(self) -> None:
+        """Write the index atomically and re-map it from disk"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # A new matrix file per save: the current one may still be mapped,
+        # and only meta.json (never mapped) is replaced
+        vectors_name = f"vectors-{uuid.uuid4().hex[:12]}.npy"
+        tmp_meta = self.directory / "meta.tmp.json"
+        np.save(self.directory / vectors_name, np.ascontiguousarray(self.matrix))
+        tmp_meta.write_text(json.dumps({
+            "dim": self.dim,
+            "revision": self.revision,
+            "vectors": vectors_name,
+            "chunk_ids": self.chunk_ids,
+            "document_ids": self.document_ids,
+        }))
+        os.replace(tmp_meta, self._meta_path)
+        self.matrix = np.load(self.directory / vectors_name, mmap_mode="r")
+
+        for path in self.directory.glob("vectors*.npy"):
+            if path.name != vectors_name:
+                try:
+                    path.unlink()
+                except OSError:
+                    # Still mapped elsewhere (Windows); removed by a later save
+                    pass
+
+    def rebuild(
+        self,
+        chunks: List[Dict[str, Any]],
+        revision: Optional[str],
+        vectors: Optional["np.ndarray"] = None
+    ) -> None:
+        """
+        Replace all rows with the given chunks (dicts with id, document_id,
+        content) and save. vectors are their embeddings if already computed.
+        """
+        if vectors is None:
+            vectors = embed_texts([chunk.get("content", "") for chunk in chunks], self.dim)
+        self.chunk_ids = []
+        self.document_ids = []
+        self.matrix = np.zeros((0, self.dim), dtype=np.int8)
+        self.add(
+            [chunk["id"] for chunk in chunks],
+            [chunk["document_id"] for chunk in chunks],
+            vectors,
+        )
+        self.revision = revision
+        self.save()
+        logger.info(f"Built vector index for project {self.project_id}: {len(self)} chunks")
+
+    def add(self, chunk_ids: List[str], document_ids: List[str], vectors: "np.ndarray") -> None:
+        """Append float32 unit vectors for the given chunks"""
+        if not chunk_ids:
+            return
+        self.chunk_ids.extend(chunk_ids)
+        self.document_ids.extend(document_ids)
+        self.matrix = np.concatenate([np.asarray(self.matrix), quantize(vectors)])
+
+    def remove_document(self, document_id: str) -> int:
+        """Drop all rows of a document. Returns the number removed."""
+        keep = [i for i, doc_id in enumerate(self.document_ids) if doc_id != document_id]
+        removed = len(self.document_ids) - len(keep)
+        if removed:
+            self.chunk_ids = [self.chunk_ids[i] for i in keep]
+            self.document_ids = [self.document_ids[i] for i in keep]
+            self.matrix = np.asarray(self.matrix)[keep]
+        return removed
+
+    def search(self, query_vector: "np.ndarray", limit: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, cosine similarity) pairs, best first"""
+        count = len(self.chunk_ids)
+        if not count or limit <= 0:
+            return []
+        scores = (self.matrix @ query_vector.astype(np.float32)) / QUANT_SCALE
+        k = min(limit, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunk_ids[i], float(scores[i])) for i in top]
+
+
+def get_index_directory(project_id: str) -> Path:
+    """Directory holding a project's vector index"""
+    return settings.knowledge_vectors_dir / project_id
@@ -3,7 +3,7 @@ Pydantic models for API requests and responses
 """
 
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
 
@@ -180,6 +180,7 @@ class ProjectSettings(BaseModel):
     """Project-specific settings"""
     default_profile_id: Optional[str] = None
     custom_instructions: Optional[str] = None
+    knowledge_search_mode: Optional[Literal["bm25", "vector", "hybrid"]] = None  # Defaults to settings.knowledge_search_mode
 
 
 class ProjectBase(BaseModel):
@@ -294,9 +295,24 @@ class Session(SessionBase):
     updated_at: datetime
 
 
+class HistoryPageInfo(BaseModel):
+    """Position of a page of session messages within the full history"""
+    total: int = 0
+    has_more_before: bool = False  # Older messages exist (load with before=before_cursor)
+    has_more_after: bool = False  # Newer messages exist (load with after=after_cursor)
+    before_cursor: Optional[str] = None  # Id of the first message in the page
+    after_cursor: Optional[str] = None  # Id of the last message in the page
+
+
 class SessionWithMessages(Session):
     """Session with message history"""
     messages: List[SessionMessage] = []
+    history_page: Optional[HistoryPageInfo] = None  # Set when only a page of messages is returned
+
+
+class SessionHistoryPage(HistoryPageInfo):
+    """A page of session messages"""
+    messages: List[SessionMessage] = []
 
 
 class SessionSearchResult(Session):
@@ -883,6 +899,23 @@ class KnowledgeSearchResult(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class KnowledgeBatchItem(BaseModel):
+    """Outcome for one file of a batch upload"""
+    filename: str
+    status: str  # completed, failed
+    document_id: Optional[str] = None
+    chunk_count: int = 0
+    error: Optional[str] = None
+
+
+class KnowledgeBatchResult(BaseModel):
+    """Batch upload response"""
+    batch_id: str
+    documents: List[KnowledgeBatchItem]
+    succeeded: int = 0
+    failed: int = 0
+
+
 class KnowledgeStats(BaseModel):
     """Statistics for a project's knowledge base"""
     document_count: int = 0
@@ -0,0 +1,177 @@
+"""
+SDK options cache
+
+build_options_from_profile (app/core/query_engine.py) runs before every
+query. Most of what it reads rarely changes, yet each call used to load the
+profile, fetch every enabled subagent one query at a time, read the admin
+API keys and AI tool defaults from system_settings (a query and a Fernet
+decrypt per key) and run `git rev-parse` in the working directory.
+
+OptionsCache keeps those in memory, one layer each:
+- profiles: profile rows by id
+- subagents: subagent rows by id
+- settings: admin provider keys and AI tool defaults
+- git: whether a working directory is a git repo
+
+Writes to profiles, subagents and system_settings (through app/db/database.py)
+invalidate the matching entries. Every entry also expires after
+options_cache_ttl_seconds, which bounds how long a write made by another
+worker, or a directory that became a git repo, goes unnoticed.
+
+StageTimer records how long each step before the first response takes
+(building options stage by stage, connecting the SDK client, waiting for
+the first message), so time to first token can be broken down in
+/api/v1/metrics.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.db import database
+
+# Cache layers
+PROFILES = "profiles"
+SUBAGENTS = "subagents"
+SETTINGS = "settings"
+GIT = "git"
+
+# Database table -> layer its writes invalidate
+_TABLE_LAYERS = {
+    "profiles": PROFILES,
+    "subagents": SUBAGENTS,
+    "system_settings": SETTINGS,
+}
+
+
+class OptionsCache:
+    """Layered in-memory cache for the static parts of SDK options"""
+
+    def __init__(self):
+        self._layers: Dict[str, Dict[Any, Tuple[float, Any]]] = {
+            layer: {} for layer in (PROFILES, SUBAGENTS, SETTINGS, GIT)
+        }
+        # Bumped on invalidation so a load that raced with a write is not stored
+        self._generations: Dict[str, int] = {layer: 0 for layer in self._layers}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layer: str, key: Any, loader: Callable[[], Any]) -> Any:
+        """Cached value of key in layer, calling loader() when missing or expired
+
+        A loader result of None (e.g. a deleted row) is returned but not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._layers[layer].get(key)
+            if entry and now - entry[0] < settings.options_cache_ttl_seconds:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations[layer]
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                if self._generations[layer] == generation:
+                    self._layers[layer][key] = (now, value)
+        return value
+
+    def invalidate(self, layer: str, key: Any = None) -> None:
+        """Drop one entry of a layer, or the whole layer when key is None"""
+        with self._lock:
+            self._generations[layer] += 1
+            if key is None:
+                self._layers[layer].clear()
+            else:
+                self._layers[layer].pop(key, None)
+
+    def on_database_change(self, table: str, key: Optional[str]) -> None:
+        layer = _TABLE_LAYERS.get(table)
+        if layer == SETTINGS:
+            # Provider settings are cached as one entry
+            self.invalidate(SETTINGS)
+        elif layer:
+            self.invalidate(layer, key)
+
+    def clear(self) -> None:
+        for layer in self._layers:
+            self.invalidate(layer)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = {layer: len(values) for layer, values in self._layers.items()}
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class StageClock:
+    """Times consecutive stages of one operation (see StageTimer.clock)"""
+
+    def __init__(self, timer: "StageTimer", prefix: str):
+        self._timer = timer
+        self._prefix = prefix
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Record the time since the previous lap as prefix.stage"""
+        now = time.perf_counter()
+        self._timer.record(f"{self._prefix}.{stage}", (now - self._last) * 1000)
+        self._last = now
+
+    def done(self) -> None:
+        """Record the time since the clock started as prefix"""
+        self._timer.record(self._prefix, (time.perf_counter() - self._started) * 1000)
+
+
+class StageTimer:
+    """Count, average and maximum duration of named stages"""
+
+    def __init__(self):
+        self._stages: Dict[str, list] = {}  # stage -> [count, total_ms, max_ms]
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed_ms
+            totals[2] = max(totals[2], elapsed_ms)
+
+    def clock(self, prefix: str) -> StageClock:
+        return StageClock(self, prefix)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": count,
+                    "avg_ms": round(total / count, 2),
+                    "max_ms": round(peak, 2),
+                }
+                for stage, (count, total, peak) in sorted(self._stages.items())
+            }
+
+
+# Global instances
+options_cache = OptionsCache()
+stage_timer = StageTimer()
+database.add_change_listener(options_cache.on_database_change)
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Cache counters and per-stage timings for /api/v1/metrics"""
+    return {**options_cache.get_metrics(), "stages": stage_timer.get_metrics()}
@@ -6,12 +6,22 @@ Manages tool permission requests with a queue system that supports:
 - Batch approval/denial when rules match multiple queued requests
 - Persistent permission rules (session-level and profile-level)
 - Pattern matching for tool inputs (e.g., "Bash:npm*")
+
+Profile rules are read from the database once per profile and compiled
+into a CompiledRuleSet: for each tool name, the glob patterns of the rules
+that apply to it are joined into one regex, so a tool call costs a dict
+lookup and a regex match per input value instead of a query and a glob
+match per rule. The permission rules API invalidates the cache; entries
+also expire after permission_rule_cache_seconds.
 """
 
 import asyncio
 import logging
 import fnmatch
-from typing import Optional, Dict, Any, List, Literal, Union
+import os
+import re
+import time
+from typing import Optional, Dict, Any, List, Literal, Union, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -19,6 +29,7 @@ from enum import Enum
 from claude_agent_sdk.types import PermissionResultAllow, PermissionResultDeny
 
 from app.db import database
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -73,31 +84,99 @@ class PermissionRule:
 
     def _match_pattern(self, tool_input: Dict[str, Any]) -> bool:
         """Match pattern against tool input"""
-        pattern = self.tool_pattern
+        return any(
+            fnmatch.fnmatch(subject, self.tool_pattern)
+            for subject in _pattern_subjects(self.tool_name, tool_input)
+        )
 
-        # Handle different tool types
-        if self.tool_name == "Bash":
-            command = tool_input.get("command", "")
-            return fnmatch.fnmatch(command, pattern)
 
-        elif self.tool_name in ("Read", "Write", "Edit", "Glob"):
-            file_path = tool_input.get("file_path", "") or tool_input.get("path", "")
-            return fnmatch.fnmatch(file_path, pattern)
+def _pattern_subjects(rule_tool_name: str, tool_input: Dict[str, Any]) -> List[str]:
+    """The tool input values a pattern of a rule for rule_tool_name is matched against"""
+    # Handle different tool types
+    if rule_tool_name == "Bash":
+        subject = tool_input.get("command", "")
+    elif rule_tool_name in ("Read", "Write", "Edit", "Glob"):
+        subject = tool_input.get("file_path", "") or tool_input.get("path", "")
+    elif rule_tool_name == "Grep":
+        subject = tool_input.get("path", "")
+    elif rule_tool_name == "WebFetch":
+        subject = tool_input.get("url", "")
+    else:
+        # Generic: try to match against any string value in input
+        return [value for value in tool_input.values() if isinstance(value, str)]
+    return [subject] if isinstance(subject, str) else []
 
-        elif self.tool_name == "Grep":
-            path = tool_input.get("path", "")
-            return fnmatch.fnmatch(path, pattern)
 
-        elif self.tool_name == "WebFetch":
-            url = tool_input.get("url", "")
-            return fnmatch.fnmatch(url, pattern)
+def _combine_patterns(indexed_rules: List[Tuple[int, PermissionRule]]) -> Optional[re.Pattern]:
+    """One regex matching any of the rules' globs; the named group r<index> that matched identifies the rule"""
+    if not indexed_rules:
+        return None
+    return re.compile("|".join(
+        f"(?P<r{index}>{fnmatch.translate(os.path.normcase(rule.tool_pattern))})"
+        for index, rule in indexed_rules
+    ))
+
+
+class _ToolMatcher:
+    """The rules that apply to one tool name, compiled"""
+
+    def __init__(self, tool_name: str, rules: List[PermissionRule]):
+        self.tool_name = tool_name
+        # Rules after the first one without a pattern can never match first
+        self.catch_all: Optional[int] = None
+        own: List[Tuple[int, PermissionRule]] = []
+        wildcard: List[Tuple[int, PermissionRule]] = []
+        for index, rule in enumerate(rules):
+            if rule.tool_name == tool_name:
+                group = own
+            elif rule.tool_name == "*":
+                group = wildcard
+            else:
+                continue
+            if not rule.tool_pattern:
+                self.catch_all = index
+                break
+            group.append((index, rule))
+
+        # "*" rules match patterns against every string value of the input
+        self._own = _combine_patterns(own)
+        self._wildcard = _combine_patterns(wildcard)
+
+    def first_match(self, tool_input: Dict[str, Any]) -> Optional[int]:
+        """Index of the first rule matching the tool input, or None"""
+        best = self.catch_all
+        for regex, rule_tool_name in ((self._own, self.tool_name), (self._wildcard, "*")):
+            if regex is None:
+                continue
+            for subject in _pattern_subjects(rule_tool_name, tool_input):
+                match = regex.match(os.path.normcase(subject))
+                if match:
+                    index = int(match.lastgroup[1:])
+                    if best is None or index < best:
+                        best = index
+        return best
+
+
+class CompiledRuleSet:
+    """
+    An ordered list of rules compiled for fast matching.
+
+    match() returns the first rule (in list order) that PermissionRule.matches
+    would accept. Rules are grouped by tool name on first use of each tool.
+    """
 
-        # Generic: try to match against any string value in input
-        for value in tool_input.values():
-            if isinstance(value, str) and fnmatch.fnmatch(value, pattern):
-                return True
+    def __init__(self, rules: List[PermissionRule]):
+        self.rules = rules
+        self._matchers: Dict[str, _ToolMatcher] = {}
 
-        return False
+    def match(self, tool_name: str, tool_input: Dict[str, Any]) -> Optional[PermissionRule]:
+        if not self.rules:
+            return None
+        matcher = self._matchers.get(tool_name)
+        if matcher is None:
+            matcher = self._matchers[tool_name] = _ToolMatcher(tool_name, self.rules)
+        index = matcher.first_match(tool_input)
+        return self.rules[index] if index is not None else None
 
 
 class PermissionHandler:
@@ -119,6 +198,10 @@ class PermissionHandler:
         # In-memory session rules (cleared when session ends)
         self._session_rules: Dict[str, List[PermissionRule]] = {}
 
+        # Compiled rule sets: session_id -> rules, profile_id -> (time loaded, rules)
+        self._session_rule_sets: Dict[str, CompiledRuleSet] = {}
+        self._profile_rule_sets: Dict[Optional[str], Tuple[float, CompiledRuleSet]] = {}
+
         # Lock for thread-safe operations
         self._lock = asyncio.Lock()
 
@@ -269,6 +352,7 @@ class PermissionHandler:
                     if session_id not in self._session_rules:
                         self._session_rules[session_id] = []
                     self._session_rules[session_id].append(rule)
+                    self._session_rule_sets.pop(session_id, None)
                 else:
                     # Save to database for profile-level persistence
                     database.add_permission_rule(
@@ -277,6 +361,7 @@ class PermissionHandler:
                         tool_pattern=rule.tool_pattern,
                         decision=rule.decision.value
                     )
+                    self.invalidate_rules(request.profile_id)
 
                 # Auto-resolve matching queued requests
                 resolved_requests = await self._resolve_matching_requests(
@@ -302,9 +387,10 @@ class PermissionHandler:
             return resolved_ids
 
         # Find all matching requests
+        rule_set = CompiledRuleSet([rule])
         requests_to_resolve = []
         for req_id, req in list(self._pending_requests[session_id].items()):
-            if rule.matches(req.tool_name, req.tool_input):
+            if rule_set.match(req.tool_name, req.tool_input):
                 requests_to_resolve.append((req_id, req))
 
         # Resolve them
@@ -340,14 +426,25 @@ class PermissionHandler:
         """Check if any saved rule matches this tool use"""
         # Check session-level rules first (more specific)
         if session_id in self._session_rules:
-            for rule in self._session_rules[session_id]:
-                if rule.matches(tool_name, tool_input):
-                    return rule
-
-        # Check profile-level rules from database
-        db_rules = database.get_permission_rules(profile_id=profile_id)
-        for rule_data in db_rules:
-            rule = PermissionRule(
+            rule_set = self._session_rule_sets.get(session_id)
+            if rule_set is None:
+                rule_set = self._session_rule_sets[session_id] = CompiledRuleSet(self._session_rules[session_id])
+            rule = rule_set.match(tool_name, tool_input)
+            if rule:
+                return rule
+
+        # Check profile-level rules (cached from the database)
+        return self._get_profile_rule_set(profile_id).match(tool_name, tool_input)
+
+    def _get_profile_rule_set(self, profile_id: Optional[str]) -> CompiledRuleSet:
+        """Compiled profile rules, loaded from the database when missing or expired"""
+        now = time.monotonic()
+        cached = self._profile_rule_sets.get(profile_id)
+        if cached and now - cached[0] < settings.permission_rule_cache_seconds:
+            return cached[1]
+
+        rules = [
+            PermissionRule(
                 id=rule_data["id"],
                 session_id=None,
                 profile_id=rule_data["profile_id"],
@@ -355,10 +452,20 @@ class PermissionHandler:
                 tool_pattern=rule_data.get("tool_pattern"),
                 decision=PermissionDecision(rule_data["decision"])
             )
-            if rule.matches(tool_name, tool_input):
-                return rule
-
-        return None
+            for rule_data in database.get_permission_rules(profile_id=profile_id)
+        ]
+        rule_set = CompiledRuleSet(rules)
+        self._profile_rule_sets[profile_id] = (now, rule_set)
+        return rule_set
+
+    def invalidate_rules(self, profile_id: Optional[str] = None):
+        """Drop cached profile rules after they change (all profiles when profile_id is None)"""
+        if profile_id is None:
+            self._profile_rule_sets.clear()
+        else:
+            self._profile_rule_sets.pop(profile_id, None)
+            # Without a profile, get_permission_rules returns every profile's rules
+            self._profile_rule_sets.pop(None, None)
 
     def get_pending_requests(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all pending permission requests for a session"""
@@ -413,6 +520,7 @@ class PermissionHandler:
     def clear_session_rules(self, session_id: str):
         """Clear session-level rules when session ends"""
         self._session_rules.pop(session_id, None)
+        self._session_rule_sets.pop(session_id, None)
 
     def get_session_rules(self, session_id: str) -> List[Dict[str, Any]]:
         """Get session-level rules"""
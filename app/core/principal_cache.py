@@ -0,0 +1,223 @@
+"""
+Authenticated principal cache
+
+Every API request resolves its token several times: RateLimitMiddleware
+identifies the caller for rate limiting, require_auth (or require_api_key)
+authenticates it, and WebSocket endpoints run authenticate_websocket. Each
+of those is a chain of SQLite lookups (admin session, API key session, API
+user, API key hash).
+
+This module resolves a token once and caches the result:
+- Entries are keyed by the SHA-256 of the token, never the token itself
+- Entries expire after auth_cache_ttl_seconds (or when the session expires,
+  if sooner) and the least recently used are dropped beyond
+  auth_cache_max_entries
+- Logout invalidates the token; updating, deactivating or deleting an API
+  user or regenerating its key invalidates every token of that user
+- Unknown tokens are not cached, so a new session works immediately
+
+It also coalesces API user last_used_at writes to at most one per user per
+auth_last_used_interval_seconds.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.db import database, async_database
+
+logger = logging.getLogger(__name__)
+
+# Principal kinds
+ADMIN_SESSION = "admin_session"
+API_KEY_SESSION = "api_key_session"
+API_KEY = "api_key"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who a token authenticates"""
+    kind: str
+    api_user: Optional[Dict[str, Any]] = None
+    expires_at: Optional[float] = None  # Unix time the session expires
+
+    @property
+    def is_admin(self) -> bool:
+        return self.kind == ADMIN_SESSION
+
+    @property
+    def api_user_id(self) -> Optional[str]:
+        return self.api_user["id"] if self.api_user else None
+
+    @property
+    def rate_limit_user_id(self) -> str:
+        """User ID the rate limiter counts requests under"""
+        if self.is_admin:
+            return "admin"
+        return self.api_user.get("username") or self.api_user["name"]
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _session_expiry(session: Dict[str, Any]) -> Optional[float]:
+    expires_at = session.get("expires_at")
+    if not isinstance(expires_at, str):
+        return None
+    try:
+        # Stored as naive UTC
+        return (datetime.fromisoformat(expires_at) - datetime(1970, 1, 1)).total_seconds()
+    except ValueError:
+        return None
+
+
+def lookup_principal(token: str) -> Optional[Principal]:
+    """Resolve a token against the database (uncached)"""
+    # API keys are prefixed; session tokens are plain urlsafe tokens
+    if not token.startswith("aih_"):
+        session = database.get_auth_session(token)
+        if session:
+            return Principal(ADMIN_SESSION, expires_at=_session_expiry(session))
+
+        api_key_session = database.get_api_key_session(token)
+        if api_key_session:
+            api_user = database.get_api_user(api_key_session["api_user_id"])
+            if api_user and api_user.get("is_active", True):
+                return Principal(API_KEY_SESSION, api_user, _session_expiry(api_key_session))
+
+    api_user = database.get_api_user_by_key_hash(hash_token(token))
+    if api_user and api_user.get("is_active", True):
+        return Principal(API_KEY, api_user)
+    return None
+
+
+class PrincipalCache:
+    """TTL + LRU cache of resolved tokens"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = settings.auth_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = settings.auth_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        # token hash -> (principal, monotonic deadline)
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        # API user id -> monotonic time of the last last_used_at write
+        self._last_used: Dict[str, float] = {}
+        # require_auth runs in the threadpool, middleware on the event loop
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        """Cached principal of a token, if any"""
+        if not token or self.ttl_seconds <= 0:
+            return None
+        key = hash_token(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, deadline = entry
+            if time.monotonic() >= deadline:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        deadline = time.monotonic() + self.ttl_seconds
+        if principal.expires_at is not None:
+            deadline = min(deadline, time.monotonic() + principal.expires_at - time.time())
+        key = hash_token(token)
+        with self._lock:
+            self._entries[key] = (principal, deadline)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def resolve(self, token: Optional[str]) -> Optional[Principal]:
+        """Principal of a token, looked up on a miss (blocking; use from sync code)"""
+        if not token:
+            return None
+        principal = self.get(token)
+        if principal is None:
+            principal = lookup_principal(token)
+            if principal is not None:
+                self.put(token, principal)
+        return principal
+
+    async def resolve_async(self, token: Optional[str]) -> Optional[Principal]:
+        """Principal of a token, looked up off the event loop on a miss"""
+        if not token:
+            return None
+        principal = self.get(token)
+        if principal is None:
+            principal = await async_database.run(lookup_principal, token)
+            if principal is not None:
+                self.put(token, principal)
+        return principal
+
+    def invalidate_token(self, token: Optional[str]) -> None:
+        """Forget a token (logout)"""
+        if not token:
+            return
+        with self._lock:
+            self._entries.pop(hash_token(token), None)
+
+    def invalidate_user(self, api_user_id: str) -> None:
+        """Forget every token of an API user (updated, deactivated, deleted, new key)"""
+        with self._lock:
+            stale = [key for key, (principal, _) in self._entries.items() if principal.api_user_id == api_user_id]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached tokens of API user {api_user_id}")
+
+    def should_record_use(self, api_user_id: str) -> bool:
+        """
+        Whether to write last_used_at for a user now.
+
+        True at most once per auth_last_used_interval_seconds per user; the
+        caller does the write.
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_used.get(api_user_id)
+            if last is not None and now - last < settings.auth_last_used_interval_seconds:
+                return False
+            self._last_used[api_user_id] = now
+            if len(self._last_used) > max(self.max_entries, 1) * 2:
+                # Drop users not seen for a whole interval
+                cutoff = now - settings.auth_last_used_interval_seconds
+                self._last_used = {k: v for k, v in self._last_used.items() if v >= cutoff}
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._last_used.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global instance
+principal_cache = PrincipalCache()
@@ -5,8 +5,10 @@ No built-in profiles or subagents are seeded automatically.
 Users must create their own profiles and projects before starting chats.
 """
 
+import copy
 from typing import Dict, Any, Optional
 from app.db import database
+from app.core.options_cache import options_cache, PROFILES
 
 
 # Default profile configuration template (for reference when creating new profiles)
@@ -128,5 +130,7 @@ def _seed_default_templates():
 
 
 def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
-    """Get a profile from database"""
-    return database.get_profile(profile_id)
+    """Get a profile from database (cached, see app/core/options_cache.py)"""
+    profile = options_cache.get(PROFILES, profile_id, lambda: database.get_profile(profile_id))
+    # Callers may modify the profile, so never hand out the cached dict
+    return copy.deepcopy(profile)
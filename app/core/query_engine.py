@@ -15,7 +15,7 @@ import sys
 import uuid
 import asyncio
 from pathlib import Path
-from typing import Optional, Dict, Any, AsyncGenerator
+from typing import Optional, Dict, Any, AsyncGenerator, Awaitable, Callable, List
 from dataclasses import dataclass, field
 from datetime import datetime
 
@@ -26,15 +26,20 @@ from claude_agent_sdk import (
 )
 from claude_agent_sdk.types import StreamEvent, HookMatcher, HookContext, HookInput
 
-from app.db import database
+from app.db import database, async_database
+from app.db.write_behind import write_behind
 from app.core.config import settings
 from app.core.profiles import get_profile
-from app.core.sync_engine import sync_engine
+from app.core.sync_engine import sync_engine, SyncEvent
+from app.core.queue_manager import request_queue, AdmissionError, QueueStatus
+from app.core.rate_limiter import rate_limiter
 from app.core.permission_handler import permission_handler
 from app.core.platform import detect_deployment_mode, DeploymentMode
 from app.core.user_question_handler import user_question_handler
-from app.core import encryption
 from app.core import knowledge_service
+from app.core.credential_service import secret_cache
+from app.core.options_cache import options_cache, stage_timer, GIT, SETTINGS, SUBAGENTS
+from app.core.client_pool import client_pool
 
 logger = logging.getLogger(__name__)
 
@@ -313,11 +318,15 @@ class SessionState:
     background_task: Optional[asyncio.Task] = None  # Track background streaming task
     written_agent_ids: list = field(default_factory=list)  # Track agents written to filesystem
     agents_dir: Optional[Path] = None  # Path to .claude/agents/ directory
+    pooled: bool = False  # Client was taken pre-connected from the warm pool (see app/core/client_pool.py)
 
 
 # Track active sessions - key is our session_id, value is SessionState
 _active_sessions: Dict[str, SessionState] = {}
 
+# Background queries waiting for admission (see queue_manager), for interrupts
+_queued_queries: Dict[str, asyncio.Task] = {}
+
 
 def get_session_state(session_id: str) -> Optional[SessionState]:
     """Get the active session state for a session ID"""
@@ -343,6 +352,30 @@ async def cleanup_stale_sessions(max_age_seconds: int = 3600):
             except Exception as e:
                 logger.warning(f"Error cleaning up stale session {session_id}: {e}")
 
+    # Pooled clients are never handed back (they hold a conversation once
+    # used), but idle ones and unused pools expire here too
+    evicted = client_pool.evict_idle()
+    if evicted:
+        logger.info(f"Disconnected {evicted} idle pooled SDK clients")
+
+
+async def _connect_client(options: ClaudeAgentOptions, use_pool: bool = True) -> tuple[ClaudeSDKClient, bool]:
+    """
+    Get a connected SDK client for a new query.
+
+    Takes an idle client from the warm pool when it has one for these
+    options, otherwise connects a new one.
+
+    Returns:
+        Tuple of (client, pooled)
+    """
+    client = await client_pool.acquire(options) if use_pool else None
+    if client is not None:
+        return client, True
+    client = ClaudeSDKClient(options=options)
+    await client.connect()
+    return client, False
+
 
 # Instructions for displaying media and files in chat
 SECURITY_INSTRUCTIONS = """
@@ -424,9 +457,10 @@ def _get_available_providers() -> Dict[str, Any]:
     Get all available AI providers based on configured API keys.
     Returns a dict with image_providers, video_providers, and model3d_providers that have valid keys.
     """
-    gemini_key = _get_decrypted_api_key("image_api_key")
-    openai_key = _get_decrypted_api_key("openai_api_key")
-    meshy_key = _get_decrypted_api_key("meshy_api_key")
+    provider_settings = _get_provider_settings()
+    gemini_key = provider_settings["image_api_key"]
+    openai_key = provider_settings["openai_api_key"]
+    meshy_key = provider_settings["meshy_api_key"]
 
     # Image providers with their capabilities
     image_providers = {}
@@ -1060,30 +1094,41 @@ def _get_decrypted_api_key(setting_name: str) -> Optional[str]:
     """
     Get an API key from the database and decrypt it if encrypted.
 
+    Decrypted keys are cached in memory (see app/core/credential_service.py).
+
     Args:
         setting_name: The name of the setting (e.g., "openai_api_key")
 
     Returns:
         The decrypted API key, or None if not found or decryption fails
     """
-    value = database.get_system_setting(setting_name)
-    if not value:
-        return None
+    return secret_cache.get_admin_key(setting_name)
+
+
+# Admin API keys (decrypted) and AI tool defaults read when building options
+_PROVIDER_KEY_SETTINGS = ("image_api_key", "openai_api_key", "meshy_api_key")
+_PROVIDER_DEFAULT_SETTINGS = (
+    "image_provider", "image_model",
+    "video_provider", "video_model",
+    "model3d_provider", "model3d_model",
+)
+
+
+def _load_provider_defaults() -> Dict[str, Optional[str]]:
+    values = database.get_system_settings(list(_PROVIDER_DEFAULT_SETTINGS))
+    return {name: values.get(name) for name in _PROVIDER_DEFAULT_SETTINGS}
 
-    # Check if the value is encrypted
-    if encryption.is_encrypted(value):
-        if not encryption.is_encryption_ready():
-            logger.warning(f"Cannot decrypt {setting_name}: encryption key not available")
-            return None
-        try:
-            decrypted = encryption.decrypt_value(value)
-            return decrypted
-        except Exception as e:
-            logger.error(f"Failed to decrypt {setting_name}: {e}")
-            return None
 
-    # Return plaintext value (for backwards compatibility during migration)
-    return value
+def _get_provider_settings() -> Dict[str, Optional[str]]:
+    """
+    Admin provider keys and AI tool defaults.
+
+    The keys come from secret_cache and the defaults from options_cache, each
+    read in one query on a miss and dropped on any system_settings write.
+    """
+    provider_settings = secret_cache.get_admin_keys(_PROVIDER_KEY_SETTINGS)
+    provider_settings.update(options_cache.get(SETTINGS, "providers", _load_provider_defaults))
+    return provider_settings
 
 
 def _resolve_api_credential(
@@ -1120,30 +1165,18 @@ def _resolve_api_credential(
     # Get per-user policy for this credential
     # Policies are always per-user, no global fallback
     # Default to "user_provided" if no policy exists (shouldn't happen for properly created users)
-    policy_obj = None
-    if api_user_id:
-        policy_obj = database.get_user_credential_policy(api_user_id, credential_type)
-    policy = policy_obj.get("policy", "user_provided") if policy_obj else "user_provided"
+    # All of a user's policies and credentials are loaded (and cached) together
+    user_secrets = secret_cache.get_user_secrets(api_user_id) if api_user_id else None
+    policy = user_secrets.policies.get(credential_type, "user_provided") if user_secrets else "user_provided"
 
     resolved_key = None
     source = None
 
     # Try user's credential if applicable
-    if api_user_id and policy in ["user_provided", "optional"]:
-        user_cred = database.get_user_credential(api_user_id, credential_type)
-        if user_cred:
-            encrypted = user_cred.get("encrypted_value")
-            if encrypted:
-                if encryption.is_encrypted(encrypted) and encryption.is_encryption_ready():
-                    try:
-                        resolved_key = encryption.decrypt_value(encrypted)
-                        source = "user"
-                    except Exception as e:
-                        logger.error(f"Failed to decrypt user credential {credential_type}: {e}")
-                elif not encryption.is_encrypted(encrypted):
-                    # Plaintext (shouldn't happen in production, but handle it)
-                    resolved_key = encrypted
-                    source = "user"
+    if user_secrets and policy in ["user_provided", "optional"]:
+        resolved_key = user_secrets.credentials.get(credential_type)
+        if resolved_key:
+            source = "user"
 
     # Try admin's key if applicable
     if not resolved_key and policy in ["admin_provided", "optional"]:
@@ -1278,6 +1311,8 @@ def _build_env_with_ai_tools(
     if not any_image_tools and not any_video_tools and not any_3d_tools:
         return env
 
+    provider_settings = _get_provider_settings()
+
     # Resolve API keys based on user/policy
     # If api_user_id is provided, use policy-based resolution (user key → admin fallback)
     # Otherwise, use admin keys directly (local/admin sessions)
@@ -1288,9 +1323,9 @@ def _build_env_with_ai_tools(
         logger.debug(f"Resolved credentials for API user {api_user_id}")
     else:
         # Admin/local session - use admin keys directly
-        gemini_api_key = _get_decrypted_api_key("image_api_key")
-        openai_api_key = _get_decrypted_api_key("openai_api_key")
-        meshy_api_key = _get_decrypted_api_key("meshy_api_key")
+        gemini_api_key = provider_settings["image_api_key"]
+        openai_api_key = provider_settings["openai_api_key"]
+        meshy_api_key = provider_settings["meshy_api_key"]
 
     # Inject ALL available API keys so Claude can dynamically choose providers
     # This is the key change - instead of only injecting the default provider's key,
@@ -1313,8 +1348,8 @@ def _build_env_with_ai_tools(
 
     # Set default provider/model from settings (Claude can override these per-request)
     if any_image_tools:
-        image_provider = database.get_system_setting("image_provider")
-        image_model = database.get_system_setting("image_model")
+        image_provider = provider_settings["image_provider"]
+        image_model = provider_settings["image_model"]
 
         if image_provider:
             env["IMAGE_PROVIDER"] = image_provider
@@ -1326,8 +1361,8 @@ def _build_env_with_ai_tools(
             logger.debug(f"Set default IMAGE_MODEL={image_model}")
 
     if any_video_tools:
-        video_provider = database.get_system_setting("video_provider")
-        video_model = database.get_system_setting("video_model")
+        video_provider = provider_settings["video_provider"]
+        video_model = provider_settings["video_model"]
 
         if video_provider:
             env["VIDEO_PROVIDER"] = video_provider
@@ -1339,8 +1374,8 @@ def _build_env_with_ai_tools(
             logger.debug(f"Set default VIDEO_MODEL={video_model}")
 
     if any_3d_tools:
-        model3d_provider = database.get_system_setting("model3d_provider")
-        model3d_model = database.get_system_setting("model3d_model")
+        model3d_provider = provider_settings["model3d_provider"]
+        model3d_model = provider_settings["model3d_model"]
 
         if model3d_provider:
             env["MODEL3D_PROVIDER"] = model3d_provider
@@ -1369,7 +1404,7 @@ def generate_environment_details(
         execution_mode: Either "local" or "worktree"
         worktree_info: Dict with branch and base_branch info when in worktree mode
     """
-    is_git = _is_git_repo(working_dir)
+    is_git = options_cache.get(GIT, working_dir, lambda: _is_git_repo(working_dir))
     os_version = _get_os_version()
     today = datetime.now().strftime("%Y-%m-%d")
 
@@ -1427,6 +1462,7 @@ def build_options_from_profile(
     """
     config = profile["config"]
     overrides = overrides or {}
+    clock = stage_timer.clock("options")
 
     # Determine working directory and execution mode (needed for env details injection)
     # Priority order:
@@ -1465,6 +1501,7 @@ def build_options_from_profile(
         working_dir = config.get("cwd")
     else:
         working_dir = str(settings.workspace_dir)
+    clock.lap("working_dir")
 
     # Build system prompt
     system_prompt = config.get("system_prompt")
@@ -1543,6 +1580,7 @@ def build_options_from_profile(
 
         if override_append:
             final_system_prompt += "\n\n" + override_append
+    clock.lap("system_prompt")
 
     # Build agents dict from profile's enabled_agents
     # Profile stores a list of subagent IDs that reference global subagents in the database
@@ -1553,8 +1591,8 @@ def build_options_from_profile(
     if enabled_agent_ids:
         agents_dict = {}
         for agent_id in enabled_agent_ids:
-            # Look up subagent from global database
-            subagent = database.get_subagent(agent_id)
+            # Look up subagent from global database (cached, see app/core/options_cache.py)
+            subagent = options_cache.get(SUBAGENTS, agent_id, lambda: database.get_subagent(agent_id))
             if subagent:
                 # Create AgentDefinition dataclass instance
                 agent_def = AgentDefinition(
@@ -1581,6 +1619,7 @@ def build_options_from_profile(
             else:
                 # Append to string system prompt
                 final_system_prompt += builtin_instructions
+    clock.lap("subagents")
 
     # Determine permission mode
     permission_mode = overrides.get("permission_mode") or config.get("permission_mode", "default")
@@ -1607,6 +1646,11 @@ def build_options_from_profile(
         model_to_use, betas_to_use = MODEL_1M_MAPPING[raw_model]
         logger.info(f"1M context model selected: {raw_model} -> model={model_to_use}, betas={betas_to_use}")
 
+    # Environment - inject AI tool credentials if enabled
+    # Pass api_user_id for policy-based credential resolution
+    env = _build_env_with_ai_tools(config.get("env"), ai_tools_config, api_user_id)
+    clock.lap("env")
+
     # Build options with all ClaudeAgentOptions fields
     # Note: We don't set cli_path - let the SDK use its bundled CLI or find system CLI automatically
     # The SDK handles finding Claude properly on all platforms
@@ -1633,9 +1677,8 @@ def build_options_from_profile(
         # Settings loading
         setting_sources=config.get("setting_sources"),
 
-        # Environment and arguments - inject AI tool credentials if enabled
-        # Pass api_user_id for policy-based credential resolution
-        env=_build_env_with_ai_tools(config.get("env"), ai_tools_config, api_user_id),
+        # Environment and arguments
+        env=env,
         extra_args=_build_extra_args(config.get("extra_args") or {}, hooks),
 
         # Buffer settings - Default to 50MB to handle large file reads (images, PDFs)
@@ -1690,9 +1733,77 @@ def build_options_from_profile(
     if resume_session_id:
         options.resume = resume_session_id
 
+    clock.done()
     return options, agents_dict
 
 
+def _queue_tool_messages(session_id: str, tool_messages: List[Dict[str, Any]]) -> None:
+    """Queue collected tool_use/tool_result messages for write-behind storage"""
+    for tool_msg in tool_messages:
+        if tool_msg["type"] == "tool_use":
+            write_behind.add_session_message(
+                session_id=session_id,
+                role="tool_use",
+                content=f"Using tool: {tool_msg['name']}",
+                tool_name=tool_msg["name"],
+                tool_input=tool_msg.get("input"),
+                metadata={"tool_id": tool_msg.get("tool_id")}
+            )
+        elif tool_msg["type"] == "tool_result":
+            write_behind.add_session_message(
+                session_id=session_id,
+                role="tool_result",
+                content=tool_msg.get("output", ""),
+                tool_name=tool_msg["name"],
+                metadata={"tool_id": tool_msg.get("tool_id")}
+            )
+
+
+async def _acquire_query_slot(
+    session_id: str,
+    api_user_id: Optional[str],
+    send: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> str:
+    """
+    Wait until the admission queue lets a query of this session run.
+
+    Queries are admitted in weighted fair order by the caller's rate limit
+    priority. While the query waits, its queue position is pushed to the
+    devices watching the session and to send (the device that sent the
+    prompt). Returns the ticket to release with request_queue.release().
+
+    Raises:
+        AdmissionError: If the queue is full or was cleared
+    """
+    user_id, api_key_id = (None, api_user_id) if api_user_id else ("admin", None)
+    try:
+        priority = (await async_database.run(rate_limiter.get_limit_config, user_id, api_key_id)).priority
+    except Exception as e:
+        logger.warning(f"Failed to get the queue priority of {api_key_id or user_id}: {e}")
+        priority = 0
+
+    queued = False
+
+    async def push(event_type: str, data: Dict[str, Any]):
+        if send:
+            await send({"type": event_type, "session_id": session_id, **data})
+        await sync_engine.broadcast_event(SyncEvent(event_type=event_type, session_id=session_id, data=data))
+
+    async def on_update(status: QueueStatus):
+        nonlocal queued
+        queued = True
+        await push("query_queued", {
+            "position": status.position,
+            "estimated_wait_seconds": status.estimated_wait_seconds,
+            "total_queued": status.total_queued
+        })
+
+    ticket = await request_queue.acquire(user_id, api_key_id, priority, {"session_id": session_id}, on_update)
+    if queued:
+        await push("query_admitted", {})
+    return ticket
+
+
 async def execute_query(
     prompt: str,
     profile_id: str,
@@ -1704,20 +1815,20 @@ async def execute_query(
     """Execute a non-streaming query"""
 
     # Get profile
-    profile = get_profile(profile_id)
+    profile = await async_database.run(get_profile, profile_id)
     if not profile:
         raise ValueError(f"Profile not found: {profile_id}")
 
     # Get project if specified
     project = None
     if project_id:
-        project = database.get_project(project_id)
+        project = await async_database.run(database.get_project, project_id)
         if not project:
             raise ValueError(f"Project not found: {project_id}")
 
     # Get or create session
     if session_id:
-        session = database.get_session(session_id)
+        session = await async_database.run(database.get_session, session_id)
         if not session:
             raise ValueError(f"Session not found: {session_id}")
         resume_id = session.get("sdk_session_id")
@@ -1727,7 +1838,7 @@ async def execute_query(
         title = prompt[:50].strip()
         if len(prompt) > 50:
             title += "..."
-        session = database.create_session(
+        session = await async_database.run(database.create_session,
             session_id=session_id,
             profile_id=profile_id,
             project_id=project_id,
@@ -1736,8 +1847,31 @@ async def execute_query(
         )
         resume_id = None
 
-    # Store user message
-    database.add_session_message(
+    # Wait for a slot in the global concurrency budget
+    ticket = await _acquire_query_slot(session_id, api_user_id)
+    try:
+        return await _execute_admitted_query(
+            prompt, profile_id, project_id, overrides, session_id, api_user_id, profile, project, resume_id
+        )
+    finally:
+        request_queue.release(ticket)
+
+
+async def _execute_admitted_query(
+    prompt: str,
+    profile_id: str,
+    project_id: Optional[str],
+    overrides: Optional[Dict[str, Any]],
+    session_id: str,
+    api_user_id: Optional[str],
+    profile: Dict[str, Any],
+    project: Optional[Dict[str, Any]],
+    resume_id: Optional[str]
+) -> Dict[str, Any]:
+    """Run a non-streaming query once admitted (see execute_query)"""
+    # Store user message (after any rows still buffered from the previous turn)
+    await write_behind.barrier()
+    await async_database.run(database.add_session_message,
         session_id=session_id,
         role="user",
         content=prompt
@@ -1824,7 +1958,7 @@ async def execute_query(
 
     # Update session with SDK session ID for resume
     if sdk_session_id:
-        database.update_session(
+        await async_database.run(database.update_session,
             session_id=session_id,
             sdk_session_id=sdk_session_id,
             cost_increment=metadata.get("total_cost_usd", 0),
@@ -1833,29 +1967,12 @@ async def execute_query(
             turn_increment=metadata.get("num_turns", 0)
         )
 
-    # Store tool messages (tool_use and tool_result)
-    for tool_msg in tool_messages:
-        if tool_msg["type"] == "tool_use":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_use",
-                content=f"Using tool: {tool_msg['name']}",
-                tool_name=tool_msg["name"],
-                tool_input=tool_msg.get("input"),
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
-        elif tool_msg["type"] == "tool_result":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_result",
-                content=tool_msg.get("output", ""),
-                tool_name=tool_msg["name"],
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
+    # Queue tool messages (tool_use and tool_result) for write-behind
+    _queue_tool_messages(session_id, tool_messages)
 
-    # Store assistant response
+    # Queue assistant response
     full_response = "\n".join(response_text)
-    database.add_session_message(
+    write_behind.add_session_message(
         session_id=session_id,
         role="assistant",
         content=full_response,
@@ -1863,7 +1980,7 @@ async def execute_query(
     )
 
     # Log usage
-    database.log_usage(
+    write_behind.log_usage(
         session_id=session_id,
         profile_id=profile_id,
         model=metadata.get("model"),
@@ -1872,6 +1989,10 @@ async def execute_query(
         cost_usd=metadata.get("total_cost_usd", 0),
         duration_ms=metadata.get("duration_ms", 0)
     )
+    request_queue.record_duration(metadata.get("duration_ms"))
+
+    # Write the turn's rows (one transaction, per db_write_mode)
+    await write_behind.commit_turn()
 
     return {
         "response": full_response,
@@ -1899,7 +2020,7 @@ async def stream_query(
     """
 
     # Get profile
-    profile = get_profile(profile_id)
+    profile = await async_database.run(get_profile, profile_id)
     if not profile:
         yield {"type": "error", "message": f"Profile not found: {profile_id}"}
         return
@@ -1907,7 +2028,7 @@ async def stream_query(
     # Get project if specified
     project = None
     if project_id:
-        project = database.get_project(project_id)
+        project = await async_database.run(database.get_project, project_id)
         if not project:
             yield {"type": "error", "message": f"Project not found: {project_id}"}
             return
@@ -1917,7 +2038,7 @@ async def stream_query(
     resume_id = None
 
     if session_id:
-        session = database.get_session(session_id)
+        session = await async_database.run(database.get_session, session_id)
         if not session:
             yield {"type": "error", "message": f"Session not found: {session_id}"}
             return
@@ -1929,7 +2050,7 @@ async def stream_query(
         title = prompt[:50].strip()
         if len(prompt) > 50:
             title += "..."
-        session = database.create_session(
+        session = await async_database.run(database.create_session,
             session_id=session_id,
             profile_id=profile_id,
             project_id=project_id,
@@ -1939,8 +2060,38 @@ async def stream_query(
         _is_new_session = True  # Flag available for future analytics/logging
         logger.info(f"Created new session {session_id} with title: {title}")
 
-    # Store user message and broadcast to other devices
-    user_msg = database.add_session_message(
+    # Wait for a slot in the global concurrency budget
+    try:
+        ticket = await _acquire_query_slot(session_id, api_user_id)
+    except AdmissionError as e:
+        yield {"type": "error", "message": str(e)}
+        return
+    try:
+        async for event in _stream_admitted_query(
+            prompt, profile_id, project_id, overrides, session_id, api_user_id, device_id, profile, project, resume_id
+        ):
+            yield event
+    finally:
+        request_queue.release(ticket)
+
+
+async def _stream_admitted_query(
+    prompt: str,
+    profile_id: str,
+    project_id: Optional[str],
+    overrides: Optional[Dict[str, Any]],
+    session_id: str,
+    api_user_id: Optional[str],
+    device_id: Optional[str],
+    profile: Dict[str, Any],
+    project: Optional[Dict[str, Any]],
+    resume_id: Optional[str]
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Stream a query once admitted (see stream_query)"""
+    # Store user message (after any rows still buffered from the previous turn)
+    # and broadcast to other devices
+    await write_behind.barrier()
+    user_msg = await async_database.run(database.add_session_message,
         session_id=session_id,
         role="user",
         content=prompt
@@ -1953,15 +2104,6 @@ async def stream_query(
         source_device_id=device_id
     )
 
-    # Log to sync log for polling fallback
-    database.add_sync_log(
-        session_id=session_id,
-        event_type="message_added",
-        entity_type="message",
-        entity_id=str(user_msg["id"]),
-        data=user_msg
-    )
-
     # Build options with user-scoped credential resolution
     options, agents_dict = build_options_from_profile(
         profile=profile,
@@ -2001,17 +2143,18 @@ async def stream_query(
             cleanup_agents_directory(state.agents_dir, state.written_agent_ids)
         del _active_sessions[session_id]
 
-    # Always create new client
+    # Always use a fresh client (new, or pre-connected from the warm pool)
     logger.info(f"Creating new ClaudeSDKClient for session {session_id} (resume={resume_id is not None})")
     logger.info(f"Options cwd: {options.cwd}")
     logger.info(f"Agents written to filesystem: {written_agent_ids if written_agent_ids else None}")
-    client = ClaudeSDKClient(options=options)
-    logger.info("ClaudeSDKClient created, attempting connect...")
+    clock = stage_timer.clock("query")
 
     # Connect without timeout - Anvil doesn't use timeout for connect()
+    # Agents written to the filesystem need a CLI started after they were written
     try:
-        await client.connect()
-        logger.info(f"Connected to Claude SDK for session {session_id}")
+        client, pooled = await _connect_client(options, use_pool=not written_agent_ids)
+        clock.lap("connect")
+        logger.info(f"Connected to Claude SDK for session {session_id} (pooled={pooled})")
     except Exception as e:
         import traceback
         logger.error(f"Failed to connect to Claude SDK for session {session_id}: {e}")
@@ -2025,7 +2168,8 @@ async def stream_query(
         sdk_session_id=resume_id,
         is_connected=True,
         written_agent_ids=written_agent_ids,
-        agents_dir=agents_dir
+        agents_dir=agents_dir,
+        pooled=pooled
     )
     _active_sessions[session_id] = state
 
@@ -2043,15 +2187,6 @@ async def stream_query(
         source_device_id=device_id
     )
 
-    # Log stream start for polling fallback
-    database.add_sync_log(
-        session_id=session_id,
-        event_type="stream_start",
-        entity_type="message",
-        entity_id=assistant_msg_id,
-        data={"message_id": assistant_msg_id}
-    )
-
     # Execute query
     response_text = []
     tool_messages = []  # Collect tool use/result messages for storage
@@ -2059,10 +2194,16 @@ async def stream_query(
     sdk_session_id = resume_id  # Start with existing SDK session ID if resuming
     interrupted = False
 
+    first_message = True
     try:
+        clock.lap("prepare")
         await state.client.query(prompt)
 
         async for message in state.client.receive_response():
+            if first_message:
+                clock.lap("first_message")
+                first_message = False
+
             if isinstance(message, SystemMessage):
                 # session_id comes in init message data after first query
                 if message.subtype == "init" and "session_id" in message.data:
@@ -2208,7 +2349,7 @@ async def stream_query(
 
     # Update session in database
     if sdk_session_id:
-        database.update_session(
+        await async_database.run(database.update_session,
             session_id=session_id,
             sdk_session_id=sdk_session_id,
             cost_increment=metadata.get("total_cost_usd", 0),
@@ -2218,52 +2359,22 @@ async def stream_query(
         )
         logger.info(f"Updated session {session_id}, sdk_session_id={sdk_session_id}")
 
-    # Store tool messages (tool_use and tool_result)
-    for tool_msg in tool_messages:
-        if tool_msg["type"] == "tool_use":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_use",
-                content=f"Using tool: {tool_msg['name']}",
-                tool_name=tool_msg["name"],
-                tool_input=tool_msg.get("input"),
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
-        elif tool_msg["type"] == "tool_result":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_result",
-                content=tool_msg.get("output", ""),
-                tool_name=tool_msg["name"],
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
+    # Queue tool messages (tool_use and tool_result) for write-behind
+    _queue_tool_messages(session_id, tool_messages)
 
-    # Store assistant response
+    # Queue assistant response
     full_response = "\n".join(response_text)
     if full_response or interrupted or tool_messages:
-        assistant_msg = database.add_session_message(
+        write_behind.add_session_message(
             session_id=session_id,
             role="assistant",
             content=full_response + ("\n[Interrupted]" if interrupted else ""),
             metadata=metadata
         )
 
-        # Log stream end for polling fallback
-        database.add_sync_log(
-            session_id=session_id,
-            event_type="stream_end",
-            entity_type="message",
-            entity_id=str(assistant_msg["id"]),
-            data={
-                "message": assistant_msg,
-                "metadata": metadata,
-                "interrupted": interrupted
-            }
-        )
-
     # Log usage
     if metadata:
-        database.log_usage(
+        write_behind.log_usage(
             session_id=session_id,
             profile_id=profile_id,
             model=metadata.get("model"),
@@ -2272,6 +2383,10 @@ async def stream_query(
             cost_usd=metadata.get("total_cost_usd", 0),
             duration_ms=metadata.get("duration_ms", 0)
         )
+        request_queue.record_duration(metadata.get("duration_ms"))
+
+    # Write the turn's rows (one transaction, per db_write_mode)
+    await write_behind.commit_turn()
 
     # Yield done event (unless already yielded error/interrupted)
     if not interrupted:
@@ -2303,8 +2418,10 @@ async def _run_background_query(
 
     All events are broadcast via sync_engine for WebSocket delivery.
     """
-    # Store user message and broadcast to other devices
-    user_msg = database.add_session_message(
+    # Store user message (after any rows still buffered from the previous turn)
+    # and broadcast to other devices
+    await write_behind.barrier()
+    user_msg = await async_database.run(database.add_session_message,
         session_id=session_id,
         role="user",
         content=prompt
@@ -2317,15 +2434,44 @@ async def _run_background_query(
         source_device_id=device_id
     )
 
-    # Log to sync log for polling fallback
-    database.add_sync_log(
-        session_id=session_id,
-        event_type="message_added",
-        entity_type="message",
-        entity_id=str(user_msg["id"]),
-        data=user_msg
-    )
+    # Wait for a slot in the global concurrency budget
+    _queued_queries[session_id] = asyncio.current_task()
+    try:
+        ticket = await _acquire_query_slot(session_id, api_user_id)
+    except (AdmissionError, asyncio.CancelledError) as e:
+        # Rejected, or interrupted while waiting
+        logger.info(f"[Background] Query for session {session_id} not run: {e or 'interrupted'}")
+        await sync_engine.broadcast_stream_end(
+            session_id=session_id,
+            message_id=message_id or f"error-{session_id}",
+            metadata={"error": str(e)} if isinstance(e, AdmissionError) else {},
+            interrupted=True,
+            source_device_id=device_id
+        )
+        return
+    finally:
+        _queued_queries.pop(session_id, None)
 
+    try:
+        await _run_admitted_background_query(
+            session_id, prompt, profile, project, overrides, resume_id, device_id, api_user_id, message_id
+        )
+    finally:
+        request_queue.release(ticket)
+
+
+async def _run_admitted_background_query(
+    session_id: str,
+    prompt: str,
+    profile: Dict[str, Any],
+    project: Optional[Dict[str, Any]],
+    overrides: Optional[Dict[str, Any]],
+    resume_id: Optional[str],
+    device_id: Optional[str],
+    api_user_id: Optional[str],
+    message_id: Optional[str]
+):
+    """Run a background query once admitted (see _run_background_query)"""
     # Build options with user-scoped credential resolution
     options, agents_dict = build_options_from_profile(
         profile=profile,
@@ -2357,15 +2503,16 @@ async def _run_background_query(
             cleanup_agents_directory(state.agents_dir, state.written_agent_ids)
         del _active_sessions[session_id]
 
-    # Always create new client
+    # Always use a fresh client (new, or pre-connected from the warm pool)
     logger.info(f"[Background] Creating new ClaudeSDKClient for session {session_id} (resume={resume_id is not None})")
     logger.info(f"[Background] Agents written to filesystem: {written_agent_ids if written_agent_ids else None}")
-    client = ClaudeSDKClient(options=options)
+    clock = stage_timer.clock("query")
 
     # Connect
     try:
-        await client.connect()
-        logger.info(f"[Background] Connected to Claude SDK for session {session_id}")
+        client, pooled = await _connect_client(options, use_pool=not written_agent_ids)
+        clock.lap("connect")
+        logger.info(f"[Background] Connected to Claude SDK for session {session_id} (pooled={pooled})")
     except Exception as e:
         logger.error(f"[Background] Failed to connect to Claude SDK for session {session_id}: {e}")
         # Broadcast error
@@ -2383,7 +2530,8 @@ async def _run_background_query(
         sdk_session_id=resume_id,
         is_connected=True,
         written_agent_ids=written_agent_ids,
-        agents_dir=agents_dir
+        agents_dir=agents_dir,
+        pooled=pooled
     )
     _active_sessions[session_id] = state
 
@@ -2404,14 +2552,8 @@ async def _run_background_query(
             source_device_id=None  # Don't exclude any device - all should see it
         )
 
-    # Log stream start for polling fallback
-    database.add_sync_log(
-        session_id=session_id,
-        event_type="stream_start",
-        entity_type="message",
-        entity_id=assistant_msg_id,
-        data={"message_id": assistant_msg_id}
-    )
+    # Interrupts from other workers are routed here
+    await sync_engine.claim_session(session_id)
 
     # Execute query
     response_text = []
@@ -2420,10 +2562,16 @@ async def _run_background_query(
     sdk_session_id = resume_id
     interrupted = False
 
+    first_message = True
     try:
+        clock.lap("prepare")
         await state.client.query(prompt)
 
         async for message in state.client.receive_response():
+            if first_message:
+                clock.lap("first_message")
+                first_message = False
+
             if isinstance(message, SystemMessage):
                 if message.subtype == "init" and "session_id" in message.data:
                     sdk_session_id = message.data["session_id"]
@@ -2541,6 +2689,7 @@ async def _run_background_query(
         state.is_streaming = False
         state.last_activity = datetime.now()
         state.background_task = None
+        await sync_engine.release_session(session_id)
 
         # Broadcast stream end to all devices
         await sync_engine.broadcast_stream_end(
@@ -2553,7 +2702,7 @@ async def _run_background_query(
 
     # Update session in database
     if sdk_session_id:
-        database.update_session(
+        await async_database.run(database.update_session,
             session_id=session_id,
             sdk_session_id=sdk_session_id,
             cost_increment=metadata.get("total_cost_usd", 0),
@@ -2563,52 +2712,22 @@ async def _run_background_query(
         )
         logger.info(f"[Background] Updated session {session_id}, sdk_session_id={sdk_session_id}")
 
-    # Store tool messages (tool_use and tool_result)
-    for tool_msg in tool_messages:
-        if tool_msg["type"] == "tool_use":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_use",
-                content=f"Using tool: {tool_msg['name']}",
-                tool_name=tool_msg["name"],
-                tool_input=tool_msg.get("input"),
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
-        elif tool_msg["type"] == "tool_result":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_result",
-                content=tool_msg.get("output", ""),
-                tool_name=tool_msg["name"],
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
+    # Queue tool messages (tool_use and tool_result) for write-behind
+    _queue_tool_messages(session_id, tool_messages)
 
-    # Store assistant response
+    # Queue assistant response
     full_response = "\n".join(response_text)
     if full_response or interrupted or tool_messages:
-        assistant_msg = database.add_session_message(
+        write_behind.add_session_message(
             session_id=session_id,
             role="assistant",
             content=full_response + ("\n[Interrupted]" if interrupted else ""),
             metadata=metadata
         )
 
-        # Log stream end for polling fallback
-        database.add_sync_log(
-            session_id=session_id,
-            event_type="stream_end",
-            entity_type="message",
-            entity_id=str(assistant_msg["id"]),
-            data={
-                "message": assistant_msg,
-                "metadata": metadata,
-                "interrupted": interrupted
-            }
-        )
-
     # Log usage
     if metadata and not metadata.get("error"):
-        database.log_usage(
+        write_behind.log_usage(
             session_id=session_id,
             profile_id=profile["id"],
             model=metadata.get("model"),
@@ -2617,6 +2736,10 @@ async def _run_background_query(
             cost_usd=metadata.get("total_cost_usd", 0),
             duration_ms=metadata.get("duration_ms", 0)
         )
+        request_queue.record_duration(metadata.get("duration_ms"))
+
+    # Write the turn's rows (one transaction, per db_write_mode)
+    await write_behind.commit_turn()
 
     logger.info(f"[Background] Query completed for session {session_id}")
 
@@ -2637,14 +2760,14 @@ async def start_background_query(
     Use interrupt_session() to stop.
     """
     # Get profile
-    profile = get_profile(profile_id)
+    profile = await async_database.run(get_profile, profile_id)
     if not profile:
         raise ValueError(f"Profile not found: {profile_id}")
 
     # Get project if specified
     project = None
     if project_id:
-        project = database.get_project(project_id)
+        project = await async_database.run(database.get_project, project_id)
         if not project:
             raise ValueError(f"Project not found: {project_id}")
 
@@ -2652,7 +2775,7 @@ async def start_background_query(
     resume_id = None
 
     if session_id:
-        session = database.get_session(session_id)
+        session = await async_database.run(database.get_session, session_id)
         if not session:
             raise ValueError(f"Session not found: {session_id}")
         resume_id = session.get("sdk_session_id")
@@ -2662,7 +2785,7 @@ async def start_background_query(
         title = prompt[:50].strip()
         if len(prompt) > 50:
             title += "..."
-        session = database.create_session(
+        session = await async_database.run(database.create_session,
             session_id=session_id,
             profile_id=profile_id,
             project_id=project_id,
@@ -2729,6 +2852,12 @@ async def interrupt_session(session_id: str) -> bool:
     """
     state = _active_sessions.get(session_id)
     if not state:
+        queued = _queued_queries.get(session_id)
+        if queued is not None:
+            # Still waiting for admission: give up the place in the queue
+            queued.cancel()
+            logger.info(f"Cancelled queued query for session {session_id}")
+            return True
         logger.warning(f"No active session found for {session_id}")
         return False
 
@@ -2807,7 +2936,7 @@ async def stream_to_websocket(
         api_user_id: Optional API user ID for user-specific credential resolution
     """
     # Get profile
-    profile = get_profile(profile_id)
+    profile = await async_database.run(get_profile, profile_id)
     if not profile:
         yield {"type": "error", "message": f"Profile not found: {profile_id}"}
         return
@@ -2815,15 +2944,43 @@ async def stream_to_websocket(
     # Get project if specified
     project = None
     if project_id:
-        project = database.get_project(project_id)
+        project = await async_database.run(database.get_project, project_id)
         if not project:
             yield {"type": "error", "message": f"Project not found: {project_id}"}
             return
 
     # Get session for resume ID
-    session = database.get_session(session_id)
+    session = await async_database.run(database.get_session, session_id)
     resume_id = session.get("sdk_session_id") if session else None
 
+    # Wait for a slot in the global concurrency budget
+    try:
+        ticket = await _acquire_query_slot(session_id, api_user_id, broadcast_func)
+    except AdmissionError as e:
+        yield {"type": "error", "message": str(e)}
+        return
+    try:
+        async for event in _stream_admitted_to_websocket(
+            prompt, session_id, profile_id, project_id, overrides, broadcast_func, api_user_id, profile, project, resume_id
+        ):
+            yield event
+    finally:
+        request_queue.release(ticket)
+
+
+async def _stream_admitted_to_websocket(
+    prompt: str,
+    session_id: str,
+    profile_id: str,
+    project_id: Optional[str],
+    overrides: Optional[Dict[str, Any]],
+    broadcast_func: Optional[callable],
+    api_user_id: Optional[str],
+    profile: Dict[str, Any],
+    project: Optional[Dict[str, Any]],
+    resume_id: Optional[str]
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Stream a query to the WebSocket once admitted (see stream_to_websocket)"""
     # Determine permission mode
     config = profile.get("config", {})
     permission_mode = overrides.get("permission_mode") if overrides else None
@@ -2954,17 +3111,17 @@ async def stream_to_websocket(
             cleanup_agents_directory(state.agents_dir, state.written_agent_ids)
         del _active_sessions[session_id]
 
-    # Create new client
+    # Use a fresh client (new, or pre-connected from the warm pool)
     logger.info(f"[WS] Creating ClaudeSDKClient for session {session_id} (resume={resume_id is not None}, include_partial={options.include_partial_messages})")
     logger.info(f"[WS] Options cwd: {options.cwd}")
     logger.info(f"[WS] Agents written to filesystem: {written_agent_ids if written_agent_ids else None}")
-    client = ClaudeSDKClient(options=options)
-    logger.info("[WS] ClaudeSDKClient created, attempting connect...")
+    clock = stage_timer.clock("query")
 
     # Connect
     try:
-        await client.connect()
-        logger.info(f"[WS] Connected to Claude SDK for session {session_id}")
+        client, pooled = await _connect_client(options, use_pool=not written_agent_ids)
+        clock.lap("connect")
+        logger.info(f"[WS] Connected to Claude SDK for session {session_id} (pooled={pooled})")
     except Exception as e:
         import traceback
         logger.error(f"[WS] Failed to connect for session {session_id}: {e}")
@@ -2978,7 +3135,8 @@ async def stream_to_websocket(
         sdk_session_id=resume_id,
         is_connected=True,
         written_agent_ids=written_agent_ids,
-        agents_dir=agents_dir
+        agents_dir=agents_dir,
+        pooled=pooled
     )
     _active_sessions[session_id] = state
 
@@ -2999,11 +3157,13 @@ async def stream_to_websocket(
     include_partial = options.include_partial_messages  # Track if streaming events are enabled
 
     # Inject knowledge base context if project has knowledge documents
-    # This prepends relevant context to the user's prompt based on keyword matching
+    # This prepends the best BM25 matches for the prompt (index lookups and
+    # any rebuild run on the reader pool, off the event loop)
     enhanced_prompt = prompt
     if project_id:
         try:
-            relevant_context = knowledge_service.get_relevant_context(
+            relevant_context = await async_database.run_read(
+                knowledge_service.get_relevant_context,
                 project_id=project_id,
                 query=prompt,
                 max_chunks=5,
@@ -3017,10 +3177,16 @@ async def stream_to_websocket(
             logger.warning(f"[WS] Failed to retrieve knowledge context: {e}")
             # Continue without knowledge context
 
+    first_message = True
     try:
+        clock.lap("prepare")
         await state.client.query(enhanced_prompt)
 
         async for message in state.client.receive_response():
+            if first_message:
+                clock.lap("first_message")
+                first_message = False
+
             # Check for interrupt request as a failsafe
             if state.interrupt_requested:
                 logger.info(f"[WS] Interrupt flag detected for session {session_id}, breaking out of loop")
@@ -3357,7 +3523,7 @@ async def stream_to_websocket(
     if len(prompt) > 50:
         title += "..."
 
-    database.update_session(
+    await async_database.run(database.update_session,
         session_id=session_id,
         sdk_session_id=sdk_session_id,
         title=title,
@@ -3368,30 +3534,13 @@ async def stream_to_websocket(
     )
     logger.info(f"[WS] Updated session {session_id}, sdk_session_id={sdk_session_id}, title={title}")
 
-    # Store tool messages (tool_use and tool_result)
-    for tool_msg in tool_messages:
-        if tool_msg["type"] == "tool_use":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_use",
-                content=f"Using tool: {tool_msg['name']}",
-                tool_name=tool_msg["name"],
-                tool_input=tool_msg.get("input"),
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
-        elif tool_msg["type"] == "tool_result":
-            database.add_session_message(
-                session_id=session_id,
-                role="tool_result",
-                content=tool_msg.get("output", ""),
-                tool_name=tool_msg["name"],
-                metadata={"tool_id": tool_msg.get("tool_id")}
-            )
+    # Queue tool messages (tool_use and tool_result) for write-behind
+    _queue_tool_messages(session_id, tool_messages)
 
-    # Store assistant response
+    # Queue assistant response
     full_response = "".join(response_text)
     if full_response or tool_messages or interrupted:
-        database.add_session_message(
+        write_behind.add_session_message(
             session_id=session_id,
             role="assistant",
             content=full_response + ("\n\n[Interrupted]" if interrupted else ""),
@@ -3400,7 +3549,7 @@ async def stream_to_websocket(
 
     # Log usage
     if metadata:
-        database.log_usage(
+        write_behind.log_usage(
             session_id=session_id,
             profile_id=profile_id,
             model=metadata.get("model"),
@@ -3409,6 +3558,10 @@ async def stream_to_websocket(
             cost_usd=metadata.get("total_cost_usd", 0),
             duration_ms=metadata.get("duration_ms", 0)
         )
+        request_queue.record_duration(metadata.get("duration_ms"))
+
+    # Write the turn's rows (one transaction, per db_write_mode)
+    await write_behind.commit_turn()
 
     # Yield done or interrupted event
     if interrupted:
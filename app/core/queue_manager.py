@@ -1,21 +1,53 @@
 """
 Request queue manager for AI Hub.
 
-Manages a priority queue for requests that exceed rate limits.
-Higher priority users are processed first.
+Admission control for queries: at most query_max_concurrent queries (each
+running its own SDK client) execute at once. Further queries wait in a
+queue until a running one releases its slot.
+
+- Weighted fair queuing across users: each user's share of admissions is
+  proportional to the weight of its RateLimitConfig.priority (priority + 1,
+  or 1 / (1 - priority) below zero). Requests are tagged with a virtual
+  finish time on arrival (self-clocked fair queuing), so a user with many
+  queued requests cannot starve the others, and among users with a single
+  request the higher priority goes first.
+- Removing a request (cancelled while queued) only marks it; it is
+  skipped when it reaches the top of the heap.
+- Wait estimates use a rolling average of real query durations
+  (usage_log.duration_ms), seeded from the database on startup.
+- Queued requests are told their position whenever it changes, which
+  query_engine pushes to the session's WebSocket devices.
 """
 
 import asyncio
 import heapq
+import inspect
+import itertools
 import logging
+import math
+import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db import database, async_database
 
 logger = logging.getLogger(__name__)
 
 
+class AdmissionError(Exception):
+    """Raised when a query cannot be admitted (the queue is full or was cleared)"""
+    pass
+
+
+def _weight(priority: int) -> float:
+    """Share of admissions relative to priority 0"""
+    return priority + 1 if priority >= 0 else 1 / (1 - priority)
+
+
 @dataclass
 class QueuedRequest:
     """A request waiting in the queue"""
@@ -26,8 +58,16 @@ class QueuedRequest:
     created_at: datetime
     request_data: Dict[str, Any]
     callback: Optional[Callable] = None
-    # For heap comparison (lower = higher priority since heapq is min-heap)
-    _sort_key: Tuple[int, datetime] = field(init=False, repr=False)
+    # Called with a QueueStatus whenever the request's position changes
+    on_update: Optional[Callable[["QueueStatus"], Awaitable[None]]] = None
+    # For heap comparison (lower = higher priority since heapq is min-heap).
+    # RequestQueue replaces it with (virtual finish time, arrival order).
+    _sort_key: Tuple[Any, Any] = field(init=False, repr=False)
+    # Set by RequestQueue
+    removed: bool = field(default=False, init=False, repr=False)
+    _user_key: str = field(default="", init=False, repr=False)
+    _waiter: Optional[asyncio.Future] = field(default=None, init=False, repr=False)
+    _last_position: int = field(default=0, init=False, repr=False)
 
     def __post_init__(self):
         # Negative priority so higher priority is popped first
@@ -53,25 +93,51 @@ class QueueStatus:
 
 class RequestQueue:
     """
-    Priority queue for rate-limited requests.
+    Weighted fair queue and concurrency budget for queries.
 
     Features:
-    - Priority-based ordering (higher priority users first)
+    - Global budget of running queries (acquire/release)
+    - Weighted fair queuing across users by priority
     - FIFO within same priority level
     - Maximum queue size limit
-    - Estimated wait time calculation
+    - Estimated wait time from recent query durations
+    - O(log n) removal by lazy deletion
+
+    acquire() queues as many requests as a user makes; release() admits
+    the next. enqueue()/dequeue() manage the queue by hand and keep one
+    request per user. When a request queued with enqueue() reaches the
+    front of a draining queue, it is admitted by calling its callback (whose
+    owner must then release() its id); without a callback it only held a
+    place in line and is dropped.
     """
 
     DEFAULT_MAX_SIZE = 100
-    DEFAULT_ESTIMATED_PROCESS_TIME = 30  # seconds per request
+    DEFAULT_ESTIMATED_PROCESS_TIME = 30  # seconds per request, until durations are known
 
-    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
-        self._queue: List[QueuedRequest] = []  # heapq
-        self._user_requests: Dict[str, str] = {}  # user_key -> request_id
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, max_active: Optional[int] = None):
+        self._queue: List[QueuedRequest] = []  # heapq; removed requests are skipped when popped
+        self._user_requests: Dict[str, str] = {}  # user_key -> oldest queued request_id
+        self._user_backlog: Dict[str, Deque[str]] = {}  # user_key -> later request_ids
         self._request_map: Dict[str, QueuedRequest] = {}  # request_id -> request
         self._max_size = max_size
         self._lock = asyncio.Lock()
         self._process_time_estimate = self.DEFAULT_ESTIMATED_PROCESS_TIME
+        self._durations: Deque[float] = deque(maxlen=max(1, settings.query_duration_samples))
+
+        # Fair queuing
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}  # user_key -> finish tag of its last request
+        self._arrivals = itertools.count()
+
+        # Admission
+        self._max_active = settings.query_max_concurrent if max_active is None else max_active
+        self._active: Dict[str, float] = {}  # ticket -> monotonic time admitted
+        self._tasks: set = set()
+
+        # Metrics
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
 
     def _get_user_key(self, user_id: Optional[str], api_key_id: Optional[str]) -> str:
         """Generate a unique key for the user/API key"""
@@ -82,6 +148,229 @@ class RequestQueue:
         else:
             return f"anon:{uuid.uuid4()}"
 
+    # -------------------------------------------------------------------------
+    # Queue internals (no awaits: atomic on the event loop)
+    # -------------------------------------------------------------------------
+
+    def _push(
+        self,
+        user_key: str,
+        user_id: Optional[str],
+        api_key_id: Optional[str],
+        priority: int,
+        request_data: Dict[str, Any],
+        callback: Optional[Callable] = None,
+        on_update: Optional[Callable[[QueueStatus], Awaitable[None]]] = None
+    ) -> QueuedRequest:
+        request = QueuedRequest(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            api_key_id=api_key_id,
+            priority=priority,
+            created_at=datetime.utcnow(),
+            request_data=request_data,
+            callback=callback,
+            on_update=on_update
+        )
+        start = max(self._virtual_time, self._last_finish.get(user_key, 0.0))
+        finish = start + 1 / _weight(priority)
+        self._last_finish[user_key] = finish
+        request._sort_key = (finish, next(self._arrivals))
+        request._user_key = user_key
+
+        # Every request gets its own heap entry; only the per-user lookup
+        # (oldest request plus backlog) is keyed by user
+        heapq.heappush(self._queue, request)
+        self._request_map[request.id] = request
+        if user_key in self._user_requests:
+            self._user_backlog.setdefault(user_key, deque()).append(request.id)
+        else:
+            self._user_requests[user_key] = request.id
+        return request
+
+    def _forget(self, request: QueuedRequest) -> None:
+        """Drop a request from the lookup tables (its heap entry may remain)"""
+        self._request_map.pop(request.id, None)
+        user_key = request._user_key
+        if self._user_requests.get(user_key) != request.id:
+            return
+        del self._user_requests[user_key]
+        backlog = self._user_backlog.get(user_key)
+        while backlog:
+            next_id = backlog.popleft()
+            if next_id in self._request_map:
+                self._user_requests[user_key] = next_id
+                break
+        if not backlog:
+            self._user_backlog.pop(user_key, None)
+
+    def _pop_next(self) -> Optional[QueuedRequest]:
+        while self._queue:
+            request = heapq.heappop(self._queue)
+            if request.removed:
+                continue
+            self._virtual_time = max(self._virtual_time, request._sort_key[0])
+            self._forget(request)
+            if len(self._last_finish) > 2 * max(self._max_size, len(self._request_map)):
+                # Users whose last tag has passed start from the virtual time anyway
+                self._last_finish = {k: v for k, v in self._last_finish.items() if v > self._virtual_time}
+            return request
+        return None
+
+    def _discard(self, request: QueuedRequest) -> None:
+        request.removed = True
+        self._forget(request)
+        while self._queue and self._queue[0].removed:
+            heapq.heappop(self._queue)
+
+    def _live(self) -> List[QueuedRequest]:
+        """Queued requests in admission order"""
+        return sorted(r for r in self._queue if not r.removed)
+
+    def _estimate_wait(self, position: int) -> int:
+        slots = self._max_active if self._max_active > 0 else 1
+        return math.ceil(position / slots) * self._process_time_estimate
+
+    def _spawn(self, awaitable: Awaitable) -> None:
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_update(self, request: QueuedRequest, status: QueueStatus) -> None:
+        try:
+            await request.on_update(status)
+        except Exception as e:
+            logger.debug(f"Queue position update for request {request.id} failed: {e}")
+
+    def _notify_positions(self) -> None:
+        """Tell waiting requests whose position changed"""
+        if not any(r.on_update is not None for r in self._request_map.values()):
+            return
+        total = len(self._request_map)
+        for position, request in enumerate(self._live(), 1):
+            if request.on_update is None or request._last_position == position:
+                continue
+            request._last_position = position
+            status = QueueStatus(
+                position=position,
+                estimated_wait_seconds=self._estimate_wait(position),
+                total_queued=total,
+                is_queued=True
+            )
+            self._spawn(self._send_update(request, status))
+
+    def _admit(self, ticket: str) -> str:
+        self._active[ticket] = time.monotonic()
+        self.admitted += 1
+        return ticket
+
+    def _dispatch(self) -> None:
+        """Admit queued requests while the budget has room"""
+        while self._max_active <= 0 or len(self._active) < self._max_active:
+            request = self._pop_next()
+            if request is None:
+                break
+            if request._waiter is not None:
+                if request._waiter.done():
+                    continue  # Cancelled while queued
+                self._admit(request.id)
+                request._waiter.set_result(request.id)
+            elif request.callback is not None:
+                self._admit(request.id)
+                result = request.callback(request)
+                if inspect.isawaitable(result):
+                    self._spawn(result)
+            else:
+                continue  # Only held a place in line
+            logger.info(f"Admitted request {request.id} for user {request._user_key}")
+        self._notify_positions()
+
+    # -------------------------------------------------------------------------
+    # Admission
+    # -------------------------------------------------------------------------
+
+    async def acquire(
+        self,
+        user_id: Optional[str],
+        api_key_id: Optional[str],
+        priority: int = 0,
+        request_data: Optional[Dict[str, Any]] = None,
+        on_update: Optional[Callable[[QueueStatus], Awaitable[None]]] = None
+    ) -> str:
+        """
+        Wait for a slot in the concurrency budget.
+
+        Admits at once while there is room and nobody is waiting; otherwise
+        the request is queued until release() frees a slot for it, and
+        on_update is called whenever its position changes.
+
+        Returns:
+            The ticket to pass to release()
+
+        Raises:
+            AdmissionError: If the queue is full or was cleared
+        """
+        async with self._lock:
+            if self._max_active <= 0 or (len(self._active) < self._max_active and not self._request_map):
+                return self._admit(str(uuid.uuid4()))
+
+            if len(self._request_map) >= self._max_size:
+                self.rejected += 1
+                logger.warning(f"Queue full ({self._max_size}), rejecting request")
+                raise AdmissionError("Too many requests are waiting to run, please try again later")
+
+            user_key = self._get_user_key(user_id, api_key_id)
+            request = self._push(user_key, user_id, api_key_id, priority, request_data or {}, on_update=on_update)
+            request._waiter = asyncio.get_running_loop().create_future()
+            self.waited += 1
+            logger.info(
+                f"Queued request {request.id} for user {user_key} "
+                f"(priority={priority}, running={len(self._active)}/{self._max_active})"
+            )
+            self._dispatch()
+
+        try:
+            return await request._waiter
+        except asyncio.CancelledError:
+            waiter = request._waiter
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Admitted just as the caller gave up
+                self.release(waiter.result())
+            else:
+                self._discard(request)
+                self._notify_positions()
+            raise
+
+    def release(self, ticket: str) -> None:
+        """Free the slot of an admitted request (ticket from acquire()) and admit the next one"""
+        if self._active.pop(ticket, None) is None:
+            return
+        self._dispatch()
+
+    def record_duration(self, duration_ms: Optional[float]) -> None:
+        """Add a query duration (as logged to usage_log) to the wait estimate average"""
+        if not duration_ms or duration_ms <= 0:
+            return
+        self._durations.append(duration_ms / 1000)
+        self._process_time_estimate = max(1, round(sum(self._durations) / len(self._durations)))
+
+    async def load_durations(self) -> int:
+        """Seed wait estimates from recent queries in usage_log; returns how many"""
+        durations = await async_database.run(database.get_recent_query_durations, self._durations.maxlen)
+        # Newest first; add oldest first so the newest stay in the window
+        for duration_ms in reversed(durations):
+            self.record_duration(duration_ms)
+        return len(durations)
+
+    def set_max_active(self, max_active: int) -> None:
+        """Update the number of queries allowed to run at once (0 = unlimited)"""
+        self._max_active = max_active
+        self._dispatch()
+
+    # -------------------------------------------------------------------------
+    # Queue operations
+    # -------------------------------------------------------------------------
+
     async def enqueue(
         self,
         user_id: Optional[str],
@@ -105,7 +394,7 @@ class RequestQueue:
         """
         async with self._lock:
             # Check queue size limit
-            if len(self._queue) >= self._max_size:
+            if len(self._request_map) >= self._max_size:
                 logger.warning(f"Queue full ({self._max_size}), rejecting request")
                 return None
 
@@ -117,47 +406,24 @@ class RequestQueue:
                 logger.debug(f"User {user_key} already has request {existing_id} queued")
                 return existing_id
 
-            # Create queued request
-            request_id = str(uuid.uuid4())
-            request = QueuedRequest(
-                id=request_id,
-                user_id=user_id,
-                api_key_id=api_key_id,
-                priority=priority,
-                created_at=datetime.utcnow(),
-                request_data=request_data,
-                callback=callback
-            )
-
-            # Add to heap
-            heapq.heappush(self._queue, request)
-            self._user_requests[user_key] = request_id
-            self._request_map[request_id] = request
+            request = self._push(user_key, user_id, api_key_id, priority, request_data, callback)
 
-            logger.info(f"Queued request {request_id} for user {user_key} (priority={priority})")
-            return request_id
+            logger.info(f"Queued request {request.id} for user {user_key} (priority={priority})")
+            return request.id
 
     async def dequeue(self) -> Optional[QueuedRequest]:
         """
         Get the next request from the queue.
 
         Returns:
-            The highest priority request, or None if queue is empty
+            The next request in fair-queuing order, or None if queue is empty
         """
         async with self._lock:
-            if not self._queue:
+            request = self._pop_next()
+            if request is None:
                 return None
 
-            request = heapq.heappop(self._queue)
-            user_key = self._get_user_key(request.user_id, request.api_key_id)
-
-            # Clean up tracking
-            if user_key in self._user_requests:
-                del self._user_requests[user_key]
-            if request.id in self._request_map:
-                del self._request_map[request.id]
-
-            logger.info(f"Dequeued request {request.id} for user {user_key}")
+            logger.info(f"Dequeued request {request.id} for user {request._user_key}")
             return request
 
     async def remove(self, request_id: str) -> bool:
@@ -171,20 +437,14 @@ class RequestQueue:
             True if removed, False if not found
         """
         async with self._lock:
-            if request_id not in self._request_map:
+            request = self._request_map.get(request_id)
+            if request is None:
                 return False
 
-            request = self._request_map[request_id]
-            user_key = self._get_user_key(request.user_id, request.api_key_id)
-
-            # Remove from heap (inefficient but necessary)
-            self._queue = [r for r in self._queue if r.id != request_id]
-            heapq.heapify(self._queue)
-
-            # Clean up tracking
-            if user_key in self._user_requests:
-                del self._user_requests[user_key]
-            del self._request_map[request_id]
+            self._discard(request)
+            if request._waiter is not None and not request._waiter.done():
+                request._waiter.set_exception(AdmissionError("The request was removed from the queue"))
+            self._notify_positions()
 
             logger.info(f"Removed request {request_id} from queue")
             return True
@@ -207,46 +467,34 @@ class RequestQueue:
         async with self._lock:
             user_key = self._get_user_key(user_id, api_key_id)
 
-            if user_key not in self._user_requests:
-                return QueueStatus(
-                    position=0,
-                    estimated_wait_seconds=0,
-                    total_queued=len(self._queue),
-                    is_queued=False
-                )
-
-            request_id = self._user_requests[user_key]
-            request = self._request_map.get(request_id)
+            request_id = self._user_requests.get(user_key)
+            request = self._request_map.get(request_id) if request_id else None
 
             if not request:
                 return QueueStatus(
                     position=0,
                     estimated_wait_seconds=0,
-                    total_queued=len(self._queue),
+                    total_queued=len(self._request_map),
                     is_queued=False
                 )
 
             # Calculate position (count requests ahead)
-            position = 1
-            for queued in self._queue:
-                if queued.id == request_id:
-                    break
-                if queued._sort_key < request._sort_key:
-                    position += 1
-
-            estimated_wait = position * self._process_time_estimate
+            position = 1 + sum(
+                1 for queued in self._queue
+                if not queued.removed and queued._sort_key < request._sort_key
+            )
 
             return QueueStatus(
                 position=position,
-                estimated_wait_seconds=estimated_wait,
-                total_queued=len(self._queue),
+                estimated_wait_seconds=self._estimate_wait(position),
+                total_queued=len(self._request_map),
                 is_queued=True
             )
 
     async def get_queue_size(self) -> int:
         """Get the current queue size"""
         async with self._lock:
-            return len(self._queue)
+            return len(self._request_map)
 
     async def is_user_queued(
         self,
@@ -260,9 +508,13 @@ class RequestQueue:
     async def clear(self) -> int:
         """Clear all requests from the queue. Returns count of cleared requests."""
         async with self._lock:
-            count = len(self._queue)
+            count = len(self._request_map)
+            for request in self._request_map.values():
+                if request._waiter is not None and not request._waiter.done():
+                    request._waiter.set_exception(AdmissionError("The queue was cleared"))
             self._queue.clear()
             self._user_requests.clear()
+            self._user_backlog.clear()
             self._request_map.clear()
             logger.info(f"Cleared {count} requests from queue")
             return count
@@ -275,6 +527,17 @@ class RequestQueue:
         """Update the estimated processing time per request"""
         self._process_time_estimate = seconds
 
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._active),
+            "max_running": self._max_active,
+            "queued": len(self._request_map),
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "estimated_query_seconds": self._process_time_estimate,
+        }
+
 
 # Global queue manager instance
 request_queue = RequestQueue()
@@ -1,8 +1,16 @@
 """
 Rate limiter service for AI Hub.
 
-Provides per-user rate limiting using a sliding window algorithm.
-Uses in-memory tracking for speed with database persistence for configuration.
+Provides per-user rate limiting using sliding windows of bucketed counters:
+each user/API key has rings of per-second, per-minute and per-5-minute
+counts covering the last minute, hour and day. Recording a request and
+checking the limits are O(1) with a fixed amount of memory per key,
+however many requests it makes. Windows are exact to the bucket width and
+err on the side of counting slightly older requests.
+
+Counts are kept in memory and periodically persisted to the
+rate_limit_buckets table (rate_limit_persist_seconds), so limits survive a
+restart. Configuration is stored in the database.
 """
 
 import asyncio
@@ -12,9 +20,10 @@ from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
-from app.db import database
+from app.core.config import settings
+from app.db import database, async_database
 
 logger = logging.getLogger(__name__)
 
@@ -55,15 +64,95 @@ class RateLimitStatus:
     retry_after: int = 0  # seconds
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_seconds(timestamp: datetime) -> float:
+    """Seconds since the epoch of a naive UTC datetime"""
+    return (timestamp - _EPOCH).total_seconds()
+
+
+class BucketRing:
+    """
+    Event counts in fixed-width time buckets.
+
+    Holds the last `size` buckets; older ones are zeroed as time advances.
+    total is kept up to date, so the count over the whole ring is O(1).
+    """
+
+    __slots__ = ("width", "counts", "head", "total")
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.counts = [0] * size
+        self.head: Optional[int] = None  # Newest bucket number
+        self.total = 0
+
+    def _advance(self, bucket: int) -> None:
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        size = len(self.counts)
+        if bucket - self.head >= size:
+            self.counts = [0] * size
+            self.total = 0
+        else:
+            for expired in range(self.head + 1, bucket + 1):
+                index = expired % size
+                self.total -= self.counts[index]
+                self.counts[index] = 0
+        self.head = bucket
+
+    def add(self, at: float, count: int = 1) -> None:
+        bucket = int(at // self.width)
+        self._advance(bucket)
+        if bucket <= self.head - len(self.counts):
+            return  # Older than the ring
+        self.counts[bucket % len(self.counts)] += count
+        self.total += count
+
+    def total_at(self, at: float) -> int:
+        """Events in the ring once it has advanced to `at`"""
+        self._advance(int(at // self.width))
+        return self.total
+
+    def count_between(self, since: float, at: float) -> int:
+        """Events in the buckets from `since` to `at` (O(size))"""
+        self._advance(int(at // self.width))
+        if self.head is None:
+            return 0
+        first = max(int(since // self.width), self.head - len(self.counts) + 1)
+        return sum(self.counts[b % len(self.counts)] for b in range(first, self.head + 1))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"head": self.head, "counts": self.counts}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        counts = data.get("counts") or []
+        if len(counts) != len(self.counts):
+            return  # Saved with a different layout; start empty
+        self.counts = [int(c) for c in counts]
+        self.head = data.get("head")
+        self.total = sum(self.counts)
+
+
 @dataclass
 class RequestWindow:
-    """Sliding window for tracking requests"""
-    timestamps: List[datetime] = field(default_factory=list)
+    """Sliding windows of request counts for one user or API key"""
+    # One bucket more than the window, so a full window is always covered
+    minute: BucketRing = field(default_factory=lambda: BucketRing(1, 61))
+    hour: BucketRing = field(default_factory=lambda: BucketRing(60, 61))
+    day: BucketRing = field(default_factory=lambda: BucketRing(300, 289))
     concurrent_count: int = 0
 
     def add_request(self, timestamp: datetime) -> None:
         """Add a request timestamp"""
-        self.timestamps.append(timestamp)
+        at = _to_seconds(timestamp)
+        self.minute.add(at)
+        self.hour.add(at)
+        self.day.add(at)
         self.concurrent_count += 1
 
     def complete_request(self) -> None:
@@ -71,21 +160,43 @@ class RequestWindow:
         if self.concurrent_count > 0:
             self.concurrent_count -= 1
 
-    def count_since(self, since: datetime) -> int:
-        """Count requests since a given time"""
-        return sum(1 for ts in self.timestamps if ts >= since)
+    def counts(self, now: datetime) -> Tuple[int, int, int]:
+        """Requests in the last minute, hour and day"""
+        at = _to_seconds(now)
+        return self.minute.total_at(at), self.hour.total_at(at), self.day.total_at(at)
+
+    def count_since(self, since: datetime, now: Optional[datetime] = None) -> int:
+        """Count requests since a given time (up to a day back)"""
+        now = now or datetime.utcnow()
+        span = (now - since).total_seconds()
+        ring = self.minute if span <= 60 else self.hour if span <= 3600 else self.day
+        return ring.count_between(_to_seconds(since), _to_seconds(now))
+
+    def is_idle(self, now: datetime) -> bool:
+        """No requests in the last day and none in flight"""
+        return self.concurrent_count == 0 and self.day.total_at(_to_seconds(now)) == 0
 
-    def cleanup_old(self, cutoff: datetime) -> None:
-        """Remove timestamps older than the cutoff"""
-        self.timestamps = [ts for ts in self.timestamps if ts >= cutoff]
+    def to_dict(self) -> Dict[str, Any]:
+        return {"minute": self.minute.to_dict(), "hour": self.hour.to_dict(), "day": self.day.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RequestWindow":
+        window = cls()
+        for name in ("minute", "hour", "day"):
+            if name in data:
+                getattr(window, name).load(data[name])
+        return window
 
 
 class RateLimiter:
     """
-    In-memory rate limiter with sliding window algorithm.
+    In-memory rate limiter with bucketed sliding windows.
 
     Tracks requests per user/API key in memory for fast access.
     Configuration is stored in the database.
+
+    Checks and updates never await between reading and writing a window,
+    so they are atomic on the event loop and need no lock.
     """
 
     # Default limits when no configuration exists
@@ -107,8 +218,9 @@ class RateLimiter:
         self._config_cache: Dict[str, Tuple[RateLimitConfig, datetime]] = {}
         self._config_cache_ttl = timedelta(minutes=5)
 
-        # Lock for thread safety
-        self._lock = asyncio.Lock()
+        # Keys whose counts changed since they were last persisted
+        self._dirty: set = set()
+        self._persist_task: Optional[asyncio.Task] = None
 
     def _get_key(self, user_id: Optional[str], api_key_id: Optional[str]) -> str:
         """Generate a unique key for the user/API key"""
@@ -198,64 +310,58 @@ class RateLimiter:
         if config.is_unlimited:
             return (RateLimitResult.ALLOWED, RateLimitStatus(is_limited=False))
 
-        async with self._lock:
-            now = datetime.utcnow()
-            window = self._windows[key]
-
-            # Clean up old timestamps (keep last 24 hours)
-            window.cleanup_old(now - timedelta(hours=24))
-
-            # Calculate counts for each window
-            minute_count = window.count_since(now - timedelta(minutes=1))
-            hour_count = window.count_since(now - timedelta(hours=1))
-            day_count = window.count_since(now - timedelta(hours=24))
-
-            # Calculate reset times
-            minute_reset = now + timedelta(minutes=1)
-            hour_reset = now + timedelta(hours=1)
-            day_reset = now + timedelta(hours=24)
-
-            # Check concurrent limit
-            concurrent_exceeded = window.concurrent_count >= config.concurrent_requests
-
-            # Check rate limits
-            minute_exceeded = minute_count >= config.requests_per_minute
-            hour_exceeded = hour_count >= config.requests_per_hour
-            day_exceeded = day_count >= config.requests_per_day
-
-            is_limited = concurrent_exceeded or minute_exceeded or hour_exceeded or day_exceeded
-
-            # Calculate retry after
-            retry_after = 0
-            if minute_exceeded:
-                retry_after = 60
-            elif hour_exceeded:
-                retry_after = 3600
-            elif day_exceeded:
-                retry_after = 86400
-            elif concurrent_exceeded:
-                retry_after = 5  # Short retry for concurrent limits
-
-            status = RateLimitStatus(
-                minute_count=minute_count,
-                hour_count=hour_count,
-                day_count=day_count,
-                concurrent_count=window.concurrent_count,
-                minute_remaining=max(0, config.requests_per_minute - minute_count),
-                hour_remaining=max(0, config.requests_per_hour - hour_count),
-                day_remaining=max(0, config.requests_per_day - day_count),
-                concurrent_remaining=max(0, config.concurrent_requests - window.concurrent_count),
-                minute_reset=minute_reset,
-                hour_reset=hour_reset,
-                day_reset=day_reset,
-                is_limited=is_limited,
-                retry_after=retry_after
-            )
+        now = datetime.utcnow()
+        window = self._windows[key]
+
+        # Calculate counts for each window
+        minute_count, hour_count, day_count = window.counts(now)
+
+        # Calculate reset times
+        minute_reset = now + timedelta(minutes=1)
+        hour_reset = now + timedelta(hours=1)
+        day_reset = now + timedelta(hours=24)
+
+        # Check concurrent limit
+        concurrent_exceeded = window.concurrent_count >= config.concurrent_requests
+
+        # Check rate limits
+        minute_exceeded = minute_count >= config.requests_per_minute
+        hour_exceeded = hour_count >= config.requests_per_hour
+        day_exceeded = day_count >= config.requests_per_day
+
+        is_limited = concurrent_exceeded or minute_exceeded or hour_exceeded or day_exceeded
+
+        # Calculate retry after
+        retry_after = 0
+        if minute_exceeded:
+            retry_after = 60
+        elif hour_exceeded:
+            retry_after = 3600
+        elif day_exceeded:
+            retry_after = 86400
+        elif concurrent_exceeded:
+            retry_after = 5  # Short retry for concurrent limits
+
+        status = RateLimitStatus(
+            minute_count=minute_count,
+            hour_count=hour_count,
+            day_count=day_count,
+            concurrent_count=window.concurrent_count,
+            minute_remaining=max(0, config.requests_per_minute - minute_count),
+            hour_remaining=max(0, config.requests_per_hour - hour_count),
+            day_remaining=max(0, config.requests_per_day - day_count),
+            concurrent_remaining=max(0, config.concurrent_requests - window.concurrent_count),
+            minute_reset=minute_reset,
+            hour_reset=hour_reset,
+            day_reset=day_reset,
+            is_limited=is_limited,
+            retry_after=retry_after
+        )
 
-            if is_limited:
-                return (RateLimitResult.DENIED, status)
+        if is_limited:
+            return (RateLimitResult.DENIED, status)
 
-            return (RateLimitResult.ALLOWED, status)
+        return (RateLimitResult.ALLOWED, status)
 
     async def record_request(
         self,
@@ -279,9 +385,8 @@ class RateLimiter:
         request_id = str(uuid.uuid4())
         key = self._get_key(user_id, api_key_id)
 
-        async with self._lock:
-            now = datetime.utcnow()
-            self._windows[key].add_request(now)
+        self._windows[key].add_request(datetime.utcnow())
+        self._dirty.add(key)
 
         # Log to database for persistence (fire and forget)
         try:
@@ -314,9 +419,9 @@ class RateLimiter:
             duration_ms: Optional duration in milliseconds
         """
         key = self._get_key(user_id, api_key_id)
-
-        async with self._lock:
-            self._windows[key].complete_request()
+        window = self._windows.get(key)
+        if window is not None:
+            window.complete_request()
 
     def get_rate_limit_status(
         self,
@@ -339,21 +444,22 @@ class RateLimiter:
             return RateLimitStatus(is_limited=False)
 
         now = datetime.utcnow()
-        window = self._windows.get(key, RequestWindow())
-
-        minute_count = window.count_since(now - timedelta(minutes=1))
-        hour_count = window.count_since(now - timedelta(hours=1))
-        day_count = window.count_since(now - timedelta(hours=24))
+        window = self._windows.get(key)
+        if window is not None:
+            minute_count, hour_count, day_count = window.counts(now)
+            concurrent_count = window.concurrent_count
+        else:
+            minute_count = hour_count = day_count = concurrent_count = 0
 
         return RateLimitStatus(
             minute_count=minute_count,
             hour_count=hour_count,
             day_count=day_count,
-            concurrent_count=window.concurrent_count,
+            concurrent_count=concurrent_count,
             minute_remaining=max(0, config.requests_per_minute - minute_count),
             hour_remaining=max(0, config.requests_per_hour - hour_count),
             day_remaining=max(0, config.requests_per_day - day_count),
-            concurrent_remaining=max(0, config.concurrent_requests - window.concurrent_count),
+            concurrent_remaining=max(0, config.concurrent_requests - concurrent_count),
             minute_reset=now + timedelta(minutes=1),
             hour_reset=now + timedelta(hours=1),
             day_reset=now + timedelta(hours=24),
@@ -364,11 +470,83 @@ class RateLimiter:
         """Clear the configuration cache"""
         self._config_cache.clear()
 
+    def drop_idle_windows(self) -> int:
+        """Forget keys with no requests in the last day; returns how many"""
+        now = datetime.utcnow()
+        idle = [key for key, window in self._windows.items() if window.is_idle(now)]
+        for key in idle:
+            del self._windows[key]
+            # Persist the drop so the saved row is deleted too
+            self._dirty.add(key)
+        return len(idle)
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    async def load(self) -> int:
+        """Restore persisted counts (on startup); returns the number of keys"""
+        rows = await async_database.run(database.get_rate_limit_buckets)
+        for row in rows:
+            window = RequestWindow.from_dict(row["data"])
+            # Requests in flight before the restart are gone
+            window.concurrent_count = 0
+            self._windows[row["key"]] = window
+        return len(rows)
+
+    async def persist(self) -> int:
+        """Save the counts of keys that changed; returns the number saved"""
+        if not self._dirty:
+            return 0
+        keys, self._dirty = self._dirty, set()
+        buckets = {key: self._windows[key].to_dict() for key in keys if key in self._windows}
+        deleted = [key for key in keys if key not in self._windows]
+        try:
+            await async_database.run(database.save_rate_limit_buckets, buckets, deleted)
+        except Exception as e:
+            logger.warning(f"Failed to persist rate limit counters: {e}")
+            self._dirty |= keys
+            return 0
+        return len(buckets)
+
+    async def start(self) -> None:
+        """Load persisted counts and start persisting periodically"""
+        if settings.rate_limit_persist_seconds <= 0:
+            return
+        try:
+            loaded = await self.load()
+            if loaded:
+                logger.info(f"Restored rate limit counters for {loaded} users/API keys")
+        except Exception as e:
+            logger.warning(f"Failed to restore rate limit counters: {e}")
+        self._persist_task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self) -> None:
+        if self._persist_task is None:
+            return
+        self._persist_task.cancel()
+        try:
+            await self._persist_task
+        except asyncio.CancelledError:
+            pass
+        self._persist_task = None
+        await self.persist()
+
+    async def _persist_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.rate_limit_persist_seconds)
+            try:
+                self.drop_idle_windows()
+                await self.persist()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Rate limit persistence failed: {e}")
+
     def cleanup(self) -> None:
         """Clean up old data from memory"""
         cutoff = datetime.utcnow() - timedelta(hours=24)
-        for window in self._windows.values():
-            window.cleanup_old(cutoff)
+        self.drop_idle_windows()
 
         # Also clean up old request logs from database
         try:
@@ -0,0 +1,112 @@
+"""
+Paginated session history
+
+Loading a session used to send every message in one payload. This module
+returns one page of a session's history instead: the latest messages by
+default, older or newer ones relative to a cursor, or a window around a
+message (for jumping to a search result).
+
+The JSONL transcript is the source of truth and is paged through the
+session history index (app/core/jsonl_index.py). Sessions without a
+transcript fall back to a keyset query on session_messages, as does a
+cursor that only exists in the database (search results reference
+session_messages ids).
+
+Cursors are message ids: the JSONL uuid, or the session_messages id
+(optionally as "msg-<id>", the id format sent over WebSocket).
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core import jsonl_parser
+from app.db import database
+
+logger = logging.getLogger(__name__)
+
+# Page size used when history pagination is requested without a limit
+DEFAULT_PAGE_SIZE = 100
+
+
+def resolve_page_size(limit: Optional[int]) -> Optional[int]:
+    """
+    Page size for a request, or None for the full history.
+
+    Falls back to settings.history_page_size when no limit is given and
+    caps it at settings.history_max_page_size.
+    """
+    if not limit:
+        limit = settings.history_page_size
+    if not limit or limit <= 0:
+        return None
+    return min(limit, max(1, settings.history_max_page_size))
+
+
+def parse_db_cursor(cursor: Optional[str]) -> Optional[int]:
+    """session_messages id from a cursor. Raises ValueError if it isn't one."""
+    if cursor is None:
+        return None
+    value = str(cursor)
+    if value.startswith("msg-"):
+        value = value[len("msg-"):]
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Unknown message cursor: {cursor}")
+
+
+def get_db_history_page(
+    session_id: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None
+) -> Dict[str, Any]:
+    """One page of session_messages rows, with string cursors"""
+    page = database.get_session_messages_page(
+        session_id,
+        limit,
+        before_id=parse_db_cursor(before),
+        after_id=parse_db_cursor(after),
+        around_id=parse_db_cursor(around),
+    )
+    messages = page["messages"]
+    page["before_cursor"] = str(messages[0]["id"]) if messages else None
+    page["after_cursor"] = str(messages[-1]["id"]) if messages else None
+    return page
+
+
+def get_history_page(
+    session: Dict[str, Any],
+    working_dir: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    around: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    One page of a session's history.
+
+    Returns a dict with source ("jsonl" or "db"), messages (streaming format
+    for jsonl, session_messages rows for db), total, has_more_before,
+    has_more_after, before_cursor and after_cursor. Raises ValueError if a
+    cursor matches no message in either source.
+    """
+    sdk_session_id = session.get("sdk_session_id")
+    if sdk_session_id:
+        try:
+            page = jsonl_parser.parse_session_history_page(
+                sdk_session_id, working_dir, limit, before=before, after=after, around=around
+            )
+        except ValueError:
+            # Cursor isn't a transcript message id; try it as a session_messages id
+            page = None
+            logger.debug(f"History cursor not in JSONL for session {session['id']}, using database")
+        if page and page["total"]:
+            page["source"] = "jsonl"
+            return page
+
+    page = get_db_history_page(session["id"], limit, before=before, after=after, around=around)
+    page["source"] = "db"
+    return page
@@ -0,0 +1,176 @@
+"""
+Stream chunk batching
+
+With partial messages enabled the SDK yields one stream_delta per token, so
+a long answer became thousands of WebSocket frames to the streaming device
+and, through the sync engine, to every other device watching the session.
+
+A StreamChunkBatcher sits between the SDK receive loop and the outgoing
+sends. Consecutive text-like events of the same stream (same type,
+delta_type, content block index and subagent) are merged into one event
+with concatenated content and emitted when:
+- stream_batch_window_ms has passed since the first merged event
+- the merged content reaches stream_batch_max_chars
+- a different event arrives (tool_use, tool_result, block boundaries,
+  done, ...) - callers flush() before handling it so order is preserved
+
+A window of 0 disables batching: every event is emitted as it arrives.
+Frames in and out per session are kept for the metrics endpoint.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Event types whose content can be concatenated
+COALESCED_TYPES = frozenset({"stream_delta", "subagent_chunk"})
+
+# Sessions kept in the metrics registry
+MAX_TRACKED_SESSIONS = 100
+
+
+@dataclass
+class StreamStats:
+    """Frame counters of one session's streams"""
+    frames_in: int = 0
+    frames_out: int = 0
+    streaming_seconds: float = 0.0
+    _started_at: Optional[float] = None
+
+    def start(self) -> None:
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+
+    def stop(self) -> None:
+        if self._started_at is not None:
+            self.streaming_seconds += time.monotonic() - self._started_at
+            self._started_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        seconds = self.streaming_seconds
+        if self._started_at is not None:
+            seconds += time.monotonic() - self._started_at
+        return {
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "streaming_seconds": round(seconds, 3),
+            "frames_in_per_second": round(self.frames_in / seconds, 1) if seconds else 0.0,
+            "frames_out_per_second": round(self.frames_out / seconds, 1) if seconds else 0.0,
+            "streaming": self._started_at is not None,
+        }
+
+
+_stats: "OrderedDict[str, StreamStats]" = OrderedDict()
+
+
+def _get_stats(session_id: str) -> StreamStats:
+    stats = _stats.get(session_id)
+    if stats is None:
+        stats = _stats[session_id] = StreamStats()
+        while len(_stats) > MAX_TRACKED_SESSIONS:
+            _stats.popitem(last=False)
+    else:
+        _stats.move_to_end(session_id)
+    return stats
+
+
+class StreamChunkBatcher:
+    """Merges consecutive text deltas of one stream before emitting them"""
+
+    def __init__(
+        self,
+        emit: Callable[[Dict[str, Any]], Awaitable[None]],
+        session_id: str,
+        window_ms: Optional[int] = None,
+        max_chars: Optional[int] = None
+    ):
+        self.emit = emit
+        self.session_id = session_id
+        self.window = (settings.stream_batch_window_ms if window_ms is None else window_ms) / 1000
+        self.max_chars = settings.stream_batch_max_chars if max_chars is None else max_chars
+        self.stats = _get_stats(session_id)
+        self.stats.start()
+
+        self._pending: Optional[Dict[str, Any]] = None
+        self._pending_key: Optional[Tuple] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(event: Dict[str, Any]) -> Tuple:
+        return (event.get("type"), event.get("delta_type"), event.get("index"), event.get("agent_id"))
+
+    async def add(self, event: Dict[str, Any]) -> None:
+        """Queue a coalescible event (see COALESCED_TYPES)"""
+        self.stats.frames_in += 1
+        if self.window <= 0:
+            async with self._lock:
+                await self._emit(event)
+            return
+
+        async with self._lock:
+            key = self._key(event)
+            if self._pending is not None and key == self._pending_key:
+                self._pending["content"] = self._pending.get("content", "") + (event.get("content") or "")
+            else:
+                await self._flush_locked()
+                self._pending = dict(event)
+                self._pending_key = key
+
+            if len(self._pending.get("content") or "") >= self.max_chars:
+                await self._flush_locked()
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_after_window())
+
+    async def flush(self) -> None:
+        """Emit the merged event, if any"""
+        async with self._lock:
+            await self._flush_locked()
+
+    async def close(self) -> None:
+        """Flush and stop the window timer"""
+        await self.flush()
+        self.stats.stop()
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window)
+        async with self._lock:
+            self._timer = None
+            await self._flush_locked()
+
+    async def _flush_locked(self) -> None:
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        event, self._pending, self._pending_key = self._pending, None, None
+        if event is not None:
+            await self._emit(event)
+
+    async def _emit(self, event: Dict[str, Any]) -> None:
+        self.stats.frames_out += 1
+        try:
+            await self.emit(event)
+        except Exception as e:
+            logger.warning(f"Failed to emit batched stream event for session {self.session_id}: {e}")
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Batching settings and per-session frame rates"""
+    return {
+        "window_ms": settings.stream_batch_window_ms,
+        "max_chars": settings.stream_batch_max_chars,
+        "frames_in": sum(stats.frames_in for stats in _stats.values()),
+        "frames_out": sum(stats.frames_out for stats in _stats.values()),
+        "sessions": {session_id: stats.to_dict() for session_id, stats in _stats.items()},
+    }
+
+
+def clear_metrics() -> None:
+    _stats.clear()
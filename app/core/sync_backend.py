@@ -0,0 +1,287 @@
+"""
+Broadcast backends for the sync engine
+
+The sync engine keeps WebSocket connections, streaming buffers and running
+queries in process-local dicts. With more than one uvicorn worker (or more
+than one node on a shared volume), a device connected to worker B would
+never see chunks produced by the query running on worker A.
+
+A backend carries sync traffic between workers:
+- publish() sends a message to every other worker. The sync engine
+  publishes session events (so remote workers update their streaming state
+  and deliver the event to their own devices), global events, and commands
+  for a specific worker.
+- Session ownership records which worker runs the SDK client of a
+  streaming session, so that requests such as interrupting the session are
+  routed to that worker.
+
+Backends:
+- LocalBackend (sync_backend = "local", the default): a single process.
+  Nothing is published and every session is owned locally.
+- SQLiteBackend (sync_backend = "sqlite"): workers sharing a SQLite file
+  (sync_backend_path). Messages are appended to a table that every worker
+  polls; ownership rows are refreshed by their owner and expire after
+  sync_owner_ttl_seconds if it dies. No outside services are needed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class SyncBackend:
+    """Interface of a broadcast backend"""
+
+    name = "base"
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or _new_worker_id()
+        self._handler: Optional[MessageHandler] = None
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: MessageHandler) -> None:
+        """Start delivering messages from other workers to handler"""
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """Send a message to every other worker"""
+        raise NotImplementedError
+
+    async def claim_session(self, session_id: str) -> None:
+        """Record this worker as the one running a session"""
+        raise NotImplementedError
+
+    async def release_session(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    async def owner_of(self, session_id: str) -> Optional[str]:
+        """Worker running a session, if any"""
+        raise NotImplementedError
+
+    async def _deliver(self, message: Dict[str, Any]) -> None:
+        self.received += 1
+        if self._handler is None:
+            return
+        try:
+            await self._handler(message)
+        except Exception as e:
+            logger.error(f"Failed to handle sync message from worker {message.get('origin')}: {e}", exc_info=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class LocalBackend(SyncBackend):
+    """Single-process backend: nothing to fan out"""
+
+    name = "local"
+
+    def __init__(self, worker_id: Optional[str] = None):
+        super().__init__(worker_id)
+        self._owned: set = set()
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        return
+
+    async def claim_session(self, session_id: str) -> None:
+        self._owned.add(session_id)
+
+    async def release_session(self, session_id: str) -> None:
+        self._owned.discard(session_id)
+
+    async def owner_of(self, session_id: str) -> Optional[str]:
+        return self.worker_id if session_id in self._owned else None
+
+
+class SQLiteBackend(SyncBackend):
+    """Backend for workers sharing a SQLite file"""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: Path,
+        worker_id: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        retention_seconds: Optional[float] = None,
+        owner_ttl_seconds: Optional[float] = None
+    ):
+        super().__init__(worker_id)
+        self.path = Path(path)
+        self.poll_interval = settings.sync_backend_poll_ms / 1000 if poll_interval is None else poll_interval
+        self.retention_seconds = settings.sync_backend_retention_seconds if retention_seconds is None else retention_seconds
+        self.owner_ttl_seconds = settings.sync_owner_ttl_seconds if owner_ttl_seconds is None else owner_ttl_seconds
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._last_id = 0
+        self._owned: set = set()
+        self._poll_task: Optional[asyncio.Task] = None
+        self._poll_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_owners (
+                session_id TEXT PRIMARY KEY,
+                worker_id TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._db_lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            return self._conn.execute(sql, params).fetchall()
+
+    async def _run(self, sql: str, params: tuple = ()) -> List[tuple]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        # Only messages published from now on are delivered
+        rows = await self._run("SELECT COALESCE(MAX(id), 0) FROM sync_messages")
+        self._last_id = rows[0][0]
+        self._poll_task = asyncio.create_task(self._poll_loop())
+        logger.info(f"SQLite sync backend started: worker={self.worker_id}, path={self.path}")
+
+    async def stop(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        for session_id in list(self._owned):
+            await self.release_session(session_id)
+        await super().stop()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        payload = json.dumps(message, separators=(",", ":"), default=str)
+        await self._run(
+            "INSERT INTO sync_messages (origin, payload, created_at) VALUES (?, ?, ?)",
+            (self.worker_id, payload, time.time())
+        )
+        self.published += 1
+
+    async def poll(self) -> int:
+        """Deliver messages published by other workers since the last poll"""
+        async with self._poll_lock:
+            rows = await self._run(
+                "SELECT id, origin, payload FROM sync_messages WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            )
+            delivered = 0
+            for row_id, origin, payload in rows:
+                self._last_id = row_id
+                if origin == self.worker_id:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    logger.warning(f"Ignoring malformed sync message {row_id}")
+                    continue
+                message["origin"] = origin
+                await self._deliver(message)
+                delivered += 1
+            return delivered
+
+    async def _housekeeping(self) -> None:
+        now = time.time()
+        await self._run("DELETE FROM sync_messages WHERE created_at < ?", (now - self.retention_seconds,))
+        if self._owned:
+            await self._run("UPDATE sync_owners SET updated_at = ? WHERE worker_id = ?", (now, self.worker_id))
+
+    async def _poll_loop(self) -> None:
+        # Refresh ownership well within its TTL
+        housekeeping_interval = max(self.poll_interval, self.owner_ttl_seconds / 3)
+        last_housekeeping = 0.0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                if time.monotonic() - last_housekeeping >= housekeeping_interval:
+                    await self._housekeeping()
+                    last_housekeeping = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Sync backend poll failed: {e}")
+
+    async def claim_session(self, session_id: str) -> None:
+        self._owned.add(session_id)
+        await self._run(
+            "INSERT OR REPLACE INTO sync_owners (session_id, worker_id, updated_at) VALUES (?, ?, ?)",
+            (session_id, self.worker_id, time.time())
+        )
+
+    async def release_session(self, session_id: str) -> None:
+        self._owned.discard(session_id)
+        await self._run(
+            "DELETE FROM sync_owners WHERE session_id = ? AND worker_id = ?",
+            (session_id, self.worker_id)
+        )
+
+    async def owner_of(self, session_id: str) -> Optional[str]:
+        rows = await self._run(
+            "SELECT worker_id FROM sync_owners WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.owner_ttl_seconds)
+        )
+        return rows[0][0] if rows else None
+
+
+def create_backend() -> SyncBackend:
+    """The backend selected by settings.sync_backend"""
+    if settings.sync_backend == "sqlite":
+        path = Path(settings.sync_backend_path) if settings.sync_backend_path else settings.effective_data_dir / "sync_bus.sqlite"
+        return SQLiteBackend(path)
+    if settings.sync_backend != "local":
+        logger.warning(f"Unknown sync_backend {settings.sync_backend!r}, using the in-process backend")
+    return LocalBackend()
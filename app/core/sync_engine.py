@@ -3,18 +3,52 @@ Real-time synchronization engine for cross-device chat sync.
 
 Manages WebSocket connections and broadcasts events to all connected devices
 watching the same session.
+
+Each device has its own bounded outbound queue drained by a writer task, so
+a broadcast never waits for a device's socket and one slow client can't
+stall the others (or the query producing the events). Events are serialized
+once per broadcast and wire encoding (see app/core/ws_transport.py). When a
+device falls behind, consecutive text chunks of
+the same message are merged; if its queue still fills up, the queued events
+are dropped and replaced by a resync_required event telling the client to
+reload the session.
+
+Events are also published through a broadcast backend (see
+app/core/sync_backend.py) so devices connected to other workers receive
+them, and other workers' streaming state and buffers stay current. The
+backend also records which worker runs each streaming session, so commands
+such as interrupt can be routed to it.
+
+Every delivered event gets a sequence number (increasing across the whole
+engine) and is kept in a bounded per-session replay log. A device that
+reconnects with the last sequence number it saw is replayed what it missed,
+or told to resync if the log no longer reaches back that far. Polling
+clients long-poll the same log. Events evicted from a log can optionally
+overflow to the sync_log table (sync_replay_overflow).
 """
 
 import asyncio
 import logging
+import uuid
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Set, Any
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Any
 
 from fastapi import WebSocket
 
+from app.core.config import settings
+from app.core import ws_transport
+from app.core.sync_backend import LocalBackend, SyncBackend
+from app.core.ws_transport import Frame
+from app.db import async_database, database
+from app.db.write_behind import write_behind
+
 logger = logging.getLogger(__name__)
 
+# How often route_command re-checks the owner while waiting for an ack
+COMMAND_OWNER_CHECK_SECONDS = 0.25
+
 
 @dataclass
 class SyncEvent:
@@ -35,6 +69,19 @@ class SyncEvent:
         }
 
 
+@dataclass
+class _QueuedEvent:
+    """An event waiting in a device's send queue"""
+    message: Dict[str, Any]  # SyncEvent.to_dict()
+    frame: Optional[Frame] = None  # Encoded message, shared by all devices of a broadcast
+
+    def is_text_chunk(self) -> bool:
+        return (
+            self.message.get("event_type") == "stream_chunk"
+            and self.message.get("data", {}).get("chunk_type") == "text"
+        )
+
+
 @dataclass
 class DeviceConnection:
     """Represents a connected device watching a session"""
@@ -43,43 +90,196 @@ class DeviceConnection:
     websocket: WebSocket
     connected_at: datetime = field(default_factory=datetime.utcnow)
     last_activity: datetime = field(default_factory=datetime.utcnow)
+    # Events queued before backpressure kicks in
+    max_queue: int = 256
+    # Called (once) when sending fails, so the engine can drop the connection
+    on_failure: Optional[Callable[["DeviceConnection"], Awaitable[None]]] = field(default=None, repr=False)
+    # Metrics
+    events_sent: int = 0
+    events_coalesced: int = 0
+    events_dropped: int = 0
+
+    def __post_init__(self):
+        self._queue: Deque[_QueuedEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
 
     async def send_event(self, event: SyncEvent) -> bool:
         """Send an event to this device. Returns False if send failed."""
         try:
-            await self.websocket.send_json(event.to_dict())
+            await ws_transport.send(self.websocket, event.to_dict())
             self.last_activity = datetime.utcnow()
             return True
         except Exception as e:
             logger.warning(f"Failed to send event to device {self.device_id}: {e}")
             return False
 
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def enqueue(self, message: Dict[str, Any], frame: Optional[Frame] = None) -> None:
+        """Queue an event for the writer task (never blocks)"""
+        if self._closed:
+            return
+
+        item = _QueuedEvent(message, frame)
+        tail = self._queue[-1] if self._queue else None
+        if tail is not None and self._can_coalesce(tail, item):
+            # The device is behind: send the text of both chunks as one
+            data = dict(tail.message["data"])
+            data["content"] = (data.get("content") or "") + (message["data"].get("content") or "")
+            self._queue[-1] = _QueuedEvent({**message, "data": data})
+            self.events_coalesced += 1
+        else:
+            if len(self._queue) >= self.max_queue:
+                self._drop_for_resync()
+            self._queue.append(item)
+
+        self._idle.clear()
+        self._wakeup.set()
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    @staticmethod
+    def _can_coalesce(tail: _QueuedEvent, item: _QueuedEvent) -> bool:
+        if not (tail.is_text_chunk() and item.is_text_chunk()):
+            return False
+        return (
+            tail.message["data"].get("message_id") == item.message["data"].get("message_id")
+            and tail.message.get("source_device_id") == item.message.get("source_device_id")
+        )
+
+    def _drop_for_resync(self) -> None:
+        """Replace a full queue with a resync_required marker"""
+        dropped = 0
+        for queued in self._queue:
+            if queued.message.get("event_type") == "resync_required":
+                dropped += queued.message["data"].get("dropped", 0)
+            else:
+                dropped += 1
+        self._queue.clear()
+        self.events_dropped += dropped
+        logger.warning(f"Device {self.device_id} is too slow, dropped {dropped} queued events and requested a resync")
+        self._queue.append(_QueuedEvent({
+            "event_type": "resync_required",
+            "session_id": self.session_id,
+            "data": {"reason": "slow_consumer", "dropped": dropped},
+            "timestamp": datetime.utcnow().isoformat(),
+            "source_device_id": None
+        }))
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    self._idle.set()
+                    await self._wakeup.wait()
+                item = self._queue.popleft()
+                await ws_transport.send_frame(self.websocket, item.frame or Frame(item.message))
+                self.last_activity = datetime.utcnow()
+                self.events_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send event to device {self.device_id}: {e}")
+            self._closed = True
+            self._queue.clear()
+            try:
+                if self.on_failure:
+                    await self.on_failure(self)
+            finally:
+                self._idle.set()
+
+    async def drain(self) -> None:
+        """Wait until every queued event was sent (or the connection failed)"""
+        await self._idle.wait()
+
+    def close(self) -> None:
+        """Stop the writer task and drop queued events"""
+        self._closed = True
+        self._queue.clear()
+        self._idle.set()
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+
+
+@dataclass
+class GlobalConnection:
+    """A device connected to the global WebSocket"""
+    device_id: str
+    websocket: WebSocket
+    api_user: Optional[Dict[str, Any]] = None  # None for admin sessions
+
+    def can_see_project(self, project_id: Optional[str]) -> bool:
+        """API users restricted to a project only receive that project's events"""
+        if not self.api_user or not self.api_user.get("project_id"):
+            return True
+        return self.api_user["project_id"] == project_id
+
 
 @dataclass
 class StreamingBuffer:
-    """Buffer to store in-progress streaming content for a session"""
+    """
+    Buffer to store in-progress streaming content for a session.
+
+    Chunks arrive for every token of long agentic runs, so adding one does
+    constant work: text is appended to a list of parts of the current text
+    message and only joined when a snapshot is taken, and tool results find
+    their tool_use through an index by tool_id.
+    """
     session_id: str
     messages: List[Dict[str, Any]] = field(default_factory=list)
     started_at: datetime = field(default_factory=datetime.utcnow)
+    # Current streaming text message and its unjoined parts
+    _text_msg: Optional[Dict[str, Any]] = field(default=None, repr=False)
+    _text_parts: List[str] = field(default_factory=list, repr=False)
+    _tool_uses: Dict[str, Dict[str, Any]] = field(default_factory=dict, repr=False)
+
+    def _join_text(self) -> None:
+        """Write the accumulated parts into the current text message"""
+        if self._text_msg is not None and len(self._text_parts) > 1:
+            self._text_parts = [''.join(self._text_parts)]
+        if self._text_msg is not None:
+            self._text_msg['content'] = self._text_parts[0] if self._text_parts else ''
+
+    def _end_text(self) -> None:
+        """Mark the current text message as complete"""
+        if self._text_msg is not None:
+            self._join_text()
+            self._text_msg['streaming'] = False
+        self._text_msg = None
+        self._text_parts = []
 
     def add_chunk(self, chunk_type: str, content: str, tool_name: str = None, tool_id: str = None, tool_input: Dict = None, subtype: str = None, data: Dict = None):
         """Add a streaming chunk to the buffer"""
         # Find or create message for this chunk type
         if chunk_type == 'text':
-            # Find existing text message or create new one
-            text_msg = next((m for m in self.messages if m.get('type') == 'text' and m.get('streaming')), None)
-            if text_msg:
-                text_msg['content'] = (text_msg.get('content') or '') + content
-            else:
-                self.messages.append({
+            # Append to the current text message or start a new one
+            if self._text_msg is None:
+                self._text_msg = {
                     'type': 'text',
                     'role': 'assistant',
-                    'content': content,
+                    'content': '',
                     'streaming': True
-                })
+                }
+                self.messages.append(self._text_msg)
+            if content:
+                self._text_parts.append(content)
         elif chunk_type == 'tool_use':
+            # Mark any previous text message as complete
+            self._end_text()
             # Add tool use message
-            self.messages.append({
+            tool_msg = {
                 'type': 'tool_use',
                 'role': 'assistant',
                 'content': content,
@@ -87,25 +287,19 @@ class StreamingBuffer:
                 'tool_id': tool_id,
                 'tool_input': tool_input,
                 'streaming': True
-            })
-            # Mark any previous text message as complete
-            for m in self.messages:
-                if m.get('type') == 'text':
-                    m['streaming'] = False
+            }
+            self.messages.append(tool_msg)
+            self._tool_uses.setdefault(tool_id, tool_msg)
         elif chunk_type == 'tool_result':
             # Find the tool_use message and merge the result into it (for proper grouping)
             # This ensures late-joining devices see tool_use with embedded result
-            found_tool_use = False
-            for m in self.messages:
-                if m.get('type') == 'tool_use' and m.get('tool_id') == tool_id:
-                    m['streaming'] = False
-                    m['tool_result'] = content
-                    m['tool_status'] = 'complete'
-                    found_tool_use = True
-                    break
-
-            # Only create separate tool_result if no matching tool_use found (shouldn't happen normally)
-            if not found_tool_use:
+            tool_msg = self._tool_uses.get(tool_id)
+            if tool_msg is not None:
+                tool_msg['streaming'] = False
+                tool_msg['tool_result'] = content
+                tool_msg['tool_status'] = 'complete'
+            else:
+                # Only create separate tool_result if no matching tool_use found (shouldn't happen normally)
                 self.messages.append({
                     'type': 'tool_result',
                     'role': 'assistant',
@@ -126,12 +320,71 @@ class StreamingBuffer:
             })
 
     def get_messages(self) -> List[Dict[str, Any]]:
-        """Get all buffered messages"""
+        """Get all buffered messages (a shallow snapshot)"""
+        self._join_text()
         return self.messages.copy()
 
     def clear(self):
         """Clear the buffer"""
         self.messages = []
+        self._text_msg = None
+        self._text_parts = []
+        self._tool_uses = {}
+
+
+class SessionEventLog:
+    """
+    Recent events of one session, for replay.
+
+    Sequence numbers are engine-wide, so a session's events are increasing
+    but not consecutive. Events up to floor may be missing from the log; a
+    client that saw floor or later can be replayed without gaps. base_floor
+    is the floor when the log was created, i.e. how far back overflowed
+    events reach.
+    """
+
+    def __init__(self, session_id: str, max_events: int, floor: int = 0):
+        self.session_id = session_id
+        self.max_events = max_events
+        self.events: Deque[Dict[str, Any]] = deque()
+        self.floor = floor
+        self.base_floor = floor
+        self._changed = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self.events[-1]["seq"] if self.events else self.floor
+
+    def append(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Add an event; returns the event evicted to make room, if any"""
+        self.events.append(message)
+        evicted = None
+        if len(self.events) > self.max_events:
+            evicted = self.events.popleft()
+            self.floor = evicted["seq"]
+        # Wake long-polls waiting for this session
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return evicted
+
+    def since(self, seq: int) -> List[Dict[str, Any]]:
+        """Events after seq (newest are at the end, so scan from there)"""
+        newer = []
+        for message in reversed(self.events):
+            if message["seq"] <= seq:
+                break
+            newer.append(message)
+        newer.reverse()
+        return newer
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for the next event; False on timeout"""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
 
 class SyncEngine:
@@ -144,6 +397,7 @@ class SyncEngine:
     - Support for streaming events (message chunks)
     - Exclude source device from broadcasts (to avoid echo)
     - Buffer streaming content for late-joining devices
+    - Fan out to other workers through a broadcast backend
     """
 
     def __init__(self):
@@ -155,6 +409,162 @@ class SyncEngine:
         self._streaming_sessions: Set[str] = set()
         # Buffer for in-progress streaming content per session
         self._streaming_buffers: Dict[str, StreamingBuffer] = {}
+        # device_id -> global WebSocket connection (not tied to a session)
+        self._global_connections: Dict[str, GlobalConnection] = {}
+        # Fan-out to other workers (in-process until start_backend)
+        self.backend: SyncBackend = LocalBackend()
+        # command name -> handler(session_id, args) run on the session's owner
+        self._command_handlers: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[Any]]] = {}
+        # Routed commands running here, and request id -> ack awaited by route_command
+        self._command_tasks: Set[asyncio.Task] = set()
+        self._command_replies: Dict[str, asyncio.Future] = {}
+        # Replay logs; sequence numbers restart with the engine, so clients
+        # also send the epoch they were given
+        self.epoch = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._event_logs: "OrderedDict[str, SessionEventLog]" = OrderedDict()
+        # Highest sequence number of any evicted log (its events are gone)
+        self._evicted_upto = 0
+
+    async def start_backend(self, backend: SyncBackend):
+        """Switch to a broadcast backend and start receiving from other workers"""
+        await self.backend.stop()
+        self.backend = backend
+        await backend.start(self._on_backend_message)
+        logger.info(f"Sync backend: {backend.name} (worker {backend.worker_id})")
+
+    async def stop_backend(self):
+        await self.backend.stop()
+        self.backend = LocalBackend()
+
+    async def _publish(self, message: Dict[str, Any]):
+        try:
+            await self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Failed to publish sync message to other workers: {e}")
+
+    async def _on_backend_message(self, message: Dict[str, Any]):
+        """Handle a message published by another worker"""
+        kind = message.get("kind")
+        if kind == "session_event":
+            event = message["event"]
+            self._apply_stream_state(event)
+            self._deliver(event, message.get("exclude"))
+        elif kind == "global":
+            await self._deliver_global(message["message"], message.get("project_id"))
+        elif kind == "command" and message.get("target") == self.backend.worker_id:
+            handler = self._command_handlers.get(message["command"])
+            if handler is None:
+                logger.warning(f"No handler for routed command {message['command']}")
+                return
+            # Handlers may wait (e.g. for a query task to cancel); don't hold
+            # up delivery of other workers' messages meanwhile
+            task = asyncio.create_task(self._run_command(handler, message))
+            self._command_tasks.add(task)
+            task.add_done_callback(self._command_tasks.discard)
+        elif kind == "command_done" and message.get("target") == self.backend.worker_id:
+            reply = self._command_replies.get(message.get("request_id"))
+            if reply is not None and not reply.done():
+                reply.set_result(None)
+
+    async def _run_command(self, handler: Callable[[str, Dict[str, Any]], Awaitable[Any]], message: Dict[str, Any]):
+        """Run a routed command, then acknowledge it to the worker that sent it"""
+        try:
+            await handler(message["session_id"], message.get("args") or {})
+        except Exception as e:
+            logger.error(f"Routed command {message['command']} for session {message['session_id']} failed: {e}", exc_info=True)
+        if message.get("reply_to"):
+            await self._publish({
+                "kind": "command_done",
+                "target": message["reply_to"],
+                "request_id": message.get("request_id"),
+            })
+
+    def register_command(self, command: str, handler: Callable[[str, Dict[str, Any]], Awaitable[Any]]):
+        """Handle a command routed to this worker as the owner of a session"""
+        self._command_handlers[command] = handler
+
+    async def claim_session(self, session_id: str):
+        """Record that this worker runs the SDK client of a session"""
+        try:
+            await self.backend.claim_session(session_id)
+        except Exception as e:
+            logger.error(f"Failed to claim session {session_id}: {e}")
+
+    async def release_session(self, session_id: str):
+        try:
+            await self.backend.release_session(session_id)
+        except Exception as e:
+            logger.error(f"Failed to release session {session_id}: {e}")
+
+    async def is_owned_elsewhere(self, session_id: str) -> bool:
+        """Whether another worker runs this session"""
+        try:
+            owner = await self.backend.owner_of(session_id)
+        except Exception as e:
+            logger.error(f"Failed to look up owner of session {session_id}: {e}")
+            return False
+        return owner is not None and owner != self.backend.worker_id
+
+    async def route_command(
+        self,
+        session_id: str,
+        command: str,
+        ack_timeout: Optional[float] = None,
+        **args
+    ) -> bool:
+        """
+        Send a command to the worker running a session.
+
+        Returns False if no other worker owns the session, in which case the
+        caller should handle it locally. With ack_timeout, also waits until
+        the owner has run the command or no longer owns the session, and
+        raises asyncio.TimeoutError if neither happens in time.
+        """
+        owner = await self.backend.owner_of(session_id)
+        if owner is None or owner == self.backend.worker_id:
+            return False
+
+        request_id = uuid.uuid4().hex
+        reply: Optional[asyncio.Future] = None
+        if ack_timeout is not None:
+            reply = asyncio.get_running_loop().create_future()
+            self._command_replies[request_id] = reply
+        try:
+            await self._publish({
+                "kind": "command",
+                "target": owner,
+                "command": command,
+                "session_id": session_id,
+                "args": args,
+                "request_id": request_id,
+                "reply_to": self.backend.worker_id if reply is not None else None,
+            })
+            logger.info(f"Routed {command} for session {session_id} to worker {owner}")
+            if reply is not None:
+                await self._wait_for_owner(session_id, owner, reply, ack_timeout)
+        finally:
+            self._command_replies.pop(request_id, None)
+        return True
+
+    async def _wait_for_owner(self, session_id: str, owner: str, reply: asyncio.Future, timeout: float):
+        """Wait for a routed command's ack, or for owner to give up the session"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Worker {owner} did not acknowledge command for session {session_id}")
+            try:
+                await asyncio.wait_for(asyncio.shield(reply), min(remaining, COMMAND_OWNER_CHECK_SECONDS))
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if await self.backend.owner_of(session_id) != owner:
+                    return
+            except Exception as e:
+                logger.error(f"Failed to look up owner of session {session_id}: {e}")
 
     async def register_device(
         self,
@@ -170,6 +580,7 @@ class SyncEngine:
             # Close existing connection for this device if any
             if device_id in self._connections[session_id]:
                 old_conn = self._connections[session_id][device_id]
+                old_conn.close()
                 try:
                     await old_conn.websocket.close()
                 except Exception:
@@ -178,7 +589,9 @@ class SyncEngine:
             connection = DeviceConnection(
                 device_id=device_id,
                 session_id=session_id,
-                websocket=websocket
+                websocket=websocket,
+                max_queue=max(1, settings.sync_send_queue_size),
+                on_failure=self._on_send_failure
             )
             self._connections[session_id][device_id] = connection
 
@@ -205,7 +618,7 @@ class SyncEngine:
                             logger.info(f"Device {device_id} has new connection, skipping unregister for old websocket")
                             return
 
-                    del self._connections[session_id][device_id]
+                    self._connections[session_id].pop(device_id).close()
                     logger.info(f"Device {device_id} unregistered from session {session_id}")
 
                 # Clean up empty session entries
@@ -234,40 +647,227 @@ class SyncEngine:
         """
         Broadcast an event to all devices watching the session.
 
+        Returns once the event is queued for each device; use flush() to
+        wait for delivery.
+
         Args:
             event: The event to broadcast
             exclude_device_id: Device ID to exclude (usually the source device)
         """
-        session_id = event.session_id
+        message = event.to_dict()
+        self._deliver(message, exclude_device_id)
+        await self._publish({"kind": "session_event", "event": message, "exclude": exclude_device_id})
 
+    def _deliver(self, message: Dict[str, Any], exclude_device_id: Optional[str] = None):
+        """Record an event and queue it for this worker's devices watching its session"""
+        message = self._record(message)
+        session_id = message["session_id"]
         if session_id not in self._connections:
             logger.debug(f"No connections for session {session_id}, skipping broadcast")
             return
 
         # Get connections to broadcast to
         connections = list(self._connections[session_id].values())
-        logger.info(f"Broadcasting {event.event_type} to {len(connections)} devices for session {session_id[:8]}...")
+        logger.debug(f"Broadcasting {message['event_type']} to {len(connections)} devices for session {session_id[:8]}...")
 
-        # Send to all devices except the excluded one
-        failed_devices = []
+        # Encode once per wire encoding; each device's writer task sends it
+        frame = Frame(message)
         for conn in connections:
             if exclude_device_id and conn.device_id == exclude_device_id:
-                logger.debug(f"Skipping source device {conn.device_id[:8]}")
                 continue
+            conn.enqueue(message, frame)
 
-            logger.debug(f"Sending {event.event_type} to device {conn.device_id[:8]}")
-            success = await conn.send_event(event)
-            if not success:
-                failed_devices.append(conn.device_id)
-            else:
-                logger.debug(f"Successfully sent {event.event_type} to device {conn.device_id[:8]}")
+    def _get_event_log(self, session_id: str) -> SessionEventLog:
+        log = self._event_logs.get(session_id)
+        if log is None:
+            log = self._event_logs[session_id] = SessionEventLog(
+                session_id, max(1, settings.sync_replay_buffer_size), floor=self._evicted_upto
+            )
+            while len(self._event_logs) > max(1, settings.sync_replay_sessions):
+                _, evicted = self._event_logs.popitem(last=False)
+                self._evicted_upto = max(self._evicted_upto, evicted.last_seq)
+        else:
+            self._event_logs.move_to_end(session_id)
+        return log
 
-        # Clean up failed connections
-        if failed_devices:
-            async with self._lock:
-                for device_id in failed_devices:
-                    if session_id in self._connections:
-                        self._connections[session_id].pop(device_id, None)
+    def _record(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Number an event and add it to its session's replay log"""
+        self._seq += 1
+        message = {**message, "seq": self._seq}
+        evicted = self._get_event_log(message["session_id"]).append(message)
+        if evicted is not None and settings.sync_replay_overflow:
+            write_behind.add_sync_log(
+                session_id=evicted["session_id"],
+                event_type=evicted["event_type"],
+                entity_type="sync_event",
+                entity_id=str(evicted["seq"]),
+                data={"epoch": self.epoch, "event": evicted}
+            )
+        return message
+
+    def latest_seq(self, session_id: str) -> int:
+        """Sequence number to resume a session from after loading its state"""
+        log = self._event_logs.get(session_id)
+        return log.last_seq if log else self._seq
+
+    def _replay_from_log(self, session_id: str, since_seq: int, overflowed: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Events after since_seq, or None if some may be missing"""
+        log = self._event_logs.get(session_id)
+        if log is None:
+            # Nothing recorded for this session since the engine started
+            # (or since its log was evicted)
+            return [] if since_seq >= self._evicted_upto and since_seq <= self._seq else None
+        if since_seq > self._seq:
+            return None
+        if since_seq >= log.floor:
+            return log.since(since_seq)
+        # Older events only exist in the overflow table
+        if not overflowed or since_seq < log.base_floor:
+            return None
+        if overflowed[-1]["seq"] < log.floor:
+            return None
+        newest = overflowed[-1]["seq"]
+        return overflowed + log.since(newest)
+
+    async def _read_overflow(self, session_id: str, since_seq: int) -> List[Dict[str, Any]]:
+        """Evicted events after since_seq from the sync_log table"""
+        log = self._event_logs.get(session_id)
+        if not settings.sync_replay_overflow or log is None or since_seq >= log.floor:
+            return []
+        await write_behind.barrier()
+        rows = await async_database.run_read(database.get_sync_events, session_id, since_seq)
+        return [row["event"] for row in rows if row.get("epoch") == self.epoch]
+
+    async def replay(self, session_id: str, since_seq: int, epoch: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Events of a session after since_seq.
+
+        Returns events, latest_seq, epoch and complete. complete is False if
+        the events can't be replayed without gaps (the engine restarted or
+        the replay log doesn't reach back far enough); the client should
+        then reload the session.
+        """
+        events = None
+        if epoch is None or epoch == self.epoch:
+            overflowed = await self._read_overflow(session_id, since_seq)
+            events = self._replay_from_log(session_id, since_seq, overflowed)
+        return {
+            "events": events or [],
+            "latest_seq": self.latest_seq(session_id),
+            "epoch": self.epoch,
+            "complete": events is not None,
+        }
+
+    async def wait_for_events(self, session_id: str, since_seq: int, timeout: float) -> bool:
+        """Long-poll: wait until the session has an event after since_seq"""
+        log = self._get_event_log(session_id)
+        if log.last_seq > since_seq:
+            return True
+        return await log.wait(timeout)
+
+    async def resume_device(
+        self,
+        device_id: str,
+        session_id: str,
+        websocket: WebSocket,
+        since_seq: int,
+        epoch: Optional[str] = None
+    ) -> DeviceConnection:
+        """
+        Register a reconnecting device and replay the events it missed.
+
+        The replay is queued before any live event, so the device sees a
+        gap-free sequence, or a resync_required event if that's not possible.
+        """
+        overflowed = []
+        if epoch is None or epoch == self.epoch:
+            overflowed = await self._read_overflow(session_id, since_seq)
+        connection = await self.register_device(device_id, session_id, websocket)
+        # No await from here on: nothing can be broadcast in between
+        events = None
+        if epoch is None or epoch == self.epoch:
+            events = self._replay_from_log(session_id, since_seq, overflowed)
+        if events is None:
+            logger.info(f"Device {device_id} can't resume session {session_id} from {since_seq}, requesting resync")
+            connection.enqueue({
+                "event_type": "resync_required",
+                "session_id": session_id,
+                "data": {"reason": "replay_unavailable", "epoch": self.epoch, "latest_seq": self.latest_seq(session_id)},
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_device_id": None
+            })
+        else:
+            logger.info(f"Replaying {len(events)} events of session {session_id} to device {device_id}")
+            for message in events:
+                connection.enqueue(message)
+        return connection
+
+    def _start_stream(self, session_id: str):
+        # Only create buffer if not already streaming (idempotent)
+        if session_id not in self._streaming_sessions:
+            self._streaming_sessions.add(session_id)
+            self._streaming_buffers[session_id] = StreamingBuffer(session_id=session_id)
+
+    def _buffer_chunk(self, session_id: str, chunk_type: str, chunk_data: Dict[str, Any]):
+        # Add chunk to buffer for late-joining devices
+        if session_id in self._streaming_buffers:
+            buffer = self._streaming_buffers[session_id]
+            buffer.add_chunk(
+                chunk_type=chunk_type,
+                content=chunk_data.get('content', ''),
+                tool_name=chunk_data.get('tool_name'),
+                tool_id=chunk_data.get('tool_id'),
+                tool_input=chunk_data.get('tool_input'),
+                subtype=chunk_data.get('subtype'),
+                data=chunk_data.get('data')
+            )
+
+    def _end_stream(self, session_id: str):
+        self._streaming_sessions.discard(session_id)
+        # Clear the streaming buffer
+        self._streaming_buffers.pop(session_id, None)
+
+    def _apply_stream_state(self, message: Dict[str, Any]):
+        """Mirror another worker's streaming state from its events"""
+        session_id = message["session_id"]
+        event_type = message["event_type"]
+        if event_type == "stream_start":
+            self._start_stream(session_id)
+        elif event_type == "stream_chunk":
+            data = message.get("data") or {}
+            self._buffer_chunk(session_id, data.get("chunk_type"), data)
+        elif event_type == "stream_end":
+            self._end_stream(session_id)
+
+    async def _on_send_failure(self, conn: DeviceConnection):
+        """Drop a connection whose writer failed to send"""
+        async with self._lock:
+            devices = self._connections.get(conn.session_id)
+            if devices and devices.get(conn.device_id) is conn:
+                del devices[conn.device_id]
+                if not devices:
+                    del self._connections[conn.session_id]
+
+    async def flush(self, session_id: Optional[str] = None):
+        """Wait until queued events were sent to every device (of one session)"""
+        if session_id is not None:
+            connections = list(self._connections.get(session_id, {}).values())
+        else:
+            connections = [conn for devices in list(self._connections.values()) for conn in devices.values()]
+        await asyncio.gather(*(conn.drain() for conn in connections))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Send queue totals across all session connections"""
+        connections = [conn for devices in list(self._connections.values()) for conn in devices.values()]
+        return {
+            "devices": len(connections),
+            "queued": sum(conn.queued for conn in connections),
+            "max_queued": max((conn.queued for conn in connections), default=0),
+            "events_sent": sum(conn.events_sent for conn in connections),
+            "events_coalesced": sum(conn.events_coalesced for conn in connections),
+            "events_dropped": sum(conn.events_dropped for conn in connections),
+            "backend": self.backend.get_metrics(),
+        }
 
     async def broadcast_stream_start(
         self,
@@ -287,10 +887,7 @@ class SyncEngine:
             source_device_id: Device that originated the event (will be excluded from broadcast)
             usage: Token usage data from message_start event (input_tokens, cache_creation_input_tokens, cache_read_input_tokens)
         """
-        # Only create buffer if not already streaming (idempotent)
-        if session_id not in self._streaming_sessions:
-            self._streaming_sessions.add(session_id)
-            self._streaming_buffers[session_id] = StreamingBuffer(session_id=session_id)
+        self._start_stream(session_id)
 
         data = {"message_id": message_id}
         if usage:
@@ -313,18 +910,7 @@ class SyncEngine:
         source_device_id: Optional[str] = None
     ):
         """Broadcast a streaming chunk to all watching devices"""
-        # Add chunk to buffer for late-joining devices
-        if session_id in self._streaming_buffers:
-            buffer = self._streaming_buffers[session_id]
-            buffer.add_chunk(
-                chunk_type=chunk_type,
-                content=chunk_data.get('content', ''),
-                tool_name=chunk_data.get('tool_name'),
-                tool_id=chunk_data.get('tool_id'),
-                tool_input=chunk_data.get('tool_input'),
-                subtype=chunk_data.get('subtype'),
-                data=chunk_data.get('data')
-            )
+        self._buffer_chunk(session_id, chunk_type, chunk_data)
 
         event = SyncEvent(
             event_type="stream_chunk",
@@ -354,9 +940,7 @@ class SyncEngine:
         source_device_id: Optional[str] = None
     ):
         """Notify all devices that streaming has ended"""
-        self._streaming_sessions.discard(session_id)
-        # Clear the streaming buffer
-        self._streaming_buffers.pop(session_id, None)
+        self._end_stream(session_id)
 
         event = SyncEvent(
             event_type="stream_end",
@@ -461,7 +1045,10 @@ class SyncEngine:
         state = {
             "session_id": session_id,
             "is_streaming": self.is_session_streaming(session_id),
-            "connected_devices": self.get_device_count(session_id)
+            "connected_devices": self.get_device_count(session_id),
+            # Resume point for reconnects and polling (see resume_device)
+            "latest_sync_id": self.latest_seq(session_id),
+            "sync_epoch": self.epoch
         }
         # Include streaming buffer if session is actively streaming
         streaming_buffer = self.get_streaming_buffer(session_id)
@@ -469,6 +1056,66 @@ class SyncEngine:
             state["streaming_messages"] = streaming_buffer
         return state
 
+    async def register_global_device(
+        self,
+        device_id: str,
+        websocket: WebSocket,
+        api_user: Optional[Dict[str, Any]] = None
+    ) -> GlobalConnection:
+        """Register a device's global WebSocket"""
+        async with self._lock:
+            connection = GlobalConnection(device_id=device_id, websocket=websocket, api_user=api_user)
+            self._global_connections[device_id] = connection
+            return connection
+
+    async def unregister_global_device(self, device_id: str, websocket: Optional[WebSocket] = None):
+        """Unregister a device's global WebSocket (only if it is still this websocket)"""
+        async with self._lock:
+            current = self._global_connections.get(device_id)
+            if current and (websocket is None or current.websocket is websocket):
+                del self._global_connections[device_id]
+
+    async def broadcast_global(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        project_id: Optional[str] = None
+    ):
+        """
+        Send an event to every global WebSocket.
+
+        If project_id is given, API users scoped to another project are skipped.
+        """
+        message = {
+            "event_type": event_type,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        await self._deliver_global(message, project_id)
+        await self._publish({"kind": "global", "message": message, "project_id": project_id})
+
+    async def _deliver_global(self, message: Dict[str, Any], project_id: Optional[str] = None):
+        """Send a global event to this worker's global WebSockets"""
+        frame = Frame(message)
+        failed_devices = []
+        for conn in list(self._global_connections.values()):
+            if not conn.can_see_project(project_id):
+                continue
+            try:
+                if ws_transport.get_encoding(conn.websocket) == ws_transport.JSON:
+                    await conn.websocket.send_json(message)
+                else:
+                    await ws_transport.send_frame(conn.websocket, frame)
+            except Exception as e:
+                logger.warning(f"Failed to send global event to device {conn.device_id}: {e}")
+                failed_devices.append(conn)
+
+        if failed_devices:
+            async with self._lock:
+                for conn in failed_devices:
+                    if self._global_connections.get(conn.device_id) is conn:
+                        del self._global_connections[conn.device_id]
+
     async def cleanup_stale_connections(self, max_age_seconds: int = 300):
         """Remove connections that haven't been active recently"""
         now = datetime.utcnow()
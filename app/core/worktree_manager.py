@@ -546,7 +546,7 @@ class WorktreeManager:
 
         return worktrees
 
-    def get_worktree_details(self, worktree_id: str) -> Optional[Dict]:
+    def get_worktree_details(self, worktree_id: str, include_git_status: bool = True) -> Optional[Dict]:
         """Get detailed worktree information with session history."""
         worktree = database.get_worktree(worktree_id)
         if not worktree:
@@ -556,7 +556,7 @@ class WorktreeManager:
         worktree_abs_path = str(settings.workspace_dir / worktree["worktree_path"])
         worktree["exists"] = Path(worktree_abs_path).exists()
 
-        if worktree["exists"]:
+        if worktree["exists"] and include_git_status:
             worktree["git_status"] = self.git_service.get_status(worktree_abs_path)
 
         # Get all sessions for this worktree (new model)
@@ -594,6 +594,14 @@ class WorktreeManager:
 
         return worktree
 
+    async def get_worktree_details_async(self, worktree_id: str) -> Optional[Dict]:
+        """get_worktree_details, reading the git status without blocking the event loop."""
+        worktree = self.get_worktree_details(worktree_id, include_git_status=False)
+        if worktree and worktree["exists"]:
+            worktree_abs_path = str(settings.workspace_dir / worktree["worktree_path"])
+            worktree["git_status"] = await self.git_service.get_status_async(worktree_abs_path)
+        return worktree
+
     def cleanup_worktree(self, worktree_id: str, keep_branch: bool = True) -> bool:
         """
         Remove a worktree and optionally delete its branch.
@@ -661,6 +669,25 @@ class WorktreeManager:
         Returns:
             Dict with sync results
         """
+        result, repo, main_dir = self._start_sync(project_id)
+        if not main_dir:
+            return result
+
+        # Get actual worktrees from git
+        git_worktrees = self.git_service.list_worktrees(main_dir)
+        return self._reconcile_worktrees(project_id, repo, git_worktrees, result)
+
+    async def sync_worktrees_async(self, project_id: str) -> Dict[str, Any]:
+        """sync_worktrees, listing git worktrees without blocking the event loop."""
+        result, repo, main_dir = self._start_sync(project_id)
+        if not main_dir:
+            return result
+
+        git_worktrees = await self.git_service.list_worktrees_async(main_dir)
+        return self._reconcile_worktrees(project_id, repo, git_worktrees, result)
+
+    def _start_sync(self, project_id: str) -> Tuple[Dict[str, Any], Optional[Dict], Optional[str]]:
+        """Sync result skeleton, repository record and main directory (None if the sync can't run)"""
         result = {
             "synced": 0,
             "orphaned": 0,
@@ -672,17 +699,24 @@ class WorktreeManager:
         project = database.get_project(project_id)
         if not project:
             result["errors"].append(f"Project not found: {project_id}")
-            return result
+            return result, None, None
 
         repo = database.get_git_repository_by_project(project_id)
         if not repo:
             result["errors"].append(f"No git repository for project: {project_id}")
-            return result
+            return result, None, None
 
         main_dir = str(settings.workspace_dir / project["path"])
+        return result, repo, main_dir
 
-        # Get actual worktrees from git
-        git_worktrees = self.git_service.list_worktrees(main_dir)
+    def _reconcile_worktrees(
+        self,
+        project_id: str,
+        repo: Dict,
+        git_worktrees: List[Dict[str, Any]],
+        result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Update database worktree records from the worktrees git reports"""
         git_worktree_paths = set()
         for wt in git_worktrees:
             if not wt.get("is_main"):
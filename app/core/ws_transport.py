@@ -0,0 +1,139 @@
+"""
+WebSocket wire encodings
+
+Every WebSocket message used to be sent as uncompressed JSON text. Session
+histories, tool outputs of up to MAX_TOOL_OUTPUT_SIZE and streaming buffers
+make that expensive for remote and mobile clients.
+
+Clients may now ask for another encoding with the `encoding` query
+parameter on connect, a comma-separated preference list such as
+"msgpack,deflate". The first one the server supports is used and announced
+in a {"type": "transport", "encoding": ...} JSON text frame, the last
+plain-JSON frame the client receives if another encoding was chosen:
+- json: JSON text frames (the default and the fallback)
+- deflate: JSON text frames, except messages of at least
+  ws_compress_min_bytes, which are sent as zlib-compressed binary frames
+- msgpack: every message as a MessagePack binary frame (only offered when
+  the optional msgpack package is installed)
+
+This is independent of the permessage-deflate WebSocket extension, which
+the server negotiates on its own (see ws_per_message_deflate); the
+deflate encoding is for clients or proxies without it.
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_AVAILABLE = False
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+DEFLATE = "deflate"
+MSGPACK = "msgpack"
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can send, most compact first"""
+    encodings = [MSGPACK] if MSGPACK_AVAILABLE else []
+    return encodings + [DEFLATE, JSON]
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """The first supported encoding of a client's preference list"""
+    supported = supported_encodings()
+    for name in (requested or "").split(","):
+        name = name.strip().lower()
+        if name in supported:
+            return name
+    return JSON
+
+
+def serialize_json(message: Dict[str, Any]) -> str:
+    """Serialize a message the way WebSocket.send_json does"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def encode(message: Dict[str, Any], encoding: str, text: Optional[str] = None) -> Union[str, bytes]:
+    """
+    Encode a message for the wire: str for a text frame, bytes for a binary one.
+
+    text is the message already serialized as JSON, if the caller has it.
+    """
+    if encoding == MSGPACK:
+        return msgpack.packb(message, default=str, use_bin_type=True)
+    if text is None:
+        text = serialize_json(message)
+    if encoding == DEFLATE and len(text) >= settings.ws_compress_min_bytes:
+        return zlib.compress(text.encode("utf-8"), settings.ws_compress_level)
+    return text
+
+
+def set_encoding(websocket, encoding: str) -> None:
+    websocket.state.wire_encoding = encoding
+
+
+def get_encoding(websocket) -> str:
+    """The encoding negotiated for a WebSocket (json if none was)"""
+    state = getattr(websocket, "state", None)
+    encoding = getattr(state, "wire_encoding", JSON)
+    return encoding if encoding in (JSON, DEFLATE, MSGPACK) else JSON
+
+
+async def accept_encoding(websocket, requested: Optional[str]) -> str:
+    """
+    Negotiate the encoding of an accepted WebSocket.
+
+    Announces the choice to clients that asked for an encoding; clients
+    that didn't keep receiving plain JSON without the extra frame.
+    """
+    encoding = negotiate(requested)
+    set_encoding(websocket, encoding)
+    if requested:
+        await websocket.send_json({"type": "transport", "encoding": encoding, "supported": supported_encodings()})
+        logger.debug(f"WebSocket encoding {encoding} (requested {requested})")
+    return encoding
+
+
+class Frame:
+    """An outgoing message, encoded at most once per wire encoding"""
+
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+
+    def encode(self, encoding: str) -> Union[str, bytes]:
+        data = self._encoded.get(encoding)
+        if data is None:
+            # deflate compresses the JSON text, so share it when both are used
+            text = self._encoded.get(JSON) if encoding == DEFLATE else None
+            data = self._encoded[encoding] = encode(self.message, encoding, text)
+        return data
+
+
+async def send_frame(websocket, frame: Frame) -> None:
+    """Send a frame in the WebSocket's encoding"""
+    data = frame.encode(get_encoding(websocket))
+    if isinstance(data, bytes):
+        await websocket.send_bytes(data)
+    else:
+        await websocket.send_text(data)
+
+
+async def send(websocket, message: Dict[str, Any]) -> None:
+    """Send one message in the WebSocket's encoding"""
+    if get_encoding(websocket) == JSON:
+        await websocket.send_json(message)
+    else:
+        await send_frame(websocket, Frame(message))
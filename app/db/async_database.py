@@ -0,0 +1,189 @@
+"""
+Async database facade
+
+The functions in app.db.database are synchronous. Calling them directly from
+an `async def` runs SQLite on the event loop thread, so one slow query stalls
+every WebSocket stream in the process. This module runs them on dedicated
+executors instead:
+
+- Reads go to a bounded reader pool (settings.db_async_readers threads)
+- Writes go to a single writer thread, which preserves write ordering and
+  matches the pool's single-writer model (see app/db/pool.py)
+
+Call sites pass the function object so existing patches of a module's
+`database` reference keep working:
+
+    from app.db import async_database
+    session = await async_database.run(database.get_session, session_id)
+
+Also provides LoopLagMonitor, which measures how long the event loop was
+blocked by anything that still runs synchronously.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Function name prefixes in app.db.database that modify data
+_WRITE_PREFIXES = (
+    "add_", "create_", "update_", "delete_", "set_", "log_", "record_",
+    "clear_", "cleanup_", "increment_", "remove_", "save_", "upsert_",
+    "mark_", "revoke_", "reset_", "toggle_", "rename_", "move_", "init_",
+    "claim_", "revert_",
+)
+
+_executor_lock = threading.Lock()
+_reader_executor: Optional[ThreadPoolExecutor] = None
+_writer_executor: Optional[ThreadPoolExecutor] = None
+
+
+def is_write_function(func: Callable) -> bool:
+    """Classify a database function as a write by its name"""
+    name = getattr(func, "__name__", "") or ""
+    return name.startswith(_WRITE_PREFIXES)
+
+
+def _get_reader_executor() -> ThreadPoolExecutor:
+    global _reader_executor
+    if _reader_executor is None:
+        with _executor_lock:
+            if _reader_executor is None:
+                _reader_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.db_async_readers),
+                    thread_name_prefix="db-read",
+                )
+    return _reader_executor
+
+
+def _get_writer_executor() -> ThreadPoolExecutor:
+    global _writer_executor
+    if _writer_executor is None:
+        with _executor_lock:
+            if _writer_executor is None:
+                _writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+    return _writer_executor
+
+
+async def run_read(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a read-only database function on the reader pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_reader_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_write(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a database function that writes on the single writer thread"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_writer_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def submit_write(func: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+    """Queue a write on the writer thread without waiting (usable from any thread)"""
+    return _get_writer_executor().submit(func, *args, **kwargs)
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a database function off the event loop, routed by read/write"""
+    if is_write_function(func):
+        return await run_write(func, *args, **kwargs)
+    return await run_read(func, *args, **kwargs)
+
+
+def shutdown(wait: bool = True) -> None:
+    """Stop the executors (pending writes are completed when wait=True)"""
+    global _reader_executor, _writer_executor
+    with _executor_lock:
+        readers, writer = _reader_executor, _writer_executor
+        _reader_executor = None
+        _writer_executor = None
+    if writer:
+        writer.shutdown(wait=wait)
+    if readers:
+        readers.shutdown(wait=wait)
+
+
+# =============================================================================
+# Event Loop Lag Monitor
+# =============================================================================
+
+class LoopLagMonitor:
+    """
+    Measure event loop blocking.
+
+    Sleeps for a fixed interval and records how late it woke up. Any lag
+    beyond the interval is time the loop spent running synchronous code.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_threshold_ms: float = 100.0):
+        self.interval = interval
+        self.warn_threshold_ms = warn_threshold_ms
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self.slow_ticks = 0
+
+    def record(self, lag_ms: float) -> None:
+        """Record one lag sample"""
+        lag_ms = max(0.0, lag_ms)
+        self.samples += 1
+        self.last_lag_ms = lag_ms
+        self.total_lag_ms += lag_ms
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+        if lag_ms >= self.warn_threshold_ms:
+            self.slow_ticks += 1
+            logger.warning(f"Event loop was blocked for {lag_ms:.1f}ms")
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            elapsed = time.perf_counter() - start
+            self.record((elapsed - self.interval) * 1000)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "avg_lag_ms": round(self.total_lag_ms / self.samples, 3) if self.samples else 0.0,
+            "slow_ticks": self.slow_ticks,
+            "warn_threshold_ms": self.warn_threshold_ms,
+        }
+
+
+# Global loop lag monitor (started in app lifespan)
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.loop_lag_interval_ms / 1000,
+    warn_threshold_ms=settings.loop_lag_warn_ms,
+)
@@ -5,11 +5,14 @@ SQLite database setup and operations
 import sqlite3
 import json
 import logging
+import re
+import threading
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from contextlib import contextmanager
 
 from app.core.config import settings
+from app.db.pool import ConnectionPool, PoolConfig
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +24,10 @@ logger = logging.getLogger(__name__)
 # v24: Add unique index on active worktrees to prevent race conditions, fix N+1 queries
 # v25: Add api_user_profiles junction table for multi-profile support
 # v26: Add built-in subagent support with default values storage and protection
-SCHEMA_VERSION = 26
+# v27: Add FTS5 search index over session titles and message content
+# v28: Add rate_limit_buckets table for persisted rate limit windows
+# v29: Add agent_runs.priority for agent scheduling
+SCHEMA_VERSION = 29
 
 
 # =============================================================================
@@ -35,9 +41,84 @@ class WorktreeStatus:
     ORPHANED = "orphaned"   # Worktree path no longer exists on disk (cleanup needed)
 
 
+# =============================================================================
+# Search Index Constants
+# =============================================================================
+# Tokenizer for the FTS5 search index (case and diacritic insensitive)
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+# Title hits outrank content hits with a similar BM25 score
+SEARCH_TITLE_WEIGHT = 2.0
+# Markers wrapped around matched terms in snippets (rendered by the frontend)
+SEARCH_HIGHLIGHT_OPEN = "**"
+SEARCH_HIGHLIGHT_CLOSE = "**"
+
+
+# =============================================================================
+# Connection Management
+# =============================================================================
+# get_db() hands out per-thread pooled connections (see app/db/pool.py) when
+# settings.db_pool_enabled is set, otherwise a fresh connection per call.
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_config_from_settings() -> PoolConfig:
+    return PoolConfig(
+        journal_mode=settings.db_journal_mode,
+        synchronous=settings.db_synchronous,
+        mmap_size=settings.db_mmap_size,
+        cache_size_kib=settings.db_cache_size_kib,
+        busy_timeout_ms=settings.db_busy_timeout_ms,
+        statement_cache_size=settings.db_statement_cache_size,
+        busy_retries=settings.db_busy_retries,
+    )
+
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.db_path != settings.db_path:
+        with _pool_lock:
+            if _pool is None or _pool.db_path != settings.db_path:
+                if _pool is not None:
+                    # Data directory changed (e.g. reconfigured) - drop old connections
+                    _pool.close_all()
+                _pool = ConnectionPool(settings.db_path, _pool_config_from_settings())
+            pool = _pool
+    return pool
+
+
+def set_pool(pool: Optional[ConnectionPool]) -> Optional[ConnectionPool]:
+    """Install a different pool (or None to rebuild from settings). Returns the old one."""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
+
+
+def close_pool():
+    """Close all pooled connections (called on shutdown)"""
+    if _pool is not None:
+        _pool.close_all()
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Get connection pool metrics for diagnostics"""
+    if not settings.db_pool_enabled:
+        return {"enabled": False}
+    return {"enabled": True, **get_pool().get_metrics()}
+
+
 def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory"""
-    conn = sqlite3.connect(str(settings.db_path), check_same_thread=False)
+    """Get a new (unpooled) database connection with row factory"""
+    conn = sqlite3.connect(
+        str(settings.db_path),
+        check_same_thread=False,
+        timeout=settings.db_busy_timeout_ms / 1000,
+        cached_statements=settings.db_statement_cache_size,
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
@@ -46,6 +127,11 @@ def get_connection() -> sqlite3.Connection:
 @contextmanager
 def get_db():
     """Context manager for database connections"""
+    if settings.db_pool_enabled:
+        with get_pool().connection() as conn:
+            yield conn
+        return
+
     conn = get_connection()
     try:
         yield conn
@@ -57,6 +143,42 @@ def get_db():
         conn.close()
 
 
+def _begin_immediate(conn: sqlite3.Connection) -> None:
+    """
+    Take the write lock now rather than at the first write statement, so
+    reads earlier in the transaction cannot be invalidated by another writer.
+    A no-op inside an already open transaction.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+# =============================================================================
+# Change Notifications
+# =============================================================================
+# Caches of rows that rarely change (see app/core/options_cache.py and
+# app/core/credential_service.py) register a listener; writes to those tables
+# call it with the table name and the key of the changed row (the api_user_id
+# for user credentials and their policies, None when many rows may have changed).
+
+ChangeListener = Callable[[str, Optional[str]], None]
+_change_listeners: List[ChangeListener] = []
+
+
+def add_change_listener(listener: ChangeListener) -> None:
+    """Call listener(table, key) after a write to a cached table"""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _notify_change(table: str, key: Optional[str] = None) -> None:
+    for listener in _change_listeners:
+        try:
+            listener(table, key)
+        except Exception as e:
+            logger.warning(f"Change listener failed for {table}: {e}")
+
+
 def init_database():
     """Initialize the database with schema"""
     logger.info(f"Initializing database at {settings.db_path}")
@@ -609,6 +731,15 @@ def _create_schema(cursor: sqlite3.Cursor):
         )
     """)
 
+    # Persisted rate limit counters (see app/core/rate_limiter.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # Create rate limit indexes
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_user ON rate_limits(user_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_api_key ON rate_limits(api_key_id)")
@@ -689,6 +820,7 @@ def _create_schema(cursor: sqlite3.Cursor):
             auto_merge BOOLEAN DEFAULT FALSE,
             auto_review BOOLEAN DEFAULT FALSE,
             max_duration_minutes INTEGER DEFAULT 30,
+            priority INTEGER DEFAULT 0,
             sdk_session_id TEXT,
             started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             completed_at TIMESTAMP,
@@ -712,6 +844,12 @@ def _create_schema(cursor: sqlite3.Cursor):
     except sqlite3.OperationalError:
         pass  # Column already exists
 
+    # Migration: Add priority column to agent_runs (for existing DBs)
+    try:
+        cursor.execute("ALTER TABLE agent_runs ADD COLUMN priority INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
     # Agent tasks - hierarchical task tracking within agent runs
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS agent_tasks (
@@ -828,6 +966,107 @@ def _create_schema(cursor: sqlite3.Cursor):
             VALUES (?, ?, ?)
         """, (policy_id, policy, description))
 
+    _create_search_index(cursor)
+
+
+def _create_search_index(cursor: sqlite3.Cursor):
+    """
+    Create the FTS5 search index over session titles and message content.
+
+    sessions_fts holds a copy of each session title. messages_fts is an
+    external-content index over session_messages (user and assistant rows
+    only), so message text is not stored twice. Both are kept in sync by
+    triggers and backfilled the first time they are created. If the SQLite
+    build lacks FTS5 the index is skipped and search falls back to LIKE.
+    """
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('sessions_fts', 'messages_fts')"
+    )
+    needs_backfill = cursor.fetchone()[0] < 2
+
+    try:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                session_id UNINDEXED,
+                title,
+                tokenize = '{SEARCH_TOKENIZER}',
+                prefix = '2 3'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content,
+                content = 'session_messages',
+                content_rowid = 'id',
+                tokenize = '{SEARCH_TOKENIZER}',
+                prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 not available, session search will use LIKE: {e}")
+        return
+
+    # Session titles
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions
+        WHEN new.title IS NOT NULL
+        BEGIN
+            INSERT INTO sessions_fts (session_id, title) VALUES (new.id, new.title);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS sessions_fts_update AFTER UPDATE OF title ON sessions
+        BEGIN
+            DELETE FROM sessions_fts WHERE session_id = old.id;
+            INSERT INTO sessions_fts (session_id, title)
+            SELECT new.id, new.title WHERE new.title IS NOT NULL;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM sessions_fts WHERE session_id = old.id;
+        END
+    """)
+
+    # Message content - external content tables need the old values to delete
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON session_messages
+        WHEN new.role IN ('user', 'assistant')
+        BEGIN
+            INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content, role ON session_messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            SELECT 'delete', old.id, old.content WHERE old.role IN ('user', 'assistant');
+            INSERT INTO messages_fts (rowid, content)
+            SELECT new.id, new.content WHERE new.role IN ('user', 'assistant');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON session_messages
+        WHEN old.role IN ('user', 'assistant')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    """)
+
+    if needs_backfill:
+        logger.info("Backfilling session search index")
+        cursor.execute("DELETE FROM sessions_fts")
+        cursor.execute("""
+            INSERT INTO sessions_fts (session_id, title)
+            SELECT id, title FROM sessions WHERE title IS NOT NULL
+        """)
+        cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('delete-all')")
+        cursor.execute("""
+            INSERT INTO messages_fts (rowid, content)
+            SELECT id, content FROM session_messages WHERE role IN ('user', 'assistant')
+        """)
+
 
 def row_to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
     """Convert a sqlite3.Row to a dictionary"""
@@ -1202,6 +1441,7 @@ def update_profile(
                 f"UPDATE profiles SET {', '.join(updates)} WHERE id = ?",
                 values
             )
+        _notify_change("profiles", profile_id)
 
     return get_profile(profile_id)
 
@@ -1223,7 +1463,9 @@ def delete_profile(profile_id: str) -> bool:
         cursor.execute("DELETE FROM sessions WHERE profile_id = ?", (profile_id,))
         # Now delete the profile
         cursor.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    _notify_change("profiles", profile_id)
+    return deleted
 
 
 def set_profile_builtin(profile_id: str, is_builtin: bool) -> bool:
@@ -1234,7 +1476,9 @@ def set_profile_builtin(profile_id: str, is_builtin: bool) -> bool:
             "UPDATE profiles SET is_builtin = ?, updated_at = ? WHERE id = ?",
             (is_builtin, datetime.utcnow().isoformat(), profile_id)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+    _notify_change("profiles", profile_id)
+    return updated
 
 
 # ============================================================================
@@ -1547,6 +1791,15 @@ def get_session_forks(session_id: str) -> List[Dict[str, Any]]:
 # Session Message Operations
 # ============================================================================
 
+def _decode_message_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for row in rows:
+        if row.get("tool_input"):
+            row["tool_input"] = json.loads(row["tool_input"]) if isinstance(row["tool_input"], str) else row["tool_input"]
+        if row.get("metadata"):
+            row["metadata"] = json.loads(row["metadata"]) if isinstance(row["metadata"], str) else row["metadata"]
+    return rows
+
+
 def get_session_messages(session_id: str) -> List[Dict[str, Any]]:
     """Get all messages for a session"""
     with get_db() as conn:
@@ -1555,13 +1808,81 @@ def get_session_messages(session_id: str) -> List[Dict[str, Any]]:
             "SELECT * FROM session_messages WHERE session_id = ? ORDER BY created_at ASC",
             (session_id,)
         )
-        rows = rows_to_list(cursor.fetchall())
-        for row in rows:
-            if row.get("tool_input"):
-                row["tool_input"] = json.loads(row["tool_input"]) if isinstance(row["tool_input"], str) else row["tool_input"]
-            if row.get("metadata"):
-                row["metadata"] = json.loads(row["metadata"]) if isinstance(row["metadata"], str) else row["metadata"]
-        return rows
+        return _decode_message_rows(rows_to_list(cursor.fetchall()))
+
+
+def get_session_messages_page(
+    session_id: str,
+    limit: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    around_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Get one page of a session's messages in id order.
+
+    Keyset pagination on (session_id, id), served by
+    idx_session_messages_session (id is the rowid). Without a cursor the
+    latest `limit` messages are returned; before_id/after_id page
+    older/newer than a message and around_id centers the page on one.
+
+    Returns a dict with messages, total, has_more_before and has_more_after.
+    """
+    limit = max(1, limit)
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        def older(message_id: Optional[int], count: int) -> List[Dict[str, Any]]:
+            if message_id is None:
+                cursor.execute(
+                    "SELECT * FROM session_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (session_id, count)
+                )
+            else:
+                cursor.execute(
+                    "SELECT * FROM session_messages WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (session_id, message_id, count)
+                )
+            return rows_to_list(cursor.fetchall())[::-1]
+
+        def newer(message_id: int, count: int, inclusive: bool = False) -> List[Dict[str, Any]]:
+            cursor.execute(
+                f"SELECT * FROM session_messages WHERE session_id = ? AND id {'>=' if inclusive else '>'} ? "
+                "ORDER BY id ASC LIMIT ?",
+                (session_id, message_id, count)
+            )
+            return rows_to_list(cursor.fetchall())
+
+        # Fetch one extra row on each side to know whether there is more
+        if around_id is not None:
+            before_rows = older(around_id, limit + 1)
+            after_rows = newer(around_id, limit + 1, inclusive=True)
+            take_before = min(len(before_rows), limit // 2)
+            take_after = min(len(after_rows), limit - take_before)
+            take_before = min(len(before_rows), limit - take_after)
+            rows = before_rows[len(before_rows) - take_before:] + after_rows[:take_after]
+            has_more_before = len(before_rows) > take_before
+            has_more_after = len(after_rows) > take_after
+        elif after_id is not None:
+            rows = newer(after_id, limit + 1)
+            has_more_after = len(rows) > limit
+            rows = rows[:limit]
+            has_more_before = bool(older(after_id + 1, 1))
+        else:
+            rows = older(before_id, limit + 1)
+            has_more_before = len(rows) > limit
+            rows = rows[-limit:]
+            has_more_after = before_id is not None and bool(newer(before_id, 1, inclusive=True))
+
+        cursor.execute("SELECT COUNT(*) FROM session_messages WHERE session_id = ?", (session_id,))
+        total = cursor.fetchone()[0]
+
+        return {
+            "messages": _decode_message_rows(rows),
+            "total": total,
+            "has_more_before": has_more_before,
+            "has_more_after": has_more_after,
+        }
 
 
 def add_session_message(
@@ -1596,6 +1917,64 @@ def add_session_message(
         }
 
 
+def write_batch(
+    session_messages: Optional[List[Dict[str, Any]]] = None,
+    sync_logs: Optional[List[Dict[str, Any]]] = None,
+    usage_logs: Optional[List[Dict[str, Any]]] = None
+) -> None:
+    """
+    Insert a batch of write-behind rows in a single transaction.
+
+    Each list holds keyword dicts matching add_session_message, add_sync_log
+    and log_usage. Rows are inserted with executemany, in order.
+    """
+    session_messages = session_messages or []
+    sync_logs = sync_logs or []
+    usage_logs = usage_logs or []
+    now = datetime.utcnow().isoformat()
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        if session_messages:
+            cursor.executemany(
+                """INSERT INTO session_messages (session_id, role, content, tool_name, tool_input, metadata, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (m["session_id"], m["role"], m["content"], m.get("tool_name"),
+                     json.dumps(m["tool_input"]) if m.get("tool_input") else None,
+                     json.dumps(m["metadata"]) if m.get("metadata") else None,
+                     m.get("created_at") or now)
+                    for m in session_messages
+                ]
+            )
+
+        if sync_logs:
+            cursor.executemany(
+                """INSERT INTO sync_log (session_id, event_type, entity_type, entity_id, data, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (entry["session_id"], entry["event_type"], entry["entity_type"], entry.get("entity_id"),
+                     json.dumps(entry["data"]) if entry.get("data") else None,
+                     entry.get("created_at") or now)
+                    for entry in sync_logs
+                ]
+            )
+
+        if usage_logs:
+            cursor.executemany(
+                """INSERT INTO usage_log (session_id, profile_id, model, tokens_in, tokens_out, cost_usd, duration_ms)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (u.get("session_id"), u.get("profile_id"), u.get("model"),
+                     u.get("tokens_in", 0), u.get("tokens_out", 0),
+                     u.get("cost_usd", 0), u.get("duration_ms", 0))
+                    for u in usage_logs
+                ]
+            )
+
+
+
 def delete_session_message(session_id: str, message_id: int) -> bool:
     """Delete a specific message from a session"""
     with get_db() as conn:
@@ -1624,154 +2003,445 @@ def search_sessions(
     profile_id: Optional[str] = None,
     api_user_id: Optional[str] = None,
     admin_only: bool = False,
-    limit: int = 20
+    limit: int = 20,
+    tag_id: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Search sessions by title and message content.
     Returns sessions with matching snippets showing where the match was found.
+
+    Served from the FTS5 index (BM25-ranked, prefix and "phrase" queries)
+    when it exists, otherwise from a LIKE scan.
     """
     if not query or not query.strip():
         return []
 
-    search_term = f"%{query.strip()}%"
-
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Build the base query - search both session titles and message content
-        # Use UNION to combine title matches and content matches
-        sql = """
-        WITH title_matches AS (
-            SELECT
-                s.id,
-                s.project_id,
-                s.profile_id,
-                s.api_user_id,
-                s.title,
-                s.status,
-                s.total_cost_usd,
-                s.total_tokens_in,
-                s.total_tokens_out,
-                s.turn_count,
-                s.created_at,
-                s.updated_at,
-                'title' as match_type,
-                s.title as match_snippet,
-                s.updated_at as match_time
-            FROM sessions s
-            WHERE s.title LIKE ? COLLATE NOCASE
-            AND s.status != 'archived'
-        ),
-        content_matches AS (
-            SELECT DISTINCT
-                s.id,
-                s.project_id,
-                s.profile_id,
-                s.api_user_id,
-                s.title,
-                s.status,
-                s.total_cost_usd,
-                s.total_tokens_in,
-                s.total_tokens_out,
-                s.turn_count,
-                s.created_at,
-                s.updated_at,
-                'content' as match_type,
-                (
-                    SELECT SUBSTR(
-                        sm2.content,
-                        MAX(1, INSTR(LOWER(sm2.content), LOWER(?)) - 40),
-                        120
-                    )
-                    FROM session_messages sm2
-                    WHERE sm2.session_id = s.id
-                    AND sm2.content LIKE ? COLLATE NOCASE
-                    AND sm2.role IN ('user', 'assistant')
-                    ORDER BY sm2.created_at DESC
-                    LIMIT 1
-                ) as match_snippet,
-                (
-                    SELECT sm3.created_at
-                    FROM session_messages sm3
-                    WHERE sm3.session_id = s.id
-                    AND sm3.content LIKE ? COLLATE NOCASE
-                    AND sm3.role IN ('user', 'assistant')
-                    ORDER BY sm3.created_at DESC
-                    LIMIT 1
-                ) as match_time
-            FROM sessions s
-            INNER JOIN session_messages sm ON sm.session_id = s.id
-            WHERE sm.content LIKE ? COLLATE NOCASE
-            AND sm.role IN ('user', 'assistant')
-            AND s.status != 'archived'
-        ),
-        all_matches AS (
-            SELECT * FROM title_matches
-            UNION ALL
-            SELECT * FROM content_matches
+        match = build_fts_query(query)
+        if match and _has_search_index(cursor):
+            try:
+                return _search_sessions_fts(
+                    cursor, match, project_id, profile_id, api_user_id, admin_only, tag_id, limit
+                )
+            except sqlite3.OperationalError as e:
+                logger.warning(f"FTS session search failed, falling back to LIKE: {e}")
+
+        return _search_sessions_like(
+            cursor, query, project_id, profile_id, api_user_id, admin_only, tag_id, limit
         )
+
+
+def build_fts_query(query: str) -> Optional[str]:
+    """
+    Convert user search text into an FTS5 MATCH expression.
+
+    - "quoted text" is a phrase query
+    - a term ending in * is a prefix query
+    - the last term is a prefix query unless followed by a space, so results
+      update while the user is still typing
+    - all terms must match (implicit AND)
+
+    Every term is quoted, so FTS5 operators in user input are searched as
+    text rather than causing syntax errors. Returns None if nothing in the
+    query is searchable.
+    """
+    terms = []
+    for match in re.finditer(r'"([^"]*)"|(\S+)', query):
+        phrase, word = match.group(1), match.group(2)
+        if phrase is not None:
+            if re.search(r"\w", phrase):
+                terms.append((f'"{phrase.strip()}"', False, True))
+            continue
+        prefix = word.endswith("*")
+        word = word.replace('"', "").strip("*")
+        if re.search(r"\w", word):
+            terms.append((f'"{word}"', prefix, False))
+
+    if not terms:
+        return None
+
+    # Search-as-you-type: treat a trailing bare word as a prefix
+    if not query[-1:].isspace():
+        text, _prefix, is_phrase = terms[-1]
+        if not is_phrase:
+            terms[-1] = (text, True, False)
+
+    return " ".join(text + ("*" if prefix else "") for text, prefix, _phrase in terms)
+
+
+def _has_search_index(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('sessions_fts', 'messages_fts')"
+    )
+    return cursor.fetchone()[0] == 2
+
+
+def search_index_available() -> bool:
+    """Check whether the FTS5 search index exists in this database"""
+    with get_db() as conn:
+        return _has_search_index(conn.cursor())
+
+
+def _session_search_filters(
+    project_id: Optional[str] = None,
+    profile_id: Optional[str] = None,
+    api_user_id: Optional[str] = None,
+    admin_only: bool = False,
+    tag_id: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    prefix: str = ""
+) -> Tuple[str, List[Any]]:
+    """Build the shared session filter clause for the search queries"""
+    sql = ""
+    params: List[Any] = []
+    if project_id:
+        sql += f" AND {prefix}project_id = ?"
+        params.append(project_id)
+    if profile_id:
+        sql += f" AND {prefix}profile_id = ?"
+        params.append(profile_id)
+    if admin_only:
+        sql += f" AND {prefix}api_user_id IS NULL"
+    elif api_user_id:
+        sql += f" AND {prefix}api_user_id = ?"
+        params.append(api_user_id)
+    if tag_id:
+        sql += f" AND {prefix}id IN (SELECT session_id FROM session_tags WHERE tag_id = ?)"
+        params.append(tag_id)
+    if created_after:
+        sql += f" AND {prefix}created_at >= ?"
+        params.append(created_after)
+    if created_before:
+        sql += f" AND {prefix}created_at < ?"
+        params.append(created_before)
+    return sql, params
+
+
+def _search_sessions_fts(
+    cursor: sqlite3.Cursor,
+    match: str,
+    project_id: Optional[str],
+    profile_id: Optional[str],
+    api_user_id: Optional[str],
+    admin_only: bool,
+    tag_id: Optional[str],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """BM25-ranked session search over the FTS5 index"""
+    filters, filter_params = _session_search_filters(
+        project_id, profile_id, api_user_id, admin_only, tag_id, prefix="s."
+    )
+
+    # Filters are applied inside both branches so the join only touches
+    # sessions the caller can see. The best-scoring hit of each session
+    # supplies its snippet (SQLite returns bare columns from the MIN() row).
+    sql = f"""
+    WITH hits AS (
         SELECT
-            id,
-            project_id,
-            profile_id,
-            api_user_id,
-            title,
-            status,
-            total_cost_usd,
-            total_tokens_in,
-            total_tokens_out,
-            turn_count,
-            created_at,
-            updated_at,
-            match_type,
-            match_snippet,
-            match_time
-        FROM all_matches
-        WHERE 1=1
-        """
-
-        # Base params for the search terms (used multiple times in query)
-        params = [search_term, query.strip(), search_term, search_term, search_term]
-
-        # Add filters
-        if project_id:
-            sql += " AND project_id = ?"
-            params.append(project_id)
-        if profile_id:
-            sql += " AND profile_id = ?"
-            params.append(profile_id)
-        if admin_only:
-            sql += " AND api_user_id IS NULL"
-        elif api_user_id:
-            sql += " AND api_user_id = ?"
-            params.append(api_user_id)
+            s.id AS session_id,
+            bm25(sessions_fts) * ? AS score,
+            'title' AS match_type,
+            highlight(sessions_fts, 1, ?, ?) AS match_snippet,
+            s.updated_at AS match_time
+        FROM sessions_fts
+        INNER JOIN sessions s ON s.id = sessions_fts.session_id
+        WHERE sessions_fts MATCH ?
+        AND s.status != 'archived'{filters}
+        UNION ALL
+        SELECT
+            s.id AS session_id,
+            bm25(messages_fts) AS score,
+            'content' AS match_type,
+            snippet(messages_fts, 0, ?, ?, '...', 24) AS match_snippet,
+            sm.created_at AS match_time
+        FROM messages_fts
+        INNER JOIN session_messages sm ON sm.id = messages_fts.rowid
+        INNER JOIN sessions s ON s.id = sm.session_id
+        WHERE messages_fts MATCH ?
+        AND s.status != 'archived'{filters}
+    ),
+    best AS (
+        SELECT session_id, MIN(score) AS score, match_type, match_snippet, match_time
+        FROM hits
+        GROUP BY session_id
+    )
+    SELECT
+        s.id,
+        s.project_id,
+        s.profile_id,
+        s.api_user_id,
+        s.title,
+        s.status,
+        s.total_cost_usd,
+        s.total_tokens_in,
+        s.total_tokens_out,
+        s.turn_count,
+        s.created_at,
+        s.updated_at,
+        best.match_type,
+        best.match_snippet,
+        best.match_time,
+        best.score AS rank
+    FROM best
+    INNER JOIN sessions s ON s.id = best.session_id
+    ORDER BY best.score, s.updated_at DESC
+    LIMIT ?
+    """
+    params = [
+        SEARCH_TITLE_WEIGHT, SEARCH_HIGHLIGHT_OPEN, SEARCH_HIGHLIGHT_CLOSE, match, *filter_params,
+        SEARCH_HIGHLIGHT_OPEN, SEARCH_HIGHLIGHT_CLOSE, match, *filter_params,
+        limit,
+    ]
+    cursor.execute(sql, params)
+    return rows_to_list(cursor.fetchall())
 
-        # Group by session to avoid duplicates, keeping the best match
-        # Order by most recent match
-        sql += """
-        GROUP BY id
-        ORDER BY
-            CASE WHEN match_type = 'title' THEN 0 ELSE 1 END,
-            updated_at DESC
-        LIMIT ?
-        """
-        params.append(limit)
 
-        cursor.execute(sql, params)
-        results = rows_to_list(cursor.fetchall())
+def _search_sessions_like(
+    cursor: sqlite3.Cursor,
+    query: str,
+    project_id: Optional[str],
+    profile_id: Optional[str],
+    api_user_id: Optional[str],
+    admin_only: bool,
+    tag_id: Optional[str],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """Substring session search for databases without the FTS5 index"""
+    search_term = f"%{query.strip()}%"
+
+    # Build the base query - search both session titles and message content
+    # Use UNION to combine title matches and content matches
+    sql = """
+    WITH title_matches AS (
+        SELECT
+            s.id,
+            s.project_id,
+            s.profile_id,
+            s.api_user_id,
+            s.title,
+            s.status,
+            s.total_cost_usd,
+            s.total_tokens_in,
+            s.total_tokens_out,
+            s.turn_count,
+            s.created_at,
+            s.updated_at,
+            'title' as match_type,
+            s.title as match_snippet,
+            s.updated_at as match_time
+        FROM sessions s
+        WHERE s.title LIKE ? COLLATE NOCASE
+        AND s.status != 'archived'
+    ),
+    content_matches AS (
+        SELECT DISTINCT
+            s.id,
+            s.project_id,
+            s.profile_id,
+            s.api_user_id,
+            s.title,
+            s.status,
+            s.total_cost_usd,
+            s.total_tokens_in,
+            s.total_tokens_out,
+            s.turn_count,
+            s.created_at,
+            s.updated_at,
+            'content' as match_type,
+            (
+                SELECT SUBSTR(
+                    sm2.content,
+                    MAX(1, INSTR(LOWER(sm2.content), LOWER(?)) - 40),
+                    120
+                )
+                FROM session_messages sm2
+                WHERE sm2.session_id = s.id
+                AND sm2.content LIKE ? COLLATE NOCASE
+                AND sm2.role IN ('user', 'assistant')
+                ORDER BY sm2.created_at DESC
+                LIMIT 1
+            ) as match_snippet,
+            (
+                SELECT sm3.created_at
+                FROM session_messages sm3
+                WHERE sm3.session_id = s.id
+                AND sm3.content LIKE ? COLLATE NOCASE
+                AND sm3.role IN ('user', 'assistant')
+                ORDER BY sm3.created_at DESC
+                LIMIT 1
+            ) as match_time
+        FROM sessions s
+        INNER JOIN session_messages sm ON sm.session_id = s.id
+        WHERE sm.content LIKE ? COLLATE NOCASE
+        AND sm.role IN ('user', 'assistant')
+        AND s.status != 'archived'
+    ),
+    all_matches AS (
+        SELECT * FROM title_matches
+        UNION ALL
+        SELECT * FROM content_matches
+    )
+    SELECT
+        id,
+        project_id,
+        profile_id,
+        api_user_id,
+        title,
+        status,
+        total_cost_usd,
+        total_tokens_in,
+        total_tokens_out,
+        turn_count,
+        created_at,
+        updated_at,
+        match_type,
+        match_snippet,
+        match_time
+    FROM all_matches
+    WHERE 1=1
+    """
 
-        # Clean up snippets - add ellipsis if truncated
-        for result in results:
-            if result.get('match_snippet') and result.get('match_type') == 'content':
-                snippet = result['match_snippet']
-                # Add ellipsis if we truncated
-                if len(snippet) >= 118:
-                    if not snippet.startswith(' '):
-                        snippet = '...' + snippet
-                    snippet = snippet + '...'
-                result['match_snippet'] = snippet.strip()
+    # Base params for the search terms (used multiple times in query)
+    params = [search_term, query.strip(), search_term, search_term, search_term]
 
-        return results
+    # Add filters
+    filters, filter_params = _session_search_filters(
+        project_id, profile_id, api_user_id, admin_only, tag_id
+    )
+    sql += filters
+    params.extend(filter_params)
+
+    # Group by session to avoid duplicates, keeping the best match
+    # Order by most recent match
+    sql += """
+    GROUP BY id
+    ORDER BY
+        CASE WHEN match_type = 'title' THEN 0 ELSE 1 END,
+        updated_at DESC
+    LIMIT ?
+    """
+    params.append(limit)
+
+    cursor.execute(sql, params)
+    results = rows_to_list(cursor.fetchall())
+
+    # Clean up snippets - add ellipsis if truncated
+    for result in results:
+        if result.get('match_snippet') and result.get('match_type') == 'content':
+            snippet = result['match_snippet']
+            # Add ellipsis if we truncated
+            if len(snippet) >= 118:
+                if not snippet.startswith(' '):
+                    snippet = '...' + snippet
+                snippet = snippet + '...'
+            result['match_snippet'] = snippet.strip()
+
+    return results
+
+
+def search_session_messages(
+    query: str,
+    project_id: Optional[str] = None,
+    profile_id: Optional[str] = None,
+    api_user_id: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    matches_per_session: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Search the FTS5 index for sessions and their matching messages.
+
+    Sessions are ranked by their best BM25 score (title or message). Each
+    result is a session row plus:
+    - title_snippet: highlighted title if the title matched, else None
+    - matches: up to matches_per_session matching messages in conversation
+      order, each with message_id, message_index, role, content, created_at
+      and a highlighted snippet
+
+    created_after/created_before filter on session creation time
+    (ISO strings, before is exclusive). Returns [] if the query has no
+    searchable terms; callers should check search_index_available() first.
+    """
+    match = build_fts_query(query) if query else None
+    if not match:
+        return []
+
+    filters, filter_params = _session_search_filters(
+        project_id, profile_id, api_user_id,
+        created_after=created_after, created_before=created_before, prefix="s."
+    )
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            WITH hits AS (
+                SELECT
+                    s.id AS session_id,
+                    bm25(sessions_fts) * ? AS score,
+                    highlight(sessions_fts, 1, ?, ?) AS title_snippet
+                FROM sessions_fts
+                INNER JOIN sessions s ON s.id = sessions_fts.session_id
+                WHERE sessions_fts MATCH ?{filters}
+                UNION ALL
+                SELECT
+                    s.id AS session_id,
+                    bm25(messages_fts) AS score,
+                    NULL AS title_snippet
+                FROM messages_fts
+                INNER JOIN session_messages sm ON sm.id = messages_fts.rowid
+                INNER JOIN sessions s ON s.id = sm.session_id
+                WHERE messages_fts MATCH ?{filters}
+            )
+            SELECT s.*, MIN(hits.score) AS rank, MAX(hits.title_snippet) AS title_snippet
+            FROM hits
+            INNER JOIN sessions s ON s.id = hits.session_id
+            GROUP BY hits.session_id
+            ORDER BY rank, s.updated_at DESC
+            LIMIT ? OFFSET ?
+        """, [
+            SEARCH_TITLE_WEIGHT, SEARCH_HIGHLIGHT_OPEN, SEARCH_HIGHLIGHT_CLOSE, match, *filter_params,
+            match, *filter_params,
+            limit, offset,
+        ])
+        sessions = rows_to_list(cursor.fetchall())
+        if not sessions:
+            return []
+
+        by_id = {session["id"]: session for session in sessions}
+        for session in sessions:
+            session["matches"] = []
+
+        placeholders = ",".join("?" * len(by_id))
+        cursor.execute(f"""
+            SELECT
+                sm.id AS message_id,
+                sm.session_id,
+                sm.role,
+                sm.content,
+                sm.created_at,
+                snippet(messages_fts, 0, ?, ?, '...', 24) AS snippet,
+                (
+                    SELECT COUNT(*) FROM session_messages prior
+                    WHERE prior.session_id = sm.session_id AND prior.id < sm.id
+                ) AS message_index
+            FROM messages_fts
+            INNER JOIN session_messages sm ON sm.id = messages_fts.rowid
+            WHERE messages_fts MATCH ?
+            AND sm.session_id IN ({placeholders})
+            ORDER BY sm.session_id, sm.id
+        """, [SEARCH_HIGHLIGHT_OPEN, SEARCH_HIGHLIGHT_CLOSE, match, *by_id])
+
+        for row in cursor.fetchall():
+            matches = by_id[row["session_id"]]["matches"]
+            if len(matches) < matches_per_session:
+                matches.append(dict(row))
+
+        return sessions
 
 
 # ============================================================================
@@ -1823,6 +2493,17 @@ def get_usage_stats() -> Dict[str, Any]:
         }
 
 
+def get_recent_query_durations(limit: int = 50) -> List[int]:
+    """Durations (ms) of the most recent queries, newest first"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT duration_ms FROM usage_log WHERE duration_ms > 0 ORDER BY id DESC LIMIT ?",
+            (limit,)
+        )
+        return [row["duration_ms"] for row in cursor.fetchall()]
+
+
 # ============================================================================
 # API User Operations
 # ============================================================================
@@ -2170,6 +2851,7 @@ def set_user_credential_policy(api_user_id: str, credential_type: str, policy: s
                    VALUES (?, ?, ?, ?, ?, ?)""",
                 (policy_id, api_user_id, credential_type, policy, now, now)
             )
+    _notify_change("user_credential_policies", api_user_id)
 
     return get_user_credential_policy(api_user_id, credential_type)
 
@@ -2182,7 +2864,9 @@ def delete_user_credential_policy(api_user_id: str, credential_type: str) -> boo
             "DELETE FROM user_credential_policies WHERE api_user_id = ? AND credential_type = ?",
             (api_user_id, credential_type)
         )
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    _notify_change("user_credential_policies", api_user_id)
+    return deleted
 
 
 def delete_all_user_credential_policies(api_user_id: str) -> int:
@@ -2193,7 +2877,9 @@ def delete_all_user_credential_policies(api_user_id: str) -> int:
             "DELETE FROM user_credential_policies WHERE api_user_id = ?",
             (api_user_id,)
         )
-        return cursor.rowcount
+        deleted = cursor.rowcount
+    _notify_change("user_credential_policies", api_user_id)
+    return deleted
 
 
 # Default credential types that every user should have policies for
@@ -2246,6 +2932,7 @@ def create_default_user_credential_policies(api_user_id: str, default_policy: st
                 "credential_type": credential_type,
                 "policy": default_policy
             })
+    _notify_change("user_credential_policies", api_user_id)
 
     return created
 
@@ -2329,6 +3016,7 @@ def set_user_credential(api_user_id: str, credential_type: str, encrypted_value:
                    VALUES (?, ?, ?, ?, ?, ?)""",
                 (cred_id, api_user_id, credential_type, encrypted_value, now, now)
             )
+    _notify_change("api_user_credentials", api_user_id)
 
     return get_user_credential(api_user_id, credential_type)
 
@@ -2341,7 +3029,9 @@ def delete_user_credential(api_user_id: str, credential_type: str) -> bool:
             "DELETE FROM api_user_credentials WHERE api_user_id = ? AND credential_type = ?",
             (api_user_id, credential_type)
         )
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    _notify_change("api_user_credentials", api_user_id)
+    return deleted
 
 
 def user_has_credential(api_user_id: str, credential_type: str) -> bool:
@@ -2510,6 +3200,24 @@ def get_latest_sync_id(session_id: str) -> int:
         return row["max_id"] or 0
 
 
+def get_sync_events(session_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+    """
+    Get sync events that overflowed from the in-memory replay log (see
+    SyncEngine._record), oldest first. Each item holds the event and the
+    epoch of the engine that recorded it.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT data FROM sync_log
+               WHERE session_id = ? AND entity_type = 'sync_event'
+                 AND CAST(entity_id AS INTEGER) > ?
+               ORDER BY id ASC""",
+            (session_id, after_seq)
+        )
+        return [json.loads(row["data"]) for row in cursor.fetchall() if row["data"]]
+
+
 def cleanup_old_sync_logs(max_age_hours: int = 24):
     """Remove sync log entries older than max_age_hours"""
     from datetime import timedelta
@@ -2924,6 +3632,7 @@ def update_subagent(
                 f"UPDATE subagents SET {', '.join(updates)} WHERE id = ?",
                 values
             )
+        _notify_change("subagents", subagent_id)
 
     return get_subagent(subagent_id)
 
@@ -2933,7 +3642,9 @@ def delete_subagent(subagent_id: str) -> bool:
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM subagents WHERE id = ?", (subagent_id,))
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    _notify_change("subagents", subagent_id)
+    return deleted
 
 
 def set_subagent_builtin(subagent_id: str, is_builtin: bool) -> bool:
@@ -2944,7 +3655,9 @@ def set_subagent_builtin(subagent_id: str, is_builtin: bool) -> bool:
             "UPDATE subagents SET is_builtin = ?, updated_at = ? WHERE id = ?",
             (is_builtin, datetime.utcnow().isoformat(), subagent_id)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+    _notify_change("subagents", subagent_id)
+    return updated
 
 
 def revert_subagent_to_defaults(subagent_id: str) -> Optional[Dict[str, Any]]:
@@ -2986,6 +3699,7 @@ def revert_subagent_to_defaults(subagent_id: str) -> Optional[Dict[str, Any]]:
                WHERE id = ?""",
             (datetime.utcnow().isoformat(), subagent_id)
         )
+    _notify_change("subagents", subagent_id)
 
     return get_subagent(subagent_id)
 
@@ -3097,6 +3811,17 @@ def get_system_setting(key: str) -> Optional[str]:
         return row["value"] if row else None
 
 
+def get_system_settings(keys: List[str]) -> Dict[str, str]:
+    """Get several system settings in one query (missing keys are left out)"""
+    if not keys:
+        return {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in keys)
+        cursor.execute(f"SELECT key, value FROM system_settings WHERE key IN ({placeholders})", list(keys))
+        return {row["key"]: row["value"] for row in cursor.fetchall()}
+
+
 def set_system_setting(key: str, value: str) -> None:
     """Set a system setting (upsert)"""
     with get_db() as conn:
@@ -3110,6 +3835,7 @@ def set_system_setting(key: str, value: str) -> None:
                    updated_at = excluded.updated_at""",
             (key, value, now)
         )
+    _notify_change("system_settings", key)
 
 
 def delete_system_setting(key: str) -> bool:
@@ -3117,7 +3843,9 @@ def delete_system_setting(key: str) -> bool:
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM system_settings WHERE key = ?", (key,))
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+    _notify_change("system_settings", key)
+    return deleted
 
 
 def get_all_system_settings() -> Dict[str, str]:
@@ -4040,6 +4768,31 @@ def get_request_count(
         return row["count"] if row else 0
 
 
+def get_rate_limit_buckets() -> List[Dict[str, Any]]:
+    """Get persisted rate limit counters"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, data, updated_at FROM rate_limit_buckets")
+        rows = rows_to_list(cursor.fetchall())
+        for row in rows:
+            row["data"] = json.loads(row["data"])
+        return rows
+
+
+def save_rate_limit_buckets(buckets: Dict[str, Dict[str, Any]], deleted: Optional[List[str]] = None) -> None:
+    """Save rate limit counters by key and delete the rows of dropped keys"""
+    now = datetime.utcnow().isoformat()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """INSERT INTO rate_limit_buckets (key, data, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at""",
+            [(key, json.dumps(data, separators=(",", ":")), now) for key, data in buckets.items()]
+        )
+        if deleted:
+            cursor.executemany("DELETE FROM rate_limit_buckets WHERE key = ?", [(key,) for key in deleted])
+
+
 def cleanup_old_request_logs(older_than: datetime) -> int:
     """Remove request logs older than a given time"""
     with get_db() as conn:
@@ -4096,6 +4849,47 @@ def create_knowledge_document(
     return get_knowledge_document(document_id)
 
 
+def create_knowledge_document_with_chunks(
+    document_id: str,
+    project_id: str,
+    filename: str,
+    content: str,
+    chunks: List[Dict[str, Any]],
+    content_type: str = "text/plain",
+    file_size: int = 0
+) -> Tuple[str, str]:
+    """
+    Create a knowledge document and all its chunks in one transaction.
+
+    Each chunk dict needs id, chunk_index and content, and may set metadata.
+
+    Returns:
+        The project's knowledge revision (before, after) this write, read
+        inside the same transaction so concurrent writes cannot interleave
+    """
+    now = datetime.utcnow().isoformat()
+    with get_db() as conn:
+        _begin_immediate(conn)
+        cursor = conn.cursor()
+        previous_revision = _knowledge_revision(cursor, project_id)
+        cursor.execute(
+            """INSERT INTO knowledge_documents
+               (id, project_id, filename, content, content_type, file_size, chunk_count, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (document_id, project_id, filename, content, content_type, file_size, len(chunks), now, now)
+        )
+        cursor.executemany(
+            """INSERT INTO knowledge_chunks (id, document_id, chunk_index, content, metadata, created_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (chunk["id"], document_id, chunk["chunk_index"], chunk["content"],
+                 json.dumps(chunk.get("metadata") or {}), now)
+                for chunk in chunks
+            ]
+        )
+        return previous_revision, _knowledge_revision(cursor, project_id)
+
+
 def update_knowledge_document(
     document_id: str,
     content: Optional[str] = None,
@@ -4138,6 +4932,27 @@ def delete_knowledge_document(document_id: str) -> bool:
         return cursor.rowcount > 0
 
 
+def delete_knowledge_document_with_revisions(document_id: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Delete a knowledge document (chunks will be cascade deleted).
+
+    Returns:
+        Tuple of (project_id, revision before, revision after), read inside
+        the delete transaction, or None if the document was not found
+    """
+    with get_db() as conn:
+        _begin_immediate(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT project_id FROM knowledge_documents WHERE id = ?", (document_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        project_id = row["project_id"]
+        previous_revision = _knowledge_revision(cursor, project_id)
+        cursor.execute("DELETE FROM knowledge_documents WHERE id = ?", (document_id,))
+        return project_id, previous_revision, _knowledge_revision(cursor, project_id)
+
+
 def get_knowledge_chunks(document_id: str) -> List[Dict[str, Any]]:
     """Get all chunks for a document"""
     with get_db() as conn:
@@ -4203,39 +5018,26 @@ def delete_knowledge_chunks_for_document(document_id: str) -> int:
         return cursor.rowcount
 
 
-def search_knowledge_chunks(project_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+def get_knowledge_revision(project_id: str) -> str:
     """
-    Simple keyword-based search for relevant knowledge chunks.
-    Returns chunks that contain the query terms (case-insensitive).
-
-    For future: This can be enhanced with vector embeddings for semantic search.
+    Cheap fingerprint of a project's knowledge base.
+    Changes whenever documents are added, removed or updated.
     """
-    query_lower = query.lower()
-    query_terms = query_lower.split()
-
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """SELECT kc.*, kd.filename
-               FROM knowledge_chunks kc
-               JOIN knowledge_documents kd ON kc.document_id = kd.id
-               WHERE kd.project_id = ?""",
-            (project_id,)
-        )
-        rows = rows_to_list(cursor.fetchall())
+        return _knowledge_revision(conn.cursor(), project_id)
 
-        scored_chunks = []
-        for row in rows:
-            content_lower = row["content"].lower()
-            score = sum(1 for term in query_terms if term in content_lower)
-            if score > 0:
-                row["relevance_score"] = score
-                if row.get("metadata"):
-                    row["metadata"] = json.loads(row["metadata"]) if isinstance(row["metadata"], str) else row["metadata"]
-                scored_chunks.append(row)
 
-        scored_chunks.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return scored_chunks[:limit]
+def _knowledge_revision(cursor: sqlite3.Cursor, project_id: str) -> str:
+    cursor.execute(
+        """SELECT COUNT(*) as document_count,
+                  COALESCE(SUM(chunk_count), 0) as total_chunks,
+                  COALESCE(MAX(created_at), '') as last_created,
+                  COALESCE(MAX(updated_at), '') as last_updated
+           FROM knowledge_documents WHERE project_id = ?""",
+        (project_id,)
+    )
+    row = cursor.fetchone()
+    return ":".join(str(value) for value in tuple(row))
 
 
 def get_knowledge_stats_for_project(project_id: str) -> Dict[str, Any]:
@@ -4594,7 +5396,8 @@ def create_agent_run(
     auto_merge: bool = False,
     auto_review: bool = False,
     max_duration_minutes: int = 30,
-    base_branch: Optional[str] = None
+    base_branch: Optional[str] = None,
+    priority: int = 0
 ) -> Optional[Dict[str, Any]]:
     """Create a new agent run record"""
     now = datetime.utcnow().isoformat()
@@ -4603,10 +5406,10 @@ def create_agent_run(
         cursor.execute(
             """INSERT INTO agent_runs
                (id, name, prompt, status, progress, profile_id, project_id,
-                auto_branch, auto_pr, auto_merge, auto_review, max_duration_minutes, base_branch, started_at)
-               VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                auto_branch, auto_pr, auto_merge, auto_review, max_duration_minutes, base_branch, priority, started_at)
+               VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (agent_run_id, name, prompt, profile_id, project_id,
-             auto_branch, auto_pr, auto_merge, auto_review, max_duration_minutes, base_branch, now)
+             auto_branch, auto_pr, auto_merge, auto_review, max_duration_minutes, base_branch, priority, now)
         )
     return get_agent_run(agent_run_id)
 
@@ -4678,11 +5481,11 @@ def get_running_agent_runs() -> List[Dict[str, Any]]:
 
 
 def get_queued_agent_runs() -> List[Dict[str, Any]]:
-    """Get all queued agent runs"""
+    """Get all queued agent runs, highest priority first, then oldest first"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT * FROM agent_runs WHERE status = 'queued' ORDER BY started_at ASC"
+            "SELECT * FROM agent_runs WHERE status = 'queued' ORDER BY priority DESC, started_at ASC"
         )
         return rows_to_list(cursor.fetchall())
 
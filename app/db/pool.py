@@ -0,0 +1,301 @@
+"""
+Pooled SQLite connection manager
+
+Replaces the open-per-call pattern with per-thread reusable connections:
+- Each thread keeps one long-lived connection (WAL mode, tuned pragmas,
+  prepared-statement cache) instead of reconnecting for every query
+- Writes are serialized through a single process-wide writer lock that is
+  taken lazily on the first write statement and released on commit/rollback,
+  so readers never wait on writers (WAL) and writers never fight over
+  SQLITE_BUSY inside one process
+- Nested get_db() blocks on the same thread share one transaction; only the
+  outermost block commits
+- Metrics (checkouts, writer wait time, busy retries) for diagnostics
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statement keywords that take the SQLite write lock
+_WRITE_KEYWORDS = frozenset({
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER", "UPSERT",
+})
+
+
+def is_write_statement(sql: str) -> bool:
+    """Return True if the SQL statement modifies the database"""
+    stripped = sql.lstrip()
+    # Skip leading line comments
+    while stripped.startswith("--"):
+        newline = stripped.find("\n")
+        if newline == -1:
+            return False
+        stripped = stripped[newline + 1:].lstrip()
+    keyword = stripped[:8].split(None, 1)[0].upper() if stripped else ""
+    return keyword in _WRITE_KEYWORDS
+
+
+def _is_busy_error(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+@dataclass
+class PoolConfig:
+    """Tuning knobs for the connection pool (see Settings.db_* fields)"""
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 64 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    busy_timeout_ms: int = 5000
+    statement_cache_size: int = 256
+    busy_retries: int = 5
+    busy_retry_delay_ms: int = 25
+
+
+@dataclass
+class PoolMetrics:
+    """Counters exposed through the metrics endpoint"""
+    connections_opened: int = 0
+    connections_closed: int = 0
+    checkouts: int = 0
+    nested_checkouts: int = 0
+    write_transactions: int = 0
+    writer_wait_total_ms: float = 0.0
+    writer_wait_max_ms: float = 0.0
+    busy_retries: int = 0
+    busy_failures: int = 0
+    commits: int = 0
+    rollbacks: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["writer_wait_total_ms"] = round(self.writer_wait_total_ms, 3)
+        data["writer_wait_max_ms"] = round(self.writer_wait_max_ms, 3)
+        data["writer_wait_avg_ms"] = (
+            round(self.writer_wait_total_ms / self.write_transactions, 3)
+            if self.write_transactions else 0.0
+        )
+        return data
+
+
+class PooledCursor(sqlite3.Cursor):
+    """Cursor that takes the pool writer lock before write statements"""
+
+    def execute(self, sql, parameters=()):
+        self.connection._before_statement(sql)
+        return self.connection._retry_busy(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.connection._before_statement(sql)
+        return self.connection._retry_busy(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        self.connection._before_statement("CREATE")
+        return self.connection._retry_busy(super().executescript, sql_script)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection bound to a ConnectionPool"""
+
+    pool: "ConnectionPool"
+    _holds_writer: bool = False
+    _depth: int = 0
+
+    def cursor(self, factory=PooledCursor):
+        return super().cursor(factory)
+
+    # Connection.execute* shortcuts don't go through cursor() in CPython
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def _before_statement(self, sql: str) -> None:
+        if not self._holds_writer and is_write_statement(sql):
+            self.pool._acquire_writer(self)
+
+    def _retry_busy(self, func: Callable, *args):
+        return self.pool._retry_busy(func, *args)
+
+    def commit(self) -> None:
+        try:
+            super().commit()
+            self.pool.metrics.commits += 1
+        finally:
+            self.pool._release_writer(self)
+
+    def rollback(self) -> None:
+        try:
+            super().rollback()
+            self.pool.metrics.rollbacks += 1
+        finally:
+            self.pool._release_writer(self)
+
+
+class ConnectionPool:
+    """
+    Per-thread SQLite connection pool with a single serialized writer.
+
+    Connections are created lazily on first use by a thread and reused for
+    the lifetime of that thread (or until close_all() is called).
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        config: Optional[PoolConfig] = None,
+    ):
+        self.db_path = Path(db_path)
+        self.config = config or PoolConfig()
+        self.metrics = PoolMetrics()
+        self._local = threading.local()
+        self._writer_lock = threading.RLock()
+        self._registry_lock = threading.Lock()
+        self._connections: List[PooledConnection] = []
+        self._closed_generation = 0
+
+    # -------------------------------------------------------------------------
+    # Connection lifecycle
+    # -------------------------------------------------------------------------
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            timeout=self.config.busy_timeout_ms / 1000,
+            cached_statements=self.config.statement_cache_size,
+            factory=PooledConnection,
+        )
+        conn.pool = self
+        conn.row_factory = sqlite3.Row
+        self.configure(conn)
+        with self._registry_lock:
+            self._connections.append(conn)
+        self.metrics.connections_opened += 1
+        return conn
+
+    def configure(self, conn: sqlite3.Connection) -> None:
+        """Apply connection pragmas (safe to call on any sqlite3 connection)"""
+        cfg = self.config
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {int(cfg.busy_timeout_ms)}")
+        if cfg.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {cfg.journal_mode}")
+        if cfg.synchronous:
+            conn.execute(f"PRAGMA synchronous = {cfg.synchronous}")
+        if cfg.mmap_size:
+            conn.execute(f"PRAGMA mmap_size = {int(cfg.mmap_size)}")
+        if cfg.cache_size_kib:
+            # Negative cache_size is interpreted as KiB rather than pages
+            conn.execute(f"PRAGMA cache_size = -{int(cfg.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+    def _thread_connection(self) -> PooledConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "generation", -1) != self._closed_generation:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.generation = self._closed_generation
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """
+        Check out this thread's connection for one unit of work.
+
+        Commits on success and rolls back on error. Nested checkouts on the
+        same thread join the outer transaction.
+        """
+        conn = self._thread_connection()
+        self.metrics.checkouts += 1
+        if conn._depth > 0:
+            self.metrics.nested_checkouts += 1
+        conn._depth += 1
+        try:
+            yield conn
+            if conn._depth == 1:
+                conn.commit()
+        except BaseException:
+            if conn._depth == 1:
+                try:
+                    conn.rollback()
+                except sqlite3.Error as e:
+                    logger.warning(f"Rollback failed: {e}")
+            raise
+        finally:
+            conn._depth -= 1
+            if conn._depth == 0:
+                # Safety net: never leave the writer lock held between checkouts
+                self._release_writer(conn)
+
+    def close_all(self) -> None:
+        """Close every pooled connection (threads reconnect lazily)"""
+        with self._registry_lock:
+            connections, self._connections = self._connections, []
+            self._closed_generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+                self.metrics.connections_closed += 1
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing pooled connection: {e}")
+
+    # -------------------------------------------------------------------------
+    # Writer serialization
+    # -------------------------------------------------------------------------
+
+    def _acquire_writer(self, conn: PooledConnection) -> None:
+        start = time.perf_counter()
+        self._writer_lock.acquire()
+        waited_ms = (time.perf_counter() - start) * 1000
+        conn._holds_writer = True
+        self.metrics.write_transactions += 1
+        self.metrics.writer_wait_total_ms += waited_ms
+        if waited_ms > self.metrics.writer_wait_max_ms:
+            self.metrics.writer_wait_max_ms = waited_ms
+
+    def _release_writer(self, conn: PooledConnection) -> None:
+        if conn._holds_writer:
+            conn._holds_writer = False
+            self._writer_lock.release()
+
+    def _retry_busy(self, func: Callable, *args):
+        """Retry a statement that hit SQLITE_BUSY (e.g. another process writing)"""
+        attempts = max(0, self.config.busy_retries)
+        for attempt in range(attempts + 1):
+            try:
+                return func(*args)
+            except sqlite3.OperationalError as e:
+                if not _is_busy_error(e) or attempt >= attempts:
+                    if _is_busy_error(e):
+                        self.metrics.busy_failures += 1
+                    raise
+                self.metrics.busy_retries += 1
+                time.sleep(self.config.busy_retry_delay_ms / 1000 * (attempt + 1))
+
+    # -------------------------------------------------------------------------
+    # Diagnostics
+    # -------------------------------------------------------------------------
+
+    def get_metrics(self) -> Dict[str, Any]:
+        data = self.metrics.to_dict()
+        with self._registry_lock:
+            data["open_connections"] = len(self._connections)
+        data["config"] = asdict(self.config)
+        return data
+
+    def reset_metrics(self) -> None:
+        self.metrics = PoolMetrics()
@@ -0,0 +1,292 @@
+"""
+Write-behind persistence for streamed turns
+
+A finished agentic turn used to insert every tool_use/tool_result message,
+sync log entry and usage row with its own connection and transaction. This
+queue collects those rows and writes them with database.write_batch - one
+transaction, executemany per table - on the async_database writer thread.
+
+Durability modes (settings.db_write_mode):
+- "strict": every row is submitted to the writer as soon as it is added and
+  commit_turn() waits for it to be on disk
+- "per_turn": rows are buffered and written in one transaction when the turn
+  ends; commit_turn() waits for that transaction
+- "interval": rows are buffered and written every db_write_interval_ms by a
+  background flusher; commit_turn() returns immediately
+
+In every mode the queue is flushed early when it reaches db_write_max_batch
+rows, and flushed on shutdown (app lifespan, with an atexit fallback).
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.db import database, async_database
+
+logger = logging.getLogger(__name__)
+
+
+class DurabilityMode:
+    """Write-behind durability modes"""
+    STRICT = "strict"
+    PER_TURN = "per_turn"
+    INTERVAL = "interval"
+
+    ALL = (STRICT, PER_TURN, INTERVAL)
+
+
+@dataclass
+class _Batch:
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    sync_logs: List[Dict[str, Any]] = field(default_factory=list)
+    usage_logs: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.messages) + len(self.sync_logs) + len(self.usage_logs)
+
+
+class WriteBehindQueue:
+    """Buffers session_messages, sync_log and usage_log rows"""
+
+    # Consecutive failed flushes before a batch is dropped
+    MAX_FLUSH_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        mode: str = DurabilityMode.PER_TURN,
+        interval_ms: int = 250,
+        max_batch: int = 500
+    ):
+        if mode not in DurabilityMode.ALL:
+            raise ValueError(f"Unknown durability mode: {mode}")
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self._pending = _Batch()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._failed_attempts = 0
+        self._flusher_task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.flush_failures = 0
+        self.rows_dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    # -------------------------------------------------------------------------
+    # Enqueue
+    # -------------------------------------------------------------------------
+
+    def add_session_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        tool_name: Optional[str] = None,
+        tool_input: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue a session message (see database.add_session_message)"""
+        with self._lock:
+            self._pending.messages.append({
+                "session_id": session_id,
+                "role": role,
+                "content": content,
+                "tool_name": tool_name,
+                "tool_input": tool_input,
+                "metadata": metadata,
+                "created_at": datetime.utcnow().isoformat(),
+            })
+        self._after_add()
+
+    def add_sync_log(
+        self,
+        session_id: str,
+        event_type: str,
+        entity_type: str,
+        entity_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue a sync log entry (see database.add_sync_log)"""
+        with self._lock:
+            self._pending.sync_logs.append({
+                "session_id": session_id,
+                "event_type": event_type,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "data": data,
+                "created_at": datetime.utcnow().isoformat(),
+            })
+        self._after_add()
+
+    def log_usage(
+        self,
+        session_id: Optional[str],
+        profile_id: Optional[str],
+        model: Optional[str],
+        tokens_in: int,
+        tokens_out: int,
+        cost_usd: float,
+        duration_ms: int
+    ) -> None:
+        """Queue a usage row (see database.log_usage)"""
+        with self._lock:
+            self._pending.usage_logs.append({
+                "session_id": session_id,
+                "profile_id": profile_id,
+                "model": model,
+                "tokens_in": tokens_in,
+                "tokens_out": tokens_out,
+                "cost_usd": cost_usd,
+                "duration_ms": duration_ms,
+            })
+        self._after_add()
+
+    def _after_add(self) -> None:
+        if self.mode == DurabilityMode.STRICT or self.pending_count >= self.max_batch:
+            async_database.submit_write(self.flush)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    # -------------------------------------------------------------------------
+    # Flush
+    # -------------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write all pending rows in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, _Batch()
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                database.write_batch(
+                    session_messages=batch.messages,
+                    sync_logs=batch.sync_logs,
+                    usage_logs=batch.usage_logs,
+                )
+            except Exception as e:
+                self.flush_failures += 1
+                self._failed_attempts += 1
+                if self._failed_attempts >= self.MAX_FLUSH_ATTEMPTS:
+                    logger.error(f"Write-behind flush failed {self._failed_attempts} times, dropping {len(batch)} rows: {e}")
+                    self.rows_dropped += len(batch)
+                    self._failed_attempts = 0
+                else:
+                    logger.warning(f"Write-behind flush failed, will retry {len(batch)} rows: {e}")
+                    self._requeue(batch)
+                return 0
+
+            self._failed_attempts = 0
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            return len(batch)
+
+    def _requeue(self, batch: _Batch) -> None:
+        """Put a failed batch back in front of rows queued since"""
+        with self._lock:
+            newer = self._pending
+            batch.messages.extend(newer.messages)
+            batch.sync_logs.extend(newer.sync_logs)
+            batch.usage_logs.extend(newer.usage_logs)
+            self._pending = batch
+
+    async def flush_async(self) -> int:
+        """Flush on the writer thread, after any writes already queued there"""
+        return await async_database.run_write(self.flush)
+
+    async def barrier(self) -> None:
+        """Flush pending rows so that a direct write issued next is ordered after them"""
+        if self.pending_count:
+            await self.flush_async()
+
+    async def commit_turn(self) -> None:
+        """Mark the end of a turn; waits for durability except in interval mode"""
+        if self.mode == DurabilityMode.INTERVAL:
+            return
+        await self.flush_async()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_ms / 1000)
+            if self.pending_count:
+                try:
+                    await self.flush_async()
+                except Exception as e:
+                    logger.error(f"Write-behind interval flush error: {e}")
+
+    def start(self) -> None:
+        """Start the interval flusher (no-op outside interval mode)"""
+        if self.mode != DurabilityMode.INTERVAL:
+            return
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the interval flusher and write everything still pending"""
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        await self.flush_async()
+
+    def discard_pending(self) -> int:
+        """Drop all pending rows without writing them (used by tests)"""
+        with self._lock:
+            dropped, self._pending = len(self._pending), _Batch()
+        return dropped
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "pending": self.pending_count,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "flush_failures": self.flush_failures,
+            "rows_dropped": self.rows_dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+
+# Global write-behind queue
+write_behind = WriteBehindQueue(
+    mode=settings.db_write_mode,
+    interval_ms=settings.db_write_interval_ms,
+    max_batch=settings.db_write_max_batch,
+)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    """Last-chance flush if the process exits without running the lifespan"""
+    if write_behind.pending_count:
+        try:
+            write_behind.flush()
+        except Exception as e:
+            logger.error(f"Write-behind flush at exit failed: {e}")
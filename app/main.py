@@ -14,14 +14,20 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config import settings, ensure_directories, load_workspace_from_database
-from app.db import database
+from app.db import database, async_database
+from app.db.write_behind import write_behind
 from app.db.database import init_database
 from app.core.profiles import run_migrations
 from app.core.auth import auth_service
 from app.core.query_engine import cleanup_stale_sessions
+from app.core.client_pool import client_pool
 from app.core.sync_engine import sync_engine
+from app.core.sync_backend import create_backend
 from app.core.cleanup_manager import cleanup_manager
+from app.core.rate_limiter import rate_limiter
+from app.core.queue_manager import request_queue
 from app.core import encryption
+from app.core import knowledge_vectors
 
 # Import API routers
 from app.api import auth, profiles, projects, sessions, query, system, api_users, websocket, commands, preferences, subagents, permission_rules, import_export, settings as settings_api, generated_images, generated_videos, shared_files, tags, analytics, search, templates, webhooks, security, knowledge, rate_limits, github, git, canvas, agents, studio, plugins, user_self_service, meshy
@@ -185,8 +191,32 @@ async def lifespan(app: FastAPI):
     # Start agent execution engine
     await start_agent_engine()
 
+    # Start event loop lag monitor
+    async_database.loop_lag_monitor.start()
+
+    # Start write-behind flusher (interval durability mode)
+    write_behind.start()
+
+    # Fan out sync events to other workers (no-op with the local backend)
+    await sync_engine.start_backend(create_backend())
+
+    # Restore and periodically save API rate limit counters
+    await rate_limiter.start()
+
+    # Seed query wait estimates from recent query durations
+    try:
+        await request_queue.load_durations()
+    except Exception as e:
+        logger.warning(f"Failed to load recent query durations: {e}")
+
     yield
 
+    await rate_limiter.stop()
+
+    await sync_engine.stop_backend()
+
+    await async_database.loop_lag_monitor.stop()
+
     # Stop background cleanup scheduler
     logger.info("Shutting down AI Hub...")
     if _cleanup_task:
@@ -199,6 +229,20 @@ async def lifespan(app: FastAPI):
     # Stop agent execution engine
     await stop_agent_engine()
 
+    # Disconnect pre-connected SDK clients nobody took
+    await client_pool.close()
+
+    # Stop the knowledge embedding worker processes
+    knowledge_vectors.shutdown()
+
+    # Flush buffered rows, drain async DB executors, then close pooled connections
+    try:
+        await write_behind.stop()
+    except Exception as e:
+        logger.error(f"Failed to flush write-behind queue on shutdown: {e}")
+    async_database.shutdown(wait=True)
+    database.close_pool()
+
 
 # Create FastAPI application
 app = FastAPI(
@@ -362,5 +406,7 @@ if __name__ == "__main__":
         reload=False,
         # Increase WebSocket max message size from default 1MB to 10MB
         # This is a safety net - payloads should be truncated before hitting this limit
-        ws_max_size=10 * 1024 * 1024  # 10MB
+        ws_max_size=10 * 1024 * 1024,  # 10MB
+        # Compress frames for clients that support it (see app/core/ws_transport.py)
+        ws_per_message_deflate=settings.ws_per_message_deflate
     )
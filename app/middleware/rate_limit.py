@@ -4,7 +4,6 @@ Rate limit middleware for FastAPI.
 Checks rate limits before processing requests and adds rate limit headers to responses.
 """
 
-import hashlib
 import logging
 import time
 from typing import Optional, Tuple
@@ -13,8 +12,8 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
+from app.core.principal_cache import principal_cache, API_KEY
 from app.core.rate_limiter import rate_limiter, RateLimitResult, RateLimitStatus
-from app.db import database
 
 logger = logging.getLogger(__name__)
 
@@ -127,50 +126,26 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         is_admin = False
 
         # Check session cookie (admin auth)
-        session_token = request.cookies.get("session")
-        if session_token:
-            session = database.get_auth_session(session_token)
-            if session:
-                is_admin = True
-                user_id = "admin"
-
-        # Check API key header
+        principal = await principal_cache.resolve_async(request.cookies.get("session"))
+        if principal and principal.is_admin:
+            is_admin = True
+            user_id = "admin"
+
+        # Check API key header (API key or API key session token)
         auth_header = request.headers.get("Authorization", "")
         if auth_header.startswith("Bearer "):
-            token = auth_header[7:]
-            if token.startswith("aih_"):
-                # API key authentication
-                key_hash = hashlib.sha256(token.encode()).hexdigest()
-                api_user = database.get_api_user_by_key_hash(key_hash)
-                if api_user:
-                    api_key_id = api_user["id"]
-                    user_id = api_user.get("username") or api_user["name"]
-            else:
-                # Check if it's a session token
-                api_session = database.get_api_key_session(token)
-                if api_session:
-                    api_user = database.get_api_user(api_session["api_user_id"])
-                    if api_user:
-                        api_key_id = api_user["id"]
-                        user_id = api_user.get("username") or api_user["name"]
+            principal = await principal_cache.resolve_async(auth_header[7:])
+            if principal and not principal.is_admin:
+                api_key_id = principal.api_user_id
+                user_id = principal.rate_limit_user_id
 
         # Check query parameter for WebSocket connections
         if not user_id:
-            token = request.query_params.get("token")
-            if token:
-                # Check admin session
-                session = database.get_auth_session(token)
-                if session:
-                    is_admin = True
-                    user_id = "admin"
-                else:
-                    # Check API key session
-                    api_session = database.get_api_key_session(token)
-                    if api_session:
-                        api_user = database.get_api_user(api_session["api_user_id"])
-                        if api_user:
-                            api_key_id = api_user["id"]
-                            user_id = api_user.get("username") or api_user["name"]
+            principal = await principal_cache.resolve_async(request.query_params.get("token"))
+            if principal and principal.kind != API_KEY:
+                is_admin = principal.is_admin
+                api_key_id = principal.api_user_id
+                user_id = principal.rate_limit_user_id
 
         return user_id, api_key_id, is_admin
 
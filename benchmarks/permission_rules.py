@@ -0,0 +1,123 @@
+"""
+Permission rule matching benchmark
+
+Compares the old per-call rule check (build a PermissionRule per stored rule
+and glob match each in turn, as _check_rules did before rules were cached)
+with the compiled rule set used by PermissionHandler (see
+app/core/permission_handler.py). Both run against the same profile rules
+and tool calls, and the benchmark checks they pick the same rule. The
+database round trip the old check also made per call is not included.
+
+Run from the repository root:
+    python -m benchmarks.permission_rules [--rules 5000] [--calls 5000]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.permission_handler import CompiledRuleSet, PermissionDecision, PermissionRule
+
+TOOLS = ["Bash", "Read", "Write", "Edit", "Grep", "WebFetch", "mcp__github__create_issue"]
+
+
+def make_rules(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Profile rules as returned by database.get_permission_rules"""
+    rules = []
+    for i in range(count):
+        tool_name = rng.choice(TOOLS + ["*"])
+        if tool_name == "Bash":
+            pattern = f"tool{i} *"
+        elif tool_name == "WebFetch":
+            pattern = f"https://host{i}.example.com/*"
+        else:
+            pattern = f"/workspace/project{i}/*.py"
+        rules.append({
+            "id": f"rule-{i}",
+            "profile_id": "profile-1",
+            "tool_name": tool_name,
+            "tool_pattern": pattern,
+            "decision": rng.choice(["allow", "deny"]),
+        })
+    return rules
+
+
+def make_calls(count: int, rules: int, rng: random.Random) -> List[Tuple[str, Dict[str, Any]]]:
+    """Tool calls; some hit a rule, the rest would be asked of the user"""
+    calls = []
+    for _ in range(count):
+        tool_name = rng.choice(TOOLS)
+        i = rng.randrange(rules * 2)
+        if tool_name == "Bash":
+            tool_input = {"command": f"tool{i} --verbose"}
+        elif tool_name == "WebFetch":
+            tool_input = {"url": f"https://host{i}.example.com/page", "prompt": "summarize"}
+        elif tool_name == "Grep":
+            tool_input = {"pattern": "TODO", "path": f"/workspace/project{i}/main.py"}
+        else:
+            tool_input = {"file_path": f"/workspace/project{i}/main.py"}
+        calls.append((tool_name, tool_input))
+    return calls
+
+
+def to_rule(rule_data: Dict[str, Any]) -> PermissionRule:
+    return PermissionRule(
+        id=rule_data["id"],
+        session_id=None,
+        profile_id=rule_data["profile_id"],
+        tool_name=rule_data["tool_name"],
+        tool_pattern=rule_data.get("tool_pattern"),
+        decision=PermissionDecision(rule_data["decision"])
+    )
+
+
+def linear_check(db_rules: List[Dict[str, Any]], tool_name: str, tool_input: Dict[str, Any]) -> Optional[PermissionRule]:
+    """The per-call loop _check_rules used to run"""
+    for rule_data in db_rules:
+        rule = to_rule(rule_data)
+        if rule.matches(tool_name, tool_input):
+            return rule
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db_rules = make_rules(args.rules, rng)
+    calls = make_calls(args.calls, args.rules, rng)
+
+    started = time.perf_counter()
+    expected = [linear_check(db_rules, tool_name, tool_input) for tool_name, tool_input in calls]
+    linear_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rule_set = CompiledRuleSet([to_rule(rule_data) for rule_data in db_rules])
+    for tool_name in TOOLS:
+        rule_set.match(tool_name, {})
+    compile_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [rule_set.match(tool_name, tool_input) for tool_name, tool_input in calls]
+    compiled_s = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for a, b in zip(expected, actual)
+        if (a.id if a else None) != (b.id if b else None)
+    )
+    hits = sum(1 for rule in actual if rule)
+
+    print(f"{args.rules} rules, {args.calls} tool calls ({hits} matched a rule)\n")
+    print(f"{'matcher':<10} {'total ms':>10} {'us/call':>10}")
+    print(f"{'linear':<10} {linear_s * 1000:>10.1f} {linear_s / args.calls * 1e6:>10.1f}")
+    print(f"{'compiled':<10} {compiled_s * 1000:>10.1f} {compiled_s / args.calls * 1e6:>10.1f}")
+    print(f"\ncompile: {compile_s * 1000:.1f} ms for {len(TOOLS)} tools, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+WebSocket transport benchmark
+
+Measures bytes on the wire and encode CPU time of each wire encoding (see
+app/core/ws_transport.py) for typical payloads: a session history, a large
+tool result and a stream of small text deltas. The permessage-deflate row
+approximates the WebSocket extension with a raw deflate stream per
+connection.
+
+Run from the repository root:
+    python -m benchmarks.ws_transport [--messages 200] [--rounds 20]
+"""
+
+import argparse
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Union
+
+from app.core import ws_transport
+from app.core.sync_engine import SyncEvent
+
+
+def history_payload(messages: int) -> Dict[str, Any]:
+    """A history message like the one sent on load_session"""
+    items: List[Dict[str, Any]] = []
+    for i in range(messages):
+        items.append({"id": f"user-{i}", "role": "user", "content": f"Please look at module_{i}.py and fix the failing test"})
+        items.append({
+            "id": f"tool-{i}",
+            "role": "assistant",
+            "type": "tool_use",
+            "toolName": "Bash",
+            "toolInput": {"command": f"python -m pytest tests/test_module_{i}.py -q"},
+            "toolResult": "\n".join(f"tests/test_module_{i}.py::test_case_{j} PASSED" for j in range(20)),
+            "toolStatus": "complete",
+        })
+        items.append({
+            "id": f"assistant-{i}",
+            "role": "assistant",
+            "type": "text",
+            "content": "The failure came from an off-by-one in the pagination helper. " * 4,
+            "metadata": {"model": "claude-sonnet", "tokens_in": 1200 + i, "tokens_out": 300 + i},
+        })
+    return {"type": "history", "session_id": "session-1", "messages": items, "isStreaming": False}
+
+
+def tool_result_payload() -> Dict[str, Any]:
+    """A large tool result"""
+    output = "\n".join(f"{i:6d}  def function_{i}(value):  return value * {i}" for i in range(2000))
+    return {"type": "tool_result", "tool_use_id": "toolu_1", "output": output}
+
+
+def delta_payloads(count: int) -> List[Dict[str, Any]]:
+    """Streamed text deltas, as broadcast by the sync engine"""
+    return [
+        SyncEvent(
+            event_type="stream_chunk",
+            session_id="session-1",
+            data={"message_id": "msg-1", "chunk_type": "text", "content": f" word{i}", "delta_type": "text", "index": 0},
+        ).to_dict()
+        for i in range(count)
+    ]
+
+
+def permessage_deflate() -> Callable[[Dict[str, Any]], bytes]:
+    """Approximate the permessage-deflate extension (context kept per connection)"""
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    def encode(message: Dict[str, Any]) -> bytes:
+        data = ws_transport.serialize_json(message).encode("utf-8")
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    return encode
+
+
+def measure(encode: Callable[[Dict[str, Any]], Union[str, bytes]], payloads: List[Dict[str, Any]], rounds: int):
+    """(bytes on the wire per round, encode milliseconds per round)"""
+    size = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        size = 0
+        for payload in payloads:
+            data = encode(payload)
+            size += len(data.encode("utf-8") if isinstance(data, str) else data)
+    elapsed = (time.perf_counter() - started) / rounds
+    return size, elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="History turns (3 messages each)")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    workloads = {
+        "history": [history_payload(args.messages)],
+        "tool_result": [tool_result_payload()],
+        "text_deltas": delta_payloads(500),
+    }
+    encodings = [ws_transport.JSON, ws_transport.DEFLATE]
+    if ws_transport.MSGPACK_AVAILABLE:
+        encodings.append(ws_transport.MSGPACK)
+    else:
+        print("msgpack is not installed; skipping the msgpack encoding\n")
+
+    print(f"{'workload':<12} {'encoding':<20} {'bytes':>10} {'ratio':>7} {'encode ms':>10}")
+    for name, payloads in workloads.items():
+        baseline = None
+        rows = [(encoding, lambda message, encoding=encoding: ws_transport.encode(message, encoding)) for encoding in encodings]
+        rows.append(("permessage-deflate", None))
+        for label, encode in rows:
+            size, ms = measure(encode or permessage_deflate(), payloads, args.rounds)
+            baseline = baseline or size
+            print(f"{name:<12} {label:<20} {size:>10} {size / baseline:>7.2f} {ms:>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
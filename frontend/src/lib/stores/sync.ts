@@ -1,6 +1,11 @@
 /**
  * Cross-device synchronization store.
  * Handles WebSocket connections for real-time sync and polling fallback.
+ *
+ * Every event carries a sequence number (seq). On reconnect the store sends
+ * the last one it saw so that the server replays what was missed; the
+ * polling fallback long-polls from the same position. If events can't be
+ * replayed the server sends resync_required and the session must be reloaded.
  */
 
 import { writable, derived, get } from 'svelte/store';
@@ -12,6 +17,7 @@ export interface SyncEvent {
 	data: Record<string, unknown>;
 	timestamp: string | null;
 	source_device_id?: string;
+	seq?: number;
 }
 
 export interface SyncState {
@@ -37,7 +43,10 @@ function createSyncStore() {
 
 	let websocket: WebSocket | null = null;
 	let reconnectTimeout: ReturnType<typeof setTimeout> | null = null;
-	let pollingInterval: ReturnType<typeof setInterval> | null = null;
+	let polling = false;
+	let pollController: AbortController | null = null;
+	// Server epoch that lastSyncId belongs to (sequence numbers restart with the server)
+	let syncEpoch: string | null = null;
 	let eventHandlers: SyncEventHandler[] = [];
 	let authToken: string | null = null;
 
@@ -100,9 +109,13 @@ function createSyncStore() {
 			return false;
 		}
 
-		// Build WebSocket URL
+		// Build WebSocket URL; resume from the last event seen when reconnecting
 		const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
-		const wsUrl = `${protocol}://${window.location.host}/ws/sessions/${sessionId}?device_id=${deviceId}&token=${encodeURIComponent(token)}`;
+		let wsUrl = `${protocol}://${window.location.host}/ws/sessions/${sessionId}?device_id=${deviceId}&token=${encodeURIComponent(token)}`;
+		const current = get({ subscribe });
+		if (current.sessionId === sessionId && syncEpoch && current.lastSyncId > 0) {
+			wsUrl += `&last_seq=${current.lastSyncId}&epoch=${encodeURIComponent(syncEpoch)}`;
+		}
 
 		try {
 			websocket = new WebSocket(wsUrl);
@@ -188,17 +201,30 @@ function createSyncStore() {
 			return;
 		}
 
+		if (typeof event.seq === 'number') {
+			const seq = event.seq;
+			update((s) => ({ ...s, lastSyncId: Math.max(s.lastSyncId, seq) }));
+		}
+
 		switch (event.event_type) {
 			case 'state':
 				// Initial state received on connect
+				syncEpoch = (event.data?.sync_epoch as string) || null;
 				update((s) => ({
 					...s,
 					isRemoteStreaming: (event.data?.is_streaming as boolean) || false,
 					connectedDevices: (event.data?.connected_devices as number) || 0,
-					lastSyncId: (event.data?.latest_sync_id as number) || 0
+					// When resuming, replayed events continue from the last seq seen
+					lastSyncId: event.data?.resumed ? s.lastSyncId : (event.data?.latest_sync_id as number) || 0
 				}));
 				break;
 
+			case 'resync_required':
+				// Missed events can't be replayed; handlers reload the session
+				syncEpoch = (event.data?.epoch as string) || null;
+				update((s) => ({ ...s, lastSyncId: (event.data?.latest_seq as number) || 0 }));
+				break;
+
 			case 'stream_start':
 				update((s) => ({ ...s, isRemoteStreaming: true }));
 				break;
@@ -235,11 +261,13 @@ function createSyncStore() {
 			websocket = null;
 		}
 
+		syncEpoch = null;
 		update((s) => ({
 			...s,
 			connected: false,
 			sessionId: null,
 			isRemoteStreaming: false,
+			lastSyncId: 0,
 			connectedDevices: 0
 		}));
 	}
@@ -259,63 +287,94 @@ function createSyncStore() {
 	}
 
 	/**
-	 * Start polling fallback for when WebSocket is unavailable
+	 * Start polling fallback for when WebSocket is unavailable.
+	 * Long-polls: the server holds each request until an event arrives.
 	 */
 	function startPolling(sessionId: string) {
-		if (pollingInterval) {
+		if (polling) {
 			return; // Already polling
 		}
 
 		console.log('[Sync] Starting polling fallback');
 		const token = authToken || getCookieToken();
+		polling = true;
 
-		pollingInterval = setInterval(async () => {
-			try {
-				const state = get({ subscribe });
-				const response = await fetch(
-					`/api/v1/sessions/${sessionId}/sync?since_id=${state.lastSyncId}`,
-					{
-						headers: token ? { Authorization: `Bearer ${token}` } : {},
-						credentials: 'include'
+		const poll = async () => {
+			while (polling) {
+				pollController = new AbortController();
+				try {
+					const state = get({ subscribe });
+					const epoch = syncEpoch ? `&epoch=${encodeURIComponent(syncEpoch)}` : '';
+					const response = await fetch(
+						`/api/v1/sessions/${sessionId}/sync?since_id=${state.lastSyncId}${epoch}&wait=20`,
+						{
+							headers: token ? { Authorization: `Bearer ${token}` } : {},
+							credentials: 'include',
+							signal: pollController.signal
+						}
+					);
+
+					if (!response.ok) {
+						throw new Error(`Polling failed: ${response.status}`);
 					}
-				);
 
-				if (!response.ok) {
-					throw new Error(`Polling failed: ${response.status}`);
-				}
-
-				const data = await response.json();
+					const data = await response.json();
+					if (!polling) {
+						return;
+					}
 
-				update((s) => ({
-					...s,
-					lastSyncId: data.latest_id || s.lastSyncId,
-					isRemoteStreaming: data.is_streaming || false,
-					connectedDevices: data.connected_devices || 0
-				}));
+					syncEpoch = data.epoch || syncEpoch;
+					update((s) => ({
+						...s,
+						lastSyncId: data.latest_id ?? s.lastSyncId,
+						isRemoteStreaming: data.is_streaming || false,
+						connectedDevices: data.connected_devices || 0
+					}));
+
+					if (data.resync_required) {
+						dispatchEvent({
+							event_type: 'resync_required',
+							session_id: sessionId,
+							data: { epoch: data.epoch, latest_seq: data.latest_id },
+							timestamp: null
+						});
+						continue;
+					}
 
-				// Process changes
-				for (const change of data.changes || []) {
-					const syncEvent: SyncEvent = {
-						event_type: change.event_type,
-						session_id: sessionId,
-						data: change.data || {},
-						timestamp: change.created_at
-					};
-					dispatchEvent(syncEvent);
+					// Process changes
+					for (const change of data.changes || []) {
+						const syncEvent: SyncEvent = {
+							event_type: change.event_type,
+							session_id: sessionId,
+							data: change.data || {},
+							timestamp: change.timestamp ?? change.created_at,
+							source_device_id: change.source_device_id,
+							seq: change.seq
+						};
+						dispatchEvent(syncEvent);
+					}
+				} catch (e) {
+					if (!polling) {
+						return;
+					}
+					console.error('[Sync] Polling error:', e);
+					// Back off before retrying a failed poll
+					await new Promise((resolve) => setTimeout(resolve, 2000));
 				}
-			} catch (e) {
-				console.error('[Sync] Polling error:', e);
 			}
-		}, 2000); // Poll every 2 seconds
+		};
+
+		poll();
 	}
 
 	/**
 	 * Stop polling
 	 */
 	function stopPolling() {
-		if (pollingInterval) {
-			clearInterval(pollingInterval);
-			pollingInterval = null;
+		polling = false;
+		if (pollController) {
+			pollController.abort();
+			pollController = null;
 		}
 	}
 
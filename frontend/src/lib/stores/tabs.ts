@@ -8,6 +8,7 @@
 import { writable, derived, get } from 'svelte/store';
 import type { Session, Profile, PermissionRequest as PermissionRequestType, UserQuestionRequest } from '$lib/api/client';
 import { api } from '$lib/api/client';
+import { WS_ENCODING, createMessageDecoder } from '$lib/utils/wsTransport';
 
 export interface ApiUser {
 	id: string;
@@ -120,6 +121,9 @@ export interface ChatTab {
 	worktreeId: string | null;   // Selected existing worktree ID (null = create new)
 	worktreeMode: 'new' | 'existing';  // Whether creating new or using existing worktree
 	selectedWorktreeBranch: string | null;  // Branch name of selected existing worktree (for display)
+	// Admission queue: set while the server is at capacity and the query waits to run
+	queuePosition?: number | null;
+	queueWaitSeconds?: number | null;
 }
 
 interface TabsState {
@@ -518,9 +522,13 @@ function createTabsStore() {
 		if (token) {
 			url = `${url}&token=${encodeURIComponent(token)}`;
 		}
+		if (WS_ENCODING) {
+			url = `${url}&encoding=${WS_ENCODING}`;
+		}
 		console.log(`[Tab ${tabId}] ${isReconnect ? 'Reconnecting' : 'Connecting'} to WebSocket...`);
 
 		const ws = new WebSocket(url);
+		ws.binaryType = 'arraybuffer';
 		tabConnections.set(tabId, ws);
 
 		ws.onopen = () => {
@@ -621,14 +629,10 @@ function createTabsStore() {
 			console.error(`[Tab ${tabId}] WebSocket error:`, error);
 		};
 
-		ws.onmessage = (event) => {
-			try {
-				const data = JSON.parse(event.data);
-				handleTabMessage(tabId, data);
-			} catch (e) {
-				console.error(`[Tab ${tabId}] Failed to parse message:`, e);
-			}
-		};
+		ws.onmessage = createMessageDecoder(
+			(data) => handleTabMessage(tabId, data),
+			(e) => console.error(`[Tab ${tabId}] Failed to parse message:`, e)
+		);
 	}
 
 	/**
@@ -1309,6 +1313,37 @@ function createTabsStore() {
 				break;
 			}
 
+			case 'query_queued': {
+				// The server is running as many queries as it allows; this one waits
+				updateTab(tabId, {
+					queuePosition: eventData.position as number,
+					queueWaitSeconds: eventData.estimated_wait_seconds as number
+				});
+				break;
+			}
+
+			case 'query_admitted': {
+				updateTab(tabId, { queuePosition: null, queueWaitSeconds: null });
+				break;
+			}
+
+			case 'resync_required': {
+				// This device fell behind and the server dropped queued events - reload
+				console.log(`[Tab ${tabId}] Sync events dropped, reloading session:`, eventData);
+
+				const tab = getTab(tabId);
+				if (tab?.sessionId) {
+					const ws = tabConnections.get(tabId);
+					if (ws && ws.readyState === WebSocket.OPEN) {
+						ws.send(JSON.stringify({
+							type: 'load_session',
+							session_id: tab.sessionId
+						}));
+					}
+				}
+				break;
+			}
+
 			case 'session_opened': {
 				// Another device opened/resumed this session
 				const deviceId = eventData.device_id as string;
@@ -2164,6 +2199,8 @@ function createTabsStore() {
 							...tab,
 							messages,
 							isStreaming: false,
+							queuePosition: null,
+							queueWaitSeconds: null,
 							error: data.message as string
 						};
 					})
@@ -2171,6 +2208,20 @@ function createTabsStore() {
 				break;
 			}
 
+			case 'query_queued': {
+				// The server is running as many queries as it allows; this one waits
+				updateTab(tabId, {
+					queuePosition: data.position as number,
+					queueWaitSeconds: data.estimated_wait_seconds as number
+				});
+				break;
+			}
+
+			case 'query_admitted': {
+				updateTab(tabId, { queuePosition: null, queueWaitSeconds: null });
+				break;
+			}
+
 			case 'message_queued': {
 				// Message was successfully queued for streaming input
 				const queuePosition = data.queue_position as number;
@@ -0,0 +1,38 @@
+/**
+ * WebSocket wire encoding (see app/core/ws_transport.py)
+ *
+ * With the deflate encoding the server sends small messages as JSON text
+ * frames and large ones (histories, tool output) as zlib-compressed binary
+ * frames.
+ */
+
+/**
+ * Encoding to request with the `encoding` query parameter, or null if this
+ * browser can't decompress binary frames
+ */
+export const WS_ENCODING: string | null = typeof DecompressionStream !== 'undefined' ? 'deflate' : null;
+
+async function inflate(data: ArrayBuffer): Promise<string> {
+	const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('deflate'));
+	return new Response(stream).text();
+}
+
+/**
+ * Build a WebSocket onmessage handler that decodes text and compressed
+ * binary frames and passes the parsed messages to `handler` in order
+ */
+export function createMessageDecoder(
+	handler: (data: any) => void,
+	onError: (error: unknown) => void
+): (event: MessageEvent) => void {
+	// Decompression is async; chain frames so messages keep their order
+	let pending: Promise<void> = Promise.resolve();
+	return (event: MessageEvent) => {
+		pending = pending
+			.then(async () => {
+				const text = typeof event.data === 'string' ? event.data : await inflate(event.data);
+				handler(JSON.parse(text));
+			})
+			.catch(onError);
+	};
+}
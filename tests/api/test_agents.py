@@ -494,7 +494,8 @@ class TestLaunchAgentEndpoint:
                     auto_merge=True,
                     auto_review=True,
                     max_duration_minutes=60,
-                    base_branch="develop"
+                    base_branch="develop",
+                    priority=3
                 )
 
                 result = await launch_agent(request, token="test-token")
@@ -510,7 +511,8 @@ class TestLaunchAgentEndpoint:
                     auto_merge=True,
                     auto_review=True,
                     max_duration_minutes=60,
-                    base_branch="develop"
+                    base_branch="develop",
+                    priority=3
                 )
 
 
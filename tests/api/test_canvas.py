@@ -211,7 +211,7 @@ class TestDecryptedApiKey:
         """Should return None when setting doesn't exist."""
         from app.api.canvas import _get_decrypted_api_key
 
-        with patch("app.api.canvas.database.get_system_setting", return_value=None):
+        with patch("app.core.credential_service.database.get_system_settings", return_value={}):
             result = _get_decrypted_api_key("nonexistent_key")
             assert result is None
 
@@ -219,8 +219,8 @@ class TestDecryptedApiKey:
         """Should return plaintext value when not encrypted."""
         from app.api.canvas import _get_decrypted_api_key
 
-        with patch("app.api.canvas.database.get_system_setting", return_value="plain_api_key"):
-            with patch("app.api.canvas.encryption.is_encrypted", return_value=False):
+        with patch("app.core.credential_service.database.get_system_settings", return_value={"test_key": "plain_api_key"}):
+            with patch("app.core.credential_service.encryption.is_encrypted", return_value=False):
                 result = _get_decrypted_api_key("test_key")
                 assert result == "plain_api_key"
 
@@ -228,10 +228,10 @@ class TestDecryptedApiKey:
         """Should decrypt encrypted values."""
         from app.api.canvas import _get_decrypted_api_key
 
-        with patch("app.api.canvas.database.get_system_setting", return_value="encrypted:key"):
-            with patch("app.api.canvas.encryption.is_encrypted", return_value=True):
-                with patch("app.api.canvas.encryption.is_encryption_ready", return_value=True):
-                    with patch("app.api.canvas.encryption.decrypt_value", return_value="decrypted_key"):
+        with patch("app.core.credential_service.database.get_system_settings", return_value={"test_key": "encrypted:key"}):
+            with patch("app.core.credential_service.encryption.is_encrypted", return_value=True):
+                with patch("app.core.credential_service.encryption.is_encryption_ready", return_value=True):
+                    with patch("app.core.credential_service.encryption.decrypt_value", return_value="decrypted_key"):
                         result = _get_decrypted_api_key("test_key")
                         assert result == "decrypted_key"
 
@@ -239,9 +239,9 @@ class TestDecryptedApiKey:
         """Should return None when encryption is not ready."""
         from app.api.canvas import _get_decrypted_api_key
 
-        with patch("app.api.canvas.database.get_system_setting", return_value="encrypted:key"):
-            with patch("app.api.canvas.encryption.is_encrypted", return_value=True):
-                with patch("app.api.canvas.encryption.is_encryption_ready", return_value=False):
+        with patch("app.core.credential_service.database.get_system_settings", return_value={"test_key": "encrypted:key"}):
+            with patch("app.core.credential_service.encryption.is_encrypted", return_value=True):
+                with patch("app.core.credential_service.encryption.is_encryption_ready", return_value=False):
                     result = _get_decrypted_api_key("test_key")
                     assert result is None
 
@@ -249,10 +249,10 @@ class TestDecryptedApiKey:
         """Should return None when decryption fails."""
         from app.api.canvas import _get_decrypted_api_key
 
-        with patch("app.api.canvas.database.get_system_setting", return_value="encrypted:key"):
-            with patch("app.api.canvas.encryption.is_encrypted", return_value=True):
-                with patch("app.api.canvas.encryption.is_encryption_ready", return_value=True):
-                    with patch("app.api.canvas.encryption.decrypt_value", side_effect=Exception("Decryption failed")):
+        with patch("app.core.credential_service.database.get_system_settings", return_value={"test_key": "encrypted:key"}):
+            with patch("app.core.credential_service.encryption.is_encrypted", return_value=True):
+                with patch("app.core.credential_service.encryption.is_encryption_ready", return_value=True):
+                    with patch("app.core.credential_service.encryption.decrypt_value", side_effect=Exception("Decryption failed")):
                         result = _get_decrypted_api_key("test_key")
                         assert result is None
 
@@ -12,9 +12,10 @@ Tests cover:
 - Error handling and edge cases
 """
 
+import asyncio
 import pytest
 from datetime import datetime
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.testclient import TestClient
@@ -26,16 +27,37 @@ from app.api.git import router, require_auth, get_api_user_from_request
 # Fixtures
 # =============================================================================
 
+def mirror_async(mock, *names):
+    """Route mock.<name>_async to mock.<name> so tests configure and assert one method."""
+    for name in names:
+        sync_method = getattr(mock, name)
+        setattr(mock, f"{name}_async", AsyncMock(side_effect=lambda *args, _sync=sync_method, **kwargs: _sync(*args, **kwargs)))
+    return mock
+
+
+def off_event_loop(result):
+    """side_effect returning result that fails if called on the event loop thread."""
+    def call(*args, **kwargs):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return result
+    return call
+
+
 @pytest.fixture
 def mock_git_service():
     """Create a mock git service."""
-    return MagicMock()
+    return mirror_async(
+        MagicMock(),
+        "is_git_repo", "get_current_branch", "get_status", "list_branches",
+        "checkout", "get_commit_graph", "fetch", "get_remote_url", "get_default_branch"
+    )
 
 
 @pytest.fixture
 def mock_worktree_manager():
     """Create a mock worktree manager."""
-    return MagicMock()
+    return mirror_async(MagicMock(), "get_worktree_details", "sync_worktrees")
 
 
 @pytest.fixture
@@ -1207,10 +1229,10 @@ class TestCreateWorktree:
         self, app, mock_database, mock_git_service, mock_worktree_manager,
         mock_settings, sample_project, sample_worktree
     ):
-        """Should create a standalone worktree."""
+        """Should create a standalone worktree, off the event loop."""
         mock_database.get_project.return_value = sample_project
         mock_git_service.is_git_repo.return_value = True
-        mock_worktree_manager.create_worktree.return_value = sample_worktree
+        mock_worktree_manager.create_worktree.side_effect = off_event_loop(sample_worktree)
         mock_worktree_manager.get_worktree_details.return_value = sample_worktree
 
         with patch("app.api.git.git_service", mock_git_service):
@@ -1495,11 +1517,11 @@ class TestDeleteWorktree:
         self, app, mock_database, mock_worktree_manager, mock_settings,
         sample_project, sample_repository, sample_worktree
     ):
-        """Should delete a worktree."""
+        """Should delete a worktree, off the event loop."""
         mock_database.get_project.return_value = sample_project
         mock_database.get_worktree.return_value = sample_worktree
         mock_database.get_git_repository_by_project.return_value = sample_repository
-        mock_worktree_manager.cleanup_worktree.return_value = True
+        mock_worktree_manager.cleanup_worktree.side_effect = off_event_loop(True)
 
         with patch("app.api.git.worktree_manager", mock_worktree_manager):
             with patch("app.api.git.database", mock_database):
@@ -1693,11 +1715,12 @@ class TestSyncWorktrees:
 class TestHelperFunctions:
     """Test helper functions in git module."""
 
-    def test_ensure_git_repository_record_creates_record(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_creates_record(self):
         """Should create repository record if it doesn't exist."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
         mock_settings_obj.workspace_dir = Path("/test/workspace")
@@ -1715,18 +1738,19 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    result = ensure_git_repository_record("test-project", "/test/path")
+                    result = await ensure_git_repository_record("test-project", "/test/path")
 
         assert result is not None
         mock_db.create_git_repository.assert_called_once()
         call_kwargs = mock_db.create_git_repository.call_args.kwargs
         assert call_kwargs["github_repo_name"] == "owner/repo"
 
-    def test_ensure_git_repository_record_returns_existing(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_returns_existing(self):
         """Should return existing repository record."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
 
@@ -1737,16 +1761,17 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    result = ensure_git_repository_record("test-project", "/test/path")
+                    result = await ensure_git_repository_record("test-project", "/test/path")
 
         assert result == existing_repo
         mock_db.create_git_repository.assert_not_called()
 
-    def test_ensure_git_repository_record_not_git_repo(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_not_git_repo(self):
         """Should return None for non-git repository."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
 
@@ -1755,15 +1780,16 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    result = ensure_git_repository_record("test-project", "/test/path")
+                    result = await ensure_git_repository_record("test-project", "/test/path")
 
         assert result is None
 
-    def test_ensure_git_repository_record_ssh_url(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_ssh_url(self):
         """Should parse SSH GitHub URL."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
 
@@ -1776,16 +1802,17 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    ensure_git_repository_record("test-project", "/test/path")
+                    await ensure_git_repository_record("test-project", "/test/path")
 
         call_kwargs = mock_db.create_git_repository.call_args.kwargs
         assert call_kwargs["github_repo_name"] == "owner/repo"
 
-    def test_ensure_git_repository_record_malformed_url(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_malformed_url(self):
         """Should handle malformed remote URL without crashing."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
 
@@ -1799,17 +1826,18 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    result = ensure_git_repository_record("test-project", "/test/path")
+                    result = await ensure_git_repository_record("test-project", "/test/path")
 
         # Should still create the repo, just without github_repo_name
         assert result is not None
         mock_db.create_git_repository.assert_called_once()
 
-    def test_ensure_git_repository_record_non_github_url(self):
+    @pytest.mark.asyncio
+    async def test_ensure_git_repository_record_non_github_url(self):
         """Should handle non-GitHub remote URL."""
         from app.api.git import ensure_git_repository_record
 
-        mock_git = MagicMock()
+        mock_git = mirror_async(MagicMock(), "is_git_repo", "get_remote_url", "get_default_branch")
         mock_db = MagicMock()
         mock_settings_obj = MagicMock()
 
@@ -1823,7 +1851,7 @@ class TestHelperFunctions:
         with patch("app.api.git.git_service", mock_git):
             with patch("app.api.git.database", mock_db):
                 with patch("app.api.git.settings", mock_settings_obj):
-                    result = ensure_git_repository_record("test-project", "/test/path")
+                    result = await ensure_git_repository_record("test-project", "/test/path")
 
         # Should create repo, github_repo_name stays None
         assert result is not None
@@ -3,6 +3,7 @@ Comprehensive tests for the knowledge API endpoints.
 
 Tests cover:
 - Knowledge document CRUD operations (upload, list, get, delete)
+- Batch upload with progress events
 - Document search functionality
 - Document preview endpoint
 - Knowledge stats endpoint
@@ -284,7 +285,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "test.txt"
-        mock_file.read = AsyncMock(return_value=b"Test content")
+        mock_file.file = io.BytesIO(b"Test content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -292,7 +294,7 @@ class TestUploadDocumentEndpoint:
                     mock_user.return_value = None
                     mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
                     mock_service.is_supported_file.return_value = True
-                    mock_service.process_document = AsyncMock(return_value=("doc-123", 5))
+                    mock_service.process_document_stream = AsyncMock(return_value=("doc-123", 5))
                     mock_db.get_knowledge_document.return_value = {
                         "id": "doc-123",
                         "project_id": "project-1",
@@ -324,7 +326,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "test.exe"
-        mock_file.read = AsyncMock(return_value=b"binary content")
+        mock_file.file = io.BytesIO(b"binary content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -354,7 +357,8 @@ class TestUploadDocumentEndpoint:
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "large.txt"
         # Create content > 5MB
-        mock_file.read = AsyncMock(return_value=b"x" * (6 * 1024 * 1024))
+        mock_file.file = io.BytesIO(b"x" * (6 * 1024 * 1024))
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -382,7 +386,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = ""  # Empty filename
-        mock_file.read = AsyncMock(return_value=b"content")
+        mock_file.file = io.BytesIO(b"content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
@@ -408,7 +413,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = None
-        mock_file.read = AsyncMock(return_value=b"content")
+        mock_file.file = io.BytesIO(b"content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
@@ -434,7 +440,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "empty.txt"
-        mock_file.read = AsyncMock(return_value=b"")
+        mock_file.file = io.BytesIO(b"")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -442,7 +449,7 @@ class TestUploadDocumentEndpoint:
                     mock_user.return_value = None
                     mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
                     mock_service.is_supported_file.return_value = True
-                    mock_service.process_document = AsyncMock(
+                    mock_service.process_document_stream = AsyncMock(
                         side_effect=ValueError("Document is empty")
                     )
 
@@ -465,7 +472,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "test.txt"
-        mock_file.read = AsyncMock(return_value=b"content")
+        mock_file.file = io.BytesIO(b"content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -473,7 +481,7 @@ class TestUploadDocumentEndpoint:
                     mock_user.return_value = None
                     mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
                     mock_service.is_supported_file.return_value = True
-                    mock_service.process_document = AsyncMock(
+                    mock_service.process_document_stream = AsyncMock(
                         side_effect=Exception("Unexpected error")
                     )
 
@@ -496,7 +504,8 @@ class TestUploadDocumentEndpoint:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "test.txt"
-        mock_file.read = AsyncMock(return_value=b"content")
+        mock_file.file = io.BytesIO(b"content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
@@ -513,6 +522,80 @@ class TestUploadDocumentEndpoint:
                 assert exc_info.value.status_code == 404
 
 
+class TestUploadBatchEndpoint:
+    """Test upload_documents_batch endpoint function."""
+
+    @pytest.mark.asyncio
+    async def test_batch_upload_success(self):
+        """Batch upload should ingest every file and report progress globally."""
+        from app.api.knowledge import upload_documents_batch
+        from fastapi import UploadFile
+
+        mock_request = MagicMock()
+        files = []
+        for name in ("a.md", "b.exe"):
+            mock_file = AsyncMock(spec=UploadFile)
+            mock_file.filename = name
+            mock_file.file = io.BytesIO(b"content")
+            mock_file.size = 7
+            files.append(mock_file)
+
+        async def fake_batch(project_id, pairs, max_size, concurrency, on_event):
+            await on_event({"index": 0, "filename": "a.md", "status": "progress", "bytes_read": 7})
+            return [
+                {"filename": "a.md", "status": "completed", "document_id": "doc-1", "chunk_count": 1, "error": None},
+                {"filename": "b.exe", "status": "failed", "document_id": None, "chunk_count": 0,
+                 "error": "Unsupported file type"},
+            ]
+
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service") as mock_service, \
+             patch("app.api.knowledge.sync_engine") as mock_sync, \
+             patch("app.api.knowledge.get_api_user_from_request", return_value=None):
+            mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
+            mock_service.process_documents_batch = AsyncMock(side_effect=fake_batch)
+            mock_sync.broadcast_global = AsyncMock()
+
+            result = await upload_documents_batch(
+                request=mock_request,
+                project_id="project-1",
+                files=files,
+                batch_id="batch-1",
+                token="test-token"
+            )
+
+            assert result.batch_id == "batch-1"
+            assert result.succeeded == 1
+            assert result.failed == 1
+            assert result.documents[1].error == "Unsupported file type"
+
+            event_type, event = mock_sync.broadcast_global.call_args[0]
+            assert event_type == "knowledge_ingest_progress"
+            assert event["batch_id"] == "batch-1"
+            assert event["total"] == 2
+            assert event["file_size"] == 7
+            assert mock_sync.broadcast_global.call_args.kwargs["project_id"] == "project-1"
+
+    @pytest.mark.asyncio
+    async def test_batch_upload_requires_files(self):
+        """An empty batch should raise 400."""
+        from app.api.knowledge import upload_documents_batch
+
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.get_api_user_from_request", return_value=None):
+            mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
+
+            with pytest.raises(HTTPException) as exc_info:
+                await upload_documents_batch(
+                    request=MagicMock(),
+                    project_id="project-1",
+                    files=[],
+                    batch_id=None,
+                    token="test-token"
+                )
+            assert exc_info.value.status_code == 400
+
+
 class TestSearchDocumentsEndpoint:
     """Test search_documents endpoint function."""
 
@@ -522,11 +605,12 @@ class TestSearchDocumentsEndpoint:
         from app.api.knowledge import search_documents
 
         mock_request = MagicMock()
-        with patch("app.api.knowledge.database") as mock_db:
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service.search_chunks") as mock_search:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
                 mock_user.return_value = None
                 mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
-                mock_db.search_knowledge_chunks.return_value = [
+                mock_search.return_value = [
                     {
                         "id": "chunk-1",
                         "document_id": "doc-1",
@@ -556,11 +640,12 @@ class TestSearchDocumentsEndpoint:
         from app.api.knowledge import search_documents
 
         mock_request = MagicMock()
-        with patch("app.api.knowledge.database") as mock_db:
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service.search_chunks") as mock_search:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
                 mock_user.return_value = None
                 mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
-                mock_db.search_knowledge_chunks.return_value = []
+                mock_search.return_value = []
 
                 result = await search_documents(
                     request=mock_request,
@@ -574,15 +659,16 @@ class TestSearchDocumentsEndpoint:
 
     @pytest.mark.asyncio
     async def test_search_documents_with_limit(self):
-        """Searching with custom limit should pass limit to database."""
+        """Searching with custom limit should pass limit to the search."""
         from app.api.knowledge import search_documents
 
         mock_request = MagicMock()
-        with patch("app.api.knowledge.database") as mock_db:
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service.search_chunks") as mock_search:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
                 mock_user.return_value = None
                 mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
-                mock_db.search_knowledge_chunks.return_value = []
+                mock_search.return_value = []
 
                 await search_documents(
                     request=mock_request,
@@ -592,7 +678,7 @@ class TestSearchDocumentsEndpoint:
                     token="test-token"
                 )
 
-                mock_db.search_knowledge_chunks.assert_called_once_with(
+                mock_search.assert_called_once_with(
                     "project-1", "test", limit=5
                 )
 
@@ -602,11 +688,12 @@ class TestSearchDocumentsEndpoint:
         from app.api.knowledge import search_documents
 
         mock_request = MagicMock()
-        with patch("app.api.knowledge.database") as mock_db:
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service.search_chunks") as mock_search:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
                 mock_user.return_value = None
                 mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
-                mock_db.search_knowledge_chunks.return_value = [
+                mock_search.return_value = [
                     {
                         "id": "chunk-1",
                         "document_id": "doc-1",
@@ -1037,15 +1124,16 @@ class TestKnowledgeServiceIntegration:
     """Test knowledge_service integration points."""
 
     @pytest.mark.asyncio
-    async def test_upload_calls_process_document(self):
-        """Upload should call knowledge_service.process_document."""
+    async def test_upload_calls_process_document_stream(self):
+        """Upload should stream the file into knowledge_service."""
         from app.api.knowledge import upload_document
         from fastapi import UploadFile
 
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "readme.md"
-        mock_file.read = AsyncMock(return_value=b"# Hello\n\nWorld")
+        mock_file.file = io.BytesIO(b"# Hello\n\nWorld")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -1053,7 +1141,7 @@ class TestKnowledgeServiceIntegration:
                     mock_user.return_value = None
                     mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
                     mock_service.is_supported_file.return_value = True
-                    mock_service.process_document = AsyncMock(return_value=("doc-123", 3))
+                    mock_service.process_document_stream = AsyncMock(return_value=("doc-123", 3))
                     mock_db.get_knowledge_document.return_value = {
                         "id": "doc-123",
                         "project_id": "project-1",
@@ -1072,8 +1160,8 @@ class TestKnowledgeServiceIntegration:
                         token="test-token"
                     )
 
-                    mock_service.process_document.assert_called_once()
-                    call_args = mock_service.process_document.call_args
+                    mock_service.process_document_stream.assert_called_once()
+                    call_args = mock_service.process_document_stream.call_args
                     assert call_args.kwargs["project_id"] == "project-1"
                     assert call_args.kwargs["filename"] == "readme.md"
 
@@ -1170,11 +1258,12 @@ class TestEdgeCases:
         from app.api.knowledge import search_documents
 
         mock_request = MagicMock()
-        with patch("app.api.knowledge.database") as mock_db:
+        with patch("app.api.knowledge.database") as mock_db, \
+             patch("app.api.knowledge.knowledge_service.search_chunks") as mock_search:
             with patch("app.api.knowledge.get_api_user_from_request") as mock_user:
                 mock_user.return_value = None
                 mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
-                mock_db.search_knowledge_chunks.return_value = []
+                mock_search.return_value = []
 
                 # Should not raise with special characters
                 result = await search_documents(
@@ -1196,7 +1285,8 @@ class TestEdgeCases:
         mock_request = MagicMock()
         mock_file = AsyncMock(spec=UploadFile)
         mock_file.filename = "test_unicode.txt"
-        mock_file.read = AsyncMock(return_value=b"Content")
+        mock_file.file = io.BytesIO(b"Content")
+        mock_file.size = len(mock_file.file.getvalue())
 
         with patch("app.api.knowledge.database") as mock_db:
             with patch("app.api.knowledge.knowledge_service") as mock_service:
@@ -1204,7 +1294,7 @@ class TestEdgeCases:
                     mock_user.return_value = None
                     mock_db.get_project.return_value = {"id": "project-1", "name": "Test"}
                     mock_service.is_supported_file.return_value = True
-                    mock_service.process_document = AsyncMock(return_value=("doc-123", 1))
+                    mock_service.process_document_stream = AsyncMock(return_value=("doc-123", 1))
                     mock_db.get_knowledge_document.return_value = {
                         "id": "doc-123",
                         "project_id": "project-1",
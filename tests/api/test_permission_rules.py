@@ -403,6 +403,27 @@ class TestCreatePermissionRuleEndpoint:
                 decision="allow"
             )
 
+    @pytest.mark.asyncio
+    async def test_create_permission_rule_invalidates_cached_rules(self):
+        """Creating a rule should drop the profile's cached rules."""
+        from app.api.permission_rules import create_permission_rule, PermissionRuleCreate
+
+        rule_data = PermissionRuleCreate(
+            profile_id="test-profile",
+            tool_name="Bash",
+            tool_pattern="git *",
+            decision="allow"
+        )
+
+        with patch("app.api.permission_rules.database") as mock_db, \
+                patch("app.api.permission_rules.permission_handler") as mock_handler:
+            mock_db.get_profile.return_value = sample_profile()
+            mock_db.add_permission_rule.return_value = {"id": "rule-new123"}
+
+            await create_permission_rule(rule=rule_data, token="test-token")
+
+            mock_handler.invalidate_rules.assert_called_once_with("test-profile")
+
     @pytest.mark.asyncio
     async def test_create_permission_rule_without_pattern(self):
         """Creating a permission rule without pattern should work."""
@@ -553,6 +574,22 @@ class TestDeletePermissionRuleEndpoint:
             mock_db.get_permission_rule.assert_called_once_with("rule-abc123")
             mock_db.delete_permission_rule.assert_called_once_with("rule-abc123")
 
+    @pytest.mark.asyncio
+    async def test_delete_permission_rule_invalidates_cached_rules(self):
+        """Deleting a rule should drop the profile's cached rules."""
+        from app.api.permission_rules import delete_permission_rule
+
+        rule = sample_permission_rule()
+
+        with patch("app.api.permission_rules.database") as mock_db, \
+                patch("app.api.permission_rules.permission_handler") as mock_handler:
+            mock_db.get_permission_rule.return_value = rule
+            mock_db.delete_permission_rule.return_value = True
+
+            await delete_permission_rule(rule_id="rule-abc123", token="test-token")
+
+            mock_handler.invalidate_rules.assert_called_once_with(rule["profile_id"])
+
     @pytest.mark.asyncio
     async def test_delete_permission_rule_not_found(self):
         """Deleting a non-existent permission rule should return 404."""
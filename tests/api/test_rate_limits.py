@@ -129,6 +129,7 @@ def mock_request_queue():
         mock_rq.clear = AsyncMock(return_value=3)
         mock_rq._max_size = 100
         mock_rq._process_time_estimate = 30
+        mock_rq.get_metrics.return_value = {"running": 2, "max_running": 8}
         yield mock_rq
 
 
@@ -1109,6 +1110,8 @@ class TestGetQueueAdminInfo:
         assert data["queue_size"] == 5
         assert data["max_size"] == 100
         assert data["process_time_estimate"] == 30
+        assert data["running"] == 2
+        assert data["max_running"] == 8
 
 
 class TestClearQueue:
@@ -3,6 +3,7 @@ Unit tests for search API endpoints.
 
 Tests cover:
 - Advanced search functionality
+- Search index (FTS5) path and JSONL fallback
 - Search suggestions
 - Query validation (regex, date formats)
 - Code block searching
@@ -517,6 +518,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_basic_query(self, mock_db, search_client):
         """Should perform basic search."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -533,6 +535,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_valid_regex(self, mock_db, search_client):
         """Should accept valid regex pattern."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -554,6 +557,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_valid_date_range(self, mock_db, search_client):
         """Should accept valid date range."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -568,6 +572,7 @@ class TestAdvancedSearchEndpoint:
         """Should return search results."""
         from app.api.search import SearchMatch
 
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {
                 "id": "session-1",
@@ -598,6 +603,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search._search_session_jsonl")
     def test_search_title_match_only(self, mock_search_jsonl, mock_db, search_client):
         """Should include sessions where title matches but no content matches."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {
                 "id": "session-1",
@@ -623,12 +629,120 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_pagination(self, mock_db, search_client):
         """Should support pagination parameters."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
         response = search_client.get("/api/v1/search?q=test&limit=10&offset=5")
         assert response.status_code == 200
 
+    @patch("app.api.search.database")
+    @patch("app.api.search._search_session_jsonl")
+    def test_search_uses_index(self, mock_search_jsonl, mock_db, search_client):
+        """Should serve plain-text queries from the search index."""
+        mock_db.search_index_available.return_value = True
+        mock_db.search_session_messages.return_value = [
+            {
+                "id": "session-1",
+                "title": "Test Session",
+                "created_at": "2024-01-15T10:00:00Z",
+                "updated_at": "2024-01-15T11:00:00Z",
+                "profile_id": "profile-1",
+                "project_id": None,
+                "title_snippet": None,
+                "matches": [
+                    {"message_index": 3, "snippet": "Found **test** here", "role": "user",
+                     "content": "Found test here", "created_at": "2024-01-15T10:30:00Z"}
+                ]
+            }
+        ]
+        mock_db.get_all_profiles.return_value = [
+            {"id": "profile-1", "name": "Default Profile"}
+        ]
+
+        response = search_client.get(
+            "/api/v1/search?q=test&start_date=2024-01-01&end_date=2024-01-31&limit=10&offset=5"
+        )
+        assert response.status_code == 200
+
+        results = response.json()
+        assert len(results) == 1
+        assert results[0]["profile_name"] == "Default Profile"
+        assert results[0]["matches"][0]["message_index"] == 3
+        assert results[0]["matches"][0]["snippet"] == "Found **test** here"
+        mock_search_jsonl.assert_not_called()
+
+        kwargs = mock_db.search_session_messages.call_args.kwargs
+        assert kwargs["created_after"] == "2024-01-01"
+        assert kwargs["created_before"] == "2024-02-01"
+        assert kwargs["limit"] == 10
+        assert kwargs["offset"] == 5
+
+    @patch("app.api.search.database")
+    def test_search_index_title_match(self, mock_db, search_client):
+        """Should return the highlighted title when only the title matched."""
+        mock_db.search_index_available.return_value = True
+        mock_db.search_session_messages.return_value = [
+            {
+                "id": "session-1",
+                "title": "Testing API endpoints",
+                "created_at": "2024-01-15T10:00:00Z",
+                "updated_at": "2024-01-15T11:00:00Z",
+                "title_snippet": "**Testing** API endpoints",
+                "matches": []
+            }
+        ]
+        mock_db.get_all_profiles.return_value = []
+
+        response = search_client.get("/api/v1/search?q=testing")
+        assert response.status_code == 200
+
+        match = response.json()[0]["matches"][0]
+        assert match["role"] == "title"
+        assert match["snippet"] == "**Testing** API endpoints"
+
+    @patch("app.api.search.database")
+    def test_search_index_code_only(self, mock_db, search_client):
+        """Should keep only index hits that match inside code blocks."""
+        mock_db.search_index_available.return_value = True
+        mock_db.search_session_messages.return_value = [
+            {
+                "id": "session-1",
+                "title": "One",
+                "created_at": "2024-01-15T10:00:00Z",
+                "updated_at": "2024-01-15T11:00:00Z",
+                "title_snippet": None,
+                "matches": [
+                    {"message_index": 0, "snippet": "print outside", "role": "user",
+                     "content": "print outside code", "created_at": None},
+                    {"message_index": 1, "snippet": "...", "role": "assistant",
+                     "content": "```python\nprint('hi')\n```", "created_at": None},
+                ]
+            }
+        ]
+        mock_db.get_all_profiles.return_value = []
+
+        response = search_client.get("/api/v1/search?q=print&in_code_only=true")
+        assert response.status_code == 200
+
+        matches = response.json()[0]["matches"]
+        assert [m["message_index"] for m in matches] == [1]
+        assert "**print**" in matches[0]["snippet"]
+        assert mock_db.search_session_messages.call_args.kwargs["limit"] == 500
+
+    @patch("app.api.search.database")
+    @patch("app.api.search._search_session_jsonl")
+    def test_search_regex_skips_index(self, mock_search_jsonl, mock_db, search_client):
+        """Should fall back to JSONL search for regex queries."""
+        mock_db.search_index_available.return_value = False
+        mock_db.get_sessions.return_value = []
+        mock_db.get_all_profiles.return_value = []
+
+        response = search_client.get("/api/v1/search?q=te.t&regex=true")
+        assert response.status_code == 200
+        mock_db.search_session_messages.assert_not_called()
+        mock_db.get_sessions.assert_called_once()
+
     def test_search_limit_validation(self, search_client):
         """Should validate limit bounds."""
         # Limit too high
@@ -649,6 +763,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search._search_session_jsonl")
     def test_search_date_filter_start(self, mock_search_jsonl, mock_db, search_client):
         """Should filter sessions by start date."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {
                 "id": "session-old",
@@ -683,6 +798,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search._search_session_jsonl")
     def test_search_date_filter_end(self, mock_search_jsonl, mock_db, search_client):
         """Should filter sessions by end date."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {
                 "id": "session-old",
@@ -716,6 +832,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_profile_filter(self, mock_db, search_client):
         """Should filter by profile_id."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -730,6 +847,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_project_filter(self, mock_db, search_client):
         """Should filter by project_id."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -743,6 +861,7 @@ class TestAdvancedSearchEndpoint:
     @patch("app.api.search.database")
     def test_search_in_code_only_param(self, mock_db, search_client):
         """Should pass in_code_only parameter."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = []
         mock_db.get_all_profiles.return_value = []
 
@@ -792,6 +911,7 @@ class TestSearchSuggestionsEndpoint:
     @patch("app.api.search.database")
     def test_suggestions_basic(self, mock_db, search_client):
         """Should return suggestions based on session titles."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {"title": "Testing the API"},
             {"title": "Test driven development"},
@@ -811,6 +931,7 @@ class TestSearchSuggestionsEndpoint:
     @patch("app.api.search.database")
     def test_suggestions_case_insensitive(self, mock_db, search_client):
         """Should match case-insensitively."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {"title": "UPPERCASE TEST"},
             {"title": "lowercase test"},
@@ -825,6 +946,7 @@ class TestSearchSuggestionsEndpoint:
     @patch("app.api.search.database")
     def test_suggestions_limit(self, mock_db, search_client):
         """Should respect limit parameter."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {"title": f"Test title {i}"}
             for i in range(20)
@@ -839,6 +961,7 @@ class TestSearchSuggestionsEndpoint:
     @patch("app.api.search.database")
     def test_suggestions_no_duplicates(self, mock_db, search_client):
         """Should not return duplicate suggestions."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {"title": "Same Title"},
             {"title": "Same Title"},
@@ -855,6 +978,7 @@ class TestSearchSuggestionsEndpoint:
     @patch("app.api.search.database")
     def test_suggestions_skips_null_titles(self, mock_db, search_client):
         """Should skip sessions with null titles."""
+        mock_db.search_index_available.return_value = False
         mock_db.get_sessions.return_value = [
             {"title": None},
             {"title": "Valid Test Title"},
@@ -898,6 +1022,7 @@ class TestApiUserRestrictions:
                 "username": "testuser",
                 "project_id": "restricted-project"
             }
+            mock_db.search_index_available.return_value = False
             mock_db.get_sessions.return_value = []
             mock_db.get_all_profiles.return_value = []
 
@@ -928,6 +1053,7 @@ class TestApiUserRestrictions:
                 "username": "testuser",
                 "profile_id": "restricted-profile"
             }
+            mock_db.search_index_available.return_value = False
             mock_db.get_sessions.return_value = []
             mock_db.get_all_profiles.return_value = []
 
@@ -956,6 +1082,7 @@ class TestApiUserRestrictions:
                 "id": "api-user-1",
                 "username": "testuser"
             }
+            mock_db.search_index_available.return_value = False
             mock_db.get_sessions.return_value = []
             mock_db.get_all_profiles.return_value = []
 
@@ -985,6 +1112,7 @@ class TestApiUserRestrictions:
                 "username": "testuser",
                 "project_id": "user-project"
             }
+            mock_db.search_index_available.return_value = False
             mock_db.get_sessions.return_value = []
             mock_db.get_all_profiles.return_value = []
 
@@ -999,6 +1127,39 @@ class TestApiUserRestrictions:
 
         app.dependency_overrides.clear()
 
+    @patch("app.api.search.database")
+    def test_api_user_restrictions_apply_to_index(self, mock_db):
+        """API user restrictions should be passed to the search index."""
+        from app.main import app
+        from app.api.auth import require_auth
+
+        def mock_require_auth():
+            return "api-token"
+
+        app.dependency_overrides[require_auth] = mock_require_auth
+
+        with patch("app.api.search.get_api_user_from_request") as mock_api_user:
+            mock_api_user.return_value = {
+                "id": "api-user-1",
+                "username": "testuser",
+                "project_id": "user-project",
+                "profile_id": "user-profile"
+            }
+            mock_db.search_index_available.return_value = True
+            mock_db.search_session_messages.return_value = []
+            mock_db.get_all_profiles.return_value = []
+
+            with TestClient(app) as client:
+                response = client.get("/api/v1/search?q=test&project_id=other-project")
+                assert response.status_code == 200
+
+                call_kwargs = mock_db.search_session_messages.call_args[1]
+                assert call_kwargs.get("project_id") == "user-project"
+                assert call_kwargs.get("profile_id") == "user-profile"
+                assert call_kwargs.get("api_user_id") == "api-user-1"
+
+        app.dependency_overrides.clear()
+
 
 class TestSearchResponseModel:
     """Test search response model structure."""
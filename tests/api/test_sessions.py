@@ -540,6 +540,30 @@ class TestGetSession:
         assert len(data["messages"]) == 1
         mock_database.get_session_messages.assert_called_once()
 
+    def test_get_session_with_limit_returns_page(self, client, mock_database, sample_session):
+        """Should return only a page of messages when a limit is given."""
+        mock_database.get_session.return_value = sample_session
+        page = {
+            "source": "db",
+            "messages": [{"id": 9, "role": "user", "content": "Latest", "tool_name": None}],
+            "total": 9,
+            "has_more_before": True,
+            "has_more_after": False,
+            "before_cursor": "9",
+            "after_cursor": "9",
+        }
+
+        with patch("app.core.session_history.get_history_page", return_value=page) as mock_page:
+            response = client.get("/api/v1/sessions/test-session-id?limit=1")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [m["content"] for m in data["messages"]] == ["Latest"]
+        assert data["history_page"]["has_more_before"] is True
+        assert data["history_page"]["before_cursor"] == "9"
+        assert mock_page.call_args.args[2] == 1
+        mock_database.get_session_messages.assert_not_called()
+
     def test_get_session_access_denied(self, client, mock_database, mock_api_user, sample_session):
         """Should deny access for unauthorized API user."""
         mock_api_user.return_value = {
@@ -555,6 +579,50 @@ class TestGetSession:
         assert "Access denied" in response.json()["detail"]
 
 
+class TestGetSessionMessagesPage:
+    """Test GET /api/v1/sessions/{session_id}/messages endpoint."""
+
+    def test_get_older_page(self, client, mock_database, sample_session):
+        """Should pass the cursor through and format JSONL messages."""
+        mock_database.get_session.return_value = sample_session
+        page = {
+            "source": "jsonl",
+            "messages": [{"id": "uuid-1", "role": "user", "content": "Hello", "type": "text", "metadata": {}}],
+            "total": 5,
+            "has_more_before": False,
+            "has_more_after": True,
+            "before_cursor": "uuid-1",
+            "after_cursor": "uuid-1",
+        }
+
+        with patch("app.core.session_history.get_history_page", return_value=page) as mock_page:
+            response = client.get("/api/v1/sessions/test-session-id/messages?before=uuid-2&limit=1")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["messages"][0]["id"] == "uuid-1"
+        assert data["has_more_after"] is True
+        assert data["total"] == 5
+        assert mock_page.call_args.kwargs["before"] == "uuid-2"
+
+    def test_unknown_cursor(self, client, mock_database, sample_session):
+        """Should return 400 for a cursor that matches no message."""
+        mock_database.get_session.return_value = sample_session
+
+        with patch("app.core.session_history.get_history_page", side_effect=ValueError("Unknown message cursor: x")):
+            response = client.get("/api/v1/sessions/test-session-id/messages?around=x")
+
+        assert response.status_code == 400
+
+    def test_session_not_found(self, client, mock_database):
+        """Should return 404 for non-existent session."""
+        mock_database.get_session.return_value = None
+
+        response = client.get("/api/v1/sessions/missing/messages")
+
+        assert response.status_code == 404
+
+
 # =============================================================================
 # Test Update Session Endpoint
 # =============================================================================
@@ -822,12 +890,15 @@ class TestGetSyncChanges:
     def test_get_sync_changes_success(self, client, mock_database, sample_session):
         """Should return sync changes."""
         mock_database.get_session.return_value = sample_session
-        mock_database.get_sync_logs.return_value = [
-            {"id": 1, "event_type": "message_added", "data": {}}
-        ]
-        mock_database.get_latest_sync_id.return_value = 5
 
         with patch("app.core.sync_engine.sync_engine") as mock_sync:
+            mock_sync.epoch = "epoch-1"
+            mock_sync.replay = AsyncMock(return_value={
+                "events": [{"seq": 5, "event_type": "message_added", "data": {}}],
+                "latest_seq": 5,
+                "epoch": "epoch-1",
+                "complete": True
+            })
             mock_sync.is_session_streaming.return_value = True
             mock_sync.get_device_count.return_value = 2
 
@@ -837,8 +908,48 @@ class TestGetSyncChanges:
         data = response.json()
         assert len(data["changes"]) == 1
         assert data["latest_id"] == 5
+        assert data["epoch"] == "epoch-1"
+        assert data["resync_required"] is False
         assert data["is_streaming"] is True
         assert data["connected_devices"] == 2
+        mock_sync.replay.assert_called_once_with("test-session-id", 0, None)
+
+    def test_get_sync_changes_long_poll(self, client, mock_database, sample_session):
+        """Should wait for events, capped by sync_poll_max_wait_seconds."""
+        mock_database.get_session.return_value = sample_session
+
+        with patch("app.core.sync_engine.sync_engine") as mock_sync, \
+                patch("app.core.config.settings.sync_poll_max_wait_seconds", 10):
+            mock_sync.epoch = "epoch-1"
+            mock_sync.wait_for_events = AsyncMock(return_value=False)
+            mock_sync.replay = AsyncMock(return_value={
+                "events": [], "latest_seq": 7, "epoch": "epoch-1", "complete": True
+            })
+            mock_sync.is_session_streaming.return_value = False
+            mock_sync.get_device_count.return_value = 0
+
+            response = client.get("/api/v1/sessions/test-session-id/sync?since_id=7&epoch=epoch-1&wait=60")
+
+        assert response.status_code == 200
+        mock_sync.wait_for_events.assert_called_once_with("test-session-id", 7, 10)
+
+    def test_get_sync_changes_resync_required(self, client, mock_database, sample_session):
+        """Should ask the client to reload when events can't be replayed."""
+        mock_database.get_session.return_value = sample_session
+
+        with patch("app.core.sync_engine.sync_engine") as mock_sync:
+            mock_sync.epoch = "epoch-2"
+            mock_sync.replay = AsyncMock(return_value={
+                "events": [], "latest_seq": 3, "epoch": "epoch-2", "complete": False
+            })
+            mock_sync.is_session_streaming.return_value = False
+            mock_sync.get_device_count.return_value = 1
+
+            response = client.get("/api/v1/sessions/test-session-id/sync?since_id=40&epoch=epoch-1&wait=5")
+
+        assert response.status_code == 200
+        assert response.json()["resync_required"] is True
+        mock_sync.wait_for_events.assert_not_called()
 
     def test_get_sync_changes_not_found(self, client, mock_database):
         """Should return 404 for non-existent session."""
@@ -306,6 +306,46 @@ class TestStatsFunction:
             assert result["total_queries"] == 0
 
 
+# =============================================================================
+# Runtime Metrics Function Tests
+# =============================================================================
+
+class TestRuntimeMetricsFunction:
+    """Test get_runtime_metrics function directly."""
+
+    @pytest.mark.asyncio
+    async def test_get_runtime_metrics_includes_database_pool(self):
+        """Should return connection pool metrics under 'database'."""
+        from app.api.system import get_runtime_metrics
+
+        with patch("app.api.system.database") as mock_db:
+            mock_db.get_pool_metrics.return_value = {"enabled": True, "checkouts": 42}
+
+            result = await get_runtime_metrics(token="test-token")
+
+            assert result["database"]["enabled"] is True
+            assert result["database"]["checkouts"] == 42
+            assert "max_lag_ms" in result["event_loop"]
+
+    @pytest.mark.asyncio
+    async def test_get_runtime_metrics_includes_streaming(self):
+        """Should return sync queue and stream batching metrics."""
+        from app.api.system import get_runtime_metrics
+
+        result = await get_runtime_metrics(token="test-token")
+
+        assert "events_dropped" in result["sync"]
+        assert "frames_out" in result["streaming"]
+        assert "sessions" in result["streaming"]
+        assert "avg_wait_ms" in result["agents"]
+        assert "slot_utilization" in result["agents"]
+        assert "hit_rate" in result["options"]
+        assert "stages" in result["options"]
+        assert "hit_rate" in result["secrets"]
+        assert "avg_connect_ms" in result["client_pool"]
+        assert "cache_hit_rate" in result["git"]
+
+
 # =============================================================================
 # Deployment Info Function Tests
 # =============================================================================
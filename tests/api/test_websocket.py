@@ -121,7 +121,7 @@ class TestAuthenticateWebSocket:
         """Should authenticate with valid admin session token."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = {"id": "session-1", "token": "test-token"}
             mock_db.get_api_key_session.return_value = None
 
@@ -135,7 +135,7 @@ class TestAuthenticateWebSocket:
         """Should authenticate with API key session token."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = {"api_user_id": "user-123"}
             mock_db.get_api_user.return_value = {"id": "user-123", "is_active": True}
@@ -153,7 +153,7 @@ class TestAuthenticateWebSocket:
         raw_key = "sk-test-api-key-12345"
         key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = None
             mock_db.get_api_user_by_key_hash.return_value = {"id": "user-456", "is_active": True}
@@ -170,7 +170,7 @@ class TestAuthenticateWebSocket:
 
         mock_websocket.cookies = {"session": "cookie-session-token"}
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             # When token=None, only cookie path is checked (no side_effect needed)
             mock_db.get_auth_session.return_value = {"id": "session-1"}
             mock_db.get_api_key_session.return_value = None
@@ -184,7 +184,7 @@ class TestAuthenticateWebSocket:
         """Should fail authentication with invalid token."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = None
             mock_db.get_api_user_by_key_hash.return_value = None
@@ -199,7 +199,7 @@ class TestAuthenticateWebSocket:
         """Should fail authentication if API user is inactive."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = {"api_user_id": "user-123"}
             mock_db.get_api_user.return_value = {"id": "user-123", "is_active": False}
@@ -217,7 +217,7 @@ class TestAuthenticateWebSocket:
 
         mock_websocket.cookies = {}
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = None
 
@@ -1389,7 +1389,7 @@ class TestAuthenticateWebSocketEdgeCases:
         """Should authenticate when API user doesn't have is_active field (defaults to True)."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = {"api_user_id": "user-123"}
             # API user without is_active field - should default to True
@@ -1405,7 +1405,7 @@ class TestAuthenticateWebSocketEdgeCases:
         """Should fail when API user from session is None."""
         from app.api.websocket import authenticate_websocket
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = {"api_user_id": "user-123"}
             mock_db.get_api_user.return_value = None  # User not found
@@ -1422,7 +1422,7 @@ class TestAuthenticateWebSocketEdgeCases:
 
         mock_websocket.cookies = {"session": "cookie-api-session"}
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None  # Not admin session
             mock_db.get_api_key_session.return_value = {"api_user_id": "api-user-1"}
             mock_db.get_api_user.return_value = {"id": "api-user-1", "is_active": True}
@@ -1439,7 +1439,7 @@ class TestAuthenticateWebSocketEdgeCases:
 
         raw_key = "sk-test-inactive-key"
 
-        with patch("app.api.websocket.database") as mock_db:
+        with patch("app.core.principal_cache.database") as mock_db:
             mock_db.get_auth_session.return_value = None
             mock_db.get_api_key_session.return_value = None
             mock_db.get_api_user_by_key_hash.return_value = {"id": "user-789", "is_active": False}
@@ -223,6 +223,15 @@ def create_test_schema(cursor: sqlite3.Cursor):
         )
     """)
 
+    # Persisted rate limit counters (see app/core/rate_limiter.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # API keys
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS api_keys (
@@ -586,7 +595,7 @@ def create_test_schema(cursor: sqlite3.Cursor):
     """)
 
     # Insert schema version
-    cursor.execute("INSERT OR REPLACE INTO schema_version (version) VALUES (26)")
+    cursor.execute("INSERT OR REPLACE INTO schema_version (version) VALUES (29)")
 
 
 @pytest.fixture(scope="function")
@@ -874,6 +883,80 @@ def reset_environment():
     os.environ.update(original_env)
 
 
+@pytest.fixture(scope="session")
+def history_index_dir(tmp_path_factory) -> Path:
+    """Session-wide directory for persisted JSONL history indexes."""
+    return tmp_path_factory.mktemp("history_index")
+
+
+@pytest.fixture(autouse=True)
+def isolate_history_index(history_index_dir):
+    """
+    Keep persisted session history indexes and catalogs out of the real
+    data directory and start every test with empty in-memory caches.
+    """
+    from app.core import jsonl_index, history_catalog
+    jsonl_index.clear_cache()
+    history_catalog.clear_cache()
+    with patch.object(jsonl_index, "get_index_dir", return_value=history_index_dir):
+        yield
+    jsonl_index.clear_cache()
+    history_catalog.clear_cache()
+
+
+@pytest.fixture(autouse=True)
+def isolate_knowledge_index(tmp_path_factory):
+    """
+    Keep persisted knowledge indexes out of the real data directory, with a
+    fresh directory for each test that uses one.
+    """
+    from app.core import knowledge_service
+    directory: list = []
+
+    def index_dir() -> Path:
+        if not directory:
+            directory.append(tmp_path_factory.mktemp("knowledge_index"))
+        return directory[0]
+
+    with patch.object(knowledge_service, "get_index_dir", side_effect=index_dir):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def reset_write_behind():
+    """
+    Drop rows left in the global write-behind queue after each test so
+    they are never flushed into another test's database.
+    """
+    yield
+    from app.db.write_behind import write_behind
+    write_behind.discard_pending()
+
+
+@pytest.fixture(autouse=True)
+def reset_principal_cache():
+    """Forget tokens resolved by another test (each test mocks its own lookups)."""
+    from app.core.principal_cache import principal_cache
+    principal_cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_options_cache():
+    """Forget profiles, subagents and provider settings cached by another test."""
+    from app.core.options_cache import options_cache
+    options_cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_secret_cache():
+    """Forget API keys and user credentials decrypted by another test."""
+    from app.core.credential_service import secret_cache
+    secret_cache.clear()
+    yield
+
+
 @pytest.fixture
 def mock_encryption():
     """
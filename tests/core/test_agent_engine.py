@@ -270,24 +270,38 @@ class TestBroadcastCallback:
 class TestAgentLog:
     """Test _log method."""
 
+    @patch("app.core.agent_engine.async_database")
     @patch("app.core.agent_engine.database")
-    def test_log_adds_to_database(self, mock_db):
-        """Should add log entry to database."""
+    def test_log_adds_to_database(self, mock_db, mock_async_db):
+        """Should write the log entry on the writer thread right away."""
         engine = AgentExecutionEngine()
-        mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
 
         engine._log("agent-123", "Test message", "info", {"extra": "data"})
 
-        mock_db.add_agent_log.assert_called_once_with(
-            "agent-123", "Test message", "info", {"extra": "data"}
+        mock_async_db.submit_write.assert_called_once_with(
+            mock_db.add_agent_log, "agent-123", "Test message", "info", {"extra": "data"}
         )
 
+    @patch("app.core.agent_engine.database")
+    def test_log_written_without_a_chat_turn(self, mock_db):
+        """Should be stored in call order, not held until something flushes a buffer."""
+        from app.db import async_database as real_async_database
+
+        engine = AgentExecutionEngine()
+
+        engine._log("agent-123", "first")
+        engine._log("agent-123", "second", "warning")
+        # Writes are ordered on the writer thread
+        real_async_database.submit_write(lambda: None).result(timeout=5)
+
+        assert [c.args[1] for c in mock_db.add_agent_log.call_args_list] == ["first", "second"]
+
     @pytest.mark.asyncio
     @patch("app.core.agent_engine.database")
     async def test_log_broadcasts_when_callback_set(self, mock_db):
         """Should broadcast log when callback is set."""
         engine = AgentExecutionEngine()
-        mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
+        mock_db.add_agent_log.return_value = {"id": 1, "timestamp": "2024-01-01T00:00:00"}
         callback = AsyncMock()
         engine.set_broadcast_callback(callback)
 
@@ -301,6 +315,7 @@ class TestAgentLog:
         call_args = callback.call_args
         assert call_args[0][0] == "agent-123"
         assert call_args[0][1] == "agent_log"
+        assert call_args[0][2]["timestamp"] == "2024-01-01T00:00:00"
 
 
 # =============================================================================
@@ -368,6 +383,165 @@ class TestQueueProcessing:
             # Should only start 1 (max_concurrent - active)
             assert mock_start.await_count == 1
 
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.database")
+    async def test_process_queue_respects_project_cap(self, mock_db):
+        """Should skip runs whose project is at its cap and start later ones."""
+        engine = AgentExecutionEngine(max_concurrent=3, max_per_project=1)
+
+        mock_task = MagicMock()
+        mock_task.done.return_value = False
+        engine._active_runs["agent-0"] = AgentRunState(
+            agent_run_id="agent-0", project_id="project-a", task=mock_task
+        )
+
+        mock_db.get_queued_agent_runs.return_value = [
+            {"id": "agent-1", "project_id": "project-a"},
+            {"id": "agent-2", "project_id": "project-b"},
+            {"id": "agent-3", "project_id": "project-b"},
+        ]
+
+        with patch.object(engine, "_start_agent_run", new_callable=AsyncMock) as mock_start:
+            await engine._process_queue()
+
+        started = [c.args[0]["id"] for c in mock_start.await_args_list]
+        assert started == ["agent-2"]
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.database")
+    async def test_process_queue_starts_in_queue_order(self, mock_db):
+        """Should start runs in the (priority) order the database returns."""
+        engine = AgentExecutionEngine(max_concurrent=1)
+        mock_db.get_queued_agent_runs.return_value = [
+            {"id": "agent-high"},
+            {"id": "agent-low"},
+        ]
+
+        with patch.object(engine, "_start_agent_run", new_callable=AsyncMock) as mock_start:
+            await engine._process_queue()
+
+        assert mock_start.await_args_list[0].args[0]["id"] == "agent-high"
+        assert mock_start.await_count == 1
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.database")
+    async def test_queue_loop_waits_for_wakeup(self, mock_db):
+        """Should not query the database again until something wakes it."""
+        engine = AgentExecutionEngine()
+        mock_db.get_running_agent_runs.return_value = []
+        mock_db.get_queued_agent_runs.return_value = []
+
+        await engine.start()
+        await asyncio.sleep(0.05)
+        calls = mock_db.get_queued_agent_runs.call_count
+
+        await asyncio.sleep(0.05)
+        assert mock_db.get_queued_agent_runs.call_count == calls
+
+        engine.max_concurrent = 4
+        await asyncio.sleep(0.05)
+        assert mock_db.get_queued_agent_runs.call_count == calls + 1
+
+        await engine.stop()
+
+    @patch("app.core.agent_engine.database")
+    def test_restart_on_new_event_loop(self, mock_db):
+        """A restarted engine should keep processing the queue on a new event loop."""
+        engine = AgentExecutionEngine()
+        mock_db.get_running_agent_runs.return_value = []
+        mock_db.get_queued_agent_runs.return_value = []
+
+        async def run_once():
+            await engine.start()
+            await asyncio.sleep(0.05)
+            engine.max_concurrent = 4
+            await asyncio.sleep(0.05)
+            await engine.stop()
+
+        asyncio.run(run_once())
+        calls = mock_db.get_queued_agent_runs.call_count
+        asyncio.run(run_once())
+
+        assert mock_db.get_queued_agent_runs.call_count == 2 * calls
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.settings")
+    @patch("app.core.agent_engine.database")
+    async def test_recover_runs_requeues_orphaned_runs(self, mock_db, mock_settings):
+        """Should put runs left running by a previous process back in the queue."""
+        mock_settings.agent_max_concurrent = 3
+        mock_settings.agent_max_per_project = 0
+        mock_settings.sync_backend = "local"
+        engine = AgentExecutionEngine()
+        mock_db.get_running_agent_runs.return_value = [{"id": "agent-1", "status": "running"}]
+        mock_db.get_queued_agent_runs.return_value = [{"id": "agent-2", "status": "queued"}]
+
+        await engine._recover_runs()
+
+        mock_db.update_agent_run.assert_called_once_with("agent-1", status="queued")
+        assert set(engine._queued_since) == {"agent-1", "agent-2"}
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.settings")
+    @patch("app.core.agent_engine.database")
+    async def test_recover_runs_leaves_other_workers_runs(self, mock_db, mock_settings):
+        """Should not re-queue running rows when workers share a sync backend."""
+        mock_settings.agent_max_concurrent = 3
+        mock_settings.agent_max_per_project = 0
+        mock_settings.sync_backend = "sqlite"
+        engine = AgentExecutionEngine()
+        mock_db.get_queued_agent_runs.return_value = []
+
+        await engine._recover_runs()
+
+        mock_db.get_running_agent_runs.assert_not_called()
+        mock_db.update_agent_run.assert_not_called()
+
+
+class TestSchedulerMetrics:
+    """Test queue wait and slot utilization metrics."""
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.database")
+    async def test_start_records_queue_wait(self, mock_db):
+        """Should record how long a run waited in the queue."""
+        engine = AgentExecutionEngine(max_concurrent=2)
+        mock_db.update_agent_run.return_value = {"id": "agent-123"}
+        mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
+        engine._queued_since["agent-123"] = 0.0
+
+        with patch.object(engine, "_execute_agent", new_callable=AsyncMock):
+            await engine._start_agent_run({"id": "agent-123", "name": "Test"})
+
+        metrics = engine.get_metrics()
+        assert metrics["started"] == 1
+        assert metrics["queued"] == 0
+        assert metrics["avg_wait_ms"] > 0
+        assert metrics["running"] == 1
+        assert metrics["slot_utilization"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_run_done_wakes_queue(self):
+        """Should wake the queue processor when a run finishes."""
+        engine = AgentExecutionEngine()
+        task = asyncio.create_task(asyncio.sleep(0))
+        task.add_done_callback(engine._on_run_done)
+
+        await task
+        await asyncio.sleep(0)
+
+        assert engine._wakeup.is_set()
+
+    def test_metrics_when_idle(self):
+        """Should report zeros before any run starts."""
+        engine = AgentExecutionEngine()
+
+        metrics = engine.get_metrics()
+
+        assert metrics["running"] == 0
+        assert metrics["avg_wait_ms"] == 0.0
+        assert metrics["avg_slot_utilization"] == 0.0
+
 
 # =============================================================================
 # Launch Agent Tests
@@ -418,14 +592,27 @@ class TestLaunchAgent:
     @pytest.mark.asyncio
     @patch("app.core.agent_engine.database")
     async def test_launch_agent_triggers_queue_processing(self, mock_db):
-        """Should trigger queue processing after launch."""
+        """Should wake the queue processor after launch."""
         engine = AgentExecutionEngine()
         mock_db.create_agent_run.return_value = {"id": "agent-123"}
         mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
 
-        with patch.object(engine, "_process_queue", new_callable=AsyncMock):
-            await engine.launch_agent(name="Test", prompt="Test")
-            # process_queue is called via asyncio.create_task
+        await engine.launch_agent(name="Test", prompt="Test")
+
+        assert engine._wakeup.is_set()
+        assert len(engine._queued_since) == 1
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.database")
+    async def test_launch_agent_passes_priority(self, mock_db):
+        """Should store the priority on the new run."""
+        engine = AgentExecutionEngine()
+        mock_db.create_agent_run.return_value = {"id": "agent-123"}
+        mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
+
+        await engine.launch_agent(name="Test", prompt="Test", priority=5)
+
+        assert mock_db.create_agent_run.call_args.kwargs["priority"] == 5
 
 
 # =============================================================================
@@ -944,9 +1131,13 @@ class TestPauseResumeCancel:
         mock_db.update_agent_run.return_value = {"id": "agent-123"}
         mock_db.add_agent_log.return_value = {"timestamp": "2024-01-01T00:00:00"}
 
+        engine._queued_since["agent-123"] = 0.0
+
         result = await engine.cancel_agent("agent-123")
 
         assert result is True
+        assert "agent-123" not in engine._queued_since
+        assert engine._wakeup.is_set()
 
     @pytest.mark.asyncio
     @patch("app.core.agent_engine.database")
@@ -2099,6 +2290,111 @@ class TestSetupAgentEnvironmentFull:
         # Should not crash, worktree_path should remain None
         assert state.worktree_path is None
 
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.worktree_manager")
+    @patch("app.core.agent_engine.git_service")
+    @patch("app.core.agent_engine.settings")
+    @patch("app.core.agent_engine.database")
+    async def test_setup_reuses_worktree_of_recovered_run(self, mock_db, mock_settings, mock_git, mock_wt, tmp_path):
+        """A run re-queued after a restart should go back into its own worktree."""
+        engine = AgentExecutionEngine()
+        mock_db.get_project.return_value = {"id": "project-1", "path": "my-project"}
+        (tmp_path / ".worktrees" / "agent-test").mkdir(parents=True)
+        mock_db.get_worktree.return_value = {
+            "id": "wt-1",
+            "worktree_path": ".worktrees/agent-test",
+            "branch_name": "agent/test-agent-gent-123",
+            "status": "active",
+        }
+        mock_settings.workspace_dir = tmp_path
+        mock_git.is_git_repo.return_value = True
+
+        state = AgentRunState(agent_run_id="agent-123")
+        agent_run = {
+            "id": "agent-123",
+            "name": "Test Agent",
+            "auto_branch": True,
+            "project_id": "project-1",
+            "worktree_id": "wt-1",
+            "branch": "agent/test-agent-gent-123",
+        }
+
+        await engine._setup_agent_environment("agent-123", agent_run, state)
+
+        assert state.worktree_path == str(tmp_path / ".worktrees" / "agent-test")
+        assert state.branch_name == "agent/test-agent-gent-123"
+        mock_wt.create_worktree_session.assert_not_called()
+        mock_db.update_agent_run.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.worktree_manager")
+    @patch("app.core.agent_engine.git_service")
+    @patch("app.core.agent_engine.settings")
+    @patch("app.core.agent_engine.database")
+    async def test_setup_recreates_missing_worktree_on_existing_branch(self, mock_db, mock_settings, mock_git, mock_wt, tmp_path):
+        """A recovered run whose worktree is gone should check out its branch again."""
+        engine = AgentExecutionEngine()
+        mock_db.get_project.return_value = {"id": "project-1", "path": "my-project"}
+        mock_db.get_worktree.return_value = {
+            "id": "wt-1",
+            "worktree_path": ".worktrees/agent-test",
+            "status": "active",
+        }
+        mock_settings.workspace_dir = tmp_path
+        mock_git.is_git_repo.return_value = True
+        mock_git.get_default_branch.return_value = "main"
+        mock_wt.create_worktree_session.return_value = (
+            {"id": "wt-2", "worktree_path": ".worktrees/agent-test-2"},
+            {"id": "session-1"}
+        )
+
+        state = AgentRunState(agent_run_id="agent-123")
+        agent_run = {
+            "id": "agent-123",
+            "name": "Test Agent",
+            "auto_branch": True,
+            "project_id": "project-1",
+            "worktree_id": "wt-1",
+            "branch": "agent/test-agent-gent-123",
+        }
+
+        await engine._setup_agent_environment("agent-123", agent_run, state)
+
+        kwargs = mock_wt.create_worktree_session.call_args.kwargs
+        assert kwargs["branch_name"] == "agent/test-agent-gent-123"
+        assert kwargs["create_new_branch"] is False
+        assert state.worktree_path == str(tmp_path / ".worktrees" / "agent-test-2")
+
+    @pytest.mark.asyncio
+    @patch("app.core.agent_engine.worktree_manager")
+    @patch("app.core.agent_engine.git_service")
+    @patch("app.core.agent_engine.settings")
+    @patch("app.core.agent_engine.database")
+    async def test_setup_recovered_run_never_falls_back_to_main_repo(self, mock_db, mock_settings, mock_git, mock_wt, tmp_path):
+        """A run that had a worktree should fail rather than run in the main checkout."""
+        engine = AgentExecutionEngine()
+        mock_db.get_project.return_value = {"id": "project-1", "path": "my-project"}
+        mock_db.get_worktree.return_value = None
+        mock_settings.workspace_dir = tmp_path
+        mock_git.is_git_repo.return_value = True
+        mock_git.get_default_branch.return_value = "main"
+        mock_wt.create_worktree_session.side_effect = Exception("branch not found")
+
+        state = AgentRunState(agent_run_id="agent-123")
+        agent_run = {
+            "id": "agent-123",
+            "name": "Test Agent",
+            "auto_branch": True,
+            "project_id": "project-1",
+            "worktree_id": "wt-1",
+            "branch": "agent/test-agent-gent-123",
+        }
+
+        with pytest.raises(Exception, match="branch not found"):
+            await engine._setup_agent_environment("agent-123", agent_run, state)
+
+        assert state.worktree_path is None
+
     @pytest.mark.asyncio
     @patch("app.core.agent_engine.database")
     async def test_setup_project_not_found(self, mock_db):
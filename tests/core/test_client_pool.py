@@ -0,0 +1,302 @@
+"""
+Unit tests for the warm SDK client pool.
+
+Tests cover:
+- Pool keys (which options can share a pre-connected client)
+- Hits, misses and background refill
+- Relaying can_use_tool and hooks to the session that takes a client
+- Idle TTL eviction, dropping unused and least recently used pools
+- Connect failures and metrics
+- query_engine taking clients from the pool
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from claude_agent_sdk import ClaudeAgentOptions, HookMatcher
+
+from app.core.client_pool import ClientPool, pool_key
+
+
+class FakeSDKClient:
+    """Stands in for ClaudeSDKClient (no CLI process)"""
+
+    instances = []
+
+    def __init__(self, options=None, fail=False):
+        self.options = options
+        self.fail = fail
+        self.connected = False
+        self.disconnected = False
+        FakeSDKClient.instances.append(self)
+
+    async def connect(self):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("CLI not found")
+        self.connected = True
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+@pytest.fixture(autouse=True)
+def pool_settings():
+    FakeSDKClient.instances = []
+    with patch("app.core.client_pool.settings") as mock_settings:
+        mock_settings.client_pool_size = 2
+        mock_settings.client_pool_idle_ttl_seconds = 300.0
+        mock_settings.client_pool_max_pools = 8
+        yield mock_settings
+
+
+@pytest.fixture
+def pool():
+    return ClientPool(client_factory=FakeSDKClient)
+
+
+async def settle():
+    """Let background refill and disconnect tasks run"""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def make_options(**kwargs):
+    return ClaudeAgentOptions(**{"model": "sonnet", "cwd": "/workspace/project", **kwargs})
+
+
+class TestPoolKey:
+    """Tests for pool_key"""
+
+    def test_same_options_same_key(self):
+        assert pool_key(make_options()) == pool_key(make_options())
+
+    def test_different_options_different_key(self):
+        assert pool_key(make_options()) != pool_key(make_options(model="opus"))
+        assert pool_key(make_options()) != pool_key(make_options(env={"OPENAI_API_KEY": "sk-1"}))
+
+    def test_callbacks_do_not_change_key(self):
+        async def allow_a(*args):
+            return None
+
+        async def allow_b(*args):
+            return None
+
+        assert pool_key(make_options(can_use_tool=allow_a)) == pool_key(make_options(can_use_tool=allow_b))
+        assert pool_key(make_options(can_use_tool=allow_a)) != pool_key(make_options())
+
+    def test_hook_shape_changes_key(self):
+        async def hook(*args):
+            return {}
+
+        ask = {"PreToolUse": [HookMatcher(matcher="AskUserQuestion", hooks=[hook])]}
+        other = {"PreToolUse": [HookMatcher(matcher="Bash", hooks=[hook])]}
+
+        assert pool_key(make_options(hooks=ask)) != pool_key(make_options(hooks=other))
+
+    def test_resumed_sessions_not_pooled(self):
+        assert pool_key(make_options(resume="sdk-session-1")) is None
+        assert pool_key(make_options(continue_conversation=True)) is None
+        assert pool_key(make_options(fork_session=True)) is None
+
+
+class TestClientPool:
+    """Tests for ClientPool.acquire and refill"""
+
+    @pytest.mark.asyncio
+    async def test_first_acquire_misses_and_warms(self, pool):
+        client = await pool.acquire(make_options())
+        await settle()
+
+        assert client is None
+        assert pool.misses == 1
+        assert pool.get_metrics()["idle"] == 2
+        assert all(c.connected for c in FakeSDKClient.instances)
+
+    @pytest.mark.asyncio
+    async def test_hit_hands_out_connected_client_and_refills(self, pool):
+        await pool.acquire(make_options())
+        await settle()
+
+        client = await pool.acquire(make_options())
+        await settle()
+
+        assert client is FakeSDKClient.instances[0]
+        assert client.connected
+        assert pool.hits == 1
+        assert pool.get_metrics()["idle"] == 2
+        assert len(FakeSDKClient.instances) == 3
+
+    @pytest.mark.asyncio
+    async def test_other_options_miss(self, pool):
+        await pool.acquire(make_options())
+        await settle()
+
+        client = await pool.acquire(make_options(model="opus"))
+
+        assert client is None
+        assert pool.misses == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, pool, pool_settings):
+        pool_settings.client_pool_size = 0
+
+        assert await pool.acquire(make_options()) is None
+        await settle()
+
+        assert FakeSDKClient.instances == []
+        assert pool.misses == 0
+
+    @pytest.mark.asyncio
+    async def test_relays_callbacks_to_session(self, pool):
+        async def first_session_check(tool_name, tool_input, context):
+            return "first"
+
+        async def second_session_check(tool_name, tool_input, context):
+            return "second"
+
+        async def ask_hook(input_data, tool_use_id, context):
+            return {"session": "second"}
+
+        def session_options(check):
+            return make_options(
+                can_use_tool=check,
+                hooks={"PreToolUse": [HookMatcher(matcher="AskUserQuestion", hooks=[ask_hook])]}
+            )
+
+        await pool.acquire(session_options(first_session_check))
+        await settle()
+        client = await pool.acquire(session_options(second_session_check))
+
+        # The CLI calls the callbacks it was connected with
+        assert await client.options.can_use_tool("Bash", {}, None) == "second"
+        hook = client.options.hooks["PreToolUse"][0].hooks[0]
+        assert await hook({}, "tool-1", None) == {"session": "second"}
+        assert client.options.hooks["PreToolUse"][0].matcher == "AskUserQuestion"
+
+    @pytest.mark.asyncio
+    async def test_expired_idle_client_not_handed_out(self, pool, pool_settings):
+        with patch("app.core.client_pool.time.monotonic") as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            await pool.acquire(make_options())
+            await settle()
+
+            mock_monotonic.return_value = 1301.0
+            client = await pool.acquire(make_options())
+            await settle()
+
+        assert client is None
+        assert pool.evicted == 2
+        assert FakeSDKClient.instances[0].disconnected
+        assert FakeSDKClient.instances[1].disconnected
+
+    @pytest.mark.asyncio
+    async def test_connect_failure_stops_refill(self, pool):
+        pool._client_factory = lambda options: FakeSDKClient(options, fail=True)
+
+        await pool.acquire(make_options())
+        await settle()
+
+        assert pool.connect_failures == 1
+        assert pool.get_metrics()["idle"] == 0
+
+
+class TestEviction:
+    """Tests for evict_idle, pool limits and close"""
+
+    @pytest.mark.asyncio
+    async def test_evict_idle_drops_unused_pools(self, pool):
+        with patch("app.core.client_pool.time.monotonic") as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            await pool.acquire(make_options())
+            await settle()
+
+            mock_monotonic.return_value = 1301.0
+            evicted = pool.evict_idle()
+            await settle()
+
+        assert evicted == 2
+        assert pool.get_metrics()["pools"] == 0
+        assert all(c.disconnected for c in FakeSDKClient.instances)
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_pool_dropped(self, pool, pool_settings):
+        pool_settings.client_pool_max_pools = 1
+
+        await pool.acquire(make_options())
+        await settle()
+        await pool.acquire(make_options(model="opus"))
+        await settle()
+
+        assert pool.get_metrics()["pools"] == 1
+        assert FakeSDKClient.instances[0].disconnected
+        assert FakeSDKClient.instances[0].options.model == "sonnet"
+
+    @pytest.mark.asyncio
+    async def test_close_disconnects_idle_clients(self, pool):
+        await pool.acquire(make_options())
+        await settle()
+
+        await pool.close()
+
+        assert all(c.disconnected for c in FakeSDKClient.instances)
+        assert pool.get_metrics()["pools"] == 0
+
+    @pytest.mark.asyncio
+    async def test_metrics(self, pool):
+        await pool.acquire(make_options())
+        await settle()
+        await pool.acquire(make_options())
+
+        metrics = pool.get_metrics()
+
+        assert metrics["enabled"] is True
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == 0.5
+        assert metrics["connects"] == 2
+        assert metrics["avg_connect_ms"] >= 0
+
+
+class TestQueryEngineIntegration:
+    """query_engine._connect_client and cleanup_stale_sessions use the global pool"""
+
+    @pytest.mark.asyncio
+    async def test_connect_client_uses_pool(self, pool):
+        from app.core.query_engine import _connect_client
+
+        await pool.acquire(make_options())
+        await settle()
+
+        with patch("app.core.query_engine.client_pool", pool), \
+                patch("app.core.query_engine.ClaudeSDKClient", FakeSDKClient):
+            client, pooled = await _connect_client(make_options())
+            fresh, fresh_pooled = await _connect_client(make_options(), use_pool=False)
+
+        assert pooled is True
+        assert client is FakeSDKClient.instances[0]
+        assert fresh_pooled is False
+        assert fresh.connected
+
+    @pytest.mark.asyncio
+    async def test_connect_client_falls_back_to_new_client(self, pool):
+        from app.core.query_engine import _connect_client
+
+        with patch("app.core.query_engine.client_pool", pool), \
+                patch("app.core.query_engine.ClaudeSDKClient", FakeSDKClient):
+            client, pooled = await _connect_client(make_options(resume="sdk-session-1"))
+
+        assert pooled is False
+        assert client.connected
+        assert client.options.resume == "sdk-session-1"
+
+    @pytest.mark.asyncio
+    async def test_cleanup_stale_sessions_evicts_idle_clients(self):
+        from app.core.query_engine import cleanup_stale_sessions
+
+        with patch("app.core.query_engine.client_pool") as mock_pool:
+            mock_pool.evict_idle.return_value = 0
+            await cleanup_stale_sessions(max_age_seconds=3600)
+
+        mock_pool.evict_idle.assert_called_once()
@@ -9,6 +9,7 @@ Tests cover:
 - Generic credential validation dispatch
 - All HTTP response codes and error paths
 - Timeout and network error handling
+- Decrypted secret cache and its invalidation
 """
 
 import pytest
@@ -24,7 +25,9 @@ from app.core.credential_service import (
     validate_github_pat,
     validate_meshy_api_key,
     validate_credential,
+    SecretCache,
 )
+from app.core import encryption
 
 
 class TestValidationResult:
@@ -976,3 +979,144 @@ class TestEdgeCases:
             result = await validate_openai_api_key("sk-test")
 
             assert result.result == ValidationResult.ERROR
+
+
+# =============================================================================
+# SecretCache Tests
+# =============================================================================
+
+@pytest.fixture
+def secret_db():
+    with patch("app.core.credential_service.database") as db:
+        db.get_system_settings.return_value = {"openai_api_key": "sk-plain", "image_api_key": "gem-plain"}
+        db.get_all_user_credential_policies.return_value = [
+            {"credential_type": "openai_api_key", "policy": "optional"}
+        ]
+        db.get_all_user_credentials.return_value = [
+            {"credential_type": "openai_api_key", "encrypted_value": "sk-user"}
+        ]
+        yield db
+
+
+class TestSecretCache:
+    """Tests for SecretCache"""
+
+    def test_admin_keys_loaded_in_one_query(self, secret_db):
+        cache = SecretCache()
+
+        keys = cache.get_admin_keys(["openai_api_key", "image_api_key", "meshy_api_key"])
+
+        assert keys == {"openai_api_key": "sk-plain", "image_api_key": "gem-plain", "meshy_api_key": None}
+        secret_db.get_system_settings.assert_called_once_with(
+            ["openai_api_key", "image_api_key", "meshy_api_key"]
+        )
+
+    def test_admin_keys_cached(self, secret_db):
+        cache = SecretCache()
+        cache.get_admin_keys(["openai_api_key", "image_api_key"])
+
+        assert cache.get_admin_key("openai_api_key") == "sk-plain"
+
+        secret_db.get_system_settings.assert_called_once()
+        assert cache.hits == 1
+        assert cache.misses == 2
+
+    def test_only_missing_admin_keys_loaded(self, secret_db):
+        cache = SecretCache()
+        cache.get_admin_key("openai_api_key")
+
+        cache.get_admin_keys(["openai_api_key", "image_api_key"])
+
+        secret_db.get_system_settings.assert_called_with(["image_api_key"])
+
+    def test_expires_after_ttl(self, secret_db):
+        cache = SecretCache()
+        with patch("app.core.credential_service.settings") as mock_settings, \
+                patch("app.core.credential_service.time.monotonic") as mock_monotonic:
+            mock_settings.secret_cache_ttl_seconds = 60.0
+            mock_monotonic.return_value = 100.0
+            cache.get_admin_key("openai_api_key")
+            mock_monotonic.return_value = 161.0
+            cache.get_admin_key("openai_api_key")
+
+        assert secret_db.get_system_settings.call_count == 2
+
+    def test_decrypts_encrypted_values(self, secret_db):
+        secret_db.get_system_settings.return_value = {"openai_api_key": "enc:abc"}
+        cache = SecretCache()
+        with patch("app.core.credential_service.encryption.is_encryption_ready", return_value=True), \
+                patch("app.core.credential_service.encryption.decrypt_value", return_value="sk-secret") as mock_decrypt:
+            assert cache.get_admin_key("openai_api_key") == "sk-secret"
+            assert cache.get_admin_key("openai_api_key") == "sk-secret"
+
+        mock_decrypt.assert_called_once_with("enc:abc")
+
+    def test_key_change_drops_cached_values(self, secret_db):
+        cache = SecretCache()
+        cache.get_admin_key("openai_api_key")
+        cache.get_user_secrets("user-1")
+
+        with patch("app.core.credential_service.encryption.get_key_version", return_value=encryption.get_key_version() + 1):
+            cache.get_admin_key("openai_api_key")
+            cache.get_user_secrets("user-1")
+
+        assert secret_db.get_system_settings.call_count == 2
+        assert secret_db.get_all_user_credentials.call_count == 2
+
+    def test_user_secrets(self, secret_db):
+        cache = SecretCache()
+
+        user_secrets = cache.get_user_secrets("user-1")
+        cache.get_user_secrets("user-1")
+
+        assert user_secrets.policies == {"openai_api_key": "optional"}
+        assert user_secrets.credentials == {"openai_api_key": "sk-user"}
+        secret_db.get_all_user_credentials.assert_called_once_with("user-1")
+        secret_db.get_all_user_credential_policies.assert_called_once_with("user-1")
+
+    def test_database_changes_invalidate(self, secret_db):
+        cache = SecretCache()
+        cache.get_admin_keys(["openai_api_key", "image_api_key"])
+        cache.get_user_secrets("user-1")
+        cache.get_user_secrets("user-2")
+
+        cache.on_database_change("system_settings", "openai_api_key")
+        cache.on_database_change("api_user_credentials", "user-1")
+        cache.on_database_change("profiles", "user-2")
+
+        assert cache.get_metrics()["admin_keys"] == 1
+        assert cache.get_metrics()["users"] == 1
+
+        cache.on_database_change("user_credential_policies", "user-2")
+        assert cache.get_metrics()["users"] == 0
+
+    def test_load_racing_invalidation_is_not_stored(self, secret_db):
+        cache = SecretCache()
+
+        def read_settings(names):
+            # A write lands while the row is being read
+            cache.invalidate_admin("openai_api_key")
+            return {"openai_api_key": "sk-stale"}
+
+        def read_credentials(api_user_id):
+            cache.invalidate_user(api_user_id)
+            return [{"credential_type": "openai_api_key", "encrypted_value": "sk-stale"}]
+
+        secret_db.get_system_settings.side_effect = read_settings
+        secret_db.get_all_user_credentials.side_effect = read_credentials
+
+        assert cache.get_admin_key("openai_api_key") == "sk-stale"
+        assert cache.get_user_secrets("user-1").credentials == {"openai_api_key": "sk-stale"}
+        assert cache.get_metrics()["admin_keys"] == 0
+        assert cache.get_metrics()["users"] == 0
+
+    def test_clear(self, secret_db):
+        cache = SecretCache()
+        cache.get_admin_key("openai_api_key")
+        cache.get_user_secrets("user-1")
+
+        cache.clear()
+
+        metrics = cache.get_metrics()
+        assert metrics["admin_keys"] == 0
+        assert metrics["users"] == 0
@@ -94,6 +94,18 @@ class TestEncryptionState:
         encryption.clear_encryption_key()
         assert encryption._encryption_key is None
 
+    def test_key_version_changes_on_set_and_clear(self):
+        """The key version should change whenever the key is set or cleared."""
+        mock_db = MagicMock()
+        mock_db.get_system_setting.return_value = None
+        version = encryption.get_key_version()
+
+        encryption.set_encryption_key("test", mock_db)
+        assert encryption.get_key_version() == version + 1
+
+        encryption.clear_encryption_key()
+        assert encryption.get_key_version() == version + 2
+
     def test_clear_encryption_key_logs_message(self):
         """Clearing encryption key should log a message."""
         with patch.object(encryption.logger, "info") as mock_log:
@@ -192,6 +204,17 @@ class TestEncryptDecrypt:
         decrypted = encryption.decrypt_value(encrypted)
         assert decrypted == original
 
+    def test_fernet_reused_until_key_changes(self):
+        """The Fernet instance should be built once per key."""
+        encryption.encrypt_value("first")
+        fernet = encryption._fernet
+        encryption.decrypt_value(encryption.encrypt_value("second"))
+        assert encryption._fernet is fernet
+
+        encryption._encryption_key = Fernet.generate_key()
+        encryption.encrypt_value("third")
+        assert encryption._fernet is not fernet
+
     def test_encrypt_different_values_produce_different_ciphertext(self):
         """Different values should produce different ciphertext."""
         enc1 = encryption.encrypt_value("secret1")
@@ -8,14 +8,16 @@ Tests cover:
 - Commit graph and status
 - Fetch operations
 - Error handling and edge cases
+- Async commands, the per-repo concurrency limit and the fingerprint cache
 """
 
+import asyncio
 import pytest
 import subprocess
 from unittest.mock import MagicMock, patch, call
 from typing import List
 
-from app.core.git_service import GitService, git_service
+from app.core.git_service import GitService, git_service, repo_fingerprint
 
 
 class TestRunGit:
@@ -1729,3 +1731,269 @@ class TestBranchSorting:
             local_idx = next(i for i, b in enumerate(result) if b["name"] == "main")
             remote_idx = next(i for i, b in enumerate(result) if b["name"] == "origin/main")
             assert local_idx < remote_idx
+
+
+# =============================================================================
+# Async commands, concurrency limit and cache
+# =============================================================================
+
+def git(cwd, *args):
+    """Run git in a test repository"""
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, capture_output=True, check=True
+    )
+
+
+@pytest.fixture
+def git_repo(temp_dir):
+    """A repository on main with one commit"""
+    repo = temp_dir / "repo"
+    repo.mkdir()
+    git(repo, "init", "-b", "main")
+    (repo / "README.md").write_text("hello\n")
+    git(repo, "add", "README.md")
+    git(repo, "commit", "-m", "Initial commit")
+    return repo
+
+
+@pytest.fixture
+def git_settings():
+    with patch("app.core.git_service.settings") as mock_settings:
+        mock_settings.git_max_concurrent_per_repo = 4
+        mock_settings.git_status_cache_ttl_seconds = 5.0
+        yield mock_settings
+
+
+class FakeProcess:
+    """Stands in for an asyncio subprocess that finishes when released"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.returncode = None
+        self.killed = False
+
+    async def communicate(self):
+        self.tracker["running"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["running"])
+        try:
+            await self.tracker["release"].wait()
+        finally:
+            self.tracker["running"] -= 1
+        self.returncode = 0
+        return b"ok\n", b""
+
+    def kill(self):
+        self.killed = True
+
+    async def wait(self):
+        return self.returncode
+
+
+class TestRunGitAsync:
+    """Test _run_git_async."""
+
+    @pytest.mark.asyncio
+    async def test_runs_git(self, git_repo, git_settings):
+        service = GitService()
+
+        result = await service._run_git_async(str(git_repo), ["rev-parse", "--abbrev-ref", "HEAD"])
+
+        assert result.returncode == 0
+        assert result.stdout == "main\n"
+        assert result.args == ["git", "rev-parse", "--abbrev-ref", "HEAD"]
+        assert service.get_metrics()["commands"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_process(self, git_settings):
+        service = GitService()
+        tracker = {"running": 0, "peak": 0, "release": asyncio.Event()}
+        process = FakeProcess(tracker)
+
+        with patch("app.core.git_service.asyncio.create_subprocess_exec", return_value=process):
+            with pytest.raises(subprocess.TimeoutExpired):
+                await service._run_git_async("/test/repo", ["fetch"], timeout=0.01)
+
+        assert process.killed
+        assert service.timeouts == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limited_per_repo(self, git_settings):
+        git_settings.git_max_concurrent_per_repo = 2
+        service = GitService()
+        tracker = {"running": 0, "peak": 0, "release": asyncio.Event()}
+
+        async def spawn(*args, **kwargs):
+            return FakeProcess(tracker)
+
+        with patch("app.core.git_service.asyncio.create_subprocess_exec", side_effect=spawn):
+            tasks = [
+                asyncio.create_task(service._run_git_async("/test/repo", ["status"]))
+                for _ in range(5)
+            ]
+            other_repo = asyncio.create_task(service._run_git_async("/test/other", ["status"]))
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            # Two in /test/repo plus one in /test/other; the rest wait
+            assert tracker["running"] == 3
+            assert service.get_metrics()["waiting"] == 3
+
+            tracker["release"].set()
+            await asyncio.gather(*tasks, other_repo)
+
+        assert tracker["peak"] == 3
+        assert service.get_metrics()["waiting"] == 0
+        assert service.commands == 6
+
+    @pytest.mark.asyncio
+    async def test_async_reads_match_sync(self, git_repo, git_settings):
+        service = GitService()
+        git(git_repo, "branch", "feature")
+        (git_repo / "new.txt").write_text("new\n")
+
+        assert await service.is_git_repo_async(str(git_repo)) is True
+        assert await service.get_current_branch_async(str(git_repo)) == "main"
+        assert await service.get_default_branch_async(str(git_repo)) == service.get_default_branch(str(git_repo))
+        assert await service.list_branches_async(str(git_repo)) == service.list_branches(str(git_repo))
+        assert await service.list_worktrees_async(str(git_repo)) == service.list_worktrees(str(git_repo))
+        assert await service.get_commit_graph_async(str(git_repo)) == service.get_commit_graph(str(git_repo))
+        assert await service.get_status_async(str(git_repo)) == service.get_status(str(git_repo))
+
+    @pytest.mark.asyncio
+    async def test_not_a_repository(self, temp_dir, git_settings):
+        service = GitService()
+
+        assert await service.is_git_repo_async(str(temp_dir)) is False
+        status = await service.get_status_async(str(temp_dir))
+
+        assert status["is_git_repo"] is False
+        assert service.get_metrics()["cache_entries"] == 0
+
+
+class TestRepoFingerprint:
+    """Test repo_fingerprint."""
+
+    def test_not_a_repository(self, temp_dir):
+        assert repo_fingerprint(str(temp_dir)) is None
+
+    def test_stable_until_repository_changes(self, git_repo):
+        before = repo_fingerprint(str(git_repo))
+        assert repo_fingerprint(str(git_repo)) == before
+
+        git(git_repo, "branch", "feature/nested")
+
+        assert repo_fingerprint(str(git_repo)) != before
+
+    def test_commit_changes_fingerprint(self, git_repo):
+        before = repo_fingerprint(str(git_repo))
+
+        (git_repo / "README.md").write_text("changed\n")
+        git(git_repo, "commit", "-am", "Change")
+
+        assert repo_fingerprint(str(git_repo)) != before
+
+    def test_linked_worktree(self, git_repo, temp_dir):
+        worktree = temp_dir / "wt"
+        git(git_repo, "worktree", "add", "-b", "feature", str(worktree))
+        before = repo_fingerprint(str(worktree))
+
+        assert before is not None
+        # The worktree shares refs with the main repository
+        git(git_repo, "branch", "other")
+        assert repo_fingerprint(str(worktree)) != before
+
+
+class TestGitCache:
+    """Test caching of status, branches and worktree lists."""
+
+    @pytest.mark.asyncio
+    async def test_branches_cached_until_refs_change(self, git_repo, git_settings):
+        service = GitService()
+
+        first = await service.list_branches_async(str(git_repo))
+        commands = service.commands
+        second = await service.list_branches_async(str(git_repo))
+
+        assert second == first
+        assert service.commands == commands
+        assert service.cache_hits == 1
+
+        git(git_repo, "branch", "feature")
+        third = await service.list_branches_async(str(git_repo))
+
+        assert [b["name"] for b in third] == ["main", "feature"]
+        assert service.commands > commands
+
+    @pytest.mark.asyncio
+    async def test_cached_values_are_copies(self, git_repo, git_settings):
+        service = GitService()
+
+        branches = await service.list_branches_async(str(git_repo))
+        branches[0]["name"] = "mutated"
+
+        assert (await service.list_branches_async(str(git_repo)))[0]["name"] == "main"
+
+    @pytest.mark.asyncio
+    async def test_worktrees_cached_until_worktree_added(self, git_repo, temp_dir, git_settings):
+        service = GitService()
+
+        assert len(await service.list_worktrees_async(str(git_repo))) == 1
+        assert len(await service.list_worktrees_async(str(git_repo))) == 1
+        assert service.cache_hits == 1
+
+        git(git_repo, "worktree", "add", "-b", "feature", str(temp_dir / "wt"))
+
+        assert len(await service.list_worktrees_async(str(git_repo))) == 2
+
+    @pytest.mark.asyncio
+    async def test_status_cached_until_index_changes(self, git_repo, git_settings):
+        service = GitService()
+        (git_repo / "new.txt").write_text("new\n")
+
+        status = await service.get_status_async(str(git_repo))
+        assert status["untracked"] == ["new.txt"]
+        assert (await service.get_status_async(str(git_repo)))["untracked"] == ["new.txt"]
+        assert service.cache_hits == 1
+
+        git(git_repo, "add", "new.txt")
+        status = await service.get_status_async(str(git_repo))
+
+        assert status["staged"] == [{"file": "new.txt", "status": "A"}]
+
+    @pytest.mark.asyncio
+    async def test_status_expires_after_ttl(self, git_repo, git_settings):
+        service = GitService()
+
+        with patch("app.core.git_service.time.monotonic") as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            assert (await service.get_status_async(str(git_repo)))["is_clean"] is True
+
+            # Working tree edits don't change .git
+            (git_repo / "README.md").write_text("edited\n")
+            assert (await service.get_status_async(str(git_repo)))["is_clean"] is True
+
+            mock_monotonic.return_value = 1006.0
+            status = await service.get_status_async(str(git_repo))
+
+        assert status["modified"] == ["README.md"]
+
+    @pytest.mark.asyncio
+    async def test_status_use_cache_false(self, git_repo, git_settings):
+        service = GitService()
+
+        await service.get_status_async(str(git_repo))
+        (git_repo / "README.md").write_text("edited\n")
+        status = await service.get_status_async(str(git_repo), use_cache=False)
+
+        assert status["is_clean"] is False
+        assert service.cache_hits == 0
+
+    def test_metrics(self):
+        service = GitService()
+
+        metrics = service.get_metrics()
+
+        assert metrics["commands"] == 0
+        assert metrics["cache_hit_rate"] == 0.0
+        assert "max_wait_ms" in metrics
@@ -0,0 +1,158 @@
+"""
+Unit tests for the chat history catalog.
+
+Tests cover:
+- Titles, previews and message counts of transcripts
+- Skipping unchanged files and agent files
+- Incremental summaries of appended lines
+- Rewritten and deleted transcripts
+- Search against cached titles
+- Persistence across in-memory cache resets
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.core import history_catalog, jsonl_parser
+
+
+def _line(entry) -> str:
+    return json.dumps(entry) + "\n"
+
+
+def _user(text):
+    return _line({"type": "user", "message": {"role": "user", "content": text}})
+
+
+def _assistant(text):
+    return _line({"type": "assistant", "message": {"role": "assistant", "content": [{"type": "text", "text": text}]}})
+
+
+def _touch(path, delta_ns=1000):
+    """Move mtime forward so changes within the clock resolution are seen."""
+    mtime = path.stat().st_mtime_ns + delta_ns
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    directory = tmp_path / "-workspace-project"
+    directory.mkdir()
+    (directory / "session-a.jsonl").write_text(_user("Fix the login bug") + _assistant("Looking at auth.py"))
+    (directory / "session-b.jsonl").write_text(_user("Write deployment docs"))
+    (directory / "agent-123.jsonl").write_text(_user("Subagent prompt"))
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def no_listing_ttl():
+    with patch.object(history_catalog.settings, "history_catalog_ttl_seconds", 0):
+        yield
+
+
+class TestChatHistoryCatalog:
+    """Test catalog refresh and listing."""
+
+    def test_lists_main_sessions(self, project_dir):
+        """Sessions should carry title, preview and count; agent files are skipped."""
+        items = {item["sdk_session_id"]: item for item in history_catalog.get_catalog(project_dir).list_sessions()}
+
+        assert set(items) == {"session-a", "session-b"}
+        assert items["session-a"]["title"] == "Fix the login bug"
+        assert items["session-a"]["preview"] == "Looking at auth.py"
+        assert items["session-a"]["message_count"] == 2
+        assert items["session-a"]["type"] == "chat_history"
+
+    def test_matches_full_parse(self, project_dir):
+        """Catalog metadata should match parsing the whole file."""
+        items = history_catalog.get_catalog(project_dir).list_sessions()
+        for item in items:
+            title, preview, count = jsonl_parser._get_session_title_and_preview(project_dir / f"{item['sdk_session_id']}.jsonl")
+            assert (item["title"], item["preview"], item["message_count"]) == (title, preview, count)
+
+    def test_unchanged_files_not_reread(self, project_dir):
+        """A second listing should not read unchanged transcripts."""
+        catalog = history_catalog.get_catalog(project_dir)
+        catalog.list_sessions()
+        catalog.list_sessions(search="login")
+
+        assert catalog.files_summarized == 2
+
+    def test_append_reads_only_new_lines(self, project_dir):
+        """A grown transcript should only have its new lines summarized."""
+        catalog = history_catalog.get_catalog(project_dir)
+        catalog.list_sessions()
+        before = catalog.bytes_read
+        path = project_dir / "session-b.jsonl"
+        appended = _assistant("Here is a draft") + _user("Thanks")
+        with open(path, "a") as f:
+            f.write(appended)
+        _touch(path)
+
+        item = next(i for i in catalog.list_sessions() if i["sdk_session_id"] == "session-b")
+
+        assert catalog.bytes_read - before == len(appended.encode())
+        assert item["title"] == "Write deployment docs"
+        assert item["preview"] == "Here is a draft"
+        assert item["message_count"] == 3
+
+    def test_rewritten_and_deleted_files(self, project_dir):
+        """Rewritten transcripts are summarized again and deleted ones dropped."""
+        catalog = history_catalog.get_catalog(project_dir)
+        catalog.list_sessions()
+        path = project_dir / "session-a.jsonl"
+        path.write_text(_user("Completely new topic"))
+        _touch(path)
+        (project_dir / "session-b.jsonl").unlink()
+
+        items = catalog.list_sessions()
+
+        assert [item["title"] for item in items] == ["Completely new topic"]
+        assert items[0]["message_count"] == 1
+
+    def test_search_filters_titles_and_previews(self, project_dir):
+        catalog = history_catalog.get_catalog(project_dir)
+
+        assert [i["sdk_session_id"] for i in catalog.list_sessions(search="AUTH.PY")] == ["session-a"]
+        assert [i["sdk_session_id"] for i in catalog.list_sessions(search="deployment")] == ["session-b"]
+        assert catalog.list_sessions(search="nothing matches") == []
+
+    def test_listing_reused_within_ttl(self, project_dir):
+        """Searches within the TTL should not rescan the directory."""
+        catalog = history_catalog.get_catalog(project_dir)
+        catalog.list_sessions()
+        (project_dir / "session-c.jsonl").write_text(_user("Newer session"))
+
+        with patch.object(history_catalog.settings, "history_catalog_ttl_seconds", 60):
+            assert len(catalog.list_sessions()) == 2
+        assert len(catalog.list_sessions()) == 3
+
+    def test_persisted_catalog_survives_cache_reset(self, project_dir):
+        """A persisted catalog should be reused after the memory cache is dropped."""
+        history_catalog.get_catalog(project_dir).list_sessions()
+        history_catalog.clear_cache()
+
+        catalog = history_catalog.get_catalog(project_dir)
+        items = catalog.list_sessions()
+
+        assert len(items) == 2
+        assert catalog.files_summarized == 0
+
+
+class TestListChatHistorySessions:
+    """Test jsonl_parser.list_chat_history_sessions through the catalog."""
+
+    def test_missing_project_dir(self, tmp_path):
+        with patch("app.core.jsonl_parser.settings") as mock_settings:
+            mock_settings.get_claude_projects_dir = tmp_path
+            assert jsonl_parser.list_chat_history_sessions("/workspace/missing") == []
+
+    def test_limit(self, tmp_path, project_dir):
+        with patch("app.core.jsonl_parser.settings") as mock_settings:
+            mock_settings.get_claude_projects_dir = tmp_path
+            items = jsonl_parser.list_chat_history_sessions("/workspace/project", limit=1)
+
+        assert len(items) == 1
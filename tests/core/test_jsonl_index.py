@@ -0,0 +1,370 @@
+"""
+Unit tests for the incremental JSONL session history index.
+
+Tests cover:
+- Cache hits for unchanged files
+- Incremental parsing of appended lines
+- Rebuilds after rewrites and truncation
+- Unterminated last lines
+- Persistence across in-memory cache resets (append-only sidecar)
+- Running token totals
+- Subagent children from agent files
+- Message pages (latest, before/after/around a cursor)
+"""
+
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.core import jsonl_index, jsonl_parser
+
+
+def _line(entry) -> str:
+    return json.dumps(entry) + "\n"
+
+
+def _user(uuid, text):
+    return {"type": "user", "message": {"role": "user", "content": text}, "uuid": uuid}
+
+
+def _assistant_tool(uuid, tool_id, name="Bash", tokens=(10, 5)):
+    return {
+        "type": "assistant",
+        "message": {
+            "role": "assistant",
+            "model": "claude-test",
+            "content": [{"type": "tool_use", "id": tool_id, "name": name, "input": {"command": "ls"}}],
+            "usage": {"input_tokens": tokens[0], "output_tokens": tokens[1], "cache_read_input_tokens": 7},
+        },
+        "uuid": uuid,
+    }
+
+
+def _tool_result(uuid, tool_id, output, agent_id=None):
+    entry = {
+        "type": "user",
+        "message": {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_id, "content": output}]},
+        "uuid": uuid,
+    }
+    if agent_id:
+        entry["toolUseResult"] = {"agentId": agent_id}
+    return entry
+
+
+def _full_parse(path: Path):
+    """Reference result: a fresh parser fed every entry."""
+    parser = jsonl_parser.HistoryParser()
+    for entry in jsonl_parser.parse_jsonl_file(path):
+        parser.feed(entry)
+    return parser
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_text(_line(_user("u1", "List files")) + _line(_assistant_tool("a1", "tool-1")))
+    return path
+
+
+@pytest.fixture
+def stats():
+    with patch.dict(jsonl_index.stats, {"hits": 0, "appends": 0, "rebuilds": 0, "bytes_parsed": 0}):
+        yield jsonl_index.stats
+
+
+class TestSessionIndex:
+    """Test loading messages through the index."""
+
+    def test_first_load_matches_full_parse(self, transcript, stats):
+        """The first load should parse the whole file."""
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert messages == _full_parse(transcript).build_messages()
+        assert stats["rebuilds"] == 1
+        assert stats["bytes_parsed"] == transcript.stat().st_size
+
+    def test_unchanged_file_is_a_hit(self, transcript, stats):
+        """Loading an unchanged file should not read it again."""
+        jsonl_index.get_session_messages(transcript)
+        jsonl_index.get_session_messages(transcript)
+
+        assert stats["hits"] == 1
+        assert stats["bytes_parsed"] == transcript.stat().st_size
+
+    def test_append_parses_only_new_bytes(self, transcript, stats):
+        """Appended lines should be parsed without re-reading the file."""
+        jsonl_index.get_session_messages(transcript)
+        before = transcript.stat().st_size
+        appended = _line(_tool_result("r1", "tool-1", "file.txt")) + _line(_user("u2", "Thanks"))
+        with open(transcript, "a") as f:
+            f.write(appended)
+
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert stats["appends"] == 1
+        assert stats["bytes_parsed"] == before + len(appended.encode())
+        # The result updates the tool_use parsed in the earlier load
+        assert messages[1]["toolResult"] == "file.txt"
+        assert messages[1]["toolStatus"] == "complete"
+        assert messages == _full_parse(transcript).build_messages()
+
+    def test_returned_messages_are_copies(self, transcript):
+        """Later appends should not change previously returned messages."""
+        first = jsonl_index.get_session_messages(transcript)
+        with open(transcript, "a") as f:
+            f.write(_line(_tool_result("r1", "tool-1", "out")))
+
+        jsonl_index.get_session_messages(transcript)
+
+        assert first[1]["toolStatus"] == "running"
+
+    def test_rewrite_triggers_rebuild(self, transcript, stats):
+        """A rewritten file (e.g. after rewind) should be parsed from scratch."""
+        jsonl_index.get_session_messages(transcript)
+        transcript.write_text(_line(_user("x1", "A different start")) + _line(_user("x2", "and more text")))
+
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert stats["rebuilds"] == 2
+        assert [m["id"] for m in messages] == ["x1", "x2"]
+
+    def test_truncation_triggers_rebuild(self, transcript, stats):
+        """A file shorter than the indexed offset should be parsed from scratch."""
+        jsonl_index.get_session_messages(transcript)
+        transcript.write_text(_line(_user("u1", "List files")))
+
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert stats["rebuilds"] == 2
+        assert [m["id"] for m in messages] == ["u1"]
+
+    def test_partial_last_line_is_retried(self, transcript):
+        """An unterminated, incomplete last line should be parsed once complete."""
+        line = _line(_user("u2", "Second question"))
+        with open(transcript, "a") as f:
+            f.write(line[:20])
+        assert len(jsonl_index.get_session_messages(transcript)) == 2
+
+        with open(transcript, "a") as f:
+            f.write(line[20:])
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert [m["id"] for m in messages][-1] == "u2"
+
+    def test_persisted_index_survives_cache_reset(self, transcript, stats):
+        """A persisted index should be reused after the memory cache is dropped."""
+        expected = jsonl_index.get_session_messages(transcript)
+        jsonl_index.clear_cache()
+
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert messages == expected
+        assert stats["rebuilds"] == 1
+        assert stats["hits"] == 1
+
+    def test_sidecar_is_appended_without_message_bodies(self, transcript):
+        """Each parse should append one small record instead of rewriting the index."""
+        jsonl_index.get_session_messages(transcript)
+        with open(transcript, "a") as f:
+            f.write(_line(_user("u2", "And again")))
+        jsonl_index.get_session_messages(transcript)
+
+        lines = jsonl_index._index_file(str(transcript)).read_text().splitlines()
+        records = [json.loads(line) for line in lines[1:]]
+
+        assert len(records) == 2
+        assert len(records[1]["entries"]) == 1
+        assert "List files" not in lines[1] and "And again" not in lines[2]
+
+    def test_append_after_cache_reset(self, transcript, stats):
+        """After a restart, messages are rebuilt from offsets and only new bytes parsed."""
+        jsonl_index.get_session_messages(transcript)
+        jsonl_index.clear_cache()
+        with open(transcript, "a") as f:
+            f.write(_line(_tool_result("u2", "tool-1", "file.txt")))
+
+        messages = jsonl_index.get_session_messages(transcript)
+
+        assert messages == _full_parse(transcript).build_messages()
+        assert stats["bytes_parsed"] == transcript.stat().st_size
+        assert stats["appends"] == 1
+        assert jsonl_index.get_session_usage(transcript)["total_tokens_in"] == 10
+
+    def test_usage_after_cache_reset_skips_messages(self, transcript):
+        """Token totals should come from the sidecar without rebuilding messages."""
+        jsonl_index.get_session_messages(transcript)
+        jsonl_index.clear_cache()
+
+        with patch.object(jsonl_index, "_build_parser", wraps=jsonl_index._build_parser) as spy:
+            usage = jsonl_index.get_session_usage(transcript)
+
+        assert usage["total_tokens_in"] == 10
+        spy.assert_not_called()
+
+    def test_torn_sidecar_record(self, transcript):
+        """A half-written record should be ignored and the sidecar rewritten."""
+        expected = jsonl_index.get_session_messages(transcript)
+        with open(jsonl_index._index_file(str(transcript)), "a") as f:
+            f.write('{"size": 1')
+        jsonl_index.clear_cache()
+
+        assert jsonl_index.get_session_messages(transcript) == expected
+
+        with open(transcript, "a") as f:
+            f.write(_line(_user("u2", "And again")))
+        jsonl_index.get_session_messages(transcript)
+        jsonl_index.clear_cache()
+
+        assert jsonl_index.get_session_messages(transcript) == _full_parse(transcript).build_messages()
+
+    def test_persist_disabled(self, transcript, stats):
+        """With persistence off nothing should be reused after a cache reset."""
+        with patch.object(jsonl_index.settings, "history_index_persist", False):
+            jsonl_index.invalidate(transcript)
+            jsonl_index.get_session_messages(transcript)
+            jsonl_index.clear_cache()
+            jsonl_index.get_session_messages(transcript)
+
+        assert stats["rebuilds"] == 2
+
+    def test_missing_file(self, tmp_path):
+        """A missing file should yield no messages."""
+        assert jsonl_index.get_session_messages(tmp_path / "missing.jsonl") == []
+
+
+class TestSessionUsage:
+    """Test running token totals."""
+
+    def test_usage_accumulates_across_appends(self, transcript):
+        """Token totals should include appended turns."""
+        assert jsonl_index.get_session_usage(transcript)["total_tokens_in"] == 10
+
+        with open(transcript, "a") as f:
+            f.write(_line(_assistant_tool("a2", "tool-2", tokens=(30, 8))))
+        usage = jsonl_index.get_session_usage(transcript)
+
+        assert usage["total_tokens_in"] == 40
+        assert usage["total_tokens_out"] == 13
+        assert usage["last_input_tokens"] == 30
+        assert usage["cache_read_tokens"] == 7
+        assert usage["model"] == "claude-test"
+
+
+class TestAgentHistory:
+    """Test subagent children through the index."""
+
+    def test_agent_children_attached(self, tmp_path):
+        """Task results should pick up their agent file's children."""
+        path = tmp_path / "session.jsonl"
+        path.write_text(
+            _line(_assistant_tool("a1", "task-1", name="Task"))
+            + _line(_tool_result("r1", "task-1", "done", agent_id="agent-1"))
+        )
+        agent_path = tmp_path / "agent-agent-1.jsonl"
+        agent_path.write_text(_line({
+            "type": "assistant",
+            "message": {"role": "assistant", "content": [{"type": "text", "text": "Working"}]},
+            "uuid": "c1",
+        }))
+
+        messages = jsonl_index.get_session_messages(
+            path, lambda agent_id: jsonl_index.get_agent_history(agent_path) if agent_id == "agent-1" else None
+        )
+
+        assert messages[0]["agentId"] == "agent-1"
+        assert messages[0]["agentChildren"][0]["content"] == "Working"
+
+    def test_agent_history_cached_until_changed(self, tmp_path):
+        """Agent files should be re-parsed only when they change."""
+        agent_path = tmp_path / "agent-1.jsonl"
+        agent_path.write_text(_line({
+            "type": "assistant",
+            "message": {"role": "assistant", "content": [{"type": "text", "text": "One"}]},
+            "uuid": "c1",
+        }))
+
+        with patch.object(jsonl_parser, "parse_agent_history", wraps=jsonl_parser.parse_agent_history) as spy:
+            jsonl_index.get_agent_history(agent_path)
+            jsonl_index.get_agent_history(agent_path)
+            assert spy.call_count == 1
+
+            with open(agent_path, "a") as f:
+                f.write(_line({
+                    "type": "assistant",
+                    "message": {"role": "assistant", "content": [{"type": "text", "text": "Two"}]},
+                    "uuid": "c2",
+                }))
+            os.utime(agent_path, ns=(0, agent_path.stat().st_mtime_ns + 1000))
+            children = jsonl_index.get_agent_history(agent_path)
+
+        assert spy.call_count == 2
+        assert [c["content"] for c in children] == ["One", "Two"]
+
+
+class TestSessionPage:
+    """Test paging through indexed messages."""
+
+    @pytest.fixture
+    def long_transcript(self, tmp_path):
+        path = tmp_path / "session.jsonl"
+        path.write_text("".join(_line(_user(f"u{i}", f"Message {i}")) for i in range(10)))
+        return path
+
+    def test_page_window(self):
+        """page_window should clamp pages to the item range."""
+        assert jsonl_index.page_window(10, 3) == (7, 10)
+        assert jsonl_index.page_window(10, 3, before=2) == (0, 2)
+        assert jsonl_index.page_window(10, 3, after=8) == (9, 10)
+        assert jsonl_index.page_window(10, 4, around=5) == (3, 7)
+        assert jsonl_index.page_window(10, 4, around=0) == (0, 4)
+        assert jsonl_index.page_window(10, 4, around=9) == (6, 10)
+
+    def test_latest_page(self, long_transcript):
+        """Without a cursor the latest messages should be returned."""
+        page = jsonl_index.get_session_page(long_transcript, 3)
+
+        assert [m["id"] for m in page["messages"]] == ["u7", "u8", "u9"]
+        assert page["total"] == 10
+        assert page["has_more_before"] is True
+        assert page["has_more_after"] is False
+        assert page["before_cursor"] == "u7"
+
+    def test_cursors(self, long_transcript):
+        """before/after/around should page relative to a message id."""
+        older = jsonl_index.get_session_page(long_transcript, 3, before="u7")
+        newer = jsonl_index.get_session_page(long_transcript, 3, after="u1")
+        around = jsonl_index.get_session_page(long_transcript, 3, around="u5")
+
+        assert [m["id"] for m in older["messages"]] == ["u4", "u5", "u6"]
+        assert [m["id"] for m in newer["messages"]] == ["u2", "u3", "u4"]
+        assert [m["id"] for m in around["messages"]] == ["u4", "u5", "u6"]
+        assert around["has_more_before"] and around["has_more_after"]
+
+    def test_unknown_cursor(self, long_transcript):
+        """A cursor that matches no message should raise ValueError."""
+        with pytest.raises(ValueError):
+            jsonl_index.get_session_page(long_transcript, 3, before="missing")
+
+    def test_agent_files_read_only_for_page(self, tmp_path):
+        """Agent children should only be loaded for subagents in the page."""
+        path = tmp_path / "session.jsonl"
+        path.write_text(
+            _line(_assistant_tool("a1", "task-1", name="Task"))
+            + _line(_tool_result("r1", "task-1", "done", agent_id="agent-1"))
+            + "".join(_line(_user(f"u{i}", f"Message {i}")) for i in range(5))
+        )
+        requested = []
+
+        def agent_children(agent_id):
+            requested.append(agent_id)
+            return []
+
+        jsonl_index.get_session_page(path, 2, agent_children=agent_children)
+        assert requested == []
+
+        page = jsonl_index.get_session_page(path, 2, around="subagent-task-1", agent_children=agent_children)
+        assert requested == ["agent-1"]
+        assert page["messages"][0]["agentId"] == "agent-1"
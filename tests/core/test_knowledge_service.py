@@ -6,17 +6,44 @@ Tests cover:
 - Text extraction from file bytes
 - Document chunking with overlap
 - Document processing and storage
-- Context retrieval with keyword search
+- Streaming ingestion and batch processing
+- Context retrieval with BM25 search
+- Tokenization and the per-project inverted index
+- Vector and hybrid search modes, vector rebuilds off the query path
 - Context formatting for prompts
 - Document deletion
 - Error handling and edge cases
 """
 
+import asyncio
+import io
 import pytest
+import threading
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from unittest.mock import patch, MagicMock, call
 
-from app.core import knowledge_service
+from app.core import knowledge_service, knowledge_vectors
+from app.db import database
+from app.db.pool import ConnectionPool
+
+
+@pytest.fixture
+def knowledge_db(tmp_path):
+    """A real on-disk database (so writers on different threads can overlap) with one project."""
+    pool = ConnectionPool(tmp_path / "db.sqlite")
+    previous = database.set_pool(pool)
+    try:
+        with patch.object(database.settings, "data_dir", tmp_path), \
+             patch.object(database.settings, "db_pool_enabled", True):
+            database.init_database()
+            database.create_project("project-1", "Project", None, str(tmp_path))
+            knowledge_service.invalidate_project_index()
+            yield database
+            knowledge_service.invalidate_project_index()
+    finally:
+        database.set_pool(previous)
+        pool.close_all()
 
 
 class TestGetContentType:
@@ -302,8 +329,7 @@ class TestProcessDocument:
     def mock_database(self):
         """Mock the database module."""
         with patch.object(knowledge_service, "database") as mock_db:
-            mock_db.create_knowledge_document = MagicMock()
-            mock_db.create_knowledge_chunk = MagicMock()
+            mock_db.create_knowledge_document_with_chunks = MagicMock(return_value=("rev-0", "rev-1"))
             yield mock_db
 
     @pytest.fixture
@@ -332,8 +358,9 @@ class TestProcessDocument:
 
         assert doc_id == "test-uuid-1"
         assert chunk_count >= 1
-        mock_database.create_knowledge_document.assert_called_once()
-        assert mock_database.create_knowledge_chunk.call_count == chunk_count
+        mock_database.create_knowledge_document_with_chunks.assert_called_once()
+        call_args = mock_database.create_knowledge_document_with_chunks.call_args
+        assert len(call_args.kwargs["chunks"]) == chunk_count
 
     @pytest.mark.asyncio
     async def test_process_document_empty_content_raises(self, mock_database):
@@ -364,7 +391,7 @@ class TestProcessDocument:
 
         await knowledge_service.process_document(project_id, filename, content)
 
-        call_args = mock_database.create_knowledge_document.call_args
+        call_args = mock_database.create_knowledge_document_with_chunks.call_args
         assert call_args.kwargs["document_id"] == "test-uuid-1"
         assert call_args.kwargs["project_id"] == project_id
         assert call_args.kwargs["filename"] == filename
@@ -382,54 +409,209 @@ class TestProcessDocument:
             content.encode("utf-8")
         )
 
-        # Verify chunks were created
-        assert mock_database.create_knowledge_chunk.called
+        # Verify chunks were created in one call
+        mock_database.create_knowledge_document_with_chunks.assert_called_once()
 
         # Check chunk indices are sequential
-        calls = mock_database.create_knowledge_chunk.call_args_list
-        for i, c in enumerate(calls):
-            assert c.kwargs["chunk_index"] == i
+        chunks = mock_database.create_knowledge_document_with_chunks.call_args.kwargs["chunks"]
+        assert chunks
+        for i, chunk in enumerate(chunks):
+            assert chunk["chunk_index"] == i
+            assert chunk["document_id"] == "test-uuid-1"
 
+    @pytest.mark.asyncio
+    async def test_process_document_stream_reports_progress(self, mock_database):
+        """Should read the file in blocks and report bytes read."""
+        content = ("Paragraph text here.\n\n" * 100).encode("utf-8")
+        progress = []
+
+        with patch.object(knowledge_service, "READ_BLOCK_SIZE", 512):
+            doc_id, chunk_count = await knowledge_service.process_document_stream(
+                "project-id", "notes.md", io.BytesIO(content), on_progress=progress.append
+            )
+            await asyncio.sleep(0)
 
-class TestGetRelevantContext:
-    """Test context retrieval for queries."""
+        assert chunk_count == len(knowledge_service.chunk_document(content.decode("utf-8")))
+        assert progress[-1] == len(content)
+        assert progress == sorted(progress)
+        call_args = mock_database.create_knowledge_document_with_chunks.call_args
+        assert call_args.kwargs["content"] == content.decode("utf-8")
+        assert call_args.kwargs["file_size"] == len(content)
+
+    @pytest.mark.asyncio
+    async def test_process_document_stream_too_large(self, mock_database):
+        """Should stop reading once the size limit is exceeded."""
+        with pytest.raises(ValueError, match="File too large"):
+            await knowledge_service.process_document_stream(
+                "project-id", "big.txt", io.BytesIO(b"x" * 4096), max_size=1024
+            )
+        mock_database.create_knowledge_document_with_chunks.assert_not_called()
+
+
+class TestStreamingIngestion:
+    """Test the incremental decode/split/chunk generators."""
+
+    def test_iter_text_utf8_split_across_blocks(self):
+        """Multi-byte characters split between reads should decode intact."""
+        text = "héllo wörld ✓ " * 50
+        pieces = list(knowledge_service.iter_text(io.BytesIO(text.encode("utf-8")), "a.txt", block_size=7))
+        assert "".join(pieces) == text
+
+    def test_iter_text_latin1_fallback(self):
+        """Invalid UTF-8 should fall back to latin-1 for the rest of the file."""
+        data = b"plain ascii " + "caf\xe9".encode("latin-1") + b" tail"
+        pieces = list(knowledge_service.iter_text(io.BytesIO(data), "a.txt", block_size=4))
+        assert "".join(pieces) == data.decode("latin-1")
+
+    def test_iter_text_max_size(self):
+        """Should raise once more than max_size bytes were read."""
+        with pytest.raises(ValueError, match="File too large"):
+            list(knowledge_service.iter_text(io.BytesIO(b"x" * 100), "a.txt", block_size=10, max_size=50))
+
+    def test_iter_paragraphs_across_pieces(self):
+        """Paragraph breaks straddling piece boundaries should still split."""
+        pieces = ["first para\n", "\nsecond", " para\n  ", "\n\n", "third"]
+        assert list(knowledge_service.iter_paragraphs(pieces)) == [
+            "first para", "second para", "third"
+        ]
+
+    @pytest.mark.parametrize("piece_size", [1, 3, 17, 100])
+    def test_streamed_chunks_match_chunk_document(self, piece_size):
+        """Chunking a stream should match chunking the whole text."""
+        text = "".join(
+            f"Paragraph {i} " + "word " * (i % 40) + ("\n\n" if i % 3 else "\n \n\n")
+            for i in range(120)
+        )
+        pieces = [text[i:i + piece_size] for i in range(0, len(text), piece_size)]
+
+        streamed = list(knowledge_service.iter_chunks(knowledge_service.iter_paragraphs(pieces)))
+
+        assert streamed == knowledge_service.chunk_document(text)
+
+
+class TestProcessDocumentsBatch:
+    """Test concurrent batch ingestion."""
 
     @pytest.fixture
     def mock_database(self):
         """Mock the database module."""
         with patch.object(knowledge_service, "database") as mock_db:
+            mock_db.create_knowledge_document_with_chunks.return_value = ("rev-0", "rev-1")
             yield mock_db
 
-    def test_get_context_empty_query(self, mock_database):
+    @pytest.mark.asyncio
+    async def test_batch_results_and_events(self, mock_database):
+        """Should ingest every file and report per-file events in order."""
+        events = []
+
+        async def on_event(event):
+            events.append(event)
+
+        results = await knowledge_service.process_documents_batch(
+            "project-id",
+            [
+                ("a.md", io.BytesIO(b"alpha\n\nbeta")),
+                ("b.exe", io.BytesIO(b"binary")),
+                ("c.txt", io.BytesIO(b"   ")),
+            ],
+            concurrency=2,
+            on_event=on_event,
+        )
+
+        assert [r["status"] for r in results] == ["completed", "failed", "failed"]
+        assert results[0]["chunk_count"] == 1
+        assert results[1]["error"] == "Unsupported file type"
+        assert "empty" in results[2]["error"]
+        assert mock_database.create_knowledge_document_with_chunks.call_count == 1
+
+        a_events = [e["status"] for e in events if e["filename"] == "a.md"]
+        assert a_events[0] == "started"
+        assert a_events[-1] == "completed"
+        assert "progress" in a_events
+        assert {e["status"] for e in events if e["filename"] == "b.exe"} == {"started", "failed"}
+
+    @pytest.mark.asyncio
+    async def test_batch_database_error_is_per_file(self, mock_database):
+        """A storage failure should fail only that file."""
+        mock_database.create_knowledge_document_with_chunks.side_effect = [RuntimeError("disk full"), ("rev-0", "rev-1")]
+
+        results = await knowledge_service.process_documents_batch(
+            "project-id",
+            [("a.md", io.BytesIO(b"alpha")), ("b.md", io.BytesIO(b"beta"))],
+            concurrency=1,
+        )
+
+        assert results[0]["status"] == "failed"
+        assert "disk full" in results[0]["error"]
+        assert results[1]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_batch_documents_all_searchable(self, knowledge_db):
+        """Every file of a concurrent batch should be found by later searches."""
+        assert knowledge_service.search_chunks("project-1", "anything") == []
+        terms = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+        create = knowledge_db.create_knowledge_document_with_chunks
+        started = threading.Barrier(4, timeout=10)
+        stored = threading.Barrier(4, timeout=10)
+
+        def create_together(**kwargs):
+            # Each group of four uploads writes, then updates the index, at the same time
+            started.wait()
+            result = create(**kwargs)
+            stored.wait()
+            return result
+
+        with patch.object(knowledge_db, "create_knowledge_document_with_chunks", side_effect=create_together):
+            results = await knowledge_service.process_documents_batch(
+                "project-1",
+                [(f"{term}.md", io.BytesIO(f"{term} notes".encode())) for term in terms],
+                concurrency=4,
+            )
+
+        assert [r["status"] for r in results] == ["completed"] * len(terms)
+        for term in terms:
+            assert [r["filename"] for r in knowledge_service.search_chunks("project-1", term)] == [f"{term}.md"]
+
+
+class TestGetRelevantContext:
+    """Test context retrieval for queries."""
+
+    @pytest.fixture
+    def mock_search(self):
+        """Mock the BM25 chunk search."""
+        with patch.object(knowledge_service, "search_chunks") as mock:
+            yield mock
+
+    def test_get_context_empty_query(self, mock_search):
         """Should return empty string for empty query."""
         result = knowledge_service.get_relevant_context("project-id", "")
         assert result == ""
-        mock_database.search_knowledge_chunks.assert_not_called()
+        mock_search.assert_not_called()
 
-    def test_get_context_empty_project_id(self, mock_database):
+    def test_get_context_empty_project_id(self, mock_search):
         """Should return empty string for empty project ID."""
         result = knowledge_service.get_relevant_context("", "test query")
         assert result == ""
-        mock_database.search_knowledge_chunks.assert_not_called()
+        mock_search.assert_not_called()
 
-    def test_get_context_none_values(self, mock_database):
+    def test_get_context_none_values(self, mock_search):
         """Should handle None values."""
         result = knowledge_service.get_relevant_context(None, "query")
         assert result == ""
         result = knowledge_service.get_relevant_context("project", None)
         assert result == ""
 
-    def test_get_context_no_results(self, mock_database):
+    def test_get_context_no_results(self, mock_search):
         """Should return empty string when no matching chunks."""
-        mock_database.search_knowledge_chunks.return_value = []
+        mock_search.return_value = []
 
         result = knowledge_service.get_relevant_context("project-id", "query")
 
         assert result == ""
 
-    def test_get_context_single_result(self, mock_database):
+    def test_get_context_single_result(self, mock_search):
         """Should format single result correctly."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": "test.txt", "content": "Relevant content here."}
         ]
 
@@ -438,9 +620,9 @@ class TestGetRelevantContext:
         assert "[From: test.txt]" in result
         assert "Relevant content here." in result
 
-    def test_get_context_multiple_results(self, mock_database):
+    def test_get_context_multiple_results(self, mock_search):
         """Should format multiple results with separators."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": "doc1.txt", "content": "First content."},
             {"filename": "doc2.txt", "content": "Second content."}
         ]
@@ -453,9 +635,9 @@ class TestGetRelevantContext:
         assert "Second content." in result
         assert "---" in result  # Separator
 
-    def test_get_context_respects_max_chunks(self, mock_database):
+    def test_get_context_respects_max_chunks(self, mock_search):
         """Should respect max_chunks parameter."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": f"doc{i}.txt", "content": f"Content {i}."}
             for i in range(10)
         ]
@@ -469,9 +651,9 @@ class TestGetRelevantContext:
         # Should only include 3 chunks
         assert result.count("[From:") == 3
 
-    def test_get_context_respects_max_chars(self, mock_database):
+    def test_get_context_respects_max_chars(self, mock_search):
         """Should respect max_chars parameter and truncate."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": "doc.txt", "content": "A" * 3000}
         ]
 
@@ -484,9 +666,9 @@ class TestGetRelevantContext:
         assert len(result) <= 550  # Allow some buffer for formatting
         assert "..." in result  # Should be truncated
 
-    def test_get_context_skips_when_too_long(self, mock_database):
+    def test_get_context_skips_when_too_long(self, mock_search):
         """Should skip chunks that would exceed max_chars."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": "doc1.txt", "content": "Short content."},
             {"filename": "doc2.txt", "content": "A" * 5000}  # Very long
         ]
@@ -500,10 +682,10 @@ class TestGetRelevantContext:
         # Should only include the short one
         assert "Short content." in result
 
-    def test_get_context_all_chunks_too_large(self, mock_database):
+    def test_get_context_all_chunks_too_large(self, mock_search):
         """Should return empty string when all chunks are too large to fit."""
         # All chunks are too large to fit even as truncated versions
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"filename": "doc1.txt", "content": "A" * 5000},
             {"filename": "doc2.txt", "content": "B" * 5000}
         ]
@@ -517,9 +699,9 @@ class TestGetRelevantContext:
         # Should return empty since nothing fits
         assert result == ""
 
-    def test_get_context_missing_filename(self, mock_database):
+    def test_get_context_missing_filename(self, mock_search):
         """Should handle missing filename in results."""
-        mock_database.search_knowledge_chunks.return_value = [
+        mock_search.return_value = [
             {"content": "Content without filename."}
         ]
 
@@ -528,9 +710,9 @@ class TestGetRelevantContext:
         assert "[From: unknown]" in result
         assert "Content without filename." in result
 
-    def test_get_context_calls_search_with_double_limit(self, mock_database):
+    def test_get_context_calls_search_with_double_limit(self, mock_search):
         """Should search with double the max_chunks limit."""
-        mock_database.search_knowledge_chunks.return_value = []
+        mock_search.return_value = []
 
         knowledge_service.get_relevant_context(
             "project-id",
@@ -538,11 +720,382 @@ class TestGetRelevantContext:
             max_chunks=5
         )
 
-        mock_database.search_knowledge_chunks.assert_called_once_with(
+        mock_search.assert_called_once_with(
             "project-id", "query", limit=10
         )
 
 
+class TestTokenize:
+    """Test index tokenization."""
+
+    def test_lowercases_and_drops_stopwords(self):
+        """Should lowercase words and drop stopwords and 1-char tokens."""
+        assert knowledge_service.tokenize("How do I Deploy the API?") == ["deploy", "api"]
+
+    def test_splits_snake_case(self):
+        """Should index identifier parts as well as the identifier."""
+        assert knowledge_service.tokenize("chunk_size") == ["chunk", "size", "chunk_size"]
+
+    def test_empty(self):
+        """Should return no terms for empty text."""
+        assert knowledge_service.tokenize("") == []
+        assert knowledge_service.tokenize(None) == []
+
+
+class TestKnowledgeIndex:
+    """Test the BM25 inverted index."""
+
+    @pytest.fixture
+    def index(self):
+        index = knowledge_service.KnowledgeIndex("project-1")
+        index.add_chunk({"id": "c1", "document_id": "d1", "content": "deploy the server with docker"})
+        index.add_chunk({"id": "c2", "document_id": "d1", "content": "docker docker compose setup"})
+        index.add_chunk({"id": "c3", "document_id": "d2", "content": "database backup schedule"})
+        return index
+
+    def test_ranks_by_bm25(self, index):
+        """Higher term frequency and rarer terms should rank first."""
+        results = index.search("docker")
+        assert [r["id"] for r in results] == ["c2", "c1"]
+        assert results[0]["relevance_score"] > results[1]["relevance_score"] > 0
+
+    def test_rare_terms_weigh_more(self, index):
+        """A rare term should contribute more than a common one."""
+        assert index.idf("deploy") > index.idf("docker")
+
+    def test_no_match(self, index):
+        """Should return nothing when no query term is indexed."""
+        assert index.search("kubernetes") == []
+        assert index.search("the and of") == []
+
+    def test_limit(self, index):
+        """Should return at most limit results."""
+        assert len(index.search("docker database", limit=1)) == 1
+
+    def test_remove_document(self, index):
+        """Removing a document should drop its chunks and postings."""
+        assert index.remove_document("d1") == 2
+        assert len(index) == 1
+        assert "docker" not in index.postings
+        assert index.search("docker") == []
+        assert [r["id"] for r in index.search("backup")] == ["c3"]
+
+    def test_re_adding_chunk_replaces_it(self, index):
+        """Adding an existing chunk id should replace its terms."""
+        index.add_chunk({"id": "c3", "document_id": "d2", "content": "restore procedure"})
+        assert len(index) == 3
+        assert index.search("backup") == []
+        assert [r["id"] for r in index.search("restore")] == ["c3"]
+
+
+class TestSearchChunks:
+    """Test the cached per-project search."""
+
+    @pytest.fixture(autouse=True)
+    def clear_indexes(self):
+        knowledge_service.invalidate_project_index()
+        yield
+        knowledge_service.invalidate_project_index()
+
+    @pytest.fixture
+    def mock_database(self):
+        """Mock the database module."""
+        with patch.object(knowledge_service, "database") as mock_db:
+            mock_db.get_knowledge_revision.return_value = "rev-1"
+            mock_db.get_all_knowledge_chunks_for_project.return_value = [
+                {"id": "c1", "document_id": "d1", "filename": "a.md", "content": "alpha release notes"},
+            ]
+            yield mock_db
+
+    def test_builds_index_once(self, mock_database):
+        """Should load chunks on first search and reuse the index."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        results = knowledge_service.search_chunks("project-1", "release")
+
+        assert results[0]["filename"] == "a.md"
+        mock_database.get_all_knowledge_chunks_for_project.assert_called_once_with("project-1")
+
+    def test_rebuilds_on_revision_change(self, mock_database):
+        """Should rebuild the index when the project revision changes."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+        mock_database.get_all_knowledge_chunks_for_project.return_value = []
+
+        assert knowledge_service.search_chunks("project-1", "alpha") == []
+
+    def test_empty_inputs(self, mock_database):
+        """Should not touch the database for empty queries or projects."""
+        assert knowledge_service.search_chunks("project-1", "") == []
+        assert knowledge_service.search_chunks("", "alpha") == []
+        mock_database.get_knowledge_revision.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_document_updates_loaded_index(self, mock_database):
+        """New documents should be added to a loaded index without a rebuild."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        mock_database.create_knowledge_document_with_chunks.return_value = ("rev-1", "rev-2")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+
+        await knowledge_service.process_document("project-1", "b.md", b"beta migration guide")
+        results = knowledge_service.search_chunks("project-1", "migration")
+
+        assert [r["filename"] for r in results] == ["b.md"]
+        mock_database.get_all_knowledge_chunks_for_project.assert_called_once()
+
+    def test_delete_updates_loaded_index(self, mock_database):
+        """Deleted documents should be removed from a loaded index."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        mock_database.delete_knowledge_document_with_revisions.return_value = ("project-1", "rev-1", "rev-2")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+
+        knowledge_service.delete_document_and_chunks("d1")
+
+        assert knowledge_service.search_chunks("project-1", "alpha") == []
+        mock_database.get_all_knowledge_chunks_for_project.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_process_document_drops_stale_index(self, mock_database):
+        """A loaded index that was already stale should be rebuilt, not patched."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        mock_database.create_knowledge_document_with_chunks.return_value = ("rev-0", "rev-2")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+        mock_database.get_all_knowledge_chunks_for_project.return_value = []
+
+        await knowledge_service.process_document("project-1", "b.md", b"beta migration guide")
+
+        assert knowledge_service.search_chunks("project-1", "migration") == []
+        assert mock_database.get_all_knowledge_chunks_for_project.call_count == 2
+
+
+    def test_index_restored_without_tokenizing(self, mock_database):
+        """A persisted index should be restored after a restart without re-tokenizing chunks."""
+        expected = knowledge_service.search_chunks("project-1", "alpha")
+        knowledge_service.invalidate_project_index()
+
+        with patch.object(knowledge_service, "tokenize", wraps=knowledge_service.tokenize) as spy:
+            results = knowledge_service.search_chunks("project-1", "alpha")
+
+        assert results == expected
+        spy.assert_called_once_with("alpha")
+
+    @pytest.mark.asyncio
+    async def test_updates_appended_and_replayed(self, mock_database):
+        """Uploads and deletes should be appended and replayed on restore."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        mock_database.create_knowledge_document_with_chunks.return_value = ("rev-1", "rev-2")
+        await knowledge_service.process_document("project-1", "b.md", b"beta migration guide")
+        added = mock_database.create_knowledge_document_with_chunks.call_args.kwargs["chunks"]
+        mock_database.delete_knowledge_document_with_revisions.return_value = ("project-1", "rev-2", "rev-3")
+        knowledge_service.delete_document_and_chunks("d1")
+
+        lines = knowledge_service._index_file("project-1").read_text().splitlines()
+        assert len(lines) == 4
+
+        knowledge_service.invalidate_project_index()
+        mock_database.get_knowledge_revision.return_value = "rev-3"
+        mock_database.get_all_knowledge_chunks_for_project.return_value = added
+        with patch.object(knowledge_service, "tokenize", wraps=knowledge_service.tokenize) as spy:
+            results = knowledge_service.search_chunks("project-1", "migration")
+
+        assert [r["id"] for r in results] == [added[0]["id"]]
+        spy.assert_called_once_with("migration")
+        # Restoring compacts the removed document away
+        assert len(knowledge_service._index_file("project-1").read_text().splitlines()) == 2
+
+    def test_stale_persisted_index_rebuilt(self, mock_database):
+        """A persisted index at another revision should be ignored."""
+        knowledge_service.search_chunks("project-1", "alpha")
+        knowledge_service.invalidate_project_index()
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+        mock_database.get_all_knowledge_chunks_for_project.return_value = [
+            {"id": "c2", "document_id": "d2", "filename": "b.md", "content": "gamma rollout"},
+        ]
+
+        assert knowledge_service.search_chunks("project-1", "alpha") == []
+        assert [r["id"] for r in knowledge_service.search_chunks("project-1", "gamma")] == ["c2"]
+
+    def test_persist_disabled(self, mock_database):
+        """With persistence off the index should be rebuilt after a restart."""
+        with patch.object(knowledge_service.settings, "knowledge_index_persist", False):
+            knowledge_service.search_chunks("project-1", "alpha")
+
+        assert not knowledge_service._index_file("project-1").exists()
+
+
+@pytest.mark.skipif(not knowledge_vectors.VECTORS_AVAILABLE, reason="numpy not installed")
+class TestConcurrentIngest:
+    """Test index updates from overlapping uploads against a real database."""
+
+    def test_overlapping_ingests_both_searchable(self, knowledge_db):
+        """Two uploads writing at once should both be found by later searches."""
+        assert knowledge_service.search_chunks("project-1", "anything") == []
+        create = knowledge_db.create_knowledge_document_with_chunks
+        started = threading.Barrier(2, timeout=10)
+        stored = threading.Barrier(2, timeout=10)
+
+        def create_together(**kwargs):
+            # Both uploads are past chunking before either writes, and neither
+            # updates the index until both have written
+            started.wait()
+            result = create(**kwargs)
+            stored.wait()
+            return result
+
+        with patch.object(knowledge_db, "create_knowledge_document_with_chunks", side_effect=create_together), \
+             ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [
+                pool.submit(knowledge_service.ingest_document, "project-1", "a.md", io.BytesIO(b"alpha rollout")),
+                pool.submit(knowledge_service.ingest_document, "project-1", "b.md", io.BytesIO(b"beta migration")),
+            ]
+            for future in futures:
+                future.result(timeout=10)
+
+        assert [r["filename"] for r in knowledge_service.search_chunks("project-1", "alpha")] == ["a.md"]
+        assert [r["filename"] for r in knowledge_service.search_chunks("project-1", "migration")] == ["b.md"]
+
+
+class TestSearchModes:
+    """Test vector and hybrid retrieval through search_chunks."""
+
+    @pytest.fixture(autouse=True)
+    def clear_indexes(self, tmp_path):
+        knowledge_service.invalidate_project_index()
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch.object(knowledge_vectors, "_get_process_pool", return_value=pool), \
+             patch.object(knowledge_vectors, "get_index_directory", side_effect=lambda pid: tmp_path / pid):
+            yield
+        knowledge_service.invalidate_project_index()
+
+    @staticmethod
+    def build_vectors():
+        knowledge_service.ensure_vector_index("project-1").result(timeout=10)
+
+    @pytest.fixture
+    def mock_database(self):
+        """Mock the database module."""
+        with patch.object(knowledge_service, "database") as mock_db:
+            mock_db.get_knowledge_revision.return_value = "rev-1"
+            mock_db.get_project.return_value = {"id": "project-1", "settings": {}}
+            mock_db.get_all_knowledge_chunks_for_project.return_value = [
+                {"id": "c1", "document_id": "d1", "filename": "a.md", "content": "how to deploy the server"},
+                {"id": "c2", "document_id": "d1", "filename": "a.md", "content": "database backup schedule"},
+                {"id": "c3", "document_id": "d2", "filename": "b.md", "content": "release notes for version two"},
+            ]
+            yield mock_db
+
+    def test_project_setting_selects_mode(self, mock_database):
+        """The project's setting should override the global default."""
+        mock_database.get_project.return_value = {"id": "project-1", "settings": {"knowledge_search_mode": "hybrid"}}
+        assert knowledge_service.get_search_mode("project-1") == "hybrid"
+
+    def test_invalid_setting_falls_back(self, mock_database):
+        """Unknown modes should fall back to the global default."""
+        mock_database.get_project.return_value = {"id": "project-1", "settings": {"knowledge_search_mode": "magic"}}
+        with patch.object(knowledge_service.settings, "knowledge_search_mode", "bm25"):
+            assert knowledge_service.get_search_mode("project-1") == "bm25"
+
+    def test_vector_mode_matches_word_variants(self, mock_database):
+        """Vector search should find chunks BM25 misses on morphology."""
+        assert knowledge_service.search_chunks("project-1", "deployment", mode="bm25") == []
+        self.build_vectors()
+
+        results = knowledge_service.search_chunks("project-1", "deployment", mode="vector")
+
+        assert results[0]["id"] == "c1"
+        assert 0 < results[0]["relevance_score"] <= 1
+
+    def test_hybrid_mode_combines_scores(self, mock_database):
+        """Hybrid results should rank exact and fuzzy matches together."""
+        self.build_vectors()
+        results = knowledge_service.search_chunks("project-1", "backup deployment", mode="hybrid")
+
+        assert {r["id"] for r in results[:2]} == {"c1", "c2"}
+
+    def test_vector_index_persisted_and_reused(self, mock_database, tmp_path):
+        """The vector index should be saved and reloaded without re-embedding."""
+        self.build_vectors()
+        assert (tmp_path / "project-1" / "meta.json").exists()
+        knowledge_service.invalidate_project_index()
+
+        with patch.object(knowledge_vectors, "embed_texts") as mock_embed:
+            results = knowledge_service.search_chunks("project-1", "deploy", mode="vector")
+
+        mock_embed.assert_not_called()
+        assert results[0]["id"] == "c1"
+
+    def test_first_vector_search_falls_back_to_bm25(self, mock_database):
+        """The first search should not embed inline; BM25 answers until the rebuild lands."""
+        embedded = Future()
+        with patch.object(knowledge_vectors, "submit_embed_texts", return_value=embedded) as submit:
+            results = knowledge_service.search_chunks("project-1", "deploy", mode="vector")
+            knowledge_service.search_chunks("project-1", "deploy", mode="vector")
+
+        assert results == knowledge_service.search_chunks("project-1", "deploy", mode="bm25")
+        submit.assert_called_once()
+
+        embedded.set_result(knowledge_vectors.embed_texts([
+            chunk["content"] for chunk in mock_database.get_all_knowledge_chunks_for_project.return_value
+        ]))
+
+        assert knowledge_service._get_vector_index("project-1").revision == "rev-1"
+        assert knowledge_service.search_chunks("project-1", "deployment", mode="vector")[0]["id"] == "c1"
+
+    def test_stale_vectors_served_while_rebuilding(self, mock_database):
+        """A behind vector index should keep ranking while it is re-embedded."""
+        self.build_vectors()
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+        mock_database.get_all_knowledge_chunks_for_project.return_value = [
+            {"id": "c1", "document_id": "d1", "filename": "a.md", "content": "how to deploy the server"},
+            {"id": "c4", "document_id": "d3", "filename": "c.md", "content": "kubernetes upgrade"},
+        ]
+
+        with patch.object(knowledge_vectors, "submit_embed_texts", return_value=Future()) as submit:
+            results = knowledge_service.search_chunks("project-1", "deployment", mode="vector")
+
+        submit.assert_called_once()
+        assert [r["id"] for r in results] == ["c1"]
+        assert knowledge_service._get_vector_index("project-1").revision == "rev-1"
+
+    def test_no_rebuild_while_upload_pending(self, mock_database):
+        """Searches during an upload should wait for its vectors instead of re-embedding everything."""
+        with patch.dict(knowledge_service._pending_vector_adds, {"project-1": 1}), \
+             patch.object(knowledge_vectors, "submit_embed_texts") as submit:
+            knowledge_service.search_chunks("project-1", "deploy", mode="hybrid")
+
+        submit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_document_embeds_new_chunks(self, mock_database, tmp_path):
+        """Uploads in vector mode should append to the saved vector index."""
+        mock_database.get_project.return_value = {"id": "project-1", "settings": {"knowledge_search_mode": "vector"}}
+        self.build_vectors()
+        mock_database.create_knowledge_document_with_chunks.return_value = ("rev-1", "rev-2")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+
+        async def embed(texts):
+            return knowledge_vectors.embed_texts(texts)
+
+        with patch.object(knowledge_vectors, "embed_texts_async", side_effect=embed):
+            await knowledge_service.process_document("project-1", "c.md", b"kubernetes migration guide")
+
+        vindex = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1")
+        assert vindex.load()
+        assert vindex.revision == "rev-2"
+        assert len(vindex) == 4
+
+    def test_delete_updates_vector_index(self, mock_database):
+        """Deleting a document should drop its rows from a loaded vector index."""
+        self.build_vectors()
+        mock_database.delete_knowledge_document_with_revisions.return_value = ("project-1", "rev-1", "rev-2")
+        mock_database.get_knowledge_revision.return_value = "rev-2"
+
+        knowledge_service.delete_document_and_chunks("d1")
+
+        vindex = knowledge_service._get_vector_index("project-1")
+        assert vindex.chunk_ids == ["c3"]
+        assert vindex.revision == "rev-2"
+
+
 class TestFormatContextForPrompt:
     """Test context formatting for prompt injection."""
 
@@ -710,16 +1263,16 @@ class TestDeleteDocumentAndChunks:
 
     def test_delete_existing_document(self, mock_database):
         """Should return True when document is deleted."""
-        mock_database.delete_knowledge_document.return_value = True
+        mock_database.delete_knowledge_document_with_revisions.return_value = ("project-id", "rev-1", "rev-2")
 
         result = knowledge_service.delete_document_and_chunks("doc-id")
 
         assert result is True
-        mock_database.delete_knowledge_document.assert_called_once_with("doc-id")
+        mock_database.delete_knowledge_document_with_revisions.assert_called_once_with("doc-id")
 
     def test_delete_nonexistent_document(self, mock_database):
         """Should return False when document doesn't exist."""
-        mock_database.delete_knowledge_document.return_value = False
+        mock_database.delete_knowledge_document_with_revisions.return_value = None
 
         result = knowledge_service.delete_document_and_chunks("nonexistent-id")
 
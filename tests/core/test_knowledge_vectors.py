@@ -0,0 +1,168 @@
+"""
+Unit tests for the knowledge vector index.
+
+Tests cover:
+- Hashed n-gram embeddings
+- int8 quantization
+- VectorIndex add/remove/search
+- Persistence and memory-mapped reload
+- Embedding through the worker pool
+"""
+
+import os
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.core import knowledge_vectors
+
+pytestmark = pytest.mark.skipif(
+    not knowledge_vectors.VECTORS_AVAILABLE, reason="numpy not installed"
+)
+
+if knowledge_vectors.VECTORS_AVAILABLE:
+    import numpy as np
+
+
+class TestEmbedding:
+    """Test the hashed n-gram embedding."""
+
+    def test_unit_length(self):
+        """Embeddings should be L2-normalized."""
+        vector = knowledge_vectors.embed_text("configure the deployment pipeline")
+        assert vector.shape == (knowledge_vectors.EMBEDDING_DIM,)
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+
+    def test_empty_text(self):
+        """Empty text should embed to the zero vector."""
+        assert not knowledge_vectors.embed_text("").any()
+
+    def test_deterministic(self):
+        """The same text should always produce the same vector."""
+        a = knowledge_vectors.embed_text("backup schedule")
+        b = knowledge_vectors.embed_text("backup schedule")
+        assert np.array_equal(a, b)
+
+    def test_word_variants_are_similar(self):
+        """Shared character trigrams should make word variants similar."""
+        deploy = knowledge_vectors.embed_text("deploy")
+        deployment = knowledge_vectors.embed_text("deployment")
+        unrelated = knowledge_vectors.embed_text("spreadsheet")
+
+        assert float(deploy @ deployment) > float(deploy @ unrelated) + 0.2
+
+    def test_embed_texts_rows(self):
+        """embed_texts should stack one row per text."""
+        matrix = knowledge_vectors.embed_texts(["alpha", "beta", "gamma"])
+        assert matrix.shape == (3, knowledge_vectors.EMBEDDING_DIM)
+        assert np.array_equal(matrix[1], knowledge_vectors.embed_text("beta"))
+
+    def test_quantize_range(self):
+        """Quantized vectors should be int8 and preserve cosine closely."""
+        vectors = knowledge_vectors.embed_texts(["database backup", "backup the database"])
+        quantized = knowledge_vectors.quantize(vectors)
+
+        assert quantized.dtype == np.int8
+        approx = float(quantized[0].astype(np.float32) @ vectors[1]) / knowledge_vectors.QUANT_SCALE
+        assert approx == pytest.approx(float(vectors[0] @ vectors[1]), abs=0.02)
+
+
+class TestVectorIndex:
+    """Test the per-project vector index."""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        index = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1")
+        index.rebuild([
+            {"id": "c1", "document_id": "d1", "content": "how to deploy the server"},
+            {"id": "c2", "document_id": "d1", "content": "database backup schedule"},
+            {"id": "c3", "document_id": "d2", "content": "release notes for version two"},
+        ], "rev-1")
+        return index
+
+    def test_search_ranks_best_first(self, index):
+        """Search should return the closest chunk first."""
+        results = index.search(knowledge_vectors.embed_text("deploying servers"), limit=2)
+
+        assert len(results) == 2
+        assert results[0][0] == "c1"
+        assert results[0][1] >= results[1][1]
+
+    def test_search_limit_larger_than_index(self, index):
+        """Limits beyond the index size should return every row."""
+        assert len(index.search(knowledge_vectors.embed_text("backup"), limit=50)) == 3
+
+    def test_search_empty_index(self, tmp_path):
+        """An empty index should return nothing."""
+        index = knowledge_vectors.VectorIndex("empty", tmp_path / "empty")
+        assert index.search(knowledge_vectors.embed_text("anything")) == []
+
+    def test_remove_document(self, index):
+        """Removing a document should drop all its rows."""
+        assert index.remove_document("d1") == 2
+        assert index.chunk_ids == ["c3"]
+        assert index.matrix.shape == (1, knowledge_vectors.EMBEDDING_DIM)
+        assert index.remove_document("missing") == 0
+
+    def test_add_appends_rows(self, index):
+        """Added vectors should be searchable."""
+        index.add(["c4"], ["d3"], knowledge_vectors.embed_texts(["kubernetes cluster upgrade"]))
+
+        results = index.search(knowledge_vectors.embed_text("kubernetes upgrade"), limit=1)
+        assert results[0][0] == "c4"
+
+    def test_save_and_load_round_trip(self, index, tmp_path):
+        """A saved index should reload memory-mapped with the same rows."""
+        loaded = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1")
+
+        assert loaded.load()
+        assert isinstance(loaded.matrix, np.memmap)
+        assert loaded.revision == "rev-1"
+        assert loaded.chunk_ids == index.chunk_ids
+        assert np.array_equal(np.asarray(loaded.matrix), np.asarray(index.matrix))
+
+    def test_save_never_replaces_mapped_matrix(self, index, tmp_path):
+        """Saving should write a new matrix file instead of replacing the mapped one."""
+        loaded = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1")
+        assert loaded.load()
+        index.add(["c4"], ["d3"], knowledge_vectors.embed_texts(["kubernetes cluster upgrade"]))
+
+        with patch.object(knowledge_vectors.os, "replace", wraps=os.replace) as spy:
+            index.save()
+
+        assert all(not str(call.args[1]).endswith(".npy") for call in spy.call_args_list)
+        assert len(list((tmp_path / "project-1").glob("vectors*.npy"))) == 1
+        assert np.asarray(loaded.matrix).shape == (3, knowledge_vectors.EMBEDDING_DIM)
+        reloaded = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1")
+        assert reloaded.load()
+        assert len(reloaded) == 4
+
+    def test_load_missing(self, tmp_path):
+        """Loading a missing index should report False."""
+        index = knowledge_vectors.VectorIndex("project-2", tmp_path / "project-2")
+        assert index.load() is False
+        assert index.revision is None
+
+    def test_load_rejects_other_dimension(self, index, tmp_path):
+        """Indexes built with a different dimension should not load."""
+        other = knowledge_vectors.VectorIndex("project-1", tmp_path / "project-1", dim=64)
+        assert other.load() is False
+
+
+class TestEmbedAsync:
+    """Test embedding through the worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_embed_texts_async(self):
+        """embed_texts_async should return the same vectors as embed_texts."""
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch.object(knowledge_vectors, "_get_process_pool", return_value=pool):
+            vectors = await knowledge_vectors.embed_texts_async(["alpha", "beta"])
+
+        assert np.array_equal(vectors, knowledge_vectors.embed_texts(["alpha", "beta"]))
+
+    def test_shutdown_without_pool(self):
+        """shutdown should be safe when no pool was started."""
+        knowledge_vectors.shutdown()
+        knowledge_vectors.shutdown()
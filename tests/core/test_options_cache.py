@@ -0,0 +1,235 @@
+"""
+Unit tests for the SDK options cache.
+
+Tests cover:
+- Cached loads, TTL expiry and uncached None results
+- Invalidation by key, by layer and from database writes
+- Loads that race with an invalidation
+- Stage timing
+- Cached lookups in profiles and query_engine
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.options_cache import (
+    OptionsCache,
+    StageTimer,
+    PROFILES,
+    SUBAGENTS,
+    SETTINGS,
+    GIT,
+)
+from app.db import database
+
+
+@pytest.fixture
+def cache():
+    return OptionsCache()
+
+
+class TestOptionsCache:
+    """Tests for OptionsCache.get and invalidation"""
+
+    def test_loads_once(self, cache):
+        loader = MagicMock(return_value={"id": "p1"})
+
+        assert cache.get(PROFILES, "p1", loader) == {"id": "p1"}
+        assert cache.get(PROFILES, "p1", loader) == {"id": "p1"}
+
+        loader.assert_called_once()
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_keys_and_layers_are_separate(self, cache):
+        cache.get(PROFILES, "a", lambda: "profile")
+        cache.get(SUBAGENTS, "a", lambda: "subagent")
+
+        assert cache.get(PROFILES, "a", lambda: None) == "profile"
+        assert cache.get(SUBAGENTS, "a", lambda: None) == "subagent"
+
+    def test_none_is_not_cached(self, cache):
+        loader = MagicMock(return_value=None)
+
+        cache.get(SUBAGENTS, "missing", loader)
+        cache.get(SUBAGENTS, "missing", loader)
+
+        assert loader.call_count == 2
+
+    def test_false_is_cached(self, cache):
+        loader = MagicMock(return_value=False)
+
+        assert cache.get(GIT, "/tmp/dir", loader) is False
+        assert cache.get(GIT, "/tmp/dir", loader) is False
+
+        loader.assert_called_once()
+
+    def test_expires_after_ttl(self, cache):
+        loader = MagicMock(return_value="value")
+
+        with patch("app.core.options_cache.settings") as mock_settings, \
+                patch("app.core.options_cache.time.monotonic") as mock_monotonic:
+            mock_settings.options_cache_ttl_seconds = 30.0
+            mock_monotonic.return_value = 100.0
+            cache.get(PROFILES, "p1", loader)
+            mock_monotonic.return_value = 129.0
+            cache.get(PROFILES, "p1", loader)
+            assert loader.call_count == 1
+
+            mock_monotonic.return_value = 131.0
+            cache.get(PROFILES, "p1", loader)
+            assert loader.call_count == 2
+
+    def test_invalidate_key(self, cache):
+        cache.get(PROFILES, "a", lambda: "old-a")
+        cache.get(PROFILES, "b", lambda: "old-b")
+
+        cache.invalidate(PROFILES, "a")
+
+        assert cache.get(PROFILES, "a", lambda: "new-a") == "new-a"
+        assert cache.get(PROFILES, "b", lambda: "new-b") == "old-b"
+
+    def test_invalidate_layer(self, cache):
+        cache.get(PROFILES, "a", lambda: "old-a")
+        cache.get(PROFILES, "b", lambda: "old-b")
+
+        cache.invalidate(PROFILES)
+
+        assert cache.get(PROFILES, "a", lambda: "new-a") == "new-a"
+        assert cache.get(PROFILES, "b", lambda: "new-b") == "new-b"
+
+    def test_load_racing_invalidation_is_not_stored(self, cache):
+        def loader():
+            # A write lands while the row is being read
+            cache.invalidate(PROFILES, "p1")
+            return "stale"
+
+        assert cache.get(PROFILES, "p1", loader) == "stale"
+        assert cache.get(PROFILES, "p1", lambda: "fresh") == "fresh"
+
+    def test_database_change_mapping(self, cache):
+        cache.get(PROFILES, "p1", lambda: "profile")
+        cache.get(SUBAGENTS, "s1", lambda: "subagent")
+        cache.get(SETTINGS, "providers", lambda: "settings")
+        cache.get(GIT, "/repo", lambda: True)
+
+        cache.on_database_change("profiles", "p1")
+        cache.on_database_change("subagents", "s1")
+        cache.on_database_change("system_settings", "image_model")
+        cache.on_database_change("sessions", "s1")
+
+        assert cache.get_metrics()["entries"] == {PROFILES: 0, SUBAGENTS: 0, SETTINGS: 0, GIT: 1}
+
+    def test_get_metrics(self, cache):
+        cache.get(PROFILES, "p1", lambda: "profile")
+        cache.get(PROFILES, "p1", lambda: "profile")
+
+        metrics = cache.get_metrics()
+
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == 0.5
+        assert metrics["entries"][PROFILES] == 1
+
+
+class TestDatabaseNotifications:
+    """Writes through app/db/database.py reach the global cache"""
+
+    def test_set_system_setting_invalidates_settings(self):
+        from app.core.options_cache import options_cache
+
+        options_cache.get(SETTINGS, "providers", lambda: "cached")
+        with patch.object(database, "get_db"):
+            database.set_system_setting("image_model", "model-2")
+
+        assert options_cache.get(SETTINGS, "providers", lambda: "fresh") == "fresh"
+
+    def test_listener_errors_are_logged(self):
+        listener = MagicMock(side_effect=RuntimeError("boom"))
+        with patch.object(database, "_change_listeners", [listener]):
+            database._notify_change("profiles", "p1")
+
+        listener.assert_called_once_with("profiles", "p1")
+
+
+class TestStageTimer:
+    """Tests for StageTimer and StageClock"""
+
+    def test_record(self):
+        timer = StageTimer()
+        timer.record("connect", 10.0)
+        timer.record("connect", 30.0)
+
+        assert timer.get_metrics() == {"connect": {"count": 2, "avg_ms": 20.0, "max_ms": 30.0}}
+
+    def test_clock_laps(self):
+        timer = StageTimer()
+        with patch("app.core.options_cache.time.perf_counter") as mock_counter:
+            mock_counter.return_value = 1.0
+            clock = timer.clock("options")
+            mock_counter.return_value = 1.002
+            clock.lap("working_dir")
+            mock_counter.return_value = 1.005
+            clock.lap("env")
+            clock.done()
+
+        metrics = timer.get_metrics()
+        assert metrics["options.working_dir"]["avg_ms"] == 2.0
+        assert metrics["options.env"]["avg_ms"] == 3.0
+        assert metrics["options"]["avg_ms"] == 5.0
+
+    def test_reset(self):
+        timer = StageTimer()
+        timer.record("connect", 1.0)
+        timer.reset()
+
+        assert timer.get_metrics() == {}
+
+
+class TestCachedLookups:
+    """Callers that read through the global cache"""
+
+    def test_get_profile_returns_copies(self):
+        from app.core.profiles import get_profile
+
+        with patch("app.core.profiles.database") as mock_db:
+            mock_db.get_profile.return_value = {"id": "p1", "config": {"model": "sonnet"}}
+            first = get_profile("p1")
+            first["config"]["model"] = "opus"
+            second = get_profile("p1")
+
+        mock_db.get_profile.assert_called_once_with("p1")
+        assert second["config"]["model"] == "sonnet"
+
+    def test_get_profile_missing(self):
+        from app.core.profiles import get_profile
+
+        with patch("app.core.profiles.database") as mock_db:
+            mock_db.get_profile.return_value = None
+            assert get_profile("missing") is None
+
+    def test_provider_defaults_loaded_once(self):
+        from app.core.query_engine import _get_available_providers
+
+        with patch("app.core.query_engine.secret_cache") as mock_secrets, \
+                patch("app.core.query_engine.database") as mock_db:
+            mock_secrets.get_admin_keys.return_value = {
+                "image_api_key": None, "openai_api_key": "key", "meshy_api_key": None
+            }
+            mock_db.get_system_settings.return_value = {"image_model": "model-1"}
+            _get_available_providers()
+            _get_available_providers()
+
+        mock_db.get_system_settings.assert_called_once()
+
+    def test_git_status_cached_per_directory(self):
+        from app.core.query_engine import generate_environment_details
+
+        with patch("app.core.query_engine._is_git_repo", return_value=True) as mock_is_git:
+            generate_environment_details("/workspace/a")
+            details = generate_environment_details("/workspace/a")
+            generate_environment_details("/workspace/b")
+
+        assert "Is directory a git repo: Yes" in details
+        assert mock_is_git.call_count == 2
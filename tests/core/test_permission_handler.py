@@ -11,6 +11,7 @@ Tests cover:
 - Session and profile rule management
 - Timeout handling
 - Cancellation of pending requests
+- Compiled rule sets and the profile rule cache
 - Edge cases and error paths
 
 This is security-critical code - comprehensive coverage is essential.
@@ -28,6 +29,7 @@ from app.core.permission_handler import (
     PermissionRequest,
     PermissionRule,
     PermissionHandler,
+    CompiledRuleSet,
     permission_handler,
 )
 
@@ -1253,6 +1255,182 @@ class TestGlobalSingleton:
         assert hasattr(permission_handler, "get_pending_requests")
 
 
+# =============================================================================
+# Compiled Rule Set Tests
+# =============================================================================
+
+def _rule(rule_id: str, tool_name: str, tool_pattern=None, decision=PermissionDecision.ALLOW) -> PermissionRule:
+    return PermissionRule(
+        id=rule_id,
+        session_id=None,
+        profile_id="profile-1",
+        tool_name=tool_name,
+        tool_pattern=tool_pattern,
+        decision=decision
+    )
+
+
+class TestCompiledRuleSet:
+    """Test CompiledRuleSet matching against PermissionRule.matches."""
+
+    def test_empty_rule_set(self):
+        """Should match nothing without rules."""
+        assert CompiledRuleSet([]).match("Bash", {"command": "ls"}) is None
+
+    def test_first_matching_rule_wins(self):
+        """Should return the earliest matching rule in list order."""
+        rules = [
+            _rule("r0", "Bash", "git *", PermissionDecision.DENY),
+            _rule("r1", "Bash", "npm *"),
+            _rule("r2", "Bash", "npm install*", PermissionDecision.DENY),
+        ]
+        rule_set = CompiledRuleSet(rules)
+
+        assert rule_set.match("Bash", {"command": "npm install"}).id == "r1"
+        assert rule_set.match("Bash", {"command": "git push"}).id == "r0"
+        assert rule_set.match("Bash", {"command": "ls"}) is None
+
+    def test_rule_without_pattern_stops_later_rules(self):
+        """Should return a catch-all rule ahead of later pattern rules."""
+        rules = [
+            _rule("r0", "Read", "/etc/*", PermissionDecision.DENY),
+            _rule("r1", "Read"),
+            _rule("r2", "Read", "/home/*", PermissionDecision.DENY),
+        ]
+        rule_set = CompiledRuleSet(rules)
+
+        assert rule_set.match("Read", {"file_path": "/etc/passwd"}).id == "r0"
+        assert rule_set.match("Read", {"file_path": "/home/user/a.txt"}).id == "r1"
+
+    def test_wildcard_rules_match_any_string_value(self):
+        """Should match "*" rules against every string value of the input."""
+        rules = [
+            _rule("r0", "Bash", "rm *", PermissionDecision.DENY),
+            _rule("r1", "*", "*secret*", PermissionDecision.DENY),
+        ]
+        rule_set = CompiledRuleSet(rules)
+
+        assert rule_set.match("Bash", {"command": "cat secret.txt"}).id == "r1"
+        assert rule_set.match("Grep", {"pattern": "x", "path": "/secrets/"}).id == "r1"
+        assert rule_set.match("Grep", {"pattern": "x", "path": "/public/"}) is None
+
+    def test_ignores_other_tools(self):
+        """Should not apply rules of other tools."""
+        rule_set = CompiledRuleSet([_rule("r0", "Read", "*"), _rule("r1", "Write")])
+
+        assert rule_set.match("Bash", {"command": "ls"}) is None
+
+    def test_agrees_with_rule_matches(self):
+        """Should pick the same rule as matching each rule in turn."""
+        import random
+
+        rng = random.Random(7)
+        tools = ["Bash", "Read", "Grep", "WebFetch", "mcp__tool", "*"]
+        patterns = [None, "a*", "*b", "a?c", "[ab]*", "*/x/*", "npm *", "*.py", "http*://*"]
+        values = ["abc", "ab", "npm test", "src/x/y.py", "https://a.b", "b", "a.py", ""]
+
+        for _ in range(200):
+            rules = [
+                _rule(f"r{i}", rng.choice(tools), rng.choice(patterns))
+                for i in range(rng.randint(0, 8))
+            ]
+            rule_set = CompiledRuleSet(rules)
+            for _ in range(10):
+                tool_name = rng.choice(tools[:-1])
+                tool_input = {
+                    "command": rng.choice(values),
+                    "file_path": rng.choice(values),
+                    "path": rng.choice(values),
+                    "url": rng.choice(values),
+                    "count": 3,
+                }
+                expected = next((r for r in rules if r.matches(tool_name, tool_input)), None)
+                assert rule_set.match(tool_name, tool_input) is expected
+
+
+class TestProfileRuleCache:
+    """Test caching of compiled profile rules."""
+
+    @pytest.fixture
+    def handler(self):
+        """Create a fresh PermissionHandler for each test."""
+        return PermissionHandler()
+
+    def _db_rule(self, tool_pattern="npm *"):
+        return {
+            "id": "db-rule-1",
+            "profile_id": "profile-1",
+            "tool_name": "Bash",
+            "tool_pattern": tool_pattern,
+            "decision": "allow"
+        }
+
+    def test_rules_loaded_once_per_profile(self, handler):
+        """Should query the database once for repeated checks."""
+        with patch("app.db.database.get_permission_rules", return_value=[self._db_rule()]) as mock_get:
+            for _ in range(5):
+                assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "npm test"})
+
+        mock_get.assert_called_once_with(profile_id="profile-1")
+
+    def test_invalidate_rules_reloads(self, handler):
+        """Should reload a profile's rules after invalidation."""
+        with patch("app.db.database.get_permission_rules", return_value=[self._db_rule()]):
+            assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "npm test"})
+
+        handler.invalidate_rules("profile-1")
+
+        with patch("app.db.database.get_permission_rules", return_value=[]):
+            assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "npm test"}) is None
+
+    def test_cache_expires(self, handler):
+        """Should reload rules older than permission_rule_cache_seconds."""
+        with patch("app.db.database.get_permission_rules", return_value=[]) as mock_get:
+            with patch("app.core.permission_handler.settings") as mock_settings:
+                mock_settings.permission_rule_cache_seconds = 0
+                handler._check_rules("session-1", "profile-1", "Bash", {"command": "ls"})
+                handler._check_rules("session-1", "profile-1", "Bash", {"command": "ls"})
+
+        assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_remember_profile_invalidates_cache(self, handler):
+        """Should see a rule remembered for the profile on the next check."""
+        with patch("app.db.database.get_permission_rules", return_value=[]):
+            assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "git push"}) is None
+
+        handler._pending_requests["session-1"] = {"req-1": PermissionRequest(
+            request_id="req-1",
+            session_id="session-1",
+            profile_id="profile-1",
+            tool_name="Bash",
+            tool_input={"command": "git push"}
+        )}
+        with patch("app.db.database.add_permission_rule"):
+            await handler.respond("req-1", "session-1", "allow", remember="profile", pattern="git *")
+
+        with patch("app.db.database.get_permission_rules", return_value=[self._db_rule("git *")]):
+            assert handler._check_rules("session-2", "profile-1", "Bash", {"command": "git push"})
+
+    @pytest.mark.asyncio
+    async def test_remember_session_updates_session_rules(self, handler):
+        """Should apply a new session rule after earlier checks compiled the old ones."""
+        handler._session_rules["session-1"] = [_rule("r0", "Read")]
+        with patch("app.db.database.get_permission_rules", return_value=[]):
+            assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "ls"}) is None
+
+            handler._pending_requests["session-1"] = {"req-1": PermissionRequest(
+                request_id="req-1",
+                session_id="session-1",
+                profile_id="profile-1",
+                tool_name="Bash",
+                tool_input={"command": "ls"}
+            )}
+            await handler.respond("req-1", "session-1", "allow", remember="session")
+
+            assert handler._check_rules("session-1", "profile-1", "Bash", {"command": "ls"})
+
+
 # =============================================================================
 # Edge Cases and Security Tests
 # =============================================================================
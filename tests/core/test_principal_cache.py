@@ -0,0 +1,223 @@
+"""
+Unit tests for the authenticated principal cache.
+
+Tests cover:
+- Resolving admin sessions, API key sessions and API keys
+- Cache hits, TTL and session expiry, LRU eviction
+- Invalidation by token and by API user
+- Coalesced last_used_at writes
+- require_auth using the cache
+"""
+
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.principal_cache import (
+    PrincipalCache,
+    ADMIN_SESSION,
+    API_KEY_SESSION,
+    API_KEY,
+    hash_token,
+)
+
+API_USER = {"id": "user-1", "username": "alice", "name": "Alice", "is_active": True}
+
+
+@pytest.fixture
+def mock_db():
+    with patch("app.core.principal_cache.database") as db:
+        db.get_auth_session.return_value = None
+        db.get_api_key_session.return_value = None
+        db.get_api_user_by_key_hash.return_value = None
+        db.get_api_user.return_value = dict(API_USER)
+        yield db
+
+
+class TestLookup:
+    """Test resolving tokens."""
+
+    def test_admin_session(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        principal = PrincipalCache().resolve("t")
+
+        assert principal.kind == ADMIN_SESSION
+        assert principal.is_admin
+        assert principal.rate_limit_user_id == "admin"
+
+    def test_api_key_session(self, mock_db):
+        mock_db.get_api_key_session.return_value = {"api_user_id": "user-1"}
+        principal = PrincipalCache().resolve("t")
+
+        assert principal.kind == API_KEY_SESSION
+        assert principal.api_user_id == "user-1"
+        assert principal.rate_limit_user_id == "alice"
+
+    def test_api_key_skips_session_lookups(self, mock_db):
+        mock_db.get_api_user_by_key_hash.return_value = dict(API_USER)
+        principal = PrincipalCache().resolve("aih_key")
+
+        assert principal.kind == API_KEY
+        mock_db.get_auth_session.assert_not_called()
+        mock_db.get_api_user_by_key_hash.assert_called_once_with(hash_token("aih_key"))
+
+    def test_inactive_user_rejected(self, mock_db):
+        mock_db.get_api_key_session.return_value = {"api_user_id": "user-1"}
+        mock_db.get_api_user.return_value = {**API_USER, "is_active": False}
+
+        assert PrincipalCache().resolve("t") is None
+
+    def test_unknown_token_not_cached(self, mock_db):
+        cache = PrincipalCache()
+        assert cache.resolve("nope") is None
+        assert cache.resolve("nope") is None
+        assert mock_db.get_auth_session.call_count == 2
+
+
+class TestCaching:
+    """Test hits, expiry and eviction."""
+
+    def test_second_resolve_is_a_hit(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache()
+
+        cache.resolve("t")
+        cache.resolve("t")
+
+        assert mock_db.get_auth_session.call_count == 1
+        assert cache.get_metrics()["hits"] == 1
+
+    def test_entries_keyed_by_token_hash(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "secret-token"}
+        cache = PrincipalCache()
+        cache.resolve("secret-token")
+
+        assert list(cache._entries) == [hash_token("secret-token")]
+
+    def test_ttl_expiry(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache(ttl_seconds=60)
+        cache.resolve("t")
+
+        with patch("app.core.principal_cache.time.monotonic", return_value=time.monotonic() + 61):
+            cache.resolve("t")
+
+        assert mock_db.get_auth_session.call_count == 2
+
+    def test_session_expiry_caps_ttl(self, mock_db):
+        expires_at = (datetime.utcnow() + timedelta(seconds=5)).isoformat()
+        mock_db.get_auth_session.return_value = {"token": "t", "expires_at": expires_at}
+        cache = PrincipalCache(ttl_seconds=60)
+        cache.resolve("t")
+
+        with patch("app.core.principal_cache.time.monotonic", return_value=time.monotonic() + 10):
+            cache.resolve("t")
+
+        assert mock_db.get_auth_session.call_count == 2
+
+    def test_ttl_zero_disables(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache(ttl_seconds=0)
+        cache.resolve("t")
+        cache.resolve("t")
+
+        assert mock_db.get_auth_session.call_count == 2
+
+    def test_lru_eviction(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache(max_entries=2)
+        cache.resolve("a")
+        cache.resolve("b")
+        cache.resolve("a")  # b is now least recently used
+        cache.resolve("c")
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    @pytest.mark.asyncio
+    async def test_resolve_async(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache()
+
+        assert (await cache.resolve_async("t")).is_admin
+        assert (await cache.resolve_async("t")).is_admin
+        assert mock_db.get_auth_session.call_count == 1
+
+
+class TestInvalidation:
+    """Test invalidation."""
+
+    def test_invalidate_token(self, mock_db):
+        mock_db.get_auth_session.return_value = {"token": "t"}
+        cache = PrincipalCache()
+        cache.resolve("t")
+
+        cache.invalidate_token("t")
+
+        assert cache.get("t") is None
+
+    def test_invalidate_user_drops_all_tokens(self, mock_db):
+        mock_db.get_api_key_session.return_value = {"api_user_id": "user-1"}
+        mock_db.get_api_user_by_key_hash.return_value = dict(API_USER)
+        cache = PrincipalCache()
+        cache.resolve("session-token")
+        cache.resolve("aih_key")
+
+        cache.invalidate_user("user-1")
+
+        assert cache.get("session-token") is None
+        assert cache.get("aih_key") is None
+
+
+class TestRecordUse:
+    """Test coalesced last_used_at writes."""
+
+    def test_once_per_interval(self):
+        cache = PrincipalCache()
+        with patch("app.core.principal_cache.settings.auth_last_used_interval_seconds", 60):
+            assert cache.should_record_use("user-1") is True
+            assert cache.should_record_use("user-1") is False
+            assert cache.should_record_use("user-2") is True
+
+            with patch("app.core.principal_cache.time.monotonic", return_value=time.monotonic() + 61):
+                assert cache.should_record_use("user-1") is True
+
+
+class TestRequireAuth:
+    """Test require_auth with the global cache."""
+
+    def _request(self, cookie=None, bearer=None):
+        request = MagicMock()
+        request.cookies.get.return_value = cookie
+        request.headers.get.return_value = f"Bearer {bearer}" if bearer else ""
+        request.state = SimpleNamespace()
+        return request
+
+    def test_api_key_looked_up_and_recorded_once(self, mock_db):
+        from app.api.auth import require_auth
+
+        mock_db.get_api_user_by_key_hash.return_value = dict(API_USER)
+        with patch("app.api.auth.db") as auth_db:
+            assert require_auth(self._request(bearer="aih_key")) == "api_key:user-1"
+            request = self._request(bearer="aih_key")
+            assert require_auth(request) == "api_key:user-1"
+
+        mock_db.get_api_user_by_key_hash.assert_called_once()
+        auth_db.update_api_user_last_used.assert_called_once_with("user-1")
+        assert request.state.api_user["id"] == "user-1"
+        assert request.state.is_admin is False
+
+    def test_cookie_api_key_not_accepted(self, mock_db):
+        """An API key is only accepted as a Bearer token."""
+        from app.api.auth import require_auth
+
+        mock_db.get_api_user_by_key_hash.return_value = dict(API_USER)
+        with pytest.raises(HTTPException) as exc:
+            require_auth(self._request(cookie="aih_key"))
+
+        assert exc.value.status_code == 401
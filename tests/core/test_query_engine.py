@@ -39,6 +39,7 @@ from unittest.mock import MagicMock, AsyncMock, patch, PropertyMock
 from typing import Dict, Any
 
 # Import the module under test
+from app.core.queue_manager import RequestQueue, AdmissionError
 from app.core.query_engine import (
     truncate_large_payload,
     write_agents_to_filesystem,
@@ -66,6 +67,9 @@ from app.core.query_engine import (
     get_active_sessions,
     get_streaming_sessions,
     _active_sessions,
+    _queued_queries,
+    _acquire_query_slot,
+    _run_background_query,
     MAX_TOOL_OUTPUT_SIZE,
     MAX_DISPLAY_OUTPUT_SIZE,
     SECURITY_INSTRUCTIONS,
@@ -508,10 +512,14 @@ class TestGetOsVersion:
 class TestGetAvailableProviders:
     """Test _get_available_providers function."""
 
-    @patch("app.core.query_engine._get_decrypted_api_key")
-    def test_no_keys_returns_empty_providers(self, mock_get_key):
+    @staticmethod
+    def _admin_keys(**keys):
+        return {"image_api_key": None, "openai_api_key": None, "meshy_api_key": None, **keys}
+
+    @patch("app.core.query_engine.secret_cache")
+    def test_no_keys_returns_empty_providers(self, mock_secrets):
         """Should return empty providers when no API keys configured."""
-        mock_get_key.return_value = None
+        mock_secrets.get_admin_keys.return_value = self._admin_keys()
 
         result = _get_available_providers()
 
@@ -522,14 +530,10 @@ class TestGetAvailableProviders:
         assert result["has_openai"] is False
         assert result["has_meshy"] is False
 
-    @patch("app.core.query_engine._get_decrypted_api_key")
-    def test_gemini_key_enables_google_providers(self, mock_get_key):
+    @patch("app.core.query_engine.secret_cache")
+    def test_gemini_key_enables_google_providers(self, mock_secrets):
         """Should enable Google providers when Gemini key is available."""
-        def side_effect(key_name):
-            if key_name == "image_api_key":
-                return "test-gemini-key"
-            return None
-        mock_get_key.side_effect = side_effect
+        mock_secrets.get_admin_keys.return_value = self._admin_keys(image_api_key="test-gemini-key")
 
         result = _get_available_providers()
 
@@ -538,14 +542,10 @@ class TestGetAvailableProviders:
         assert "google-veo" in result["video_providers"]
         assert result["has_gemini"] is True
 
-    @patch("app.core.query_engine._get_decrypted_api_key")
-    def test_openai_key_enables_openai_providers(self, mock_get_key):
+    @patch("app.core.query_engine.secret_cache")
+    def test_openai_key_enables_openai_providers(self, mock_secrets):
         """Should enable OpenAI providers when OpenAI key is available."""
-        def side_effect(key_name):
-            if key_name == "openai_api_key":
-                return "test-openai-key"
-            return None
-        mock_get_key.side_effect = side_effect
+        mock_secrets.get_admin_keys.return_value = self._admin_keys(openai_api_key="test-openai-key")
 
         result = _get_available_providers()
 
@@ -553,14 +553,10 @@ class TestGetAvailableProviders:
         assert "openai-sora" in result["video_providers"]
         assert result["has_openai"] is True
 
-    @patch("app.core.query_engine._get_decrypted_api_key")
-    def test_meshy_key_enables_3d_providers(self, mock_get_key):
+    @patch("app.core.query_engine.secret_cache")
+    def test_meshy_key_enables_3d_providers(self, mock_secrets):
         """Should enable Meshy provider when Meshy key is available."""
-        def side_effect(key_name):
-            if key_name == "meshy_api_key":
-                return "test-meshy-key"
-            return None
-        mock_get_key.side_effect = side_effect
+        mock_secrets.get_admin_keys.return_value = self._admin_keys(meshy_api_key="test-meshy-key")
 
         result = _get_available_providers()
 
@@ -625,47 +621,50 @@ class TestBuildAiToolsSection:
 class TestGetDecryptedApiKey:
     """Test _get_decrypted_api_key function."""
 
-    @patch("app.core.query_engine.database")
+    @patch("app.core.credential_service.database")
     def test_returns_none_when_not_found(self, mock_db):
         """Should return None when setting not found."""
-        mock_db.get_system_setting.return_value = None
+        mock_db.get_system_settings.return_value = {}
 
         result = _get_decrypted_api_key("test_key")
 
         assert result is None
 
-    @patch("app.core.query_engine.database")
-    @patch("app.core.query_engine.encryption")
+    @patch("app.core.credential_service.database")
+    @patch("app.core.credential_service.encryption")
     def test_returns_plaintext_value(self, mock_encryption, mock_db):
         """Should return plaintext value when not encrypted."""
-        mock_db.get_system_setting.return_value = "plaintext-key"
+        mock_db.get_system_settings.return_value = {"test_key": "plaintext-key"}
         mock_encryption.is_encrypted.return_value = False
+        mock_encryption.get_key_version.return_value = 0
 
         result = _get_decrypted_api_key("test_key")
 
         assert result == "plaintext-key"
 
-    @patch("app.core.query_engine.database")
-    @patch("app.core.query_engine.encryption")
+    @patch("app.core.credential_service.database")
+    @patch("app.core.credential_service.encryption")
     def test_decrypts_encrypted_value(self, mock_encryption, mock_db):
         """Should decrypt encrypted value."""
-        mock_db.get_system_setting.return_value = "encrypted:secret"
+        mock_db.get_system_settings.return_value = {"test_key": "encrypted:secret"}
         mock_encryption.is_encrypted.return_value = True
         mock_encryption.is_encryption_ready.return_value = True
         mock_encryption.decrypt_value.return_value = "decrypted-secret"
+        mock_encryption.get_key_version.return_value = 0
 
         result = _get_decrypted_api_key("test_key")
 
         assert result == "decrypted-secret"
         mock_encryption.decrypt_value.assert_called_once()
 
-    @patch("app.core.query_engine.database")
-    @patch("app.core.query_engine.encryption")
+    @patch("app.core.credential_service.database")
+    @patch("app.core.credential_service.encryption")
     def test_returns_none_when_encryption_not_ready(self, mock_encryption, mock_db):
         """Should return None when encryption key not available."""
-        mock_db.get_system_setting.return_value = "encrypted:secret"
+        mock_db.get_system_settings.return_value = {"test_key": "encrypted:secret"}
         mock_encryption.is_encrypted.return_value = True
         mock_encryption.is_encryption_ready.return_value = False
+        mock_encryption.get_key_version.return_value = 0
 
         result = _get_decrypted_api_key("test_key")
 
@@ -777,12 +776,14 @@ class TestBuildEnvWithAiTools:
         result = _build_env_with_ai_tools(base, config)
         assert result == base
 
-    @patch("app.core.query_engine._get_decrypted_api_key")
+    @patch("app.core.query_engine.secret_cache")
     @patch("app.core.query_engine.database")
-    def test_injects_gemini_key(self, mock_db, mock_get_key):
+    def test_injects_gemini_key(self, mock_db, mock_secrets):
         """Should inject GEMINI_API_KEY when image tools enabled."""
-        mock_get_key.return_value = "test-gemini-key"
-        mock_db.get_system_setting.return_value = None
+        mock_secrets.get_admin_keys.return_value = {
+            "image_api_key": "test-gemini-key", "openai_api_key": None, "meshy_api_key": None
+        }
+        mock_db.get_system_settings.return_value = {}
 
         config = {"image_generation": True}
         result = _build_env_with_ai_tools({}, config)
@@ -1133,6 +1134,75 @@ class TestStartBackgroundQuery:
             )
 
 
+# =============================================================================
+# Query admission Tests
+# =============================================================================
+
+class TestQueryAdmission:
+    """Test waiting for the global concurrency budget."""
+
+    @pytest.fixture
+    def queue(self):
+        queue = RequestQueue(max_size=10, max_active=1)
+        with patch("app.core.query_engine.request_queue", queue), \
+                patch("app.core.query_engine.rate_limiter") as mock_rate_limiter, \
+                patch("app.core.query_engine.sync_engine") as mock_sync:
+            mock_rate_limiter.get_limit_config.return_value = MagicMock(priority=2)
+            mock_sync.broadcast_event = AsyncMock()
+            self.sync = mock_sync
+            yield queue
+
+    @pytest.mark.asyncio
+    async def test_admitted_at_once(self, queue):
+        """Should not push queue events when admitted immediately."""
+        send = AsyncMock()
+
+        ticket = await _acquire_query_slot("session-1", "user-1", send)
+
+        assert ticket in queue._active
+        send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_queue_position_pushed(self, queue):
+        """Should push the position while waiting, then admission."""
+        ticket = await _acquire_query_slot("session-1", None)
+        send = AsyncMock()
+        waiting = asyncio.create_task(_acquire_query_slot("session-2", "user-1", send))
+        await asyncio.sleep(0.01)
+
+        queued = send.call_args.args[0]
+        assert queued["type"] == "query_queued"
+        assert queued["session_id"] == "session-2"
+        assert queued["position"] == 1
+        assert queue._request_map[queue._user_requests["api:user-1"]].priority == 2
+
+        queue.release(ticket)
+        await waiting
+        assert send.call_args.args[0] == {"type": "query_admitted", "session_id": "session-2"}
+        event = self.sync.broadcast_event.call_args.args[0]
+        assert event.event_type == "query_admitted"
+
+    @pytest.mark.asyncio
+    async def test_background_query_rejected(self):
+        """A rejected background query should end its stream with the error."""
+        with patch("app.core.query_engine.database"), \
+                patch("app.core.query_engine.write_behind") as mock_write_behind, \
+                patch("app.core.query_engine.sync_engine") as mock_sync, \
+                patch("app.core.query_engine._acquire_query_slot", AsyncMock(side_effect=AdmissionError("busy"))):
+            mock_write_behind.barrier = AsyncMock()
+            mock_sync.broadcast_message_added = AsyncMock()
+            mock_sync.broadcast_stream_end = AsyncMock()
+
+            await _run_background_query(
+                "session-1", "hi", {"id": "p"}, None, None, None, None, None, message_id="msg-1"
+            )
+
+        end = mock_sync.broadcast_stream_end.call_args.kwargs
+        assert end["message_id"] == "msg-1"
+        assert end["metadata"] == {"error": "busy"}
+        assert "session-1" not in _queued_queries
+
+
 # =============================================================================
 # interrupt_session Tests
 # =============================================================================
@@ -1150,6 +1220,18 @@ class TestInterruptSession:
         result = await interrupt_session("unknown-session")
         assert result is False
 
+    @pytest.mark.asyncio
+    async def test_cancels_queued_background_query(self):
+        """Should cancel a background query still waiting for admission."""
+        task = asyncio.create_task(asyncio.sleep(60))
+        _queued_queries["queued-session"] = task
+        try:
+            assert await interrupt_session("queued-session") is True
+            await asyncio.gather(task, return_exceptions=True)
+            assert task.cancelled()
+        finally:
+            _queued_queries.clear()
+
     @pytest.mark.asyncio
     async def test_returns_false_for_disconnected_session(self):
         """Should return False when session not connected."""
@@ -1320,11 +1402,13 @@ class TestResolveApiCredential:
         assert result is None
 
     @patch("app.core.query_engine._get_decrypted_api_key")
-    @patch("app.core.query_engine.database")
+    @patch("app.core.credential_service.database")
     def test_returns_admin_key_for_optional_policy(self, mock_db, mock_get_key):
         """Should return admin key when policy is 'optional' and user has no key."""
-        mock_db.get_user_credential_policy.return_value = {"policy": "optional"}
-        mock_db.get_user_credential.return_value = None
+        mock_db.get_all_user_credential_policies.return_value = [
+            {"credential_type": "openai_api_key", "policy": "optional"}
+        ]
+        mock_db.get_all_user_credentials.return_value = []
         mock_get_key.return_value = "admin-openai-key"
 
         result = _resolve_api_credential("openai_api_key", api_user_id="user-123")
@@ -1332,10 +1416,13 @@ class TestResolveApiCredential:
         assert result == "admin-openai-key"
 
     @patch("app.core.query_engine._get_decrypted_api_key")
-    @patch("app.core.query_engine.database")
+    @patch("app.core.credential_service.database")
     def test_returns_admin_key_for_admin_provided_policy(self, mock_db, mock_get_key):
         """Should return admin key when policy is 'admin_provided'."""
-        mock_db.get_user_credential_policy.return_value = {"policy": "admin_provided"}
+        mock_db.get_all_user_credential_policies.return_value = [
+            {"credential_type": "gemini_api_key", "policy": "admin_provided"}
+        ]
+        mock_db.get_all_user_credentials.return_value = []
         mock_get_key.return_value = "admin-gemini-key"
 
         result = _resolve_api_credential("gemini_api_key", api_user_id="user-123")
@@ -1344,32 +1431,49 @@ class TestResolveApiCredential:
         # gemini_api_key maps to image_api_key in admin settings
         mock_get_key.assert_called_with("image_api_key")
 
-    @patch("app.core.query_engine.database")
-    @patch("app.core.query_engine.encryption")
+    @patch("app.core.credential_service.database")
+    @patch("app.core.credential_service.encryption")
     def test_user_provided_policy_uses_user_key(self, mock_encryption, mock_db):
         """Should use user's key when policy is 'user_provided'."""
-        mock_db.get_user_credential_policy.return_value = {"policy": "user_provided"}
-        mock_db.get_user_credential.return_value = {
-            "encrypted_value": "encrypted:user-key"
-        }
+        mock_db.get_all_user_credential_policies.return_value = [
+            {"credential_type": "openai_api_key", "policy": "user_provided"}
+        ]
+        mock_db.get_all_user_credentials.return_value = [
+            {"credential_type": "openai_api_key", "encrypted_value": "encrypted:user-key"}
+        ]
         mock_encryption.is_encrypted.return_value = True
         mock_encryption.is_encryption_ready.return_value = True
         mock_encryption.decrypt_value.return_value = "user-key"
+        mock_encryption.get_key_version.return_value = 0
 
         result = _resolve_api_credential("openai_api_key", api_user_id="user-123")
 
         assert result == "user-key"
 
-    @patch("app.core.query_engine.database")
+    @patch("app.core.credential_service.database")
     def test_user_provided_policy_returns_none_when_no_user_key(self, mock_db):
         """Should return None when policy is 'user_provided' and user has no key."""
-        mock_db.get_user_credential_policy.return_value = {"policy": "user_provided"}
-        mock_db.get_user_credential.return_value = None
+        mock_db.get_all_user_credential_policies.return_value = [
+            {"credential_type": "openai_api_key", "policy": "user_provided"}
+        ]
+        mock_db.get_all_user_credentials.return_value = []
 
         result = _resolve_api_credential("openai_api_key", api_user_id="user-123")
 
         assert result is None
 
+    @patch("app.core.credential_service.database")
+    def test_user_lookups_are_cached(self, mock_db):
+        """Should load a user's policies and credentials once for all credential types."""
+        mock_db.get_all_user_credential_policies.return_value = []
+        mock_db.get_all_user_credentials.return_value = []
+
+        for credential_type in ("openai_api_key", "gemini_api_key", "meshy_api_key"):
+            _resolve_api_credential(credential_type, api_user_id="user-123")
+
+        mock_db.get_all_user_credential_policies.assert_called_once_with("user-123")
+        mock_db.get_all_user_credentials.assert_called_once_with("user-123")
+
 
 # =============================================================================
 # Additional truncate_large_payload Tests
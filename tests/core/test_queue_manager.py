@@ -12,6 +12,8 @@ Tests cover:
 - Concurrent access with asyncio locks
 - Queue clearing and configuration
 - Error handling edge cases
+- Admission: concurrency budget, weighted fair queuing, cancellation,
+  position updates and duration-based estimates
 """
 
 import asyncio
@@ -21,6 +23,7 @@ from unittest.mock import patch, MagicMock
 from typing import Callable
 
 from app.core.queue_manager import (
+    AdmissionError,
     QueuedRequest,
     QueueStatus,
     RequestQueue,
@@ -540,7 +543,8 @@ class TestGetPosition:
 
     @pytest.mark.asyncio
     async def test_get_position_estimated_wait(self, queue):
-        """Estimated wait should be position * process time."""
+        """Estimated wait should be position * process time with one slot."""
+        queue._max_active = 1
         queue.set_process_time_estimate(30)
 
         await queue.enqueue(user_id="u1", api_key_id=None, priority=10, request_data={})
@@ -552,6 +556,20 @@ class TestGetPosition:
         assert status.position == 2
         assert status.estimated_wait_seconds == 60  # 2 * 30
 
+    @pytest.mark.asyncio
+    async def test_get_position_estimated_wait_divides_by_slots(self, queue):
+        """Requests ahead are run a budget's worth at a time."""
+        queue._max_active = 2
+        queue.set_process_time_estimate(30)
+
+        for i in range(3):
+            await queue.enqueue(user_id=f"u{i}", api_key_id=None, priority=5, request_data={})
+
+        status = await queue.get_position(user_id="u2", api_key_id=None)
+
+        assert status.position == 3
+        assert status.estimated_wait_seconds == 60  # ceil(3 / 2) * 30
+
     @pytest.mark.asyncio
     async def test_get_position_respects_priority(self, queue):
         """Position should account for priority ordering."""
@@ -1028,3 +1046,186 @@ class TestEdgeCases:
             api_key_id=None,
         )
         assert result is True
+
+
+class TestAdmission:
+    """Test admission control (acquire/release)."""
+
+    @pytest.fixture
+    def queue(self):
+        """A queue that runs one query at a time."""
+        return RequestQueue(max_size=10, max_active=1)
+
+    async def _waiting(self, queue, user_id, priority=0, on_update=None):
+        task = asyncio.create_task(queue.acquire(user_id, None, priority, on_update=on_update))
+        await asyncio.sleep(0)
+        return task
+
+    @pytest.mark.asyncio
+    async def test_admits_within_budget(self, queue):
+        """Should admit at once while there is room."""
+        ticket = await queue.acquire("u1", None)
+
+        assert queue.get_metrics()["running"] == 1
+        queue.release(ticket)
+        assert queue.get_metrics()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_release(self, queue):
+        """Should queue beyond the budget until a slot is released."""
+        ticket = await queue.acquire("u1", None)
+        waiting = await self._waiting(queue, "u2")
+
+        assert not waiting.done()
+        assert await queue.get_queue_size() == 1
+
+        queue.release(ticket)
+        second = await waiting
+
+        assert second != ticket
+        assert await queue.get_queue_size() == 0
+        assert queue.get_metrics()["running"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unlimited_budget(self):
+        """A budget of 0 should never queue."""
+        queue = RequestQueue(max_active=0)
+
+        tickets = [await queue.acquire(f"u{i}", None) for i in range(20)]
+
+        assert len(set(tickets)) == 20
+        assert await queue.get_queue_size() == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """Should raise AdmissionError when the queue is full."""
+        queue = RequestQueue(max_size=1, max_active=1)
+        await queue.acquire("u1", None)
+        await self._waiting(queue, "u2")
+
+        with pytest.raises(AdmissionError):
+            await queue.acquire("u3", None)
+        assert queue.get_metrics()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_weighted_fair_order(self, queue):
+        """A busy user should not starve others; priority sets the share."""
+        ticket = await queue.acquire("running", None)
+        admitted = []
+
+        async def run(user_id, priority):
+            ticket = await queue.acquire(user_id, None, priority)
+            admitted.append(user_id)
+            queue.release(ticket)
+
+        tasks = [asyncio.create_task(run("busy", 0)) for _ in range(3)]
+        tasks += [asyncio.create_task(run("other", 0)), asyncio.create_task(run("vip", 3))]
+        await asyncio.sleep(0)
+
+        queue.release(ticket)
+        await asyncio.gather(*tasks)
+
+        # vip (weight 4) first; other is interleaved with busy's backlog
+        assert admitted == ["vip", "busy", "other", "busy", "busy"]
+
+    @pytest.mark.asyncio
+    async def test_multiple_requests_per_user(self, queue):
+        """acquire() should queue every request of a user, in order."""
+        ticket = await queue.acquire("u1", None)
+        first = await self._waiting(queue, "u2")
+        second = await self._waiting(queue, "u2")
+
+        queue.release(ticket)
+        ticket = await first
+        assert not second.done()
+        assert await queue.is_user_queued("u2", None)
+
+        queue.release(ticket)
+        await second
+        assert not await queue.is_user_queued("u2", None)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_is_skipped(self, queue):
+        """A request cancelled while queued should give up its place."""
+        ticket = await queue.acquire("u1", None)
+        cancelled = await self._waiting(queue, "u2")
+        waiting = await self._waiting(queue, "u3")
+
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert await queue.get_queue_size() == 1
+
+        queue.release(ticket)
+        await waiting
+        assert queue.get_metrics()["running"] == 1
+
+    @pytest.mark.asyncio
+    async def test_removed_request_stays_in_heap_until_popped(self, queue):
+        """Removal should be O(log n): the heap entry is only marked."""
+        await queue.enqueue(user_id="u1", api_key_id=None, priority=5, request_data={})
+        middle_id = await queue.enqueue(user_id="u2", api_key_id=None, priority=1, request_data={})
+        await queue.enqueue(user_id="u3", api_key_id=None, priority=0, request_data={})
+
+        await queue.remove(middle_id)
+
+        assert len(queue._queue) == 3
+        assert await queue.get_queue_size() == 2
+
+    @pytest.mark.asyncio
+    async def test_clear_rejects_waiters(self, queue):
+        """Waiters should get AdmissionError when the queue is cleared."""
+        await queue.acquire("u1", None)
+        waiting = await self._waiting(queue, "u2")
+
+        await queue.clear()
+
+        with pytest.raises(AdmissionError):
+            await waiting
+
+    @pytest.mark.asyncio
+    async def test_position_updates(self, queue):
+        """Waiters should be told when their position changes."""
+        updates = {"u2": [], "u3": []}
+
+        def recorder(user_id):
+            async def on_update(status):
+                updates[user_id].append(status.position)
+            return on_update
+
+        ticket = await queue.acquire("u1", None)
+        second = await self._waiting(queue, "u2", on_update=recorder("u2"))
+        await self._waiting(queue, "u3", on_update=recorder("u3"))
+        await asyncio.sleep(0)
+
+        queue.release(ticket)
+        await second
+        await asyncio.sleep(0)
+
+        assert updates["u2"] == [1]
+        assert updates["u3"] == [2, 1]
+
+    def test_durations_set_estimate(self, queue):
+        """Wait estimates should follow the rolling average of durations."""
+        queue.record_duration(10_000)
+        queue.record_duration(20_000)
+        queue.record_duration(0)  # Ignored
+
+        assert queue._process_time_estimate == 15
+
+    def test_durations_window(self):
+        """Only the most recent durations should count."""
+        with patch("app.core.queue_manager.settings.query_duration_samples", 2):
+            queue = RequestQueue()
+        for duration_ms in (100_000, 10_000, 20_000):
+            queue.record_duration(duration_ms)
+
+        assert queue._process_time_estimate == 15
+
+    @pytest.mark.asyncio
+    async def test_load_durations(self, queue):
+        """Should seed estimates from usage_log, newest first."""
+        with patch("app.core.queue_manager.database") as mock_db:
+            mock_db.get_recent_query_durations.return_value = [20_000, 40_000]
+            assert await queue.load_durations() == 2
+
+        assert queue._process_time_estimate == 30
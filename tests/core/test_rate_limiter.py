@@ -8,6 +8,7 @@ Tests cover:
 - Rate limit checking and recording
 - Cache management
 - Cleanup operations
+- Persistence of counters
 - Edge cases and error handling
 """
 
@@ -120,7 +121,7 @@ class TestRequestWindow:
 
         window.add_request(now)
 
-        assert len(window.timestamps) == 1
+        assert window.counts(now) == (1, 1, 1)
         assert window.concurrent_count == 1
 
     def test_add_multiple_requests(self):
@@ -131,7 +132,7 @@ class TestRequestWindow:
         for i in range(5):
             window.add_request(now + timedelta(seconds=i))
 
-        assert len(window.timestamps) == 5
+        assert window.counts(now + timedelta(seconds=4)) == (5, 5, 5)
         assert window.concurrent_count == 5
 
     def test_complete_request(self):
@@ -216,8 +217,8 @@ class TestRequestWindow:
         count = window.count_since(datetime.utcnow())
         assert count == 0
 
-    def test_cleanup_old(self):
-        """Should remove old timestamps."""
+    def test_count_since_excludes_older(self):
+        """Should only count requests inside the window."""
         window = RequestWindow()
         now = datetime.utcnow()
 
@@ -226,33 +227,58 @@ class TestRequestWindow:
         window.add_request(now - timedelta(minutes=1))
         window.add_request(now)
 
-        cutoff = now - timedelta(minutes=3)
-        window.cleanup_old(cutoff)
+        assert window.count_since(now - timedelta(minutes=3), now) == 2
 
-        assert len(window.timestamps) == 2
+    def test_old_requests_expire(self):
+        """Requests older than a window should drop out of its count."""
+        window = RequestWindow()
+        now = datetime.utcnow()
+
+        window.add_request(now - timedelta(hours=25))
+        window.add_request(now - timedelta(hours=2))
+        window.add_request(now - timedelta(minutes=30))
 
-    def test_cleanup_preserves_concurrent_count(self):
-        """Cleanup should not affect concurrent count."""
+        assert window.counts(now) == (0, 1, 2)
+        assert window.concurrent_count == 3
+
+    def test_memory_is_fixed(self):
+        """Ring sizes should not grow with the number of requests."""
         window = RequestWindow()
         now = datetime.utcnow()
 
-        window.add_request(now - timedelta(minutes=10))
-        window.add_request(now - timedelta(minutes=5))
+        for i in range(5000):
+            window.add_request(now + timedelta(seconds=i))
+
+        assert len(window.minute.counts) == 61
+        assert len(window.hour.counts) == 61
+        assert len(window.day.counts) == 289
 
-        window.cleanup_old(now - timedelta(minutes=3))
+    def test_is_idle(self):
+        """A window is idle with no requests in a day and none in flight."""
+        window = RequestWindow()
+        now = datetime.utcnow()
+        window.add_request(now - timedelta(hours=30))
 
-        assert window.concurrent_count == 2
+        assert window.is_idle(now) is False
+        window.complete_request()
+        assert window.is_idle(now) is True
 
-    def test_cleanup_removes_all(self):
-        """Cleanup should remove all timestamps if all are old."""
+    def test_dict_roundtrip(self):
+        """Should restore counts from to_dict()."""
         window = RequestWindow()
         now = datetime.utcnow()
+        window.add_request(now - timedelta(hours=3))
+        window.add_request(now - timedelta(seconds=10))
 
-        window.add_request(now - timedelta(hours=2))
-        window.add_request(now - timedelta(hours=1))
+        restored = RequestWindow.from_dict(window.to_dict())
+
+        assert restored.counts(now) == (1, 1, 2)
+        assert restored.concurrent_count == 0
 
-        window.cleanup_old(now)
-        assert len(window.timestamps) == 0
+    def test_from_dict_ignores_other_layouts(self):
+        """Counts saved with a different ring size should be ignored."""
+        restored = RequestWindow.from_dict({"minute": {"head": 1, "counts": [1, 2]}})
+        assert restored.counts(datetime.utcnow()) == (0, 0, 0)
 
 
 class TestRateLimiter:
@@ -436,9 +462,8 @@ class TestRateLimiter:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            limiter._windows[key].add_request(now - timedelta(seconds=30))
-            limiter._windows[key].add_request(now - timedelta(seconds=20))
+        limiter._windows[key].add_request(now - timedelta(seconds=30))
+        limiter._windows[key].add_request(now - timedelta(seconds=20))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -461,9 +486,8 @@ class TestRateLimiter:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            limiter._windows[key].add_request(now - timedelta(minutes=30))
-            limiter._windows[key].add_request(now - timedelta(minutes=20))
+        limiter._windows[key].add_request(now - timedelta(minutes=30))
+        limiter._windows[key].add_request(now - timedelta(minutes=20))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -486,9 +510,8 @@ class TestRateLimiter:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            limiter._windows[key].add_request(now - timedelta(hours=10))
-            limiter._windows[key].add_request(now - timedelta(hours=5))
+        limiter._windows[key].add_request(now - timedelta(hours=10))
+        limiter._windows[key].add_request(now - timedelta(hours=5))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -511,9 +534,8 @@ class TestRateLimiter:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            limiter._windows[key].add_request(now)
-            limiter._windows[key].add_request(now)
+        limiter._windows[key].add_request(now)
+        limiter._windows[key].add_request(now)
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -524,24 +546,21 @@ class TestRateLimiter:
         assert status.retry_after == 5
 
     @pytest.mark.asyncio
-    async def test_check_rate_limit_cleans_old_timestamps(self, limiter, mock_database):
-        """Should clean up old timestamps during check."""
+    async def test_check_rate_limit_ignores_old_requests(self, limiter, mock_database):
+        """Requests older than a day should not count."""
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            limiter._windows[key].timestamps = [
-                now - timedelta(hours=48),
-                now - timedelta(hours=25),
-                now - timedelta(hours=10),
-            ]
-            limiter._windows[key].concurrent_count = 0
+        for hours in (48, 25, 10):
+            limiter._windows[key].add_request(now - timedelta(hours=hours))
+        limiter._windows[key].concurrent_count = 0
 
-        await limiter.check_rate_limit(
+        result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
         )
 
-        assert len(limiter._windows[key].timestamps) == 1
+        assert result == RateLimitResult.ALLOWED
+        assert status.day_count == 1
 
     @pytest.mark.asyncio
     async def test_record_request(self, limiter, mock_database):
@@ -557,8 +576,9 @@ class TestRateLimiter:
         assert len(request_id) == 36
 
         key = limiter._get_key("user123", None)
-        assert len(limiter._windows[key].timestamps) == 1
+        assert limiter._windows[key].counts(datetime.utcnow())[0] == 1
         assert limiter._windows[key].concurrent_count == 1
+        assert key in limiter._dirty
 
     @pytest.mark.asyncio
     async def test_record_request_logs_to_database(self, limiter, mock_database):
@@ -682,22 +702,19 @@ class TestRateLimiter:
         assert status.day_count == 0
 
     def test_cleanup(self, limiter, mock_database):
-        """Should clean up old data from all windows."""
+        """Should drop windows with no requests in the last day."""
         now = datetime.utcnow()
 
-        limiter._windows["user:user1"].timestamps = [
-            now - timedelta(hours=48),
-            now - timedelta(hours=10),
-        ]
-        limiter._windows["user:user2"].timestamps = [
-            now - timedelta(hours=30),
-            now - timedelta(hours=5),
-        ]
+        limiter._windows["user:user1"].add_request(now - timedelta(hours=30))
+        limiter._windows["user:user2"].add_request(now - timedelta(hours=5))
+        for window in limiter._windows.values():
+            window.complete_request()
 
         limiter.cleanup()
 
-        assert len(limiter._windows["user:user1"].timestamps) == 1
-        assert len(limiter._windows["user:user2"].timestamps) == 1
+        assert "user:user1" not in limiter._windows
+        assert "user:user2" in limiter._windows
+        assert "user:user1" in limiter._dirty
 
     def test_cleanup_calls_database(self, limiter, mock_database):
         """Should call database cleanup."""
@@ -724,6 +741,92 @@ class TestRateLimiter:
         assert "100" in caplog.text
 
 
+class TestRateLimiterPersistence:
+    """Test persisting counters across restarts."""
+
+    @pytest.fixture
+    def limiter(self):
+        """Create a fresh rate limiter for each test."""
+        return RateLimiter()
+
+    @pytest.fixture
+    def mock_database(self):
+        """Mock database calls."""
+        with patch("app.core.rate_limiter.database") as mock_db:
+            mock_db.get_rate_limit_for_user.return_value = None
+            mock_db.get_rate_limit_buckets.return_value = []
+            yield mock_db
+
+    @pytest.mark.asyncio
+    async def test_persist_saves_dirty_keys(self, limiter, mock_database):
+        """Should save changed keys only, once."""
+        await limiter.record_request(user_id="user1", api_key_id=None, endpoint="/api/test")
+
+        assert await limiter.persist() == 1
+        buckets, deleted = mock_database.save_rate_limit_buckets.call_args.args
+        assert list(buckets) == ["user:user1"]
+        assert deleted == []
+
+        assert await limiter.persist() == 0
+        mock_database.save_rate_limit_buckets.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_persist_deletes_dropped_keys(self, limiter, mock_database):
+        """Dropped idle windows should be deleted from the database."""
+        limiter._windows["user:user1"].add_request(datetime.utcnow() - timedelta(hours=30))
+        limiter._windows["user:user1"].complete_request()
+
+        assert limiter.drop_idle_windows() == 1
+        await limiter.persist()
+
+        mock_database.save_rate_limit_buckets.assert_called_once_with({}, ["user:user1"])
+
+    @pytest.mark.asyncio
+    async def test_persist_failure_retries(self, limiter, mock_database):
+        """Keys should stay dirty if saving fails."""
+        mock_database.save_rate_limit_buckets.side_effect = Exception("DB Error")
+        await limiter.record_request(user_id="user1", api_key_id=None, endpoint="/api/test")
+
+        assert await limiter.persist() == 0
+        assert limiter._dirty == {"user:user1"}
+
+    @pytest.mark.asyncio
+    async def test_load_restores_counts(self, limiter, mock_database):
+        """Should restore counts without requests in flight."""
+        window = RequestWindow()
+        window.add_request(datetime.utcnow() - timedelta(seconds=5))
+        mock_database.get_rate_limit_buckets.return_value = [
+            {"key": "user:user1", "data": window.to_dict()}
+        ]
+
+        assert await limiter.load() == 1
+
+        status = limiter.get_rate_limit_status(user_id="user1", api_key_id=None)
+        assert status.minute_count == 1
+        assert status.concurrent_count == 0
+
+    @pytest.mark.asyncio
+    async def test_start_disabled(self, limiter, mock_database):
+        """Should neither load nor persist when disabled."""
+        with patch("app.core.rate_limiter.settings.rate_limit_persist_seconds", 0):
+            await limiter.start()
+
+        assert limiter._persist_task is None
+        mock_database.get_rate_limit_buckets.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stop_persists(self, limiter, mock_database):
+        """Stopping should save outstanding counts."""
+        with patch("app.core.rate_limiter.settings.rate_limit_persist_seconds", 3600):
+            await limiter.start()
+        await limiter.record_request(user_id="user1", api_key_id=None, endpoint="/api/test")
+
+        await limiter.stop()
+
+        assert limiter._persist_task is None
+        mock_database.save_rate_limit_buckets.assert_called_once()
+
+
 class TestRateLimiterConcurrency:
     """Test concurrent access to rate limiter."""
 
@@ -812,9 +915,8 @@ class TestRateLimitStatusCalculations:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            for i in range(3):
-                limiter._windows[key].add_request(now - timedelta(seconds=i*10))
+        for i in range(3):
+            limiter._windows[key].add_request(now - timedelta(seconds=i*10))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -839,9 +941,8 @@ class TestRateLimitStatusCalculations:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            for i in range(5):
-                limiter._windows[key].add_request(now - timedelta(seconds=i*10))
+        for i in range(5):
+            limiter._windows[key].add_request(now - timedelta(seconds=i*10))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -902,9 +1003,8 @@ class TestRateLimiterEdgeCases:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            for i in range(3):
-                limiter._windows[key].add_request(now - timedelta(seconds=i*10))
+        for i in range(3):
+            limiter._windows[key].add_request(now - timedelta(seconds=i*10))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
@@ -926,9 +1026,8 @@ class TestRateLimiterEdgeCases:
         key = limiter._get_key("user123", None)
         now = datetime.utcnow()
 
-        async with limiter._lock:
-            for i in range(2):
-                limiter._windows[key].add_request(now - timedelta(seconds=i*10))
+        for i in range(2):
+            limiter._windows[key].add_request(now - timedelta(seconds=i*10))
 
         result, status = await limiter.check_rate_limit(
             user_id="user123", api_key_id=None, is_admin=False
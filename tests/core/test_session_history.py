@@ -0,0 +1,91 @@
+"""
+Unit tests for paginated session history.
+
+Tests cover:
+- Page size resolution from settings
+- Database cursor parsing
+- JSONL first, database fallback
+"""
+
+import pytest
+from unittest.mock import patch
+
+from app.core import session_history
+
+
+class TestResolvePageSize:
+    """Test page size resolution."""
+
+    def test_full_history_by_default(self):
+        """No limit and no configured page size should mean the full history."""
+        with patch.object(session_history.settings, "history_page_size", 0):
+            assert session_history.resolve_page_size(None) is None
+
+    def test_configured_default(self):
+        """The configured page size should be used without a limit."""
+        with patch.object(session_history.settings, "history_page_size", 50):
+            assert session_history.resolve_page_size(None) == 50
+
+    def test_capped(self):
+        """Requested sizes should be capped at history_max_page_size."""
+        with patch.object(session_history.settings, "history_max_page_size", 200):
+            assert session_history.resolve_page_size(5000) == 200
+
+
+class TestParseDbCursor:
+    """Test database cursor parsing."""
+
+    def test_plain_and_prefixed_ids(self):
+        assert session_history.parse_db_cursor("42") == 42
+        assert session_history.parse_db_cursor("msg-42") == 42
+        assert session_history.parse_db_cursor(None) is None
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            session_history.parse_db_cursor("not-an-id")
+
+
+class TestGetHistoryPage:
+    """Test source selection."""
+
+    @pytest.fixture
+    def db_page(self):
+        with patch.object(session_history.database, "get_session_messages_page") as mock_page:
+            mock_page.return_value = {
+                "messages": [{"id": 7, "content": "From DB"}],
+                "total": 1,
+                "has_more_before": False,
+                "has_more_after": False,
+            }
+            yield mock_page
+
+    def test_uses_jsonl_when_available(self, db_page):
+        """A transcript with messages should be paged directly."""
+        page = {"messages": [{"id": "u1"}], "total": 1, "has_more_before": False, "has_more_after": False}
+        with patch.object(session_history.jsonl_parser, "parse_session_history_page", return_value=page):
+            result = session_history.get_history_page({"id": "s1", "sdk_session_id": "sdk"}, "/workspace", 10)
+
+        assert result["source"] == "jsonl"
+        db_page.assert_not_called()
+
+    def test_falls_back_to_database(self, db_page):
+        """Sessions without a transcript should be paged from the database."""
+        with patch.object(session_history.jsonl_parser, "parse_session_history_page", return_value=None):
+            result = session_history.get_history_page({"id": "s1", "sdk_session_id": "sdk"}, "/workspace", 10)
+
+        assert result["source"] == "db"
+        assert result["before_cursor"] == "7"
+        db_page.assert_called_once_with("s1", 10, before_id=None, after_id=None, around_id=None)
+
+    def test_database_cursor_on_jsonl_session(self, db_page):
+        """A session_messages id (e.g. from search) should be found in the database."""
+        with patch.object(
+            session_history.jsonl_parser, "parse_session_history_page",
+            side_effect=ValueError("Unknown message cursor: 7")
+        ):
+            result = session_history.get_history_page(
+                {"id": "s1", "sdk_session_id": "sdk"}, "/workspace", 10, around="7"
+            )
+
+        assert result["source"] == "db"
+        assert db_page.call_args.kwargs["around_id"] == 7
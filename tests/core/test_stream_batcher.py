@@ -0,0 +1,132 @@
+"""
+Unit tests for stream chunk batching.
+
+Tests cover:
+- Merging consecutive deltas of the same stream
+- Flushing on a different stream, a size limit and the time window
+- Disabled batching
+- Per-session frame metrics
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import stream_batcher
+from app.core.stream_batcher import StreamChunkBatcher
+
+
+def _delta(content, delta_type="text", index=0):
+    return {"type": "stream_delta", "delta_type": delta_type, "content": content, "index": index}
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    stream_batcher.clear_metrics()
+    yield
+    stream_batcher.clear_metrics()
+
+
+@pytest.fixture
+def emitted():
+    return []
+
+
+@pytest.fixture
+def make_batcher(emitted):
+    async def emit(event):
+        emitted.append(event)
+
+    def factory(window_ms=1000, max_chars=4096, session_id="session-1"):
+        return StreamChunkBatcher(emit, session_id, window_ms=window_ms, max_chars=max_chars)
+
+    return factory
+
+
+class TestStreamChunkBatcher:
+    """Test delta coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_merges_consecutive_deltas(self, make_batcher, emitted):
+        batcher = make_batcher()
+        for word in ["Hello", " ", "world"]:
+            await batcher.add(_delta(word))
+
+        assert emitted == []
+        await batcher.flush()
+
+        assert emitted == [_delta("Hello world")]
+
+    @pytest.mark.asyncio
+    async def test_different_stream_flushes(self, make_batcher, emitted):
+        """A new block, delta type or subagent starts a new merged event."""
+        batcher = make_batcher()
+        await batcher.add(_delta("think", delta_type="thinking"))
+        await batcher.add(_delta("Hi", index=1))
+        await batcher.add({"type": "subagent_chunk", "agent_id": "a1", "content": "sub"})
+        await batcher.add({"type": "subagent_chunk", "agent_id": "a1", "content": "agent"})
+        await batcher.close()
+
+        assert [event["content"] for event in emitted] == ["think", "Hi", "subagent"]
+        assert emitted[1]["index"] == 1
+
+    @pytest.mark.asyncio
+    async def test_size_limit_flushes(self, make_batcher, emitted):
+        batcher = make_batcher(max_chars=5)
+        await batcher.add(_delta("abc"))
+        await batcher.add(_delta("def"))
+
+        assert emitted == [_delta("abcdef")]
+
+    @pytest.mark.asyncio
+    async def test_window_flushes(self, make_batcher, emitted):
+        batcher = make_batcher(window_ms=10)
+        await batcher.add(_delta("tick"))
+        await asyncio.sleep(0.05)
+
+        assert emitted == [_delta("tick")]
+        await batcher.close()
+        assert len(emitted) == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, make_batcher, emitted):
+        batcher = make_batcher(window_ms=0)
+        await batcher.add(_delta("a"))
+        await batcher.add(_delta("b"))
+
+        assert emitted == [_delta("a"), _delta("b")]
+
+    @pytest.mark.asyncio
+    async def test_emit_errors_are_logged(self):
+        async def failing_emit(event):
+            raise RuntimeError("socket closed")
+
+        batcher = StreamChunkBatcher(failing_emit, "session-1", window_ms=0)
+        await batcher.add(_delta("a"))
+
+
+class TestStreamMetrics:
+    """Test per-session frame counters."""
+
+    @pytest.mark.asyncio
+    async def test_frames_in_and_out(self, make_batcher):
+        batcher = make_batcher()
+        for word in ["a", "b", "c", "d"]:
+            await batcher.add(_delta(word))
+        await batcher.close()
+
+        metrics = stream_batcher.get_metrics()
+        session = metrics["sessions"]["session-1"]
+        assert (metrics["frames_in"], metrics["frames_out"]) == (4, 1)
+        assert session["frames_in"] == 4
+        assert session["frames_out"] == 1
+        assert session["streaming"] is False
+        assert "frames_out_per_second" in session
+
+    def test_registry_is_bounded(self, make_batcher):
+        for i in range(stream_batcher.MAX_TRACKED_SESSIONS + 5):
+            make_batcher(session_id=f"session-{i}")
+
+        sessions = stream_batcher.get_metrics()["sessions"]
+        assert len(sessions) == stream_batcher.MAX_TRACKED_SESSIONS
+        assert "session-0" not in sessions
@@ -0,0 +1,240 @@
+"""
+Unit tests for sync broadcast backends.
+
+Tests cover:
+- In-process backend session ownership
+- SQLite backend publish/poll between workers
+- Ownership expiry
+- Sync engines on different workers: event fan-out, mirrored streaming
+  state, and commands routed to the session owner (with acks)
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.sync_backend import LocalBackend, SQLiteBackend
+from app.core.sync_engine import SyncEngine
+
+
+@pytest.fixture
+async def backends(tmp_path):
+    """Two SQLite backends sharing one file; polled by hand"""
+    path = tmp_path / "sync_bus.sqlite"
+    started = []
+
+    async def start(worker_id, handler=None):
+        backend = SQLiteBackend(path, worker_id=worker_id, poll_interval=3600)
+        await backend.start(handler or AsyncMock())
+        started.append(backend)
+        return backend
+
+    yield start
+    for backend in started:
+        await backend.stop()
+
+
+@pytest.fixture
+async def engines(backends):
+    """Two sync engines on different workers"""
+    engine_a, engine_b = SyncEngine(), SyncEngine()
+    await engine_a.start_backend(await backends("worker-a", engine_a._on_backend_message))
+    await engine_b.start_backend(await backends("worker-b", engine_b._on_backend_message))
+    return engine_a, engine_b
+
+
+class TestLocalBackend:
+    """Test the in-process backend."""
+
+    @pytest.mark.asyncio
+    async def test_ownership(self):
+        backend = LocalBackend(worker_id="worker-1")
+        assert await backend.owner_of("session-1") is None
+
+        await backend.claim_session("session-1")
+        assert await backend.owner_of("session-1") == "worker-1"
+
+        await backend.release_session("session-1")
+        assert await backend.owner_of("session-1") is None
+
+
+class TestSQLiteBackend:
+    """Test the SQLite backend."""
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_other_workers_only(self, backends):
+        handler_a, handler_b = AsyncMock(), AsyncMock()
+        backend_a = await backends("worker-a", handler_a)
+        backend_b = await backends("worker-b", handler_b)
+
+        await backend_a.publish({"kind": "global", "message": {"n": 1}})
+
+        assert await backend_b.poll() == 1
+        assert await backend_a.poll() == 0
+        handler_b.assert_called_once_with({"kind": "global", "message": {"n": 1}, "origin": "worker-a"})
+        handler_a.assert_not_called()
+        assert await backend_b.poll() == 0
+
+    @pytest.mark.asyncio
+    async def test_messages_before_start_not_delivered(self, backends):
+        backend_a = await backends("worker-a")
+        await backend_a.publish({"kind": "global", "message": {}})
+
+        backend_b = await backends("worker-b")
+        assert await backend_b.poll() == 0
+
+    @pytest.mark.asyncio
+    async def test_ownership_shared_and_expires(self, backends):
+        backend_a = await backends("worker-a")
+        backend_b = await backends("worker-b")
+
+        await backend_a.claim_session("session-1")
+        assert await backend_b.owner_of("session-1") == "worker-a"
+
+        backend_b.owner_ttl_seconds = 0
+        time.sleep(0.01)
+        assert await backend_b.owner_of("session-1") is None
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_owned_sessions(self, backends):
+        backend_a = await backends("worker-a")
+        backend_b = await backends("worker-b")
+        await backend_a.claim_session("session-1")
+
+        await backend_a.stop()
+
+        assert await backend_b.owner_of("session-1") is None
+
+
+class TestSyncEngineFanOut:
+    """Test sync engines on different workers."""
+
+    @pytest.mark.asyncio
+    async def test_remote_devices_receive_events(self, engines):
+        engine_a, engine_b = engines
+        ws = AsyncMock()
+        await engine_b.register_device("device-b", "session-1", ws)
+
+        await engine_a.broadcast_message_added("session-1", {"role": "user", "content": "hi"})
+        await engine_b.backend.poll()
+        await engine_b.flush()
+
+        event = json.loads(ws.send_text.call_args.args[0])
+        assert event["event_type"] == "message_added"
+        assert event["data"]["message"]["content"] == "hi"
+
+    @pytest.mark.asyncio
+    async def test_streaming_state_mirrored(self, engines):
+        """Late joiners on another worker should see the streaming buffer."""
+        engine_a, engine_b = engines
+
+        await engine_a.broadcast_stream_start("session-1", "msg-1")
+        await engine_a.broadcast_stream_chunk("session-1", "msg-1", "text", {"content": "Hello"})
+        await engine_a.broadcast_stream_chunk("session-1", "msg-1", "text", {"content": " world"})
+        await engine_b.backend.poll()
+
+        assert engine_b.is_session_streaming("session-1")
+        assert engine_b.get_streaming_buffer("session-1")[0]["content"] == "Hello world"
+
+        await engine_a.broadcast_stream_end("session-1", "msg-1")
+        await engine_b.backend.poll()
+        assert not engine_b.is_session_streaming("session-1")
+
+    @pytest.mark.asyncio
+    async def test_global_events_fan_out(self, engines):
+        engine_a, engine_b = engines
+        ws = AsyncMock()
+        await engine_b.register_global_device("device-b", ws)
+
+        await engine_a.broadcast_global("session_created", {"id": "session-1"})
+        await engine_b.backend.poll()
+
+        assert ws.send_json.call_args.args[0]["event_type"] == "session_created"
+
+    @pytest.mark.asyncio
+    async def test_command_routed_to_owner(self, engines):
+        engine_a, engine_b = engines
+        interrupt = AsyncMock()
+        engine_a.register_command("interrupt", interrupt)
+        engine_b.register_command("interrupt", AsyncMock())
+        await engine_a.claim_session("session-1")
+
+        assert await engine_b.is_owned_elsewhere("session-1")
+        assert await engine_b.route_command("session-1", "interrupt", reason="stop")
+        await engine_a.backend.poll()
+        await asyncio.gather(*engine_a._command_tasks)
+
+        interrupt.assert_called_once_with("session-1", {"reason": "stop"})
+        engine_b._command_handlers["interrupt"].assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_routed_command_waits_for_ack(self, engines):
+        """With ack_timeout the sender should return only after the owner ran the command."""
+        engine_a, engine_b = engines
+        interrupt = AsyncMock()
+        engine_a.register_command("interrupt", interrupt)
+        await engine_a.claim_session("session-1")
+
+        routed = asyncio.create_task(engine_b.route_command("session-1", "interrupt", ack_timeout=5))
+        await asyncio.sleep(0.05)
+        await engine_a.backend.poll()
+        await asyncio.gather(*engine_a._command_tasks)
+        assert not routed.done()
+
+        await engine_b.backend.poll()
+
+        assert await asyncio.wait_for(routed, 1) is True
+        interrupt.assert_called_once()
+        assert engine_b._command_replies == {}
+
+    @pytest.mark.asyncio
+    async def test_routed_command_done_when_owner_releases(self, engines):
+        """The wait should also end when the owner gives up the session."""
+        engine_a, engine_b = engines
+        await engine_a.claim_session("session-1")
+
+        with patch("app.core.sync_engine.COMMAND_OWNER_CHECK_SECONDS", 0.01):
+            routed = asyncio.create_task(engine_b.route_command("session-1", "interrupt", ack_timeout=5))
+            await asyncio.sleep(0.05)
+            await engine_a.release_session("session-1")
+
+            assert await asyncio.wait_for(routed, 1) is True
+
+    @pytest.mark.asyncio
+    async def test_routed_command_ack_timeout(self, engines):
+        """An owner that neither answers nor releases should time the sender out."""
+        engine_a, engine_b = engines
+        await engine_a.claim_session("session-1")
+
+        with patch("app.core.sync_engine.COMMAND_OWNER_CHECK_SECONDS", 0.01), \
+             pytest.raises(asyncio.TimeoutError):
+            await engine_b.route_command("session-1", "interrupt", ack_timeout=0.05)
+
+        assert engine_b._command_replies == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_command_does_not_block_delivery(self, engines):
+        """A command handler that waits should not hold up other backend messages."""
+        engine_a, _ = engines
+        release = asyncio.Event()
+
+        async def slow(session_id, args):
+            await release.wait()
+
+        engine_a.register_command("interrupt", slow)
+        message = {"kind": "command", "target": "worker-a", "command": "interrupt", "session_id": "session-1"}
+
+        await asyncio.wait_for(engine_a._on_backend_message(message), 1)
+
+        assert len(engine_a._command_tasks) == 1
+        release.set()
+        await asyncio.gather(*engine_a._command_tasks)
+
+    @pytest.mark.asyncio
+    async def test_unowned_command_handled_locally(self, engines):
+        _, engine_b = engines
+        assert await engine_b.route_command("session-1", "interrupt") is False
+        assert not await engine_b.is_owned_elsewhere("session-1")
@@ -7,14 +7,18 @@ Tests cover:
 - StreamingBuffer chunk handling for all types
 - SyncEngine device registration/unregistration
 - Event broadcasting with device exclusion
+- Per-device send queues (slow devices, coalescing, resync on overflow)
+- Global WebSocket broadcasting with project scoping
 - Streaming lifecycle (start, chunk, end)
 - Session state management
+- Event replay for reconnecting devices and long-polling
 - Stale connection cleanup
 - Concurrent operations and error handling
 """
 
 import pytest
 import asyncio
+import json
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch, PropertyMock
 from typing import Dict, Any
@@ -26,6 +30,18 @@ from app.core.sync_engine import (
     SyncEngine,
     sync_engine,
 )
+from app.core.ws_transport import serialize_json
+
+
+def json_events(ws) -> list:
+    """Events a mock websocket received so far."""
+    return [json.loads(call.args[0]) for call in ws.send_text.call_args_list]
+
+
+async def sent_events(engine: SyncEngine, ws) -> list:
+    """Events a mock websocket received once the engine's send queues drained."""
+    await engine.flush()
+    return json_events(ws)
 
 
 # =============================================================================
@@ -326,6 +342,44 @@ class TestStreamingBuffer:
 
         assert buffer.get_messages() == []
 
+    def test_text_after_tool_use_starts_new_message(self):
+        """Text following a tool use should go into a new text message."""
+        buffer = StreamingBuffer(session_id="session-123")
+        buffer.add_chunk(chunk_type="text", content="Before")
+        buffer.add_chunk(chunk_type="tool_use", content="", tool_name="Read", tool_id="tool-1")
+        buffer.add_chunk(chunk_type="text", content="After")
+        buffer.add_chunk(chunk_type="text", content=" tool")
+
+        messages = buffer.get_messages()
+        assert [m["type"] for m in messages] == ["text", "tool_use", "text"]
+        assert messages[0]["content"] == "Before"
+        assert messages[2]["content"] == "After tool"
+        assert messages[2]["streaming"] is True
+
+    def test_snapshot_sees_later_chunks(self):
+        """Snapshots taken while streaming should include text added since."""
+        buffer = StreamingBuffer(session_id="session-123")
+        buffer.add_chunk(chunk_type="text", content="Hello")
+        assert buffer.get_messages()[0]["content"] == "Hello"
+
+        buffer.add_chunk(chunk_type="text", content=" again")
+        assert buffer.get_messages()[0]["content"] == "Hello again"
+
+    def test_many_tools_results_matched_by_id(self):
+        """Results should land on their tool_use in long agentic runs."""
+        buffer = StreamingBuffer(session_id="session-123")
+        for i in range(500):
+            buffer.add_chunk(chunk_type="text", content=f"step {i}")
+            buffer.add_chunk(chunk_type="tool_use", content="", tool_name="Bash", tool_id=f"tool-{i}")
+        for i in reversed(range(500)):
+            buffer.add_chunk(chunk_type="tool_result", content=f"out {i}", tool_id=f"tool-{i}")
+
+        messages = buffer.get_messages()
+        assert len(messages) == 1000
+        assert messages[1]["tool_result"] == "out 0"
+        assert messages[999]["tool_result"] == "out 499"
+        assert all(not m["streaming"] for m in messages)
+
 
 # =============================================================================
 # SyncEngine Tests
@@ -573,7 +627,7 @@ class TestSyncEngineStreaming:
             usage={"input_tokens": 100, "cache_read_input_tokens": 50}
         )
 
-        call_args = mock_ws.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, mock_ws))[-1]
         assert call_args["data"]["usage"] == {"input_tokens": 100, "cache_read_input_tokens": 50}
 
     @pytest.mark.asyncio
@@ -617,7 +671,7 @@ class TestSyncEngineStreaming:
         )
 
         # Get last call (stream_end)
-        call_args = mock_ws.send_json.call_args_list[-1][0][0]
+        call_args = (await sent_events(engine, mock_ws))[-1]
         assert call_args["event_type"] == "stream_end"
         assert call_args["data"]["metadata"] == {"tokens": 500}
         assert call_args["data"]["interrupted"] is True
@@ -662,9 +716,9 @@ class TestSyncEngineStreaming:
 
         # Find the stream_chunk call
         chunk_call = None
-        for call in mock_ws.send_json.call_args_list:
-            if call[0][0].get("event_type") == "stream_chunk":
-                chunk_call = call[0][0]
+        for event in await sent_events(engine, mock_ws):
+            if event.get("event_type") == "stream_chunk":
+                chunk_call = event
                 break
 
         assert chunk_call is not None
@@ -703,9 +757,9 @@ class TestSyncEngineBroadcast:
 
         await engine.broadcast_event(event)
 
-        ws1.send_json.assert_called_once()
-        ws2.send_json.assert_called_once()
-        ws3.send_json.assert_called_once()
+        assert len(await sent_events(engine, ws1)) == 1
+        assert len(await sent_events(engine, ws2)) == 1
+        assert len(await sent_events(engine, ws3)) == 1
 
     @pytest.mark.asyncio
     async def test_broadcast_event_excludes_source_device(self):
@@ -725,8 +779,8 @@ class TestSyncEngineBroadcast:
 
         await engine.broadcast_event(event, exclude_device_id="device-1")
 
-        ws1.send_json.assert_not_called()
-        ws2.send_json.assert_called_once()
+        assert await sent_events(engine, ws1) == []
+        assert len(await sent_events(engine, ws2)) == 1
 
     @pytest.mark.asyncio
     async def test_broadcast_event_cleans_failed_connections(self):
@@ -734,7 +788,7 @@ class TestSyncEngineBroadcast:
         engine = SyncEngine()
         ws_good = AsyncMock()
         ws_bad = AsyncMock()
-        ws_bad.send_json.side_effect = Exception("Connection lost")
+        ws_bad.send_text.side_effect = Exception("Connection lost")
 
         await engine.register_device("device-good", "session-1", ws_good)
         await engine.register_device("device-bad", "session-1", ws_bad)
@@ -746,6 +800,7 @@ class TestSyncEngineBroadcast:
         )
 
         await engine.broadcast_event(event)
+        await engine.flush()
 
         assert "device-good" in engine._connections["session-1"]
         assert "device-bad" not in engine._connections["session-1"]
@@ -777,7 +832,7 @@ class TestSyncEngineBroadcast:
             source_device_id="device-2"
         )
 
-        call_args = mock_ws.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, mock_ws))[-1]
         assert call_args["event_type"] == "message_added"
         assert call_args["data"]["message"]["content"] == "Hello"
 
@@ -793,7 +848,7 @@ class TestSyncEngineBroadcast:
             updates={"title": "New Title"}
         )
 
-        call_args = mock_ws.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, mock_ws))[-1]
         assert call_args["event_type"] == "session_updated"
         assert call_args["data"]["updates"]["title"] == "New Title"
 
@@ -814,10 +869,10 @@ class TestSyncEngineBroadcast:
         )
 
         # Both devices should receive rewind event (even source)
-        ws1.send_json.assert_called_once()
-        ws2.send_json.assert_called_once()
+        assert len(await sent_events(engine, ws1)) == 1
+        assert len(await sent_events(engine, ws2)) == 1
 
-        call_args = ws1.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, ws1))[-1]
         assert call_args["event_type"] == "session_rewound"
         assert call_args["data"]["messages_removed"] == 5
 
@@ -837,10 +892,10 @@ class TestSyncEngineBroadcast:
         )
 
         # Source device should be excluded
-        ws1.send_json.assert_not_called()
-        ws2.send_json.assert_called_once()
+        assert await sent_events(engine, ws1) == []
+        assert len(await sent_events(engine, ws2)) == 1
 
-        call_args = ws2.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, ws2))[-1]
         assert call_args["event_type"] == "session_opened"
         assert call_args["data"]["is_new"] is True
 
@@ -859,13 +914,178 @@ class TestSyncEngineBroadcast:
         )
 
         # Source device should be excluded
-        ws1.send_json.assert_not_called()
-        ws2.send_json.assert_called_once()
+        assert await sent_events(engine, ws1) == []
+        assert len(await sent_events(engine, ws2)) == 1
 
-        call_args = ws2.send_json.call_args[0][0]
+        call_args = (await sent_events(engine, ws2))[-1]
         assert call_args["event_type"] == "session_closed"
 
 
+class TestSyncEngineSendQueues:
+    """Test per-device send queues."""
+
+    @staticmethod
+    def _blocked_ws():
+        """A websocket whose sends wait until release is set."""
+        release = asyncio.Event()
+        ws = AsyncMock()
+
+        async def send_text(payload):
+            await release.wait()
+
+        ws.send_text.side_effect = send_text
+        return ws, release
+
+    @pytest.mark.asyncio
+    async def test_slow_device_does_not_block_others(self):
+        """A device that never finishes sending should not delay other devices."""
+        engine = SyncEngine()
+        slow_ws, release = self._blocked_ws()
+        fast_ws = AsyncMock()
+        await engine.register_device("slow", "session-1", slow_ws)
+        await engine.register_device("fast", "session-1", fast_ws)
+
+        for i in range(3):
+            await asyncio.wait_for(engine.broadcast_message_added("session-1", {"content": f"m{i}"}), timeout=1)
+        await asyncio.wait_for(engine._connections["session-1"]["fast"].drain(), timeout=1)
+
+        assert [e["data"]["message"]["content"] for e in json_events(fast_ws)] == ["m0", "m1", "m2"]
+        release.set()
+        await engine.flush()
+        assert slow_ws.send_text.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_event_serialized_once_per_broadcast(self):
+        """The event should be serialized once, not once per device."""
+        engine = SyncEngine()
+        for i in range(3):
+            await engine.register_device(f"device-{i}", "session-1", AsyncMock())
+
+        with patch("app.core.ws_transport.serialize_json", wraps=serialize_json) as spy:
+            await engine.broadcast_message_added("session-1", {"content": "hi"})
+            await engine.flush()
+
+        assert spy.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_text_chunks_coalesced_when_behind(self):
+        """Queued text chunks of the same message should be sent as one."""
+        engine = SyncEngine()
+        ws, release = self._blocked_ws()
+        await engine.register_device("device-1", "session-1", ws)
+
+        await engine.broadcast_stream_start("session-1", "msg-1")
+        for word in ("Hello", " big", " world"):
+            await engine.broadcast_stream_chunk("session-1", "msg-1", "text", {"content": word})
+        release.set()
+        events = await sent_events(engine, ws)
+
+        assert [e["event_type"] for e in events] == ["stream_start", "stream_chunk"]
+        assert events[1]["data"]["content"] == "Hello big world"
+        assert engine.get_metrics()["events_coalesced"] == 2
+
+    @pytest.mark.asyncio
+    async def test_overflow_requests_resync(self):
+        """A full queue should be replaced by a resync_required event."""
+        engine = SyncEngine()
+        ws, release = self._blocked_ws()
+        with patch("app.core.sync_engine.settings") as mock_settings:
+            mock_settings.sync_send_queue_size = 2
+            await engine.register_device("device-1", "session-1", ws)
+
+        # The first event is taken by the writer, the next two fill the queue
+        await engine.broadcast_message_added("session-1", {"content": "m0"})
+        await asyncio.sleep(0)
+        for i in range(1, 4):
+            await engine.broadcast_message_added("session-1", {"content": f"m{i}"})
+        release.set()
+        events = await sent_events(engine, ws)
+
+        assert [e["event_type"] for e in events] == ["message_added", "resync_required", "message_added"]
+        assert events[1]["data"] == {"reason": "slow_consumer", "dropped": 2}
+        assert events[2]["data"]["message"]["content"] == "m3"
+        assert engine.get_metrics()["events_dropped"] == 2
+
+    @pytest.mark.asyncio
+    async def test_unregister_stops_writer(self):
+        """Unregistering should drop queued events for the device."""
+        engine = SyncEngine()
+        ws, release = self._blocked_ws()
+        await engine.register_device("device-1", "session-1", ws)
+        conn = engine._connections["session-1"]["device-1"]
+
+        await engine.broadcast_message_added("session-1", {"content": "m0"})
+        await engine.broadcast_message_added("session-1", {"content": "m1"})
+        await engine.unregister_device("device-1", "session-1")
+
+        assert conn.closed is True
+        assert conn.queued == 0
+
+
+class TestSyncEngineGlobalBroadcast:
+    """Test global WebSocket registration and broadcasting."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_global_to_all_devices(self):
+        """Should send the event to every global connection."""
+        engine = SyncEngine()
+        ws1 = AsyncMock()
+        ws2 = AsyncMock()
+        await engine.register_global_device("device-1", ws1)
+        await engine.register_global_device("device-2", ws2)
+
+        await engine.broadcast_global("knowledge_ingest_progress", {"status": "started"})
+
+        for ws in (ws1, ws2):
+            message = ws.send_json.call_args[0][0]
+            assert message["event_type"] == "knowledge_ingest_progress"
+            assert message["data"] == {"status": "started"}
+
+    @pytest.mark.asyncio
+    async def test_broadcast_global_respects_project_scope(self):
+        """API users scoped to another project should not receive the event."""
+        engine = SyncEngine()
+        admin_ws = AsyncMock()
+        scoped_ws = AsyncMock()
+        other_ws = AsyncMock()
+        await engine.register_global_device("admin", admin_ws)
+        await engine.register_global_device("scoped", scoped_ws, {"id": "u1", "project_id": "project-1"})
+        await engine.register_global_device("other", other_ws, {"id": "u2", "project_id": "project-2"})
+
+        await engine.broadcast_global("knowledge_ingest_progress", {}, project_id="project-1")
+
+        admin_ws.send_json.assert_called_once()
+        scoped_ws.send_json.assert_called_once()
+        other_ws.send_json.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_broadcast_global_drops_failed_connections(self):
+        """Connections that fail to send should be unregistered."""
+        engine = SyncEngine()
+        ws = AsyncMock()
+        ws.send_json.side_effect = Exception("closed")
+        await engine.register_global_device("device-1", ws)
+
+        await engine.broadcast_global("event", {})
+
+        assert "device-1" not in engine._global_connections
+
+    @pytest.mark.asyncio
+    async def test_unregister_global_ignores_replaced_websocket(self):
+        """A stale websocket should not unregister a newer connection."""
+        engine = SyncEngine()
+        old_ws = AsyncMock()
+        new_ws = AsyncMock()
+        await engine.register_global_device("device-1", old_ws)
+        await engine.register_global_device("device-1", new_ws)
+
+        await engine.unregister_global_device("device-1", old_ws)
+        assert engine._global_connections["device-1"].websocket is new_ws
+
+        await engine.unregister_global_device("device-1", new_ws)
+        assert "device-1" not in engine._global_connections
+
+
 class TestSyncEngineSessionState:
     """Test session state management."""
 
@@ -912,6 +1132,137 @@ class TestSyncEngineSessionState:
         assert state["connected_devices"] == 0
 
 
+class TestSyncEngineReplay:
+    """Test sequence numbers, replay on reconnect and long-polling."""
+
+    @pytest.mark.asyncio
+    async def test_events_numbered_in_order(self):
+        """Delivered events should carry increasing sequence numbers."""
+        engine = SyncEngine()
+        ws = AsyncMock()
+        await engine.register_device("device-1", "session-1", ws)
+
+        for i in range(3):
+            await engine.broadcast_message_added("session-1", {"id": i})
+
+        seqs = [event["seq"] for event in await sent_events(engine, ws)]
+        assert seqs == [1, 2, 3]
+        state = await engine.get_session_state("session-1")
+        assert state["latest_sync_id"] == 3
+        assert state["sync_epoch"] == engine.epoch
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_events_before_live_ones(self):
+        """A reconnecting device should get a gap-free sequence."""
+        engine = SyncEngine()
+        await engine.broadcast_message_added("session-1", {"id": "seen"})
+        await engine.broadcast_message_added("session-2", {"id": "other"})
+        await engine.broadcast_message_added("session-1", {"id": "missed-1"})
+        await engine.broadcast_message_added("session-1", {"id": "missed-2"})
+
+        ws = AsyncMock()
+        await engine.resume_device("device-1", "session-1", ws, since_seq=1, epoch=engine.epoch)
+        await engine.broadcast_message_added("session-1", {"id": "live"})
+
+        events = await sent_events(engine, ws)
+        assert [e["data"]["message"]["id"] for e in events] == ["missed-1", "missed-2", "live"]
+        assert [e["seq"] for e in events] == [3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_resume_up_to_date(self):
+        """Nothing should be replayed to a device that saw everything."""
+        engine = SyncEngine()
+        await engine.broadcast_message_added("session-1", {"id": 1})
+
+        ws = AsyncMock()
+        await engine.resume_device("device-1", "session-1", ws, since_seq=1, epoch=engine.epoch)
+
+        assert await sent_events(engine, ws) == []
+
+    @pytest.mark.asyncio
+    async def test_resume_from_other_epoch_requires_resync(self):
+        """Sequence numbers from before a restart can't be resumed."""
+        engine = SyncEngine()
+        await engine.broadcast_message_added("session-1", {"id": 1})
+
+        ws = AsyncMock()
+        await engine.resume_device("device-1", "session-1", ws, since_seq=1, epoch="old-epoch")
+
+        events = await sent_events(engine, ws)
+        assert [e["event_type"] for e in events] == ["resync_required"]
+        assert events[0]["data"]["epoch"] == engine.epoch
+
+    @pytest.mark.asyncio
+    async def test_resume_past_buffer_requires_resync(self):
+        """Events evicted from the replay log can't be replayed."""
+        engine = SyncEngine()
+        with patch("app.core.sync_engine.settings.sync_replay_buffer_size", 2):
+            for i in range(5):
+                await engine.broadcast_message_added("session-1", {"id": i})
+
+            replay = await engine.replay("session-1", 1, engine.epoch)
+            assert replay["complete"] is False
+
+            replay = await engine.replay("session-1", 3, engine.epoch)
+            assert replay["complete"] is True
+            assert [e["seq"] for e in replay["events"]] == [4, 5]
+
+    @pytest.mark.asyncio
+    async def test_evicted_session_requires_resync(self):
+        """Dropping the least recently active session's log should be detected."""
+        engine = SyncEngine()
+        with patch("app.core.sync_engine.settings.sync_replay_sessions", 1):
+            await engine.broadcast_message_added("session-1", {"id": 1})
+            await engine.broadcast_message_added("session-1", {"id": 2})
+            await engine.broadcast_message_added("session-2", {"id": 3})
+
+            assert (await engine.replay("session-1", 1))["complete"] is False
+            assert (await engine.replay("session-1", 2))["complete"] is True
+
+    @pytest.mark.asyncio
+    async def test_overflow_replayed_from_database(self):
+        """With overflow on, evicted events should be read back from sync_log."""
+        engine = SyncEngine()
+        rows = []
+        write_behind = MagicMock()
+        write_behind.barrier = AsyncMock()
+        write_behind.add_sync_log.side_effect = lambda **kwargs: rows.append(kwargs["data"])
+
+        async def run_read(func, session_id, after_seq):
+            return [row for row in rows if row["event"]["seq"] > after_seq]
+
+        with patch("app.core.sync_engine.settings.sync_replay_buffer_size", 2), \
+                patch("app.core.sync_engine.settings.sync_replay_overflow", True), \
+                patch("app.core.sync_engine.write_behind", write_behind), \
+                patch("app.core.sync_engine.async_database.run_read", run_read):
+            for i in range(5):
+                await engine.broadcast_message_added("session-1", {"id": i})
+
+            replay = await engine.replay("session-1", 1, engine.epoch)
+
+        assert write_behind.add_sync_log.call_count == 3
+        assert replay["complete"] is True
+        assert [e["seq"] for e in replay["events"]] == [2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_long_poll_wakes_on_event(self):
+        """wait_for_events should return as soon as an event is recorded."""
+        engine = SyncEngine()
+        waiter = asyncio.create_task(engine.wait_for_events("session-1", 0, timeout=5))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await engine.broadcast_message_added("session-1", {"id": 1})
+
+        assert await asyncio.wait_for(waiter, 1) is True
+
+    @pytest.mark.asyncio
+    async def test_long_poll_times_out(self):
+        """wait_for_events should return False when nothing happens."""
+        engine = SyncEngine()
+        assert await engine.wait_for_events("session-1", 0, timeout=0.01) is False
+
+
 class TestSyncEngineCleanup:
     """Test stale connection cleanup."""
 
@@ -1005,7 +1356,7 @@ class TestSyncEngineConcurrency:
         # Broadcast 10 messages concurrently
         await asyncio.gather(*[broadcast_message(i) for i in range(10)])
 
-        assert mock_ws.send_json.call_count == 10
+        assert len(await sent_events(engine, mock_ws)) == 10
 
     @pytest.mark.asyncio
     async def test_concurrent_register_unregister(self):
@@ -1126,7 +1477,7 @@ class TestSyncEngineErrorHandling:
         """Should handle websocket send errors gracefully."""
         engine = SyncEngine()
         bad_ws = AsyncMock()
-        bad_ws.send_json.side_effect = ConnectionError("Client disconnected")
+        bad_ws.send_text.side_effect = ConnectionError("Client disconnected")
 
         await engine.register_device("device-1", "session-1", bad_ws)
 
@@ -1138,6 +1489,7 @@ class TestSyncEngineErrorHandling:
 
         # Should not raise
         await engine.broadcast_event(event)
+        await engine.flush()
 
         # Device should be removed
         assert "device-1" not in engine._connections.get("session-1", {})
@@ -1157,7 +1509,7 @@ class TestSyncEngineErrorHandling:
         )
 
         # Event should still be broadcast
-        mock_ws.send_json.assert_called_once()
+        assert len(await sent_events(engine, mock_ws)) == 1
 
     @pytest.mark.asyncio
     async def test_stream_end_without_start(self):
@@ -1209,8 +1561,8 @@ class TestSyncEngineIntegration:
             {"content": "Session 1 message"}
         )
 
-        ws1.send_json.assert_called_once()
-        ws2.send_json.assert_not_called()
+        assert len(await sent_events(engine, ws1)) == 1
+        assert await sent_events(engine, ws2) == []
 
     @pytest.mark.asyncio
     async def test_device_switching_sessions(self):
@@ -1257,4 +1609,4 @@ class TestSyncEngineIntegration:
         )
 
         # Device 2 should have received: stream_start, message_added, stream_end
-        assert ws2.send_json.call_count == 3
+        assert len(await sent_events(engine, ws2)) == 3
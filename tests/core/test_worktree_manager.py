@@ -14,7 +14,7 @@ Comprehensive test coverage for worktree lifecycle management including:
 import pytest
 import uuid
 from pathlib import Path
-from unittest.mock import patch, MagicMock, PropertyMock
+from unittest.mock import patch, MagicMock, PropertyMock, AsyncMock
 from typing import Dict, Any, List, Optional
 
 # Import module under test
@@ -711,6 +711,24 @@ class TestSyncWorktrees:
 
         assert result["synced"] == 1
 
+    @pytest.mark.asyncio
+    async def test_sync_worktrees_async(self, manager, mock_database, mock_git_service, mock_settings, temp_dir):
+        """Test async sync lists git worktrees without the blocking call"""
+        worktree_path = str(temp_dir / ".worktrees" / "proj-test123" / "synced-branch")
+        mock_database.get_worktrees_for_repository.return_value = [
+            {"id": "wt-synced", "worktree_path": ".worktrees/proj-test123/synced-branch", "status": WorktreeStatus.ACTIVE},
+            {"id": "wt-deleted", "worktree_path": ".worktrees/proj-test123/deleted-branch", "status": WorktreeStatus.DELETED},
+        ]
+        mock_git_service.list_worktrees_async = AsyncMock(return_value=[
+            {"path": worktree_path, "is_main": False}
+        ])
+
+        result = await manager.sync_worktrees_async("proj-test123")
+
+        assert result["synced"] == 1
+        assert result["cleaned_up"] == 1
+        mock_git_service.list_worktrees.assert_not_called()
+
 
 # =============================================================================
 # Get Available Worktrees Tests
@@ -868,6 +886,25 @@ class TestGetWorktreeDetails:
         assert result["exists"] is False
         assert "git_status" not in result
 
+    @pytest.mark.asyncio
+    async def test_get_worktree_details_async(self, manager, mock_database, mock_git_service, mock_settings, temp_dir):
+        """Test async details read git status without the blocking call"""
+        worktree_path = temp_dir / ".worktrees" / "proj-test123" / "feature"
+        worktree_path.mkdir(parents=True)
+        mock_database.get_worktree.return_value = {
+            "id": "wt-feature",
+            "worktree_path": ".worktrees/proj-test123/feature",
+            "repository_id": "repo-test123"
+        }
+        mock_database.get_sessions_for_worktree.return_value = []
+        mock_git_service.get_status_async = AsyncMock(return_value={"is_git_repo": True, "is_clean": False})
+
+        result = await manager.get_worktree_details_async("wt-feature")
+
+        assert result["git_status"]["is_clean"] is False
+        mock_git_service.get_status_async.assert_awaited_once_with(str(worktree_path))
+        mock_git_service.get_status.assert_not_called()
+
     def test_get_worktree_details_with_sessions(self, manager, mock_database, mock_settings, temp_dir):
         """Test includes session history"""
         mock_database.get_worktree.return_value = {
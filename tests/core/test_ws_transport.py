@@ -0,0 +1,129 @@
+"""
+Unit tests for WebSocket wire encodings.
+
+Tests cover:
+- Negotiating an encoding from a client preference list
+- Deflate and msgpack encoding
+- Frames encoded once per encoding
+- Sending text and binary frames
+- Sync engine broadcasts to devices with different encodings
+"""
+
+import json
+import zlib
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core import ws_transport
+from app.core.sync_engine import SyncEngine
+from app.core.ws_transport import Frame
+
+
+def _websocket(encoding=None):
+    ws = AsyncMock()
+    ws.state = SimpleNamespace()
+    if encoding:
+        ws_transport.set_encoding(ws, encoding)
+    return ws
+
+
+BIG_MESSAGE = {"type": "tool_result", "output": "line of tool output\n" * 200}
+
+
+class TestNegotiate:
+    """Test encoding negotiation."""
+
+    def test_default_is_json(self):
+        assert ws_transport.negotiate(None) == "json"
+        assert ws_transport.negotiate("cbor") == "json"
+
+    def test_first_supported_preference(self):
+        assert ws_transport.negotiate("cbor, Deflate, json") == "deflate"
+
+    def test_msgpack_only_when_installed(self):
+        with patch.object(ws_transport, "MSGPACK_AVAILABLE", False):
+            assert ws_transport.negotiate("msgpack,deflate") == "deflate"
+            assert "msgpack" not in ws_transport.supported_encodings()
+
+    def test_unknown_websocket_state_is_json(self):
+        assert ws_transport.get_encoding(AsyncMock()) == "json"
+        assert ws_transport.get_encoding(_websocket("deflate")) == "deflate"
+
+    @pytest.mark.asyncio
+    async def test_accept_announces_choice(self):
+        ws = _websocket()
+        assert await ws_transport.accept_encoding(ws, "deflate") == "deflate"
+        ws.send_json.assert_called_once()
+        assert ws.send_json.call_args.args[0]["encoding"] == "deflate"
+
+    @pytest.mark.asyncio
+    async def test_accept_silent_without_request(self):
+        ws = _websocket()
+        assert await ws_transport.accept_encoding(ws, None) == "json"
+        ws.send_json.assert_not_called()
+
+
+class TestEncode:
+    """Test message encoding."""
+
+    def test_deflate_compresses_large_messages(self):
+        data = ws_transport.encode(BIG_MESSAGE, "deflate")
+
+        assert isinstance(data, bytes)
+        assert len(data) < len(ws_transport.serialize_json(BIG_MESSAGE)) / 10
+        assert json.loads(zlib.decompress(data)) == BIG_MESSAGE
+
+    def test_deflate_keeps_small_messages_as_text(self):
+        assert ws_transport.encode({"type": "ping"}, "deflate") == '{"type":"ping"}'
+
+    def test_msgpack(self):
+        msgpack = pytest.importorskip("msgpack")
+        with patch.object(ws_transport, "MSGPACK_AVAILABLE", True), patch.object(ws_transport, "msgpack", msgpack):
+            data = ws_transport.encode(BIG_MESSAGE, "msgpack")
+        assert msgpack.unpackb(data) == BIG_MESSAGE
+
+    def test_frame_encodes_once_per_encoding(self):
+        frame = Frame(BIG_MESSAGE)
+        with patch("app.core.ws_transport.serialize_json", wraps=ws_transport.serialize_json) as spy:
+            for _ in range(3):
+                frame.encode("json")
+                frame.encode("deflate")
+
+        assert spy.call_count == 1
+
+
+class TestSend:
+    """Test sending in the negotiated encoding."""
+
+    @pytest.mark.asyncio
+    async def test_json_uses_send_json(self):
+        ws = _websocket()
+        await ws_transport.send(ws, {"type": "ping"})
+        ws.send_json.assert_called_once_with({"type": "ping"})
+
+    @pytest.mark.asyncio
+    async def test_deflate_sends_binary_for_large_messages(self):
+        ws = _websocket("deflate")
+        await ws_transport.send(ws, BIG_MESSAGE)
+        await ws_transport.send(ws, {"type": "ping"})
+
+        assert json.loads(zlib.decompress(ws.send_bytes.call_args.args[0])) == BIG_MESSAGE
+        ws.send_text.assert_called_once_with('{"type":"ping"}')
+
+    @pytest.mark.asyncio
+    async def test_broadcast_to_mixed_encodings(self):
+        """Each device should receive the event in its own encoding."""
+        engine = SyncEngine()
+        json_ws, deflate_ws = _websocket(), _websocket("deflate")
+        await engine.register_device("device-json", "session-1", json_ws)
+        await engine.register_device("device-deflate", "session-1", deflate_ws)
+
+        await engine.broadcast_message_added("session-1", {"content": "x" * 5000})
+        await engine.flush()
+
+        sent_text = json.loads(json_ws.send_text.call_args.args[0])
+        sent_bytes = json.loads(zlib.decompress(deflate_ws.send_bytes.call_args.args[0]))
+        assert sent_text == sent_bytes
+        assert sent_text["data"]["message"]["content"] == "x" * 5000
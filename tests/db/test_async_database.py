@@ -0,0 +1,152 @@
+"""
+Unit tests for app/db/async_database.py.
+
+Tests cover:
+- Read/write classification of database functions
+- Running database functions off the event loop thread
+- Write ordering on the single writer thread
+- Event loop lag monitor
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+
+from app.db import async_database
+from app.db.async_database import LoopLagMonitor, is_write_function
+
+
+# =============================================================================
+# Classification Tests
+# =============================================================================
+
+class TestIsWriteFunction:
+    """Test is_write_function."""
+
+    def test_write_prefixes(self):
+        def add_session_message(): ...
+        def update_session(): ...
+        def log_usage(): ...
+        assert is_write_function(add_session_message)
+        assert is_write_function(update_session)
+        assert is_write_function(log_usage)
+
+    def test_read_prefixes(self):
+        def get_session(): ...
+        def search_sessions(): ...
+        assert not is_write_function(get_session)
+        assert not is_write_function(search_sessions)
+
+    def test_object_without_name_is_read(self):
+        assert not is_write_function(object())
+
+
+# =============================================================================
+# Executor Tests
+# =============================================================================
+
+class TestRun:
+    """Test async_database.run routing."""
+
+    @pytest.mark.asyncio
+    async def test_runs_off_event_loop_thread(self):
+        loop_thread = threading.current_thread().name
+
+        def get_thread():
+            return threading.current_thread().name
+
+        name = await async_database.run(get_thread)
+        assert name != loop_thread
+        assert name.startswith("db-read")
+
+    @pytest.mark.asyncio
+    async def test_writes_use_writer_thread(self):
+        def add_thread_name():
+            return threading.current_thread().name
+
+        name = await async_database.run(add_thread_name)
+        assert name.startswith("db-write")
+
+    @pytest.mark.asyncio
+    async def test_passes_args_and_kwargs(self):
+        def get_value(a, b=0):
+            return a + b
+
+        assert await async_database.run(get_value, 1, b=2) == 3
+
+    @pytest.mark.asyncio
+    async def test_propagates_exceptions(self):
+        def get_broken():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await async_database.run(get_broken)
+
+    @pytest.mark.asyncio
+    async def test_writes_preserve_order(self):
+        order = []
+
+        def add_item(i):
+            time.sleep(0.001 * (5 - i))
+            order.append(i)
+
+        await asyncio.gather(*(async_database.run(add_item, i) for i in range(5)))
+        assert order == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_loop_stays_responsive_during_slow_read(self):
+        def get_slow():
+            time.sleep(0.1)
+            return "done"
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        result = await async_database.run(get_slow)
+        tick_task.cancel()
+
+        assert result == "done"
+        assert ticks >= 3
+
+
+# =============================================================================
+# Loop Lag Monitor Tests
+# =============================================================================
+
+class TestLoopLagMonitor:
+    """Test LoopLagMonitor."""
+
+    def test_record_tracks_max_and_avg(self):
+        monitor = LoopLagMonitor(warn_threshold_ms=50)
+        monitor.record(10)
+        monitor.record(70)
+        metrics = monitor.get_metrics()
+        assert metrics["samples"] == 2
+        assert metrics["max_lag_ms"] == 70
+        assert metrics["avg_lag_ms"] == 40
+        assert metrics["slow_ticks"] == 1
+
+    def test_negative_lag_clamped(self):
+        monitor = LoopLagMonitor()
+        monitor.record(-5)
+        assert monitor.get_metrics()["last_lag_ms"] == 0
+
+    @pytest.mark.asyncio
+    async def test_detects_blocked_loop(self):
+        monitor = LoopLagMonitor(interval=0.01, warn_threshold_ms=1000)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # Block the loop
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        metrics = monitor.get_metrics()
+        assert metrics["running"] is False
+        assert metrics["max_lag_ms"] >= 50
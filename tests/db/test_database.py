@@ -474,6 +474,15 @@ def _create_test_schema(cursor: sqlite3.Cursor):
         )
     """)
 
+    # Persisted rate limit counters
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # Agent runs
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS agent_runs (
@@ -493,6 +502,7 @@ def _create_test_schema(cursor: sqlite3.Cursor):
             auto_merge BOOLEAN DEFAULT FALSE,
             auto_review BOOLEAN DEFAULT FALSE,
             max_duration_minutes INTEGER DEFAULT 30,
+            priority INTEGER DEFAULT 0,
             sdk_session_id TEXT,
             started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             completed_at TIMESTAMP,
@@ -1069,6 +1079,52 @@ class TestSessionMessageOperations:
         assert result[0]["content"] == "First"
         assert result[1]["content"] == "Second"
 
+    def test_get_session_messages_page_latest(self, mock_db, setup_profile):
+        """get_session_messages_page should return the latest messages in order."""
+        db.create_session("session-1", setup_profile)
+        for i in range(5):
+            db.add_session_message("session-1", "user", f"Message {i}")
+
+        page = db.get_session_messages_page("session-1", 2)
+
+        assert [m["content"] for m in page["messages"]] == ["Message 3", "Message 4"]
+        assert page["total"] == 5
+        assert page["has_more_before"] is True
+        assert page["has_more_after"] is False
+
+    def test_get_session_messages_page_before_and_after(self, mock_db, setup_profile):
+        """get_session_messages_page should page older and newer by id."""
+        db.create_session("session-1", setup_profile)
+        ids = [db.add_session_message("session-1", "user", f"Message {i}")["id"] for i in range(5)]
+
+        older = db.get_session_messages_page("session-1", 2, before_id=ids[2])
+        newer = db.get_session_messages_page("session-1", 2, after_id=ids[2])
+
+        assert [m["id"] for m in older["messages"]] == ids[0:2]
+        assert older["has_more_before"] is False
+        assert older["has_more_after"] is True
+        assert [m["id"] for m in newer["messages"]] == ids[3:5]
+        assert newer["has_more_before"] is True
+        assert newer["has_more_after"] is False
+
+    def test_get_session_messages_page_around(self, mock_db, setup_profile):
+        """get_session_messages_page should center the page on around_id."""
+        db.create_session("session-1", setup_profile)
+        db.create_session("session-2", setup_profile)
+        ids = []
+        for i in range(7):
+            ids.append(db.add_session_message("session-1", "user", f"Message {i}")["id"])
+            db.add_session_message("session-2", "user", "Other session")
+
+        page = db.get_session_messages_page("session-1", 3, around_id=ids[3])
+        edge = db.get_session_messages_page("session-1", 3, around_id=ids[0])
+
+        assert [m["id"] for m in page["messages"]] == ids[2:5]
+        assert page["has_more_before"] is True
+        assert page["has_more_after"] is True
+        assert [m["id"] for m in edge["messages"]] == ids[0:3]
+        assert edge["has_more_before"] is False
+
     def test_delete_session_message(self, mock_db, setup_profile):
         """delete_session_message should delete specific message."""
         db.create_session("session-1", setup_profile)
@@ -1135,6 +1191,126 @@ class TestSearchSessions:
         assert result == []
 
 
+class TestSearchIndex:
+    """Test the FTS5 session search index."""
+
+    @pytest.fixture
+    def search_index(self, mock_db):
+        """Create the FTS5 index and triggers on the test database."""
+        db._create_search_index(mock_db.cursor())
+        mock_db.commit()
+        return mock_db
+
+    def test_build_fts_query_quotes_terms(self):
+        """build_fts_query should quote terms and prefix the last one."""
+        assert db.build_fts_query("react hooks") == '"react" "hooks"*'
+        assert db.build_fts_query("react hooks ") == '"react" "hooks"'
+
+    def test_build_fts_query_phrase_and_prefix(self):
+        """build_fts_query should keep phrases and explicit prefixes."""
+        assert db.build_fts_query('"connection pool" web*') == '"connection pool" "web"*'
+        assert db.build_fts_query('data* "exact phrase"') == '"data"* "exact phrase"'
+
+    def test_build_fts_query_neutralizes_syntax(self):
+        """build_fts_query should not pass FTS5 operators through."""
+        assert db.build_fts_query('NEAR( "a') == '"NEAR(" "a"*'
+        assert db.build_fts_query("*** ()") is None
+
+    def test_backfill_indexes_existing_rows(self, mock_db, setup_profile):
+        """Creating the index should backfill sessions and messages."""
+        db.create_session("session-1", setup_profile, title="Existing title")
+        db.add_session_message("session-1", "user", "Existing message about websockets")
+
+        db._create_search_index(mock_db.cursor())
+        mock_db.commit()
+
+        assert db.search_index_available() is True
+        assert [r["id"] for r in db.search_sessions("websock")] == ["session-1"]
+        assert [r["id"] for r in db.search_sessions("existing title")] == ["session-1"]
+
+    def test_title_match_is_highlighted(self, search_index, setup_profile):
+        """Title matches should be highlighted and support prefixes."""
+        db.create_session("session-1", setup_profile, title="Python debugging help")
+
+        result = db.search_sessions("debug")
+
+        assert len(result) == 1
+        assert result[0]["match_type"] == "title"
+        assert result[0]["match_snippet"] == "Python **debugging** help"
+
+    def test_phrase_query(self, search_index, setup_profile):
+        """Quoted queries should only match the exact phrase."""
+        db.create_session("session-1", setup_profile, title="One")
+        db.create_session("session-2", setup_profile, title="Two")
+        db.add_session_message("session-1", "user", "use the connection pool")
+        db.add_session_message("session-2", "user", "pool the connection")
+
+        result = db.search_sessions('"connection pool"')
+
+        assert [r["id"] for r in result] == ["session-1"]
+        assert "**connection pool**" in result[0]["match_snippet"]
+
+    def test_title_outranks_content(self, search_index, setup_profile):
+        """A title hit should rank above a similar content hit."""
+        db.create_session("session-1", setup_profile, title="Other")
+        db.add_session_message("session-1", "assistant", "Notes about caching")
+        db.create_session("session-2", setup_profile, title="Caching")
+
+        result = db.search_sessions("caching")
+
+        assert [r["id"] for r in result] == ["session-2", "session-1"]
+
+    def test_tool_messages_not_indexed(self, search_index, setup_profile):
+        """Only user and assistant messages should be searchable."""
+        db.create_session("session-1", setup_profile, title="One")
+        db.add_session_message("session-1", "tool_result", "secretword output")
+
+        assert db.search_sessions("secretword") == []
+
+    def test_index_follows_updates_and_deletes(self, search_index, setup_profile):
+        """Triggers should keep the index in sync with edits and deletes."""
+        db.create_session("session-1", setup_profile, title="Old title")
+        msg = db.add_session_message("session-1", "user", "original wording")
+
+        db.update_message_content(msg["id"], "revised wording")
+        db.update_session("session-1", title="New title")
+
+        assert db.search_sessions("original") == []
+        assert len(db.search_sessions("revised")) == 1
+        assert db.search_sessions("old title ") == []
+        assert len(db.search_sessions("new title")) == 1
+
+        db.delete_session("session-1")
+
+        assert db.search_sessions("revised") == []
+        assert db.search_sessions("new") == []
+
+    def test_filters(self, search_index, setup_profile, setup_project):
+        """Project and tag filters should be applied to index results."""
+        db.create_session("session-1", setup_profile, project_id=setup_project, title="Deploy notes")
+        db.create_session("session-2", setup_profile, title="Deploy notes")
+        tag = db.create_tag("tag-1", "ops")
+        db.add_session_tag("session-2", tag["id"])
+
+        assert [r["id"] for r in db.search_sessions("deploy", project_id=setup_project)] == ["session-1"]
+        assert [r["id"] for r in db.search_sessions("deploy", tag_id="tag-1")] == ["session-2"]
+
+    def test_search_session_messages(self, search_index, setup_profile):
+        """search_session_messages should return per-session message matches."""
+        db.create_session("session-1", setup_profile, title="One")
+        db.add_session_message("session-1", "user", "first question")
+        db.add_session_message("session-1", "assistant", "answer about indexes")
+        db.add_session_message("session-1", "user", "more on indexes please")
+
+        result = db.search_session_messages("indexes")
+
+        assert len(result) == 1
+        assert result[0]["title_snippet"] is None
+        matches = result[0]["matches"]
+        assert [m["message_index"] for m in matches] == [1, 2]
+        assert matches[0]["snippet"] == "answer about **indexes**"
+
+
 # =============================================================================
 # Auth Session Operations Tests
 # =============================================================================
@@ -1342,6 +1518,16 @@ class TestSystemSettingsOperations:
         assert result["key1"] == "value1"
         assert result["key2"] == "value2"
 
+    def test_get_system_settings(self, mock_db):
+        """get_system_settings should return the requested settings that exist."""
+        db.set_system_setting("key1", "value1")
+        db.set_system_setting("key2", "value2")
+
+        result = db.get_system_settings(["key1", "missing"])
+
+        assert result == {"key1": "value1"}
+        assert db.get_system_settings([]) == {}
+
 
 # =============================================================================
 # Tag Operations Tests
@@ -1638,6 +1824,16 @@ class TestAgentRunOperations:
         assert result is True
         assert db.get_agent_run("run-1") is None
 
+    def test_get_queued_agent_runs_orders_by_priority(self, mock_db):
+        """get_queued_agent_runs should return higher priorities first, then oldest."""
+        db.create_agent_run("run-1", "Low", "Prompt")
+        db.create_agent_run("run-2", "High", "Prompt", priority=5)
+        db.create_agent_run("run-3", "Low later", "Prompt")
+
+        result = db.get_queued_agent_runs()
+
+        assert [r["id"] for r in result] == ["run-2", "run-1", "run-3"]
+
 
 # =============================================================================
 # Agent Task Operations Tests
@@ -1786,6 +1982,14 @@ class TestUsageLogging:
         assert stats["total_tokens_out"] == 200
         assert stats["total_cost_usd"] == 0.03
 
+    def test_get_recent_query_durations(self, mock_db, setup_profile):
+        """get_recent_query_durations should return durations newest first."""
+        db.create_session("session-1", setup_profile)
+        for duration_ms in (1000, 0, 3000, 2000):
+            db.log_usage("session-1", setup_profile, "model", 1, 1, 0.01, duration_ms)
+
+        assert db.get_recent_query_durations(limit=2) == [2000, 3000]
+
 
 # =============================================================================
 # API Key Session Tests
@@ -1993,6 +2197,69 @@ class TestSyncLog:
 
         assert result == log2["id"]
 
+    def test_get_sync_events(self, mock_db, setup_profile):
+        """get_sync_events should return overflowed events after a sequence number."""
+        db.create_session("session-1", setup_profile)
+        db.add_sync_log("session-1", "message_added", "message", "m1", {"id": "m1"})
+        for seq in (3, 7, 12):
+            db.add_sync_log("session-1", "stream_chunk", "sync_event", str(seq), {"epoch": "e1", "event": {"seq": seq}})
+
+        result = db.get_sync_events("session-1", 3)
+
+        assert [row["event"]["seq"] for row in result] == [7, 12]
+
+
+class TestWriteBatch:
+    """Test write_batch (write-behind bulk insert)."""
+
+    def test_write_batch_inserts_all_row_types(self, mock_db, setup_profile):
+        """write_batch should insert messages, sync logs and usage."""
+        db.create_session("session-1", setup_profile)
+
+        db.write_batch(
+            session_messages=[
+                {"session_id": "session-1", "role": "tool_use", "content": "Using tool: Bash",
+                 "tool_name": "Bash", "tool_input": {"command": "ls"}},
+                {"session_id": "session-1", "role": "assistant", "content": "Done",
+                 "metadata": {"model": "m"}},
+            ],
+            sync_logs=[
+                {"session_id": "session-1", "event_type": "stream_end", "entity_type": "message",
+                 "entity_id": "m2", "data": {"interrupted": False}},
+            ],
+            usage_logs=[
+                {"session_id": "session-1", "profile_id": setup_profile, "model": "m",
+                 "tokens_in": 10, "tokens_out": 5, "cost_usd": 0.01, "duration_ms": 100},
+            ],
+        )
+
+        messages = db.get_session_messages("session-1")
+        assert [m["role"] for m in messages] == ["tool_use", "assistant"]
+        assert messages[0]["tool_input"] == {"command": "ls"}
+
+        logs = db.get_sync_logs("session-1")
+        assert logs[0]["entity_id"] == "m2"
+        assert logs[0]["data"] == {"interrupted": False}
+
+        assert mock_db.execute("SELECT COUNT(*) FROM usage_log").fetchone()[0] == 1
+
+    def test_write_batch_empty(self, mock_db):
+        """write_batch with nothing to write should be a no-op."""
+        db.write_batch()
+        assert mock_db.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0] == 0
+
+    def test_write_batch_is_atomic(self, mock_db, setup_profile):
+        """A failing row should roll back the whole batch."""
+        db.create_session("session-1", setup_profile)
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.write_batch(
+                session_messages=[{"session_id": "session-1", "role": "user", "content": "hi"}],
+                sync_logs=[{"session_id": "missing-session", "event_type": "x", "entity_type": "x"}],
+            )
+
+        assert db.get_session_messages("session-1") == []
+
 
 # =============================================================================
 # Permission Rules Tests
@@ -2335,6 +2602,16 @@ class TestRateLimitOperations:
         assert result is True
         assert db.get_rate_limit("rl-1") is None
 
+    def test_save_rate_limit_buckets(self, mock_db):
+        """save_rate_limit_buckets should upsert counters and delete dropped keys."""
+        db.save_rate_limit_buckets({"user:a": {"minute": {"head": 1, "counts": [1]}}, "user:b": {}})
+        db.save_rate_limit_buckets({"user:a": {"minute": {"head": 2, "counts": [2]}}}, ["user:b"])
+
+        rows = db.get_rate_limit_buckets()
+
+        assert [row["key"] for row in rows] == ["user:a"]
+        assert rows[0]["data"] == {"minute": {"head": 2, "counts": [2]}}
+
 
 # =============================================================================
 # Knowledge Document Tests
@@ -2380,6 +2657,25 @@ class TestKnowledgeDocuments:
         assert result is True
         assert db.get_knowledge_document("doc-1") is None
 
+    def test_delete_knowledge_document_with_revisions(self, mock_db, setup_project):
+        """delete_knowledge_document_with_revisions should report the project and revisions."""
+        empty = db.get_knowledge_revision(setup_project)
+        db.create_knowledge_document("doc-1", setup_project, "file.txt", "content", chunk_count=2)
+        added = db.get_knowledge_revision(setup_project)
+
+        assert db.delete_knowledge_document_with_revisions("doc-1") == (setup_project, added, empty)
+        assert db.delete_knowledge_document_with_revisions("doc-1") is None
+
+    def test_get_knowledge_revision_changes(self, mock_db, setup_project):
+        """get_knowledge_revision should change when documents change."""
+        empty = db.get_knowledge_revision(setup_project)
+        db.create_knowledge_document("doc-1", setup_project, "file.txt", "content", chunk_count=2)
+        added = db.get_knowledge_revision(setup_project)
+        db.delete_knowledge_document("doc-1")
+
+        assert added != empty
+        assert db.get_knowledge_revision(setup_project) == empty
+
 
 # =============================================================================
 # Request Log Tests
@@ -2601,6 +2897,39 @@ class TestKnowledgeChunks:
         assert deleted == 2
         assert len(db.get_knowledge_chunks("doc-1")) == 0
 
+    def test_create_knowledge_document_with_chunks(self, mock_db, setup_project):
+        """create_knowledge_document_with_chunks should store both in one call."""
+        empty = db.get_knowledge_revision(setup_project)
+        revisions = db.create_knowledge_document_with_chunks(
+            "doc-1", setup_project, "file.txt", "First\n\nSecond",
+            chunks=[
+                {"id": "chunk-1", "chunk_index": 0, "content": "First", "metadata": {"start_char": 0}},
+                {"id": "chunk-2", "chunk_index": 1, "content": "Second"},
+            ],
+            file_size=13
+        )
+
+        doc = db.get_knowledge_document("doc-1")
+        chunks = db.get_knowledge_chunks("doc-1")
+        assert doc["chunk_count"] == 2
+        assert doc["file_size"] == 13
+        assert [c["id"] for c in chunks] == ["chunk-1", "chunk-2"]
+        assert chunks[0]["metadata"] == {"start_char": 0}
+        assert revisions == (empty, db.get_knowledge_revision(setup_project))
+
+    def test_create_knowledge_document_with_chunks_is_atomic(self, mock_db, setup_project):
+        """A failing chunk insert should not leave the document behind."""
+        with pytest.raises(Exception):
+            db.create_knowledge_document_with_chunks(
+                "doc-1", setup_project, "file.txt", "content",
+                chunks=[
+                    {"id": "chunk-1", "chunk_index": 0, "content": "a"},
+                    {"id": "chunk-1", "chunk_index": 1, "content": "b"},
+                ]
+            )
+
+        assert db.get_knowledge_document("doc-1") is None
+
 
 # =============================================================================
 # Agent Task Update Tests
@@ -0,0 +1,278 @@
+"""
+Unit tests for app/db/pool.py.
+
+Tests cover:
+- Write statement detection
+- Per-thread connection reuse and pragmas (WAL, synchronous)
+- Nested checkouts sharing one transaction
+- Writer lock serialization and release on commit/rollback
+- SQLITE_BUSY retry accounting
+- database.get_db() routing through the pool
+"""
+
+import sqlite3
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from app.db.pool import ConnectionPool, PoolConfig, is_write_statement
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+@pytest.fixture
+def pool(tmp_path):
+    """Create a pool over a temporary on-disk database with one table."""
+    pool = ConnectionPool(tmp_path / "pool.sqlite", PoolConfig(busy_retry_delay_ms=1))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    pool.reset_metrics()
+    yield pool
+    pool.close_all()
+
+
+# =============================================================================
+# Statement Classification Tests
+# =============================================================================
+
+class TestIsWriteStatement:
+    """Test is_write_statement helper."""
+
+    @pytest.mark.parametrize("sql", [
+        "INSERT INTO t VALUES (1)",
+        "  update t set a = 1",
+        "DELETE FROM t",
+        "REPLACE INTO t VALUES (1)",
+        "CREATE TABLE x (a)",
+        "-- comment\nINSERT INTO t VALUES (1)",
+    ])
+    def test_write_statements(self, sql):
+        assert is_write_statement(sql) is True
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT * FROM t",
+        "PRAGMA foreign_keys = ON",
+        "  select 1",
+        "",
+        "-- only a comment",
+    ])
+    def test_read_statements(self, sql):
+        assert is_write_statement(sql) is False
+
+
+# =============================================================================
+# Connection Reuse Tests
+# =============================================================================
+
+class TestConnectionReuse:
+    """Test per-thread connection reuse."""
+
+    def test_same_thread_reuses_connection(self, pool):
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is second
+        assert pool.metrics.connections_opened == 0
+
+    def test_other_thread_gets_own_connection(self, pool):
+        with pool.connection() as main_conn:
+            pass
+        seen = []
+
+        def worker():
+            with pool.connection() as conn:
+                seen.append(conn)
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+
+        assert seen[0] is not main_conn
+        assert pool.metrics.connections_opened == 1
+
+    def test_pragmas_applied(self, pool):
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            # NORMAL == 1
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+    def test_close_all_forces_reconnect(self, pool):
+        with pool.connection() as first:
+            pass
+        pool.close_all()
+        with pool.connection() as second:
+            pass
+        assert first is not second
+        assert pool.metrics.connections_closed >= 1
+
+
+# =============================================================================
+# Transaction Tests
+# =============================================================================
+
+class TestTransactions:
+    """Test commit/rollback semantics."""
+
+    def test_commit_on_success(self, pool):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+
+        other = sqlite3.connect(str(pool.db_path))
+        assert other.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+        other.close()
+
+    def test_rollback_on_error(self, pool):
+        with pytest.raises(ValueError):
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('a')")
+                raise ValueError("boom")
+
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    def test_nested_checkout_joins_outer_transaction(self, pool):
+        with pytest.raises(ValueError):
+            with pool.connection() as outer:
+                with pool.connection() as inner:
+                    assert inner is outer
+                    inner.execute("INSERT INTO items (name) VALUES ('nested')")
+                # Inner exit must not commit
+                assert outer.in_transaction
+                raise ValueError("boom")
+
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+        assert pool.metrics.nested_checkouts == 1
+
+
+# =============================================================================
+# Writer Serialization Tests
+# =============================================================================
+
+class TestWriterLock:
+    """Test single-writer serialization."""
+
+    def test_reads_do_not_take_writer_lock(self, pool):
+        with pool.connection() as conn:
+            conn.execute("SELECT * FROM items").fetchall()
+            assert conn._holds_writer is False
+
+    def test_write_takes_and_releases_writer_lock(self, pool):
+        with pool.connection() as conn:
+            conn.cursor().execute("INSERT INTO items (name) VALUES ('a')")
+            assert conn._holds_writer is True
+        assert conn._holds_writer is False
+        assert pool.metrics.write_transactions == 1
+
+    def test_explicit_commit_releases_writer_lock(self, pool):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            conn.commit()
+            assert conn._holds_writer is False
+
+    def test_concurrent_writers_are_serialized(self, pool):
+        order = []
+        first_has_lock = threading.Event()
+
+        def slow_writer():
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('slow')")
+                first_has_lock.set()
+                time.sleep(0.05)
+                order.append("slow")
+
+        def fast_writer():
+            first_has_lock.wait()
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('fast')")
+                order.append("fast")
+
+        threads = [threading.Thread(target=slow_writer), threading.Thread(target=fast_writer)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert order == ["slow", "fast"]
+        assert pool.metrics.writer_wait_max_ms > 0
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+
+
+# =============================================================================
+# Busy Retry Tests
+# =============================================================================
+
+class TestBusyRetries:
+    """Test SQLITE_BUSY retry handling."""
+
+    def test_retries_then_succeeds(self, pool):
+        calls = {"n": 0}
+
+        def flaky():
+            calls["n"] += 1
+            if calls["n"] < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+
+        assert pool._retry_busy(flaky) == "ok"
+        assert pool.metrics.busy_retries == 2
+
+    def test_gives_up_after_max_retries(self, pool):
+        pool.config.busy_retries = 1
+
+        def always_locked():
+            raise sqlite3.OperationalError("database is locked")
+
+        with pytest.raises(sqlite3.OperationalError):
+            pool._retry_busy(always_locked)
+        assert pool.metrics.busy_failures == 1
+
+    def test_non_busy_errors_not_retried(self, pool):
+        def broken():
+            raise sqlite3.OperationalError("no such table: nope")
+
+        with pytest.raises(sqlite3.OperationalError):
+            pool._retry_busy(broken)
+        assert pool.metrics.busy_retries == 0
+
+
+# =============================================================================
+# database.get_db Integration Tests
+# =============================================================================
+
+class TestGetDbUsesPool:
+    """Test database.get_db routing through the pool."""
+
+    def test_get_db_uses_pool_when_enabled(self, tmp_path):
+        from app.db import database
+
+        pool = ConnectionPool(tmp_path / "db.sqlite")
+        previous = database.set_pool(pool)
+        try:
+            with patch.object(database.settings, "data_dir", tmp_path), \
+                 patch.object(database.settings, "db_pool_enabled", True):
+                with database.get_db() as conn:
+                    conn.execute("CREATE TABLE t (a)")
+                with database.get_db() as conn:
+                    assert conn is pool._thread_connection()
+                metrics = database.get_pool_metrics()
+            assert metrics["enabled"] is True
+            assert metrics["checkouts"] == 2
+        finally:
+            database.set_pool(previous)
+            pool.close_all()
+
+    def test_get_db_unpooled_when_disabled(self, tmp_path):
+        from app.db import database
+
+        with patch.object(database.settings, "data_dir", tmp_path), \
+             patch.object(database.settings, "db_pool_enabled", False):
+            with database.get_db() as conn:
+                conn.execute("CREATE TABLE t (a)")
+            assert database.get_pool_metrics() == {"enabled": False}
@@ -0,0 +1,201 @@
+"""
+Unit tests for app/db/write_behind.py.
+
+Tests cover:
+- Buffering rows until a flush
+- Batch handed to database.write_batch (row order)
+- Durability modes (strict, per_turn, interval)
+- Early flush at max_batch
+- Retry and drop on flush failure
+- Flush on stop
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.db.write_behind import WriteBehindQueue, DurabilityMode
+
+
+def _fake_write_batch(calls):
+    """Build a write_batch stand-in that records calls."""
+    def write_batch(session_messages=None, sync_logs=None, usage_logs=None):
+        calls.append({
+            "session_messages": session_messages or [],
+            "sync_logs": sync_logs or [],
+            "usage_logs": usage_logs or [],
+        })
+    return write_batch
+
+
+@pytest.fixture
+def calls():
+    calls = []
+    with patch("app.db.write_behind.database") as mock_database:
+        mock_database.write_batch.side_effect = _fake_write_batch(calls)
+        yield calls
+
+
+# =============================================================================
+# Construction Tests
+# =============================================================================
+
+class TestConstruction:
+    """Test WriteBehindQueue construction."""
+
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            WriteBehindQueue(mode="sometimes")
+
+
+# =============================================================================
+# Buffering and Flush Tests
+# =============================================================================
+
+class TestFlush:
+    """Test buffering and flush behavior."""
+
+    def test_rows_buffered_until_flush(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.PER_TURN)
+        queue.add_session_message("s1", "tool_use", "Using tool: Bash", tool_name="Bash")
+        queue.log_usage("s1", "p1", "m", 1, 2, 0.1, 10)
+
+        assert calls == []
+        assert queue.pending_count == 2
+
+        assert queue.flush() == 2
+        assert len(calls) == 1
+        assert queue.pending_count == 0
+        assert calls[0]["usage_logs"][0]["tokens_out"] == 2
+
+    def test_flush_empty_is_noop(self, calls):
+        queue = WriteBehindQueue()
+        assert queue.flush() == 0
+        assert calls == []
+
+    def test_message_order_preserved(self, calls):
+        queue = WriteBehindQueue()
+        for i in range(5):
+            queue.add_session_message("s1", "tool_result", f"out-{i}")
+        queue.flush()
+        assert [m["content"] for m in calls[0]["session_messages"]] == [f"out-{i}" for i in range(5)]
+
+    def test_discard_pending(self, calls):
+        queue = WriteBehindQueue()
+        queue.log_usage("s1", "p1", "m", 1, 2, 0.1, 10)
+        assert queue.discard_pending() == 1
+        assert queue.flush() == 0
+
+
+# =============================================================================
+# Failure Handling Tests
+# =============================================================================
+
+class TestFailures:
+    """Test flush failure handling."""
+
+    def test_failed_flush_requeues_rows_in_order(self):
+        queue = WriteBehindQueue()
+        queue.add_session_message("s1", "user", "first")
+
+        with patch("app.db.write_behind.database") as mock_database:
+            mock_database.write_batch.side_effect = RuntimeError("disk full")
+            assert queue.flush() == 0
+
+        queue.add_session_message("s1", "user", "second")
+        calls = []
+        with patch("app.db.write_behind.database") as mock_database:
+            mock_database.write_batch.side_effect = _fake_write_batch(calls)
+            queue.flush()
+
+        assert [m["content"] for m in calls[0]["session_messages"]] == ["first", "second"]
+        assert queue.flush_failures == 1
+
+    def test_rows_dropped_after_max_attempts(self):
+        queue = WriteBehindQueue()
+        queue.add_session_message("s1", "user", "first")
+
+        with patch("app.db.write_behind.database") as mock_database:
+            mock_database.write_batch.side_effect = RuntimeError("broken")
+            for _ in range(WriteBehindQueue.MAX_FLUSH_ATTEMPTS):
+                queue.flush()
+
+        assert queue.pending_count == 0
+        assert queue.rows_dropped == 1
+
+
+# =============================================================================
+# Durability Mode Tests
+# =============================================================================
+
+class TestDurabilityModes:
+    """Test strict, per_turn and interval modes."""
+
+    @pytest.mark.asyncio
+    async def test_per_turn_commit_writes_one_transaction(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.PER_TURN)
+        for i in range(200):
+            queue.add_session_message("s1", "tool_result", f"out-{i}")
+        queue.log_usage("s1", "p1", "m", 1, 2, 0.1, 10)
+
+        await queue.commit_turn()
+
+        assert len(calls) == 1
+        assert len(calls[0]["session_messages"]) == 200
+
+    @pytest.mark.asyncio
+    async def test_strict_writes_each_row_immediately(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.STRICT)
+        queue.add_session_message("s1", "user", "a")
+        queue.add_session_message("s1", "user", "b")
+
+        await queue.commit_turn()
+
+        assert queue.pending_count == 0
+        assert sum(len(c["session_messages"]) for c in calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_interval_commit_does_not_wait(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.INTERVAL, interval_ms=10)
+        queue.add_session_message("s1", "user", "a")
+
+        await queue.commit_turn()
+        assert queue.pending_count == 1
+
+        queue.start()
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+        assert queue.pending_count == 0
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_max_batch_triggers_early_flush(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.INTERVAL, max_batch=3)
+        for i in range(3):
+            queue.add_session_message("s1", "user", str(i))
+
+        # The early flush is queued on the writer thread; a barrier waits behind it
+        await queue.barrier()
+        assert queue.pending_count == 0
+        assert sum(len(c["session_messages"]) for c in calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending(self, calls):
+        queue = WriteBehindQueue(mode=DurabilityMode.PER_TURN)
+        queue.add_session_message("s1", "tool_result", "left over")
+
+        await queue.stop()
+
+        assert queue.pending_count == 0
+        assert calls[0]["session_messages"][0]["content"] == "left over"
+
+    def test_metrics(self, calls):
+        queue = WriteBehindQueue()
+        queue.log_usage("s1", "p1", "m", 1, 2, 0.1, 10)
+        queue.flush()
+        metrics = queue.get_metrics()
+        assert metrics["mode"] == "per_turn"
+        assert metrics["flushes"] == 1
+        assert metrics["rows_flushed"] == 1
+        assert metrics["pending"] == 0
@@ -232,7 +232,7 @@ class TestDispatchNonRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_non_rate_limited_endpoint_adds_headers(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -265,7 +265,7 @@ class TestDispatchNonRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_non_rate_limited_endpoint_does_not_check_limits(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -306,7 +306,7 @@ class TestDispatchRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_rate_limited_endpoint_allowed(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -348,7 +348,7 @@ class TestDispatchRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_rate_limited_endpoint_denied(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -387,7 +387,7 @@ class TestDispatchRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_conversation_endpoint_rate_limited(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -421,7 +421,7 @@ class TestDispatchRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_websocket_endpoint_rate_limited(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -455,7 +455,7 @@ class TestDispatchRateLimited:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_query_subpath_rate_limited(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -498,7 +498,7 @@ class TestGetUserInfo:
         return RateLimitMiddleware(app)
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_no_auth(self, mock_db, middleware):
         """Should return None values when no auth present."""
         request = MagicMock()
@@ -513,7 +513,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_session_cookie(self, mock_db, middleware):
         """Should identify admin from session cookie."""
         request = MagicMock()
@@ -530,7 +530,7 @@ class TestGetUserInfo:
         assert is_admin is True
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_invalid_session_cookie(self, mock_db, middleware):
         """Should not authenticate with invalid session cookie."""
         request = MagicMock()
@@ -547,7 +547,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_api_key(self, mock_db, middleware):
         """Should identify user from API key header."""
         api_key = "aih_test_api_key_12345"
@@ -572,7 +572,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_api_key_no_username(self, mock_db, middleware):
         """Should fall back to name when username is not set."""
         api_key = "aih_another_key"
@@ -595,7 +595,7 @@ class TestGetUserInfo:
         assert api_key_id == "api-user-456"
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_bearer_session_token(self, mock_db, middleware):
         """Should identify user from bearer session token (non-API key)."""
         request = MagicMock()
@@ -603,6 +603,7 @@ class TestGetUserInfo:
         request.headers.get.return_value = "Bearer session-token-123"
         request.query_params.get.return_value = None
 
+        mock_db.get_auth_session.return_value = None  # Not an admin session
         mock_db.get_api_user_by_key_hash.return_value = None  # Not an API key
         mock_db.get_api_key_session.return_value = {
             "api_user_id": "api-user-789"
@@ -620,7 +621,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_query_param_admin_session(self, mock_db, middleware):
         """Should identify admin from query param token (WebSocket)."""
         request = MagicMock()
@@ -636,7 +637,7 @@ class TestGetUserInfo:
         assert is_admin is True
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_with_query_param_api_session(self, mock_db, middleware):
         """Should identify user from query param API session token."""
         request = MagicMock()
@@ -659,7 +660,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_query_param_no_username(self, mock_db, middleware):
         """Should fall back to name when username not set for query param auth."""
         request = MagicMock()
@@ -680,7 +681,7 @@ class TestGetUserInfo:
         assert user_id == "Fallback Name"
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_invalid_bearer_session(self, mock_db, middleware):
         """Should handle invalid bearer session token gracefully."""
         request = MagicMock()
@@ -698,7 +699,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_bearer_session_user_not_found(self, mock_db, middleware):
         """Should handle case where session exists but user not found."""
         request = MagicMock()
@@ -717,7 +718,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_query_param_user_not_found(self, mock_db, middleware):
         """Should handle case where query param session exists but user not found."""
         request = MagicMock()
@@ -736,7 +737,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_query_param_no_api_session(self, mock_db, middleware):
         """Should handle case where query param token has no session."""
         request = MagicMock()
@@ -754,7 +755,7 @@ class TestGetUserInfo:
         assert is_admin is False
 
     @pytest.mark.asyncio
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_get_user_info_invalid_api_key(self, mock_db, middleware):
         """Should handle case where API key is not found."""
         api_key = "aih_invalid_key"
@@ -958,7 +959,7 @@ class TestDispatchErrorHandling:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_complete_request_called_on_exception(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -1004,7 +1005,7 @@ class TestDispatchWithDuration:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     @patch("app.middleware.rate_limit.time")
     async def test_duration_passed_to_complete_request(
         self, mock_time, mock_db, mock_rate_limiter, middleware
@@ -1044,7 +1045,7 @@ class TestDispatchWithDuration:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     @patch("app.middleware.rate_limit.time")
     async def test_duration_passed_on_exception(
         self, mock_time, mock_db, mock_rate_limiter, middleware
@@ -1093,7 +1094,7 @@ class TestRateLimitLogging:
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.logger")
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_logs_rate_limit_exceeded(
         self, mock_db, mock_rate_limiter, mock_logger, middleware
     ):
@@ -1130,7 +1131,7 @@ class TestRateLimitLogging:
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.logger")
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_log_includes_user_info(
         self, mock_db, mock_rate_limiter, mock_logger, middleware
     ):
@@ -1182,7 +1183,7 @@ class TestIntegrationScenarios:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_admin_session_bypasses_rate_limit(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -1217,7 +1218,7 @@ class TestIntegrationScenarios:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_api_user_rate_limited(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -1260,7 +1261,7 @@ class TestIntegrationScenarios:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_websocket_auth_via_query_param(
         self, mock_db, mock_rate_limiter, middleware
     ):
@@ -1293,7 +1294,7 @@ class TestIntegrationScenarios:
 
     @pytest.mark.asyncio
     @patch("app.middleware.rate_limit.rate_limiter")
-    @patch("app.middleware.rate_limit.database")
+    @patch("app.core.principal_cache.database")
     async def test_full_request_lifecycle(
         self, mock_db, mock_rate_limiter, middleware
     ):